@@ -358,3 +358,71 @@ def bulk_benefit_eligibility_prediction() -> Dict[str, Any]:
     except Exception as e:
         frappe.log_error(f"Error in bulk eligibility prediction: {str(e)}")
         return {"success": False, "message": str(e)}
+
+
+@frappe.whitelist()
+def get_semantic_cache_metrics() -> Dict[str, Any]:
+    """Semantic reply cache hit rate, saved LLM time and size per scope"""
+    try:
+        from assistant_crm.services.semantic_cache import get_metrics
+
+        return {"success": True, "metrics": get_metrics()}
+
+    except Exception as e:
+        frappe.log_error(f"Error getting semantic cache metrics: {str(e)}")
+        return {"success": False, "message": str(e)}
+
+
+@frappe.whitelist()
+def get_llm_governor_metrics() -> Dict[str, Any]:
+    """LLM rate-limit saturation, queue depth by priority, waits and 429s per model"""
+    try:
+        from assistant_crm.services.llm_governor import get_metrics
+
+        return {"success": True, "metrics": get_metrics()}
+
+    except Exception as e:
+        frappe.log_error(f"Error getting LLM governor metrics: {str(e)}")
+        return {"success": False, "message": str(e)}
+
+
+@frappe.whitelist()
+def get_service_container_metrics(measure: bool = False) -> Dict[str, Any]:
+    """Shared service builds, cache hits and instantiation cost; ``measure`` times a fresh build"""
+    frappe.only_for("System Manager")
+    try:
+        from frappe.utils import cint
+        from assistant_crm.services.service_container import get_metrics
+
+        return {"success": True, "metrics": get_metrics(measure=bool(cint(measure)))}
+
+    except Exception as e:
+        frappe.log_error(f"Error getting service container metrics: {str(e)}")
+        return {"success": False, "message": str(e)}
+
+
+@frappe.whitelist()
+def get_prompt_builder_metrics() -> Dict[str, Any]:
+    """Prompt tokens sent and trimmed to budget, and provider prompt-cache hits, for this process"""
+    try:
+        from assistant_crm.services.prompt_builder import get_metrics
+
+        return {"success": True, "metrics": get_metrics()}
+
+    except Exception as e:
+        frappe.log_error(f"Error getting prompt builder metrics: {str(e)}")
+        return {"success": False, "message": str(e)}
+
+
+@frappe.whitelist()
+def get_redis_pool_metrics() -> Dict[str, Any]:
+    """Shared Redis pool connections, circuit-breaker state and health-check latency for this process"""
+    frappe.only_for("System Manager")
+    try:
+        from assistant_crm.services.redis_pool import get_metrics
+
+        return {"success": True, "metrics": get_metrics()}
+
+    except Exception as e:
+        frappe.log_error(f"Error getting Redis pool metrics: {str(e)}")
+        return {"success": False, "message": str(e)}
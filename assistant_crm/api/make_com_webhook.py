@@ -575,7 +575,7 @@ def _add_message_to_conversation(conversation_id: str, message_content: str, dir
             "sender_id": WorkCom_data.get("sender_id", ""),
             "sender_name": WorkCom_data.get("sender_name", "Facebook User"),
             "message_type": WorkCom_data.get("message_type", "text"),
-            "platform_message_id": WorkCom_data.get("original_message_id", "")
+            "platform_message_id": WorkCom_data.get("original_message_id") or None
         })
         message_doc.insert(ignore_permissions=True)
 
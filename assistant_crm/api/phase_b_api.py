@@ -109,9 +109,9 @@ def enhance_message_quality(message_text, target_tone="professional", platform="
         Dict containing enhanced message and analysis
     """
     try:
-        from assistant_crm.services.enhanced_ai_service import EnhancedAIService
+        from assistant_crm.services import service_container
         
-        ai_service = EnhancedAIService()
+        ai_service = service_container.get("enhanced_ai")
         
         # Parse customer context if provided as string
         if isinstance(customer_context, str):
@@ -182,29 +182,10 @@ def facebook_webhook():
         data = json.loads(frappe.request.data or "{}")
 
         # 3) Persist via legacy Unified Inbox pipeline
-        from assistant_crm.api.social_media_ports import FacebookIntegration
-        FacebookIntegration().process_webhook(data)
+        from assistant_crm.api.social_media_ports import get_platform_integration
+        get_platform_integration("Facebook").process_webhook(data)
 
-        # 4) Enqueue async AI processing for the saved conversation
-        try:
-            entry = (data.get("entry") or [{}])[0]
-            messaging = (entry.get("messaging") or [{}])[0]
-            sender_id = (messaging.get("sender") or {}).get("id")
-
-            if sender_id:
-                conversation = frappe.db.get_value(
-                    "Unified Inbox Conversation",
-                    {"platform": "Facebook", "customer_platform_id": sender_id},
-                    "name",
-                )
-                if conversation:
-                    frappe.enqueue(
-                        "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                        conversation_id=conversation,
-                        queue="long",
-                    )
-        except Exception as e:
-            frappe.log_error(f"Enqueue AI error: {str(e)}", "Facebook Webhook")
+        # AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
         return {"status": "success"}
 
@@ -270,31 +251,12 @@ def telegram_webhook():
 
         # 1) Persist via legacy Unified Inbox pipeline (consistent with Facebook/Instagram)
         try:
-            from assistant_crm.api.social_media_ports import TelegramIntegration
-            TelegramIntegration().process_webhook(data)
+            from assistant_crm.api.social_media_ports import get_platform_integration
+            get_platform_integration("Telegram").process_webhook(data)
         except Exception as persist_err:
             frappe.log_error(f"Telegram persist error: {str(persist_err)}", "Telegram Webhook")
 
-        # 2) Enqueue async AI processing for the saved conversation (same pattern as Facebook)
-        try:
-            msg = (data.get("message") or {})
-            chat = (msg.get("chat") or {})
-            chat_id = str(chat.get("id") or "")
-
-            if chat_id:
-                conversation = frappe.db.get_value(
-                    "Unified Inbox Conversation",
-                    {"platform": "Telegram", "customer_platform_id": chat_id},
-                    "name",
-                )
-                if conversation:
-                    frappe.enqueue(
-                        "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                        conversation_id=conversation,
-                        queue="long",
-                    )
-        except Exception as e_enqueue:
-            frappe.log_error(f"Enqueue AI error: {str(e_enqueue)}", "Telegram Webhook")
+        # 2) AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
         # 3) Commit persistence before any optional realtime/broadcasting to avoid rollbacks
         try:
@@ -331,41 +293,10 @@ def twitter_webhook():
         data = json.loads(frappe.request.data or "{}")
 
         # Persist via Unified Inbox pipeline
-        from assistant_crm.api.social_media_ports import TwitterIntegration
-        TwitterIntegration().process_webhook(data)
-
-        # Enqueue async AI processing for the saved conversation
-        try:
-            sender_id = None
-            if isinstance(data.get("direct_message_events"), list):
-                for ev in data.get("direct_message_events") or []:
-                    mc = (ev.get("message_create") or {})
-                    sid = str(mc.get("sender_id") or "")
-                    if sid and sid != str(data.get("for_user_id") or ""):
-                        sender_id = sid
-                        break
-            elif isinstance(data.get("dm_events"), list):
-                for ev in data.get("dm_events") or []:
-                    mc = (ev.get("message_create") or {})
-                    sid = str(mc.get("sender_id") or "")
-                    if sid and sid != str(data.get("for_user_id") or ""):
-                        sender_id = sid
-                        break
+        from assistant_crm.api.social_media_ports import get_platform_integration
+        get_platform_integration("Twitter").process_webhook(data)
 
-            if sender_id:
-                conversation = frappe.db.get_value(
-                    "Unified Inbox Conversation",
-                    {"platform": "Twitter", "customer_platform_id": sender_id},
-                    "name",
-                )
-                if conversation:
-                    frappe.enqueue(
-                        "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                        conversation_id=conversation,
-                        queue="long",
-                    )
-        except Exception as e:
-            frappe.log_error(f"Twitter enqueue AI error: {str(e)}", "Twitter Webhook")
+        # AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
         return {"status": "success"}
 
@@ -388,20 +319,10 @@ def linkedin_webhook():
         data = json.loads(frappe.request.data or "{}")
 
         # 3) Persist via Unified Inbox pipeline
-        from assistant_crm.api.social_media_ports import LinkedInIntegration
-        result = LinkedInIntegration().process_webhook(data)
+        from assistant_crm.api.social_media_ports import get_platform_integration
+        get_platform_integration("LinkedIn").process_webhook(data)
 
-        # 4) Enqueue async AI processing for the saved conversation
-        try:
-            conversation = (result or {}).get("conversation_id")
-            if conversation:
-                frappe.enqueue(
-                    "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                    conversation_id=conversation,
-                    queue="long",
-                )
-        except Exception as e:
-            frappe.log_error(f"LinkedIn enqueue AI error: {str(e)}", "LinkedIn Webhook")
+        # 4) AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
         return {"status": "success"}
 
@@ -497,20 +418,10 @@ def youtube_webhook():
                 data = parse_youtube_atom_feed(raw_body)
 
         # 4) Persist via Unified Inbox pipeline
-        from assistant_crm.api.social_media_ports import YouTubeIntegration
-        result = YouTubeIntegration().process_webhook(data)
+        from assistant_crm.api.social_media_ports import get_platform_integration
+        get_platform_integration("YouTube").process_webhook(data)
 
-        # 5) Enqueue async AI processing for the saved conversation
-        try:
-            conversation = (result or {}).get("conversation_id")
-            if conversation:
-                frappe.enqueue(
-                    "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                    conversation_id=conversation,
-                    queue="long",
-                )
-        except Exception as e:
-            frappe.log_error(f"YouTube enqueue AI error: {str(e)}", "YouTube Webhook")
+        # 5) AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
         return {"status": "success"}
 
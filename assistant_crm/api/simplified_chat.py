@@ -37,15 +37,13 @@ except ImportError:
 # Import core services for single dataflow
 try:
     from assistant_crm.services.intent_router import get_intent_router
-    from assistant_crm.services.gemini_service import GeminiService
+    from assistant_crm.services import service_container
     from assistant_crm.services.enhanced_authentication_service import EnhancedAuthenticationService
-    from assistant_crm.services.enhanced_ai_service import EnhancedAIService
 except ImportError:
     # Fallback for development
     get_intent_router = lambda: None
-    GeminiService = None
+    service_container = None
     EnhancedAuthenticationService = None
-    EnhancedAIService = None
 
 def safe_log_error(message: str, title: str = "Error") -> None:
     """Safe error logging with fallback"""
@@ -66,8 +64,6 @@ class SimplifiedChatAPI:
     def __init__(self):
         """Initialize simplified chat API"""
         self.intent_router = None
-        self.gemini_service = None
-        self.ai_service = None
         self.auth_service = None
         # Lightweight in-memory conversation store keyed by session id
         self._conv_store = {}
@@ -79,17 +75,10 @@ class SimplifiedChatAPI:
             # Initialize intent router (handles caching and live data routing)
             self.intent_router = get_intent_router()
 
-            # Initialize Gemini service for AI responses (kept for backward compatibility/fallbacks)
-            if GeminiService:
-                self.gemini_service = GeminiService()
-
-            # Initialize WorkCom/OpenAI service for conversational replies
-            if EnhancedAIService:
-                try:
-                    self.ai_service = EnhancedAIService()
-                except Exception as ae:
-                    safe_log_error(f"AI service init failed: {str(ae)}", "SimplifiedChat Init")
-                    self.ai_service = None
+            # Gemini (fallback) and WorkCom/OpenAI services are shared per process by the
+            # service container; build them now so the first message does not pay for it
+            if service_container:
+                service_container.warm_up(["gemini", "enhanced_ai"])
 
             # Authentication Gate temporarily disabled: all messages go directly to AI.
             # We deliberately do NOT initialize EnhancedAuthenticationService here so that
@@ -99,10 +88,33 @@ class SimplifiedChatAPI:
         except Exception as e:
             safe_log_error(f"Service initialization error: {str(e)}", "SimplifiedChat Init")
 
-    def process_message(self, message: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+    @property
+    def gemini_service(self):
+        """Shared GeminiService, rebuilt after Assistant CRM Settings change"""
+        return self._shared_service("gemini")
+
+    @property
+    def ai_service(self):
+        """Shared EnhancedAIService, rebuilt after Enhanced AI Settings change"""
+        return self._shared_service("enhanced_ai")
+
+    def _shared_service(self, name: str):
+        if not service_container:
+            return None
+        try:
+            return service_container.get(name)
+        except Exception as e:
+            safe_log_error(f"{name} service init failed: {str(e)}", "SimplifiedChat Init")
+            return None
+
+    def process_message(self, message: str, session_id: Optional[str] = None,
+                        stream_id: Optional[str] = None) -> Dict[str, Any]:
         """
         SINGLE DATAFLOW with Authentication Gate:
         Message → Intent Router → (Auth Gate for live data) → Live Data → AI Response
+
+        With ``stream_id`` the AI reply is also streamed to the browser as it is
+        generated (see services.llm_streaming); the returned payload is unchanged.
         """
         start_time = time.time()
         try:
@@ -305,7 +317,7 @@ class SimplifiedChatAPI:
                         except Exception:
                             pass
 
-                        ai_response = self._generate_ai_response(message, routing_result, sid=sid)
+                        ai_response = self._generate_ai_response(message, routing_result, sid=sid, stream_id=stream_id)
                         response_time = time.time() - start_time
                         # Record assistant reply in history
                         self._append_history(sid, role="assistant", text=ai_response)
@@ -356,7 +368,7 @@ class SimplifiedChatAPI:
                     # We fall through so _generate_ai_response can craft the visible message.
 
             # Step 3: Generate AI response using Gemini (no auth needed or non-live intent)
-            ai_response = self._generate_ai_response(message, routing_result, sid=sid)
+            ai_response = self._generate_ai_response(message, routing_result, sid=sid, stream_id=stream_id)
 
             # Step 4: Return clean response
             response_time = time.time() - start_time
@@ -572,7 +584,8 @@ class SimplifiedChatAPI:
         except Exception:
             pass
 
-    def _generate_ai_response(self, message: str, routing_result: Dict[str, Any], sid: Optional[str] = None) -> str:
+    def _generate_ai_response(self, message: str, routing_result: Dict[str, Any], sid: Optional[str] = None,
+                              stream_id: Optional[str] = None) -> str:
         """
         Generate AI response using Gemini with live data and conversation context
 
@@ -580,10 +593,26 @@ class SimplifiedChatAPI:
             message (str): User's message
             routing_result (Dict): Result from intent router
             sid (str): Session id used to fetch conversation/auth context
+            stream_id (str): Optional realtime stream to forward generated tokens to
 
         Returns:
             str: AI-generated response
         """
+        stream = None
+        if stream_id and FRAPPE_AVAILABLE:
+            from assistant_crm.services.llm_streaming import RealtimeStream
+            stream = RealtimeStream(stream_id)
+        ai_response = None
+        try:
+            ai_response = self._generate_ai_response_text(message, routing_result, sid=sid, on_chunk=stream)
+            return ai_response
+        finally:
+            if stream is not None:
+                stream.close(final_text=ai_response)
+
+    def _generate_ai_response_text(self, message: str, routing_result: Dict[str, Any], sid: Optional[str] = None,
+                                   on_chunk=None) -> str:
+        """Body of ``_generate_ai_response``; ``on_chunk`` receives streamed text deltas."""
         try:
             # Null-safe routing_result
             if not isinstance(routing_result, dict):
@@ -658,6 +687,7 @@ class SimplifiedChatAPI:
                     ai_response = self.ai_service.generate_unified_inbox_reply(
                         message=message,
                         context=context,
+                        on_chunk=on_chunk,
                     )
                     # Log engine usage when WorkCom returns a non-empty response
                     if isinstance(ai_response, str) and ai_response.strip():
@@ -684,6 +714,7 @@ class SimplifiedChatAPI:
                         ai_response = self.gemini_service.generate_response_with_context(
                             message=message,
                             context=context,
+                            on_chunk=on_chunk,
                         )
                     else:
                         # Graceful fallback to generic path if context method is unavailable
@@ -691,6 +722,7 @@ class SimplifiedChatAPI:
                             message,
                             user_context=context,
                             chat_history=context.get('conversation_history') if isinstance(context, dict) else None,
+                            on_chunk=on_chunk,
                         ).get("response", "")
                     # Log engine usage when Gemini returns a non-empty response
                     if isinstance(ai_response, str) and ai_response.strip():
@@ -770,7 +802,7 @@ def get_simplified_chat_api() -> SimplifiedChatAPI:
 # SINGLE API ENDPOINT - This replaces all other chat endpoints
 if FRAPPE_AVAILABLE and frappe:
     @frappe.whitelist(allow_guest=True)
-    def send_message(message=None, session_id=None, **kwargs):
+    def send_message(message=None, session_id=None, stream_id=None, **kwargs):
         """
         SINGLE SIMPLIFIED CHAT ENDPOINT
 
@@ -779,6 +811,9 @@ if FRAPPE_AVAILABLE and frappe:
         Args:
             message (str): User's message
             session_id (str): Optional session id for authentication flows
+            stream_id (str): Optional random id; the reply is streamed as
+                ``assistant_crm_chat_stream`` realtime events to the
+                ``task_subscribe``-d room of this id while it is generated
             **kwargs: Ignored for simplicity
 
         Returns:
@@ -805,8 +840,11 @@ if FRAPPE_AVAILABLE and frappe:
                 }
 
             # Process through simplified dataflow
+            if stream_id and not re.fullmatch(r"[A-Za-z0-9_-]{8,64}", str(stream_id)):
+                stream_id = None
+
             api = get_simplified_chat_api()
-            return api.process_message(message, session_id=session_id)
+            return api.process_message(message, session_id=session_id, stream_id=stream_id)
 
         except Exception as e:
             safe_log_error(f"Simplified chat endpoint error: {str(e)}", "SimplifiedChat Endpoint")
@@ -4,7 +4,7 @@ import json
 from datetime import datetime, timedelta
 from assistant_crm.services.omnichannel_router import OmnichannelRouter
 from assistant_crm.services.agent_skill_matching_service import AgentSkillMatchingService
-from assistant_crm.services.sentiment_analysis_service import SentimentAnalysisService
+from assistant_crm.services import service_container
 
 
 @frappe.whitelist(allow_guest=False)
@@ -87,7 +87,7 @@ def analyze_message_for_routing(message_content, customer_data=None):
         if isinstance(customer_data, str):
             customer_data = json.loads(customer_data) if customer_data else None
         
-        sentiment_service = SentimentAnalysisService()
+        sentiment_service = service_container.get("sentiment")
         analysis = sentiment_service.get_comprehensive_analysis(message_content, customer_data)
         
         return {
@@ -54,6 +54,19 @@ class SocialMediaPlatform(ABC):
         self.credentials = self.get_platform_credentials()
         self.is_configured = self.check_configuration()
 
+    @property
+    def http(self) -> requests.Session:
+        """Pooled keep-alive session shared by all calls to this platform."""
+        from assistant_crm.services.integration_registry import get_session
+        return get_session(self.platform_name)
+
+    def reset_diagnostics(self) -> None:
+        """Forget the previous call's request/response details (integrations are cached and reused)."""
+        self.last_request_payload = None
+        self.last_response_status = None
+        self.last_response_text = None
+        self.last_error = None
+
     @abstractmethod
     def get_platform_credentials(self) -> Dict[str, str]:
         """Get platform-specific credentials from settings."""
@@ -115,17 +128,11 @@ class SocialMediaPlatform(ABC):
             platform_user_id = platform_data.get("customer_platform_id") or platform_data.get("conversation_id")
 
             # Find the single most recent conversation for this platform + user (no status filter —
-            # we check the status explicitly in Python to avoid Frappe filter edge-cases)
-            recent = frappe.get_all(
-                "Unified Inbox Conversation",
-                filters={
-                    "platform": self.platform_name,
-                    "customer_platform_id": platform_user_id,
-                },
-                fields=["name", "status", "custom_issue_id"],
-                order_by="creation desc",
-                limit=1,
-            )
+            # we check the status explicitly in Python to avoid Frappe filter edge-cases).
+            # The cached pointer turns this into a primary-key read; the query is the fallback.
+            recent = None
+            if not force_new:
+                recent = self._get_latest_conversation(platform_user_id)
 
             if recent and not force_new:
                 conv_status = (recent[0].get("status") or "").strip()
@@ -234,6 +241,41 @@ class SocialMediaPlatform(ABC):
             )
             return None
 
+    def _get_latest_conversation(self, platform_user_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Latest conversation for this platform user as a 0/1-item list (pointer first)."""
+        from assistant_crm.services import webhook_dedup
+
+        fields = ["name", "status", "custom_issue_id"]
+        pointer = webhook_dedup.get_latest_conversation(self.platform_name, platform_user_id)
+        if pointer:
+            row = frappe.db.get_value("Unified Inbox Conversation", pointer, fields, as_dict=True)
+            if row:
+                return [row]
+
+        recent = frappe.get_all(
+            "Unified Inbox Conversation",
+            filters={
+                "platform": self.platform_name,
+                "customer_platform_id": platform_user_id,
+            },
+            fields=fields,
+            order_by="creation desc",
+            limit=1,
+        )
+        if recent:
+            webhook_dedup.set_latest_conversation(self.platform_name, platform_user_id, recent[0].name)
+        return recent
+
+    def claim_platform_message(self, raw_id: Optional[str]) -> bool:
+        """O(1) duplicate check for an inbound delivery, before any doctype work.
+
+        Returns False for a redelivery that was already ingested (or is being
+        ingested by another worker); the caller should skip it.
+        """
+        from assistant_crm.services import webhook_dedup
+
+        return webhook_dedup.claim(self.platform_name, self._normalize_platform_message_id(raw_id))
+
     def _normalize_platform_message_id(self, raw_id: Optional[str]) -> Optional[str]:
         """Ensure platform_message_id fits DB column length (<=140). Use SHA1 surrogate if too long."""
         if not raw_id:
@@ -250,6 +292,9 @@ class SocialMediaPlatform(ABC):
 
     def create_unified_inbox_message(self, conversation_name: str, message_data: Dict[str, Any]) -> Optional[str]:
         """Create unified inbox message from platform message data."""
+        from assistant_crm.services import webhook_dedup
+
+        norm_msg_id = None
         try:
             # Normalize platform message id to avoid DB truncation errors
             raw_msg_id = message_data.get("message_id")
@@ -260,15 +305,9 @@ class SocialMediaPlatform(ABC):
             if raw_msg_id and norm_msg_id and raw_msg_id != norm_msg_id:
                 metadata["raw_platform_message_id"] = raw_msg_id
 
-            # Check if message already exists (use normalized id mapped to message_id)
-            existing_message = frappe.get_all(
-                "Unified Inbox Message",
-                filters={"message_id": norm_msg_id},
-                limit=1
-            )
-
-            if existing_message:
-                return existing_message[0].name
+            # Redelivery: rejected by the Redis claim, the unique index is the backstop
+            if not webhook_dedup.claim(self.platform_name, norm_msg_id):
+                return webhook_dedup.get_claimed_message(self.platform_name, norm_msg_id)
 
             # Create new message
             message_doc = frappe.get_doc({
@@ -292,10 +331,23 @@ class SocialMediaPlatform(ABC):
                 message_doc.has_attachments = 1
                 message_doc.attachments_data = json.dumps(message_data.get("attachments"))
 
-            message_doc.insert(ignore_permissions=True)
+            try:
+                message_doc.insert(ignore_permissions=True)
+            except (frappe.DuplicateEntryError, frappe.UniqueValidationError):
+                existing = frappe.db.get_value(
+                    "Unified Inbox Message",
+                    {"platform": self.platform_name, "platform_message_id": norm_msg_id},
+                    "name",
+                ) or frappe.db.get_value("Unified Inbox Message", {"message_id": norm_msg_id}, "name")
+                if existing:
+                    webhook_dedup.confirm(self.platform_name, norm_msg_id, existing)
+                return existing
+
+            webhook_dedup.confirm(self.platform_name, norm_msg_id, message_doc.name)
             return message_doc.name
 
         except Exception as e:
+            webhook_dedup.release(self.platform_name, norm_msg_id)
             frappe.log_error(f"Error creating message for {self.platform_name}: {str(e)}", "Social Media Integration Error")
             return None
 
@@ -366,82 +418,26 @@ class SocialMediaPlatform(ABC):
             return False
 
     def update_issue_conversation_history(self, conversation_name: str, new_message_content: str, sender_name: str, timestamp_str: str, direction: str):
-        """Update the ERPNext Issue with complete conversation history after each message."""
-
-        # CRITICAL DEBUG: Log to file to ensure this function is being called
-        debug_msg = f"DEBUG: ===== ISSUE UPDATE FUNCTION CALLED =====\nConversation: {conversation_name}\nMessage: {new_message_content[:50]}...\nSender: {sender_name}\nDirection: {direction}\n"
-        print(debug_msg)
-
-        try:
-            log = frappe.logger("assistant_crm.unified_inbox")
-            log.info(debug_msg)
-        except:
-            pass
+        """Append a message to the linked ERPNext Issue's conversation timeline.
 
+        Append-only: the history is not re-read and the Issue is not re-saved
+        (see services.issue_history).
+        """
         try:
-            print(f"DEBUG: Starting Issue update for conversation {conversation_name}")
-            print(f"DEBUG: Message: {new_message_content[:50]}... from {sender_name}")
-
-            # Find the Issue linked to this conversation
-            issue_name = frappe.db.get_value(
-                "Issue",
-                {"custom_conversation_id": conversation_name},
-                "name"
-            )
-
-            if not issue_name:
-                print(f"DEBUG: No Issue found for conversation {conversation_name}")
-                return
-
-            print(f"DEBUG: Found Issue {issue_name} for conversation {conversation_name}")
-
-            # Get all messages for this conversation
-            messages = frappe.get_all(
-                "Unified Inbox Message",
-                filters={"conversation": conversation_name},
-                fields=["message_content", "sender_name", "timestamp", "direction", "message_type"],
-                order_by="timestamp asc"
-            )
-
-            print(f"DEBUG: Found {len(messages)} messages for conversation {conversation_name}")
-
-            # Build complete conversation history
-            conversation_history = []
-            conversation_history.append("=== COMPLETE CONVERSATION HISTORY ===\n")
+            from assistant_crm.services import issue_history
 
-            for msg in messages:
-                timestamp_str_formatted = msg.timestamp.strftime('%Y-%m-%d %H:%M:%S') if msg.timestamp else "Unknown time"
-                direction_indicator = "ÔåÆ" if msg.direction == "Outbound" else "ÔåÉ"
-                sender = msg.sender_name or "Unknown"
-                content = msg.message_content or "[No content]"
-
-                conversation_history.append(f"{timestamp_str_formatted} {direction_indicator} {sender}:")
-                conversation_history.append(f"   {content}\n")
-
-            conversation_history.append("=== END CONVERSATION HISTORY ===")
-
-            # Update Issue description with complete conversation
-            full_description = "\n".join(conversation_history)
-
-            # Get the Issue document and update it
-            issue_doc = frappe.get_doc("Issue", issue_name)
-            issue_doc.description = full_description
-
-            # Update Issue subject to include message count
-            message_count = len(messages)
-            original_subject = issue_doc.subject.split(" (")[0]  # Remove existing message count
-            issue_doc.subject = f"{original_subject} ({message_count} messages)"
-
-            # Save the Issue
-            issue_doc.save()
+            issue_history.append_message(conversation_name, new_message_content, sender_name, timestamp_str, direction)
+        except Exception as e:
+            frappe.log_error(f"Error updating Issue conversation history: {str(e)}", "Social Media Integration")
 
-            print(f"DEBUG: Successfully updated Issue {issue_name} with {message_count} messages")
+    def rebuild_issue_conversation_history(self, conversation_name: str):
+        """Rewrite the linked Issue's timeline from all messages (bulk imports)."""
+        try:
+            from assistant_crm.services import issue_history
 
+            issue_history.rebuild(conversation_name)
         except Exception as e:
-            print(f"DEBUG: Error updating Issue conversation history: {str(e)}")
-            import traceback
-            print(f"DEBUG: Traceback: {traceback.format_exc()}")
-            frappe.log_error(f"Error updating Issue conversation history: {str(e)}", "Social Media Integration")
+            frappe.log_error(f"Error rebuilding Issue conversation history: {str(e)}", "Social Media Integration")
 
 
 class WhatsAppIntegration(SocialMediaPlatform):
@@ -485,7 +481,9 @@ class WhatsAppIntegration(SocialMediaPlatform):
 
     def send_message(self, recipient_id: str, message: str, message_type: str = "text") -> bool:
         """Send WhatsApp message."""
+        self.reset_diagnostics()
         if not self.is_configured:
+            self.last_error = "WhatsApp not configured"
             frappe.log_error("WhatsApp not configured", "WhatsApp Integration")
             return False
 
@@ -504,10 +502,13 @@ class WhatsAppIntegration(SocialMediaPlatform):
                 "text": {"body": message}
             }
 
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.http.post(url, headers=headers, json=payload, timeout=30)
+            self.last_response_status = response.status_code
+            self.last_response_text = response.text
             return response.status_code == 200
 
         except Exception as e:
+            self.last_error = str(e)
             frappe.log_error(f"WhatsApp send error: {str(e)}", "WhatsApp Integration")
             return False
 
@@ -523,6 +524,10 @@ class WhatsAppIntegration(SocialMediaPlatform):
 
             if "messages" in value:
                 for message in value["messages"]:
+                    # Redelivered webhook: skip before any doctype work
+                    if not self.claim_platform_message(message.get("id")):
+                        continue
+
                     # Get customer information from contacts array
                     contacts = value.get("contacts", [])
                     customer_info = {}
@@ -697,17 +702,13 @@ class FacebookIntegration(SocialMediaPlatform):
         - access_token must be a Page Access Token; if a user/system token is provided,
           we attempt to exchange it for a page token using the configured page_id.
         """
+        self.reset_diagnostics()
         if not self.is_configured:
+            self.last_error = "Facebook not configured"
             frappe.log_error("Facebook not configured", "Facebook Integration")
             return False
 
         try:
-            # Reset diagnostics for this send
-            self.last_request_payload = None
-            self.last_response_status = None
-            self.last_response_text = None
-            self.last_error = None
-
             api_ver = self.credentials.get("api_version", "v23.0")
             url = f"https://graph.facebook.com/{api_ver}/me/messages"
 
@@ -737,7 +738,7 @@ class FacebookIntegration(SocialMediaPlatform):
                     self.last_request_payload = {"url": url, "params": {k: ("***" if k == "access_token" else v) for k, v in params.items()}, "json": payload}
                 except Exception:
                     pass
-                resp = requests.post(url, params=params, headers=headers, json=payload, timeout=30)
+                resp = self.http.post(url, params=params, headers=headers, json=payload, timeout=30)
                 try:
                     self.last_response_status = resp.status_code
                     self.last_response_text = resp.text
@@ -773,7 +774,7 @@ class FacebookIntegration(SocialMediaPlatform):
                     proof = compute_appsecret_proof(token)
                     if proof:
                         exchange_params["appsecret_proof"] = proof
-                    ex = requests.get(exchange_url, params=exchange_params, timeout=15)
+                    ex = self.http.get(exchange_url, params=exchange_params, timeout=15)
                     if ex.status_code != 200:
                         try:
                             ex_txt = ex.text
@@ -852,6 +853,10 @@ class FacebookIntegration(SocialMediaPlatform):
                     # Skip this event but continue processing any others in the same payload
                     continue
 
+                # Redelivered webhook: skip before the Graph API lookup and any doctype work
+                if not self.claim_platform_message(message.get("mid")):
+                    continue
+
                 # Get message content for ticket generation
                 message_content = message.get("text", "")
                 if not message_content:
@@ -923,7 +928,7 @@ class FacebookIntegration(SocialMediaPlatform):
                 print(f"DEBUG: No Facebook access token configured")
                 return self._get_facebook_fallback_user_info(user_id)
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -972,7 +977,7 @@ class FacebookIntegration(SocialMediaPlatform):
             mime = mimetypes.guess_type(local_path)[0] or "image/jpeg"
             try:
                 with open(local_path, "rb") as fh:
-                    resp = requests.post(
+                    resp = self.http.post(
                         endpoint,
                         params=photo_params,
                         files={"source": (os.path.basename(local_path), fh, mime)},
@@ -987,7 +992,7 @@ class FacebookIntegration(SocialMediaPlatform):
         else:
             # --- URL-based upload (externally hosted image) ---
             photo_params["url"] = url
-            resp = requests.post(endpoint, params=photo_params, timeout=30)
+            resp = self.http.post(endpoint, params=photo_params, timeout=30)
 
         if resp.status_code == 200:
             return (resp.json() or {}).get("id")
@@ -1045,7 +1050,7 @@ class FacebookIntegration(SocialMediaPlatform):
         def _exchange_for_page_token(user_token: str) -> Optional[str]:
             """Exchange a User Access Token for a Page Access Token using page_id."""
             try:
-                ex_resp = requests.get(
+                ex_resp = self.http.get(
                     f"{base}/{page_id}",
                     params={"fields": "access_token", "access_token": user_token},
                     timeout=15,
@@ -1058,6 +1063,8 @@ class FacebookIntegration(SocialMediaPlatform):
                             frappe.get_single("Social Media Settings").db_set(
                                 "facebook_page_access_token", page_token
                             )
+                            from assistant_crm.services.integration_registry import invalidate
+                            invalidate()
                         except Exception:
                             pass
                         return page_token
@@ -1099,7 +1106,7 @@ class FacebookIntegration(SocialMediaPlatform):
                     mime = _mimetypes.guess_type(local_path)[0] or "video/mp4"
                     try:
                         with open(local_path, "rb") as fh:
-                            resp = requests.post(
+                            resp = self.http.post(
                                 f"{base}/{page_id}/videos",
                                 params=video_params,
                                 files={"source": (_os.path.basename(local_path), fh, mime)},
@@ -1110,7 +1117,7 @@ class FacebookIntegration(SocialMediaPlatform):
                         return {"success": False, "error": str(e)}
                 else:
                     video_params["file_url"] = video_url
-                    resp = requests.post(f"{base}/{page_id}/videos", params=video_params, timeout=120)
+                    resp = self.http.post(f"{base}/{page_id}/videos", params=video_params, timeout=120)
 
                 # If 403, try exchanging User token → Page token and retry
                 if resp.status_code == 403:
@@ -1122,7 +1129,7 @@ class FacebookIntegration(SocialMediaPlatform):
                         if local_path and _os.path.isfile(local_path):
                             try:
                                 with open(local_path, "rb") as fh:
-                                    resp = requests.post(
+                                    resp = self.http.post(
                                         f"{base}/{page_id}/videos",
                                         params=video_params,
                                         files={"source": (_os.path.basename(local_path), fh, mime)},
@@ -1132,7 +1139,7 @@ class FacebookIntegration(SocialMediaPlatform):
                                 return {"success": False, "error": str(e)}
                         else:
                             video_params["file_url"] = video_url
-                            resp = requests.post(f"{base}/{page_id}/videos", params=video_params, timeout=120)
+                            resp = self.http.post(f"{base}/{page_id}/videos", params=video_params, timeout=120)
 
                 if resp.status_code == 200:
                     post_id = (resp.json() or {}).get("id", "")
@@ -1162,7 +1169,7 @@ class FacebookIntegration(SocialMediaPlatform):
                     for i, item in enumerate(media):
                         payload[f"attached_media[{i}]"] = json.dumps(item)
 
-                r = requests.post(
+                r = self.http.post(
                     f"{base}/{page_id}/feed",
                     params=fp,
                     data=payload,
@@ -1232,17 +1239,13 @@ class TelegramIntegration(SocialMediaPlatform):
 
     def send_message(self, recipient_id: str, message: str, message_type: str = "text") -> bool:
         """Send Telegram message with diagnostics (parity with IG/FB)."""
+        self.reset_diagnostics()
         if not self.is_configured:
+            self.last_error = "Telegram not configured"
             frappe.log_error("Telegram not configured", "Telegram Integration")
             return False
 
         try:
-            # Reset diagnostics
-            self.last_request_payload = None
-            self.last_response_status = None
-            self.last_response_text = None
-            self.last_error = None
-
             token = (self.credentials.get('bot_token') or '').strip()
             url = f"https://api.telegram.org/bot{token}/sendMessage"
 
@@ -1258,7 +1261,7 @@ class TelegramIntegration(SocialMediaPlatform):
             except Exception:
                 pass
 
-            response = requests.post(url, json=payload, timeout=30)
+            response = self.http.post(url, json=payload, timeout=30)
             try:
                 self.last_response_status = response.status_code
                 self.last_response_text = response.text
@@ -1292,6 +1295,11 @@ class TelegramIntegration(SocialMediaPlatform):
                 chat = message.get("chat", {})
                 from_user = message.get("from", {})
 
+                # Telegram message ids are only unique within a chat
+                platform_message_id = f"{chat.get('id')}:{message.get('message_id')}"
+                if not self.claim_platform_message(platform_message_id):
+                    return {"status": "success", "platform": "Telegram", "duplicate": True}
+
                 # Build customer name from available fields
                 customer_name = from_user.get("first_name", "")
                 if from_user.get("last_name"):
@@ -1342,7 +1350,7 @@ class TelegramIntegration(SocialMediaPlatform):
                         timestamp = now()
 
                     message_data = {
-                        "message_id": str(message.get("message_id")),
+                        "message_id": platform_message_id,
                         "content": message.get("text", message.get("caption", "")),  # Handle both text and media with captions
                         "sender_name": customer_name,
                         "sender_platform_id": str(from_user.get("id")),
@@ -1368,15 +1376,7 @@ class TelegramIntegration(SocialMediaPlatform):
 
                     self.create_unified_inbox_message(conversation_name, message_data)
 
-                    # Enqueue AI processing for this conversation (safe for duplicates)
-                    try:
-                        frappe.enqueue(
-                            "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                            conversation_id=conversation_name,
-                            queue="long",
-                        )
-                    except Exception as ai_err:
-                        frappe.log_error(f"Telegram AI enqueue error: {str(ai_err)}", "Telegram Integration")
+                    # AI replies are queued by Unified Inbox Message.after_insert (ai_pipeline)
 
                     # Note: Issue update is now handled in create_issue_for_conversation()
                     # No need for redundant update here
@@ -1412,7 +1412,9 @@ class TawkToIntegration(SocialMediaPlatform):
 
     def send_message(self, recipient_id: str, message: str, message_type: str = "text") -> bool:
         """Send Tawk.to message (requires API key)."""
+        self.reset_diagnostics()
         if not self.credentials.get("api_key"):
+            self.last_error = "Tawk.to API key not configured"
             frappe.log_error("Tawk.to API key not configured for sending messages", "Tawk.to Integration")
             return False
 
@@ -1430,10 +1432,13 @@ class TawkToIntegration(SocialMediaPlatform):
                 "type": "msg"
             }
 
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = self.http.post(url, headers=headers, json=payload, timeout=30)
+            self.last_response_status = response.status_code
+            self.last_response_text = response.text
             return response.status_code == 200
 
         except Exception as e:
+            self.last_error = str(e)
             frappe.log_error(f"Tawk.to send error: {str(e)}", "Tawk.to Integration")
             return False
 
@@ -1656,9 +1661,6 @@ class TawkToIntegration(SocialMediaPlatform):
 
                     # Ingest messages in chronological order
                     last_ts = None
-                    last_sender = None
-                    last_direction = "Inbound"
-                    last_content = ""
 
                     for idx, msg in enumerate(messages or []):
                         sender = msg.get("sender") or {}
@@ -1708,23 +1710,14 @@ class TawkToIntegration(SocialMediaPlatform):
                             frappe.log_error(f"Transcript message insert failed idx={idx} id={message_id}: {ins_err}", "Tawk.to Integration")
 
                         last_ts = timestamp_str
-                        last_sender = sender_name
-                        last_direction = direction
-                        last_content = content
 
                     # Update conversation last message time to the last transcript message
                     if last_ts:
                         self.update_conversation_timestamp(conversation_name, last_ts)
 
-                    # Update ERPNext Issue description with full conversation history
+                    # A transcript imports many messages at once: rebuild the Issue timeline once
                     try:
-                        self.update_issue_conversation_history(
-                            conversation_name,
-                            last_content or "[Transcript Imported]",
-                            last_sender or customer_name,
-                            last_ts or now(),
-                            last_direction,
-                        )
+                        self.rebuild_issue_conversation_history(conversation_name)
                     except Exception as issue_err:
                         frappe.log_error(f"Issue update after transcript failed: {issue_err}", "Tawk.to Integration")
 
@@ -1951,11 +1944,7 @@ class InstagramIntegration(SocialMediaPlatform):
         from the existing user/system token using the configured Facebook Page ID.
         """
         try:
-            # Reset diagnostics for this send
-            self.last_request_payload = None
-            self.last_response_status = None
-            self.last_response_text = None
-            self.last_error = None
+            self.reset_diagnostics()
 
             # Instagram Graph API endpoint for sending messages
             api_ver = self.credentials.get("api_version", "v23.0")
@@ -1989,7 +1978,7 @@ class InstagramIntegration(SocialMediaPlatform):
                     }
                 except Exception:
                     pass
-                resp = requests.post(url, params=params, json=payload, timeout=30)
+                resp = self.http.post(url, params=params, json=payload, timeout=30)
                 try:
                     self.last_response_status = resp.status_code
                     self.last_response_text = resp.text
@@ -2044,7 +2033,7 @@ class InstagramIntegration(SocialMediaPlatform):
                         "fields": "access_token",
                         "access_token": token,
                     }
-                    exchange_resp = requests.get(exchange_url, params=exchange_params, timeout=15)
+                    exchange_resp = self.http.get(exchange_url, params=exchange_params, timeout=15)
                     if exchange_resp.status_code == 200:
                         data = exchange_resp.json() or {}
                         page_token = (data.get("access_token") or "").strip()
@@ -2102,7 +2091,7 @@ class InstagramIntegration(SocialMediaPlatform):
                         fb_token = token  # also try the configured IG token
                     if fb_token:
                         fb_url = f"https://graph.facebook.com/{api_ver}/{page_id}/messages"
-                        fb_resp = requests.post(
+                        fb_resp = self.http.post(
                             fb_url,
                             params={"access_token": fb_token},
                             json={
@@ -2182,6 +2171,10 @@ class InstagramIntegration(SocialMediaPlatform):
                     if not sender_id:
                         continue
 
+                    # Redelivered webhook: skip before the Graph API lookup and any doctype work
+                    if not self.claim_platform_message(message.get("mid")):
+                        continue
+
                     # Prefer per-event timestamp, fallback to entry time if present
                     ts = message_event.get("timestamp") or entry.get("time") or 0
 
@@ -2297,7 +2290,7 @@ class InstagramIntegration(SocialMediaPlatform):
                 "access_token": self.credentials["access_token"]
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -2322,7 +2315,7 @@ class InstagramIntegration(SocialMediaPlatform):
                 "access_token": self.credentials["access_token"]
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.http.get(url, params=params, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -2369,7 +2362,7 @@ class InstagramIntegration(SocialMediaPlatform):
                 )
                 return None
 
-            resp = requests.get(
+            resp = self.http.get(
                 f"https://graph.facebook.com/{api_ver}/{page_id}",
                 params={"fields": "instagram_business_account", "access_token": token},
                 timeout=15,
@@ -2548,7 +2541,7 @@ class InstagramIntegration(SocialMediaPlatform):
                 else:
                     container_params["image_url"] = media_url
 
-                resp = requests.post(f"{base}/media", params=container_params, timeout=30)
+                resp = self.http.post(f"{base}/media", params=container_params, timeout=30)
                 if resp.status_code != 200:
                     # If the IG account ID is wrong (subcode 33 = "Object does not exist"),
                     # auto-discover the correct ID from the linked Facebook Page and retry once.
@@ -2559,7 +2552,7 @@ class InstagramIntegration(SocialMediaPlatform):
                             if _new_id and _new_id != ig_user_id:
                                 ig_user_id = _new_id
                                 base = f"https://graph.facebook.com/{api_ver}/{ig_user_id}"
-                                resp = requests.post(f"{base}/media", params=container_params, timeout=30)
+                                resp = self.http.post(f"{base}/media", params=container_params, timeout=30)
                     except Exception:
                         pass
 
@@ -2593,7 +2586,7 @@ class InstagramIntegration(SocialMediaPlatform):
                     item_params = dict(params_base)
                     item_params["is_carousel_item"] = "true"
                     item_params["image_url"] = media_url
-                    resp = requests.post(f"{base}/media", params=item_params, timeout=30)
+                    resp = self.http.post(f"{base}/media", params=item_params, timeout=30)
                     if resp.status_code != 200 and not _carousel_id_checked:
                         try:
                             _err_obj = (resp.json() or {}).get("error") or {}
@@ -2602,7 +2595,7 @@ class InstagramIntegration(SocialMediaPlatform):
                                 if _new_id and _new_id != ig_user_id:
                                     ig_user_id = _new_id
                                     base = f"https://graph.facebook.com/{api_ver}/{ig_user_id}"
-                                    resp = requests.post(f"{base}/media", params=item_params, timeout=30)
+                                    resp = self.http.post(f"{base}/media", params=item_params, timeout=30)
                         except Exception:
                             pass
                         _carousel_id_checked = True
@@ -2623,7 +2616,7 @@ class InstagramIntegration(SocialMediaPlatform):
                 carousel_params["media_type"] = "CAROUSEL"
                 carousel_params["caption"] = content
                 carousel_params["children"] = ",".join(item_ids)
-                resp = requests.post(f"{base}/media", params=carousel_params, timeout=30)
+                resp = self.http.post(f"{base}/media", params=carousel_params, timeout=30)
                 if resp.status_code != 200:
                     error_msg = ((resp.json() or {}).get("error") or {}).get("message", resp.text[:300])
                     return {"success": False, "error": f"Instagram carousel container creation failed: {error_msg}"}
@@ -2640,7 +2633,7 @@ class InstagramIntegration(SocialMediaPlatform):
             poll_interval = 5
             elapsed = 0
             while elapsed < max_wait_secs:
-                status_resp = requests.get(
+                status_resp = self.http.get(
                     f"https://graph.facebook.com/{api_ver}/{creation_id}",
                     params={"fields": "status_code", "access_token": token},
                     timeout=15,
@@ -2663,7 +2656,7 @@ class InstagramIntegration(SocialMediaPlatform):
             # --- Step 3: Publish the container ---
             publish_params = dict(params_base)
             publish_params["creation_id"] = creation_id
-            resp = requests.post(f"{base}/media_publish", params=publish_params, timeout=30)
+            resp = self.http.post(f"{base}/media_publish", params=publish_params, timeout=30)
 
             if resp.status_code == 200:
                 post_id = (resp.json() or {}).get("id", "")
@@ -2781,11 +2774,7 @@ class TwitterIntegration(SocialMediaPlatform):
 
     def send_message(self, recipient_id: str, message: str, message_type: str = "text") -> bool:
         """Send a Direct Message via Twitter API v1.1 using OAuth 1.0a user context."""
-        # Reset diagnostics
-        self.last_request_payload = None
-        self.last_response_status = None
-        self.last_response_text = None
-        self.last_error = None
+        self.reset_diagnostics()
 
         try:
             need = self._require_user_context()
@@ -2817,7 +2806,7 @@ class TwitterIntegration(SocialMediaPlatform):
                 "Content-Type": "application/json",
             }
 
-            resp = requests.post(url, headers=headers, json=event_payload, timeout=15)
+            resp = self.http.post(url, headers=headers, json=event_payload, timeout=15)
             self.last_response_status = resp.status_code
             try:
                 self.last_response_text = resp.text
@@ -2847,11 +2836,7 @@ class TwitterIntegration(SocialMediaPlatform):
 
     def send_public_reply(self, in_reply_to_tweet_id: str, text: str) -> bool:
         """Reply publicly to a tweet using v1.1 statuses/update.json (OAuth 1.0a)."""
-        # Reset diagnostics
-        self.last_request_payload = None
-        self.last_response_status = None
-        self.last_response_text = None
-        self.last_error = None
+        self.reset_diagnostics()
         try:
             need = self._require_user_context()
             if need:
@@ -2876,7 +2861,7 @@ class TwitterIntegration(SocialMediaPlatform):
                 "Content-Type": "application/x-www-form-urlencoded",
             }
 
-            resp = requests.post(url, headers=headers, data=params, timeout=15)
+            resp = self.http.post(url, headers=headers, data=params, timeout=15)
             self.last_response_status = resp.status_code
             try:
                 self.last_response_text = resp.text
@@ -3064,7 +3049,7 @@ class TwitterIntegration(SocialMediaPlatform):
             url = f"https://api.twitter.com/2/users/{user_id}"
             params = {"user.fields": "name,username"}
             headers = {"Authorization": f"Bearer {bearer}"}
-            resp = requests.get(url, params=params, headers=headers, timeout=10)
+            resp = self.http.get(url, params=params, headers=headers, timeout=10)
             if resp.status_code == 200:
                 data = (resp.json() or {}).get("data") or {}
                 return {"name": data.get("name"), "username": data.get("username")}
@@ -3112,7 +3097,7 @@ class TwitterIntegration(SocialMediaPlatform):
                 "Authorization": auth_header,
                 "Content-Type": "application/json",
             }
-            resp = requests.post(tweet_url, headers=headers, json=payload, timeout=30)
+            resp = self.http.post(tweet_url, headers=headers, json=payload, timeout=30)
 
             if resp.status_code in (200, 201):
                 data = (resp.json() or {}).get("data") or {}
@@ -3190,11 +3175,7 @@ class LinkedInIntegration(SocialMediaPlatform):
         """Send a Direct Message via LinkedIn Messaging API using OAuth 2.0 bearer token.
         Returns True on 2xx status, False otherwise. Populates diagnostics fields on failure.
         """
-        # Reset diagnostics
-        self.last_request_payload = None
-        self.last_response_status = None
-        self.last_response_text = None
-        self.last_error = None
+        self.reset_diagnostics()
         try:
             token = (self.credentials.get("access_token") or "").strip()
             if not token:
@@ -3230,7 +3211,7 @@ class LinkedInIntegration(SocialMediaPlatform):
                 payload_a["from"] = f"urn:li:organization:{org_id}"
 
             self.last_request_payload = payload_a
-            resp = requests.post(url, headers=headers, json=payload_a, timeout=15)
+            resp = self.http.post(url, headers=headers, json=payload_a, timeout=15)
             self.last_response_status = getattr(resp, "status_code", None)
             try:
                 self.last_response_text = getattr(resp, "text", None)
@@ -3249,7 +3230,7 @@ class LinkedInIntegration(SocialMediaPlatform):
                 payload_b["from"] = f"urn:li:organization:{org_id}"
 
             self.last_request_payload = payload_b
-            resp2 = requests.post(url, headers=headers, json=payload_b, timeout=15)
+            resp2 = self.http.post(url, headers=headers, json=payload_b, timeout=15)
             self.last_response_status = getattr(resp2, "status_code", None)
             try:
                 self.last_response_text = getattr(resp2, "text", None)
@@ -3294,8 +3275,7 @@ class LinkedInIntegration(SocialMediaPlatform):
                     url = f"https://api.linkedin.com/{api_ver}/people/(id:{person_urn})"
                     # Projection for localized first/last name (v2 fields)
                     params = {"projection": "(localizedFirstName,localizedLastName,id)"}
-                    import requests
-                    resp = requests.get(url, headers=headers, params=params, timeout=10)
+                    resp = self.http.get(url, headers=headers, params=params, timeout=10)
                     if resp.status_code == 200:
                         data = resp.json() or {}
                         fn = (data.get("localizedFirstName") or "").strip()
@@ -3446,7 +3426,7 @@ class LinkedInIntegration(SocialMediaPlatform):
         else:
             # Fall back to the authenticated user's person URN
             try:
-                me_resp = requests.get(
+                me_resp = self.http.get(
                     f"https://api.linkedin.com/{api_ver}/me",
                     headers=headers,
                     timeout=10
@@ -3502,7 +3482,7 @@ class LinkedInIntegration(SocialMediaPlatform):
                 },
             }
 
-            resp = requests.post(
+            resp = self.http.post(
                 f"https://api.linkedin.com/{api_ver}/ugcPosts",
                 headers=headers,
                 json=payload,
@@ -3624,7 +3604,7 @@ class YouTubeIntegration(SocialMediaPlatform):
                 "grant_type": "refresh_token",
             }
 
-            resp = requests.post(url, data=payload, timeout=15)
+            resp = self.http.post(url, data=payload, timeout=15)
             if resp.status_code == 200:
                 data = resp.json()
                 new_token = data.get("access_token")
@@ -3634,6 +3614,8 @@ class YouTubeIntegration(SocialMediaPlatform):
                         settings = frappe.get_single("Social Media Settings")
                         settings.db_set("youtube_access_token", new_token)
                         self.credentials["access_token"] = new_token
+                        from assistant_crm.services.integration_registry import invalidate
+                        invalidate()
                     except Exception:
                         pass
                     return new_token
@@ -3652,11 +3634,7 @@ class YouTubeIntegration(SocialMediaPlatform):
         - POST https://www.googleapis.com/youtube/v3/comments (for comment replies)
         - POST https://www.googleapis.com/youtube/v3/liveChat/messages (for live chat)
         """
-        # Reset diagnostics
-        self.last_request_payload = None
-        self.last_response_status = None
-        self.last_response_text = None
-        self.last_error = None
+        self.reset_diagnostics()
 
         try:
             access_token = (self.credentials.get("access_token") or "").strip()
@@ -3701,7 +3679,7 @@ class YouTubeIntegration(SocialMediaPlatform):
                 }
 
                 self.last_request_payload = {"url": url, "params": params, "json": payload}
-                resp = requests.post(url, params=params, json=payload, headers=headers, timeout=30)
+                resp = self.http.post(url, params=params, json=payload, headers=headers, timeout=30)
                 self.last_response_status = resp.status_code
                 self.last_response_text = resp.text
                 return resp
@@ -3773,8 +3751,8 @@ class YouTubeIntegration(SocialMediaPlatform):
                 break
 
         # Ensure the video URL has a scheme — frappe.conf.host_name is sometimes
-        # stored without one (e.g. "erpdev.example.com"), which causes urlparse to
-        # treat the entire string as a path and requests.get() to raise MissingSchema.
+        # stored without one (e.g. "erpdev.example.com"). urlparse then treats the whole
+        # string as a path, and downloading it fails with requests' MissingSchema.
         if video_url and not video_url.startswith(("http://", "https://")):
             video_url = f"https://{video_url}"
 
@@ -3829,7 +3807,7 @@ class YouTubeIntegration(SocialMediaPlatform):
         # HTTP fallback (for externally hosted files)
         if video_bytes is None:
             try:
-                dl_resp = requests.get(video_url, timeout=120, stream=False)
+                dl_resp = self.http.get(video_url, timeout=120, stream=False)
                 if dl_resp.status_code != 200:
                     return {
                         "success": False,
@@ -3868,7 +3846,7 @@ class YouTubeIntegration(SocialMediaPlatform):
                 "X-Upload-Content-Type": content_type,
                 "X-Upload-Content-Length": str(len(video_bytes)),
             }
-            resp = requests.post(
+            resp = self.http.post(
                 upload_endpoint,
                 headers=init_headers,
                 params=upload_params,
@@ -4645,7 +4623,11 @@ def poll_twitter_inbox() -> Dict[str, Any]:
         return {"status": "error", "message": str(e)}
 
 def get_platform_integration(platform_name: str) -> Optional[SocialMediaPlatform]:
-    """Get platform integration instance by name."""
+    """Get the cached platform integration instance by name.
+
+    Instances are reused until Social Media Settings changes
+    (see services.integration_registry).
+    """
     platforms = {
         "WhatsApp": WhatsAppIntegration,
         "Facebook": FacebookIntegration,
@@ -4660,7 +4642,8 @@ def get_platform_integration(platform_name: str) -> Optional[SocialMediaPlatform
 
     platform_class = platforms.get(platform_name)
     if platform_class:
-        return platform_class()
+        from assistant_crm.services.integration_registry import get_integration
+        return get_integration(platform_name, platform_class)
     return None
 
 
@@ -5611,6 +5594,7 @@ class USSDIntegration(SocialMediaPlatform):
 
     def send_message(self, recipient_id: str, message: str, message_type: str = "text") -> bool:
         # Outbound USSD push is generally not supported; the provider expects synchronous responses
+        self.reset_diagnostics()
         self.last_error = "USSD push send not supported; use synchronous webhook response."
         return False
 
@@ -179,17 +179,12 @@ class TawkToIntegration:
             messages = self.get_chat_messages(chat_id)
             
             for message_data in messages:
-                # Check if message already exists
-                existing_message = frappe.get_all(
+                # Check if message already exists (ids are unique per platform, not per conversation)
+                platform_message_id = message_data.get("id") or None
+                if platform_message_id and frappe.db.exists(
                     "Unified Inbox Message",
-                    filters={
-                        "conversation": conversation_name,
-                        "platform_message_id": message_data.get("id")
-                    },
-                    limit=1
-                )
-                
-                if existing_message:
+                    {"platform": "Tawk.to", "platform_message_id": platform_message_id},
+                ):
                     continue
                 
                 # Create unified inbox message
@@ -203,7 +198,7 @@ class TawkToIntegration:
                     "sender_name": message_data.get("senderName"),
                     "sender_id": message_data.get("senderId"),
                     "timestamp": message_data.get("time") or now(),
-                    "platform_message_id": message_data.get("id"),
+                    "platform_message_id": platform_message_id,
                     "platform_metadata": json.dumps(message_data),
                     "handled_by_agent": 1 if message_data.get("type") == "agent" else 0
                 })
@@ -437,7 +432,7 @@ def _handle_transcript_created(data: Dict[str, Any]) -> Dict[str, Any]:
         timestamp = _normalize_iso_timestamp(msg.get("time"))
         message_id = f"tawk:transcript:{chat_id}:{idx}"
 
-        if frappe.db.exists("Unified Inbox Message", {"platform_message_id": message_id}):
+        if frappe.db.exists("Unified Inbox Message", {"platform": "Tawk.to", "platform_message_id": message_id}):
             continue
 
         frappe.get_doc({
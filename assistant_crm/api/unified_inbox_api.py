@@ -274,16 +274,112 @@ def _clear_invalid_issue_links(issue_doc):
         pass
 
 
+# --- Keyset (cursor) pagination helpers ---
+# Cursors encode the (sort value, name) of a boundary row. Paging is done with
+# "strictly before/after this row" predicates on a composite (sort field, name)
+# index, so deep pages cost the same as the first one (no COUNT, no OFFSET).
+
+def _encode_cursor(sort_value, name: str) -> str:
+    import base64
+    payload = json.dumps([str(sort_value) if sort_value is not None else None, name])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    import base64
+    try:
+        sort_value, name = json.loads(base64.urlsafe_b64decode(str(cursor).encode()).decode())
+        return sort_value, name
+    except Exception:
+        frappe.throw(_("Invalid pagination cursor"))
+
+
+def _filters_as_list(filters) -> List[list]:
+    """Normalize dict/list/JSON filters into a list so keyset conditions can be appended."""
+    if not filters:
+        return []
+    if isinstance(filters, str):
+        filters = frappe.parse_json(filters)
+    if isinstance(filters, dict):
+        out = []
+        for field, value in filters.items():
+            if isinstance(value, (list, tuple)) and len(value) == 2:
+                out.append([field, value[0], value[1]])
+            else:
+                out.append([field, "=", value])
+        return out
+    return [list(f) for f in filters]
+
+
+def _keyset_fetch(doctype: str, filters, fields: List[str], sort_field: str, cursor: str,
+                  direction: str, limit: int, ignore_permissions: bool = False) -> List[Dict[str, Any]]:
+    """Fetch up to ``limit`` rows strictly before (descending) or after (ascending) a cursor.
+
+    The tuple predicate ``(sort_field, name) < (v, n)`` is split into small
+    index-range queries (same value/smaller name, smaller value, then NULLs,
+    which sort lowest) so each one is a plain range scan on the composite index.
+    """
+    value, name = _decode_cursor(cursor)
+    base = _filters_as_list(filters)
+
+    if direction == "before":
+        order_by = f"{sort_field} desc, name desc"
+        if value is None:
+            steps = [[[sort_field, "is", "not set"], ["name", "<", name]]]
+        else:
+            steps = [
+                [[sort_field, "=", value], ["name", "<", name]],
+                [[sort_field, "<", value]],
+                [[sort_field, "is", "not set"]],
+            ]
+    else:
+        order_by = f"{sort_field} asc, name asc"
+        if value is None:
+            steps = [
+                [[sort_field, "is", "not set"], ["name", ">", name]],
+                [[sort_field, "is", "set"]],
+            ]
+        else:
+            steps = [
+                [[sort_field, "=", value], ["name", ">", name]],
+                [[sort_field, ">", value]],
+            ]
+
+    rows: List[Dict[str, Any]] = []
+    for extra in steps:
+        remaining = limit - len(rows)
+        if remaining <= 0:
+            break
+        rows.extend(frappe.get_all(
+            doctype,
+            filters=base + extra,
+            fields=fields,
+            order_by=order_by,
+            limit=remaining,
+            ignore_permissions=ignore_permissions,
+        ))
+    return rows
+
+
 @frappe.whitelist()
-def get_unified_inbox_conversations(filters: Dict[str, Any] = None, limit: int = 20, offset: int = 0):
+def get_unified_inbox_conversations(filters: Dict[str, Any] = None, limit: int = 20, offset: int = 0,
+                                    before: str = None, after: str = None):
     """
     Get unified inbox conversations with filtering and pagination.
+
+    Ordered by (last_message_time, name) descending. Pass ``before=next_cursor``
+    to scroll to older conversations or ``after=prev_cursor`` to fetch newer ones;
+    ``offset`` is kept for backwards compatibility only.
     """
     try:
+        limit = int(limit or 20)
+
         # Default filters
         default_filters = {"docstatus": ["!=", 2]}  # Exclude deleted documents
 
         if filters:
+            if isinstance(filters, str):
+                filters = frappe.parse_json(filters)
             default_filters.update(filters)
 
         # Get conversations
@@ -292,7 +388,9 @@ def get_unified_inbox_conversations(filters: Dict[str, Any] = None, limit: int =
             "name", "conversation_id", "platform", "customer_name", "customer_phone",
             "customer_email", "status", "priority", "assigned_agent", "creation_time",
             "last_message_time", "last_message_preview", "ai_handled", "ai_mode", "ai_confidence_score",
-            "has_active_call", "call_status", "custom_issue_id", "escalated_to", "escalated_by", "escalated_at"
+            "has_active_call", "call_status", "custom_issue_id", "escalated_to", "escalated_by", "escalated_at",
+            # Denormalized counters maintained by Unified Inbox Message (see reconcile_conversation_counters)
+            "message_count", "unread_count"
         ]
         try:
             meta = frappe.get_meta("Unified Inbox Conversation")
@@ -305,38 +403,42 @@ def get_unified_inbox_conversations(filters: Dict[str, Any] = None, limit: int =
         except Exception:
             pass
 
-        conversations = frappe.get_all(
-            "Unified Inbox Conversation",
-            filters=default_filters,
-            fields=base_fields,
-            order_by="last_message_time desc",
-            limit=limit,
-            start=offset
-        )
-
-        # Get message counts for each conversation
-        for conversation in conversations:
-            message_count = frappe.db.count(
-                "Unified Inbox Message",
-                filters={"conversation": conversation.name}
+        if before or after:
+            conversations = _keyset_fetch(
+                "Unified Inbox Conversation", default_filters, base_fields, "last_message_time",
+                before or after, "before" if before else "after", limit,
             )
-            conversation["message_count"] = message_count
-
-            # Get unread message count
-            unread_count = frappe.db.count(
-                "Unified Inbox Message",
-                filters={
-                    "conversation": conversation.name,
-                    "direction": "Inbound",
-                    "read_status": "Unread"
-                }
+            if after:
+                # Fetched ascending from the cursor; present newest first like the first page
+                conversations.reverse()
+        else:
+            conversations = frappe.get_all(
+                "Unified Inbox Conversation",
+                filters=default_filters,
+                fields=base_fields,
+                order_by="last_message_time desc, name desc",
+                limit=limit,
+                start=offset
             )
-            conversation["unread_count"] = unread_count
+
+        for conversation in conversations:
+            conversation["message_count"] = conversation.get("message_count") or 0
+            conversation["unread_count"] = conversation.get("unread_count") or 0
 
         return {
             "status": "success",
             "conversations": conversations,
-            "total_count": len(conversations)
+            "total_count": len(conversations),
+            # Baseline for realtime catch-up (get_inbox_changes)
+            "server_time": now(),
+            "next_cursor": (
+                _encode_cursor(conversations[-1].last_message_time, conversations[-1].name)
+                if conversations else None
+            ),
+            "prev_cursor": (
+                _encode_cursor(conversations[0].last_message_time, conversations[0].name)
+                if conversations else None
+            ),
         }
 
     except Exception as e:
@@ -344,14 +446,17 @@ def get_unified_inbox_conversations(filters: Dict[str, Any] = None, limit: int =
 
 
 @frappe.whitelist()
-def get_conversations():
+def get_conversations(limit: int = 100, before: str = None, after: str = None):
     """Simple wrapper for get_unified_inbox_conversations for JavaScript compatibility."""
     try:
-        result = get_unified_inbox_conversations(limit=100)
+        result = get_unified_inbox_conversations(limit=limit, before=before, after=after)
         if result.get("status") == "success":
             return {
                 "status": "success",
-                "data": result.get("conversations", [])
+                "data": result.get("conversations", []),
+                "next_cursor": result.get("next_cursor"),
+                "prev_cursor": result.get("prev_cursor"),
+                "server_time": result.get("server_time"),
             }
         else:
             return {
@@ -369,11 +474,30 @@ def get_conversations():
 
 
 @frappe.whitelist()
-def search_conversations(q: str = None, limit: int = 50, offset: int = 0):
+def get_inbox_changes(since: str = None):
+    """Catch-up for the realtime inbox: conversations changed after ``since``.
+
+    ``since`` is the ``server_time`` of the last ``unified_inbox_delta`` event
+    (or of the previous catch-up) the client applied. When ``truncated`` is
+    set the client should reload the full list instead.
+    """
+    try:
+        from assistant_crm.services.inbox_realtime import get_changes_since
+        return {"status": "success", **get_changes_since(since)}
+    except Exception as e:
+        return handle_unified_inbox_error(e, "getting inbox changes")
+
+
+@frappe.whitelist()
+def search_conversations(q: str = None, limit: int = 50, offset: int = 0, cursor: str = None):
     """
     Search unified inbox conversations by keyword.
     Matches on customer name, phone, email, NRC (if present), tags/subject (if present),
     platform, last message preview, and also within message content/sender name.
+
+    Uses the FULLTEXT/prefix search in services.inbox_search (ranked, paged with
+    ``cursor`` / ``next_cursor``) once its indexes exist; otherwise falls back to
+    the LIKE scan below, paged with ``offset``.
     """
     try:
         kw = (q or "").strip()
@@ -387,6 +511,11 @@ def search_conversations(q: str = None, limit: int = 50, offset: int = 0):
                 return {"status": "success", "data": base.get("conversations", [])}
             return {"status": "error", "message": base.get("message", "Failed to get conversations"), "data": []}
 
+        from assistant_crm.services import inbox_search
+        if inbox_search.fulltext_indexes_ready():
+            result = inbox_search.search(kw, limit=limit_i, cursor=cursor)
+            return {"status": "success", "data": result["data"], "next_cursor": result["next_cursor"]}
+
         like = f"%{kw}%"
 
         # Build select fields with optional columns guarded by metadata
@@ -410,9 +539,9 @@ def search_conversations(q: str = None, limit: int = 50, offset: int = 0):
             "c.call_status as call_status",
             "c.custom_issue_id as custom_issue_id",
             "c.custom_issue_id as issue_id",
-            # inline counts for performance
-            "(SELECT COUNT(*) FROM `tabUnified Inbox Message` mm WHERE mm.conversation = c.name) AS message_count",
-            "(SELECT COUNT(*) FROM `tabUnified Inbox Message` mu WHERE mu.conversation = c.name AND mu.direction = 'Inbound' AND mu.read_status = 'Unread') AS unread_count",
+            # denormalized counters (no per-row subqueries)
+            "IFNULL(c.message_count, 0) AS message_count",
+            "IFNULL(c.unread_count, 0) AS unread_count",
         ]
         optional_like_columns = []
         try:
@@ -497,20 +626,26 @@ def set_conversation_ai_mode(conversation_name: str, mode: str):
 
 
 @frappe.whitelist()
-def get_messages(conversation_name: str, limit: int = 200, offset: int = 0):
+def get_messages(conversation_name: str, limit: int = 200, offset: int = 0, before: str = None, after: str = None):
     """Simple wrapper for get_conversation_messages for JavaScript compatibility.
     - limit: number of messages to return (defaults to 200)
-    - offset: optional offset for pagination
+    - offset: optional offset for pagination (legacy)
+    - before/after: keyset cursors returned as before_cursor/after_cursor
     """
     try:
         if not conversation_name:
             return {"status": "error", "message": "Conversation name is required", "data": []}
 
-        result = get_conversation_messages(conversation_name, limit=int(limit), offset=int(offset))
+        result = get_conversation_messages(
+            conversation_name, limit=int(limit), offset=int(offset), before=before, after=after
+        )
         if result.get("status") == "success":
             return {
                 "status": "success",
-                "data": result.get("messages", [])
+                "data": result.get("messages", []),
+                "before_cursor": result.get("before_cursor"),
+                "after_cursor": result.get("after_cursor"),
+                "has_more_before": result.get("has_more_before"),
             }
         else:
             return {
@@ -528,11 +663,19 @@ def get_messages(conversation_name: str, limit: int = 200, offset: int = 0):
 
 
 @frappe.whitelist()
-def get_conversation_messages(conversation_name: str, limit: int = 50, offset: int = 0):
+def get_conversation_messages(conversation_name: str, limit: int = 50, offset: int = 0,
+                              before: str = None, after: str = None):
     """
-    Get messages for a specific conversation.
+    Get messages for a specific conversation, oldest first.
+
+    By default returns the latest ``limit`` messages. Use ``before=before_cursor``
+    to load older history and ``after=after_cursor`` to fetch newer messages;
+    both are keyset queries on (timestamp, name). ``offset`` is legacy.
     """
     try:
+        limit = int(limit or 50)
+        offset = int(offset or 0)
+
         # Resolve conversation identifier: accept docname or conversation_id
         resolved_name = conversation_name
         if not frappe.db.exists("Unified Inbox Conversation", resolved_name):
@@ -549,25 +692,49 @@ def get_conversation_messages(conversation_name: str, limit: int = 50, offset: i
 
         # Get messages (ignore permissions so agents with UI access can see full thread)
         # Return the LAST `limit` messages by default (so newest messages appear), preserving asc order for display
-        total_count = frappe.db.count("Unified Inbox Message", {"conversation": resolved_name})
-        start_index = offset or 0
-        if (start_index == 0) and total_count and (total_count > limit):
-            start_index = total_count - limit
+        message_fields = [
+            "name", "message_id", "direction", "message_type", "message_content",
+            "sender_name", "timestamp", "processed_by_ai", "ai_response", "ai_confidence",
+            "handled_by_agent", "agent_response", "has_attachments", "attachments_data",
+            "delivery_status", "read_status"
+        ]
+        message_filters = {"conversation": resolved_name}
+        has_more_before = None
 
-        messages = frappe.get_all(
-            "Unified Inbox Message",
-            filters={"conversation": resolved_name},
-            fields=[
-                "name", "message_id", "direction", "message_type", "message_content",
-                "sender_name", "timestamp", "processed_by_ai", "ai_response", "ai_confidence",
-                "handled_by_agent", "agent_response", "has_attachments", "attachments_data",
-                "delivery_status", "read_status"
-            ],
-            order_by="timestamp asc",
-            limit=limit,
-            start=start_index,
-            ignore_permissions=True
-        )
+        if after:
+            messages = _keyset_fetch(
+                "Unified Inbox Message", message_filters, message_fields, "timestamp",
+                after, "after", limit, ignore_permissions=True,
+            )
+        elif before or not offset:
+            # Latest page or older history: walk backwards, fetching one extra row to know if more exist
+            if before:
+                messages = _keyset_fetch(
+                    "Unified Inbox Message", message_filters, message_fields, "timestamp",
+                    before, "before", limit + 1, ignore_permissions=True,
+                )
+            else:
+                messages = frappe.get_all(
+                    "Unified Inbox Message",
+                    filters=message_filters,
+                    fields=message_fields,
+                    order_by="timestamp desc, name desc",
+                    limit=limit + 1,
+                    ignore_permissions=True
+                )
+            has_more_before = len(messages) > limit
+            messages = messages[:limit]
+            messages.reverse()
+        else:
+            messages = frappe.get_all(
+                "Unified Inbox Message",
+                filters=message_filters,
+                fields=message_fields,
+                order_by="timestamp asc, name asc",
+                limit=limit,
+                start=offset,
+                ignore_permissions=True
+            )
 
         # Mark inbound messages as read (best effort)
         try:
@@ -575,19 +742,74 @@ def get_conversation_messages(conversation_name: str, limit: int = 50, offset: i
             if unread_messages:
                 frappe.db.set_value("Unified Inbox Message", {"name": ["in", unread_messages]}, "read_status", "Read")
                 frappe.db.set_value("Unified Inbox Message", {"name": ["in", unread_messages]}, "read_timestamp", now())
+                _refresh_conversation_unread_count(resolved_name)
+                from assistant_crm.services.inbox_realtime import queue_conversation_delta
+                queue_conversation_delta(resolved_name)
         except Exception:
             pass
 
         return {
             "status": "success",
             "conversation": conversation.as_dict(),
-            "messages": messages
+            "messages": messages,
+            "before_cursor": _encode_cursor(messages[0].timestamp, messages[0].name) if messages else before,
+            "after_cursor": _encode_cursor(messages[-1].timestamp, messages[-1].name) if messages else after,
+            "has_more_before": has_more_before,
         }
 
     except Exception as e:
         return handle_unified_inbox_error(e, "getting messages")
 
 
+def _refresh_conversation_unread_count(conversation_name: str) -> None:
+    """Recompute unread_count for one conversation after a mark-as-read.
+
+    A single indexed count (conversation, direction, read_status) rather than
+    a decrement, so two agents opening the same thread cannot double-count.
+    """
+    frappe.db.sql(
+        """
+        UPDATE `tabUnified Inbox Conversation`
+        SET unread_count = (
+            SELECT COUNT(*) FROM `tabUnified Inbox Message`
+            WHERE conversation = %(conversation)s
+              AND direction = 'Inbound' AND read_status = 'Unread'
+        )
+        WHERE name = %(conversation)s
+        """,
+        {"conversation": conversation_name},
+    )
+
+
+def reconcile_conversation_counters():
+    """Scheduled job: repair drift in the denormalized message/unread counters.
+
+    Counters are maintained incrementally on insert/read; deletes, imports and
+    direct SQL edits can make them drift, so this rewrites only the rows whose
+    stored values differ from the actual message table.
+    """
+    try:
+        frappe.db.sql(
+            """
+            UPDATE `tabUnified Inbox Conversation` c
+            LEFT JOIN (
+                SELECT conversation,
+                       COUNT(*) AS total,
+                       SUM(direction = 'Inbound' AND read_status = 'Unread') AS unread
+                FROM `tabUnified Inbox Message`
+                GROUP BY conversation
+            ) m ON m.conversation = c.name
+            SET c.message_count = IFNULL(m.total, 0),
+                c.unread_count = IFNULL(m.unread, 0)
+            WHERE IFNULL(c.message_count, 0) != IFNULL(m.total, 0)
+               OR IFNULL(c.unread_count, 0) != IFNULL(m.unread, 0)
+            """
+        )
+        frappe.db.commit()
+    except Exception as e:
+        _safe_log_error("Unified Inbox API Error", f"Error reconciling conversation counters: {str(e)}")
+
+
 @frappe.whitelist()
 def send_message():
     """
@@ -596,6 +818,7 @@ def send_message():
     - Adds resilience against rare DocVersion conflicts on Conversation by retrying atomic updates
     - Switches diagnostics to frappe.logger so logs land in bench logs across environments
     """
+    claimed_key = None
     try:
         import time as _time
         log = frappe.logger("assistant_crm.unified_send")
@@ -612,6 +835,19 @@ def send_message():
         if not message_content or not message_content.strip():
             return return_unified_inbox_error("Message content is required", "send message validation")
 
+        # Client-supplied idempotency key: a double-submitted send is accepted only once
+        from assistant_crm.services import outbound_dispatcher
+        async_delivery = bool(send_via_platform) and outbound_dispatcher.is_enabled()
+        idempotency_key = data.get("idempotency_key")
+        if async_delivery and idempotency_key:
+            if not outbound_dispatcher.claim(idempotency_key):
+                return {
+                    "status": "success",
+                    "message": "Message already queued",
+                    "data": {"duplicate": True, "platform_send": {"status": "queued", "duplicate": True}}
+                }
+            claimed_key = idempotency_key
+
         # Get conversation details using direct DB fetch (avoid Document save side-effects)
         conv = frappe.db.get_value(
             "Unified Inbox Conversation",
@@ -702,7 +938,19 @@ def send_message():
             pass
 
         platform_send_result = {"status": "pending", "message": "Attempting platform send"}
-        if allow_platform_send:
+        if allow_platform_send and async_delivery:
+            # Acknowledge immediately; the outbound dispatcher delivers after commit
+            platform_send_result = outbound_dispatcher.queue_send(
+                conv.get("platform"),
+                conversation_name,
+                message_content,
+                message_name=message_doc.name,
+                idempotency_key=idempotency_key,
+                reply_mode=(data.get("twitter_reply_mode") or data.get("reply_mode")) if conv.get("platform") == "Twitter" else None,
+                agent=frappe.session.user,
+                claimed=bool(idempotency_key),
+            )
+        elif allow_platform_send:
             try:
                 if conv.get("platform") == "Tawk.to":
                     from assistant_crm.api.tawk_to_integration import send_tawk_to_message
@@ -719,6 +967,7 @@ def send_message():
                 platform_send_result = {"status": "warning", "message": "Message saved but platform send failed"}
 
         frappe.db.commit()
+        claimed_key = None  # committed: the delivery job owns the key now
 
         # Fetch updated conversation fields for response
         conv_updated = frappe.db.get_value(
@@ -735,8 +984,10 @@ def send_message():
 
         overall_status = "success"
         overall_message = "Message sent successfully"
+        if platform_send_result.get("status") == "queued":
+            overall_message = "Message queued for delivery"
         try:
-            if allow_platform_send and platform_send_result and platform_send_result.get("status") != "success":
+            if allow_platform_send and platform_send_result and platform_send_result.get("status") not in ("success", "queued"):
                 overall_status = "error"
                 overall_message = f"Failed to send message: {platform_send_result.get('message')}"
         except Exception:
@@ -766,6 +1017,12 @@ def send_message():
         }
 
     except Exception as e:
+        if claimed_key:
+            # Not committed: drop the message and its queued delivery, then let
+            # the client's retry with this key through
+            frappe.db.rollback()
+            from assistant_crm.services import outbound_dispatcher
+            outbound_dispatcher.release(claimed_key)
         # Use user-friendly error handling
         return handle_unified_inbox_error(e, "sending message")
 
@@ -996,11 +1253,12 @@ def get_agent_dashboard_data(agent: str = None):
 
 def process_conversation_with_ai(conversation_id: str):
     """
-    Background job to process conversation with AI.
+    Queue the latest unprocessed inbound message of a conversation on the AI pipeline.
+
+    Replies are only generated by ai_pipeline workers, so this cannot race
+    the message's own after_insert hook into a second reply.
     """
     try:
-        conversation_doc = frappe.get_doc("Unified Inbox Conversation", conversation_id)
-
         # Get latest unprocessed message
         latest_message = frappe.get_all(
             "Unified Inbox Message",
@@ -1009,7 +1267,7 @@ def process_conversation_with_ai(conversation_id: str):
                 "direction": "Inbound",
                 "processed_by_ai": 0
             },
-            fields=["name", "message_content"],
+            fields=["name", "platform"],
             order_by="timestamp desc",
             limit=1
         )
@@ -1017,10 +1275,8 @@ def process_conversation_with_ai(conversation_id: str):
         if not latest_message:
             return
 
-        message_doc = frappe.get_doc("Unified Inbox Message", latest_message[0].name)
-
-        # Process with AI
-        process_message_with_ai(message_doc.name)
+        from assistant_crm.services.ai_pipeline import enqueue_message
+        enqueue_message(latest_message[0].name, conversation_id, latest_message[0].platform)
 
     except Exception as e:
         import traceback
@@ -1036,7 +1292,23 @@ def process_conversation_with_ai(conversation_id: str):
 def process_message_with_ai(message_id: str):
     """
     Background job to process individual message with AI.
+
+    The message is claimed first; a message that was already answered or is
+    being answered by another worker is skipped.
     """
+    from assistant_crm.services.ai_pipeline import claim_message, release_claim
+
+    if frappe.db.get_value("Unified Inbox Message", message_id, "processed_by_ai"):
+        return
+    if not claim_message(message_id):
+        try:
+            frappe.logger("assistant_crm.unified_inbox_ai").info(
+                f"[AI] skip reason=claimed_elsewhere message_id={message_id}"
+            )
+        except Exception:
+            pass
+        return
+
     try:
         message_doc = frappe.get_doc("Unified Inbox Message", message_id)
         conversation_doc = frappe.get_doc("Unified Inbox Conversation", message_doc.conversation)
@@ -1369,12 +1641,25 @@ def process_message_with_ai(message_id: str):
         # Direct Antoine call, mirroring report doctypes and SimplifiedChatAPI's preferred path
         ai_response = ""
         try:
-            from assistant_crm.services.enhanced_ai_service import EnhancedAIService
-            ai_service = EnhancedAIService()
-            ai_response = ai_service.generate_unified_inbox_reply(
-                message=message_doc.message_content or "",
-                context=ai_context,
-            ) or ""
+            from assistant_crm.services import service_container
+            from assistant_crm.services.llm_streaming import RealtimeStream
+            ai_service = service_container.get("enhanced_ai")
+            # Agents with the conversation open watch the draft being written
+            draft_stream = RealtimeStream(
+                f"draft-{message_doc.name}",
+                event="assistant_crm_inbox_ai_draft",
+                doctype="Unified Inbox Conversation",
+                extra={"conversation": conversation_doc.name},
+            )
+            # Rate limits and cluster-wide concurrency are applied by llm_governor inside the call
+            try:
+                ai_response = ai_service.generate_unified_inbox_reply(
+                    message=message_doc.message_content or "",
+                    context=ai_context,
+                    on_chunk=draft_stream,
+                ) or ""
+            finally:
+                draft_stream.close()
         except Exception as e:
             _safe_log_error(f"Error generating AI response: {str(e)}", "Unified Inbox AI Error")
             ai_response = (
@@ -1432,7 +1717,15 @@ def process_message_with_ai(message_id: str):
 
             # Send via platform
             send_result = None
-            if conversation_doc.platform == "Tawk.to":
+            from assistant_crm.services import outbound_dispatcher
+            if outbound_dispatcher.is_enabled():
+                send_result = outbound_dispatcher.queue_send(
+                    message_doc.platform,
+                    message_doc.conversation,
+                    ai_response,
+                    message_name=ai_message_doc.name,
+                )
+            elif conversation_doc.platform == "Tawk.to":
                 from assistant_crm.api.tawk_to_integration import send_tawk_to_message
                 send_result = send_tawk_to_message(message_doc.conversation, ai_response)
             else:
@@ -1470,6 +1763,7 @@ def process_message_with_ai(message_id: str):
 
 
     except Exception as e:
+        release_claim(message_id)
         try:
             _safe_log_error(
                 f"Error in AI message processing: {str(e)}"[:2000],
@@ -1550,6 +1844,43 @@ def get_ai_performance_metrics():
         _safe_log_error(f"Error getting AI metrics: {str(e)}", "Unified Inbox API Error")
         return {"status": "error", "message": "Failed to get AI metrics"}
 
+
+@frappe.whitelist()
+def get_ai_pipeline_metrics():
+    """Get backpressure metrics for the async AI pipeline (queue depth, lag, LLM slots)."""
+    frappe.only_for("System Manager")
+    try:
+        from assistant_crm.services.ai_pipeline import get_pipeline_metrics
+        return {"status": "success", "metrics": get_pipeline_metrics()}
+    except Exception as e:
+        _safe_log_error("Unified Inbox API Error", f"Error getting AI pipeline metrics: {str(e)}")
+        return {"status": "error", "message": "Failed to get AI pipeline metrics"}
+
+
+@frappe.whitelist()
+def get_platform_poller_metrics():
+    """Get leader, throughput, ingest lag and error counts of the platform pollers."""
+    frappe.only_for("System Manager")
+    try:
+        from assistant_crm.services.platform_pollers import get_poller_metrics
+        return {"status": "success", "metrics": get_poller_metrics()}
+    except Exception as e:
+        _safe_log_error("Unified Inbox API Error", f"Error getting platform poller metrics: {str(e)}")
+        return {"status": "error", "message": "Failed to get platform poller metrics"}
+
+
+@frappe.whitelist()
+def get_outbound_delivery_metrics():
+    """Get per-platform queued/sent/retried/dead-lettered counts of the outbound dispatcher."""
+    frappe.only_for("System Manager")
+    try:
+        from assistant_crm.services.outbound_dispatcher import get_metrics
+        return {"status": "success", "metrics": get_metrics()}
+    except Exception as e:
+        _safe_log_error("Unified Inbox API Error", f"Error getting outbound delivery metrics: {str(e)}")
+        return {"status": "error", "message": "Failed to get outbound delivery metrics"}
+
+
 # Utility to manually import recent webhook messages from log
 # This is a diagnostic/repair helper to backfill Unified Inbox when webhook processing was interrupted
 import os
@@ -1994,22 +2325,15 @@ def create_issue_for_conversation(conversation_name, customer_name, platform, in
 
         if existing_issue:
             print(f"DEBUG: Found existing Issue {existing_issue} for conversation {conversation_name}")
-            print(f"DEBUG: Updating existing Issue with new message and complete conversation history")
 
-            # Update existing Issue with complete conversation history
-            update_result = update_issue_with_conversation_history(conversation_name)
-
-            if update_result.get("status") == "success":
-                print(f"DEBUG: Successfully updated existing Issue {existing_issue}")
-                return {
-                    "status": "success",
-                    "message": f"Updated existing Issue {existing_issue} with new message",
-                    "issue_id": existing_issue,
-                    "existing": True,
-                    "updated": True
-                }
-            else:
-                print(f"DEBUG: Failed to update existing Issue: {update_result.get('message')}")
+            # The timeline is appended to as messages arrive (services.issue_history);
+            # only entries still buffered need writing - no rebuild from all messages
+            try:
+                from assistant_crm.services import issue_history
+                issue_history.sync(conversation_name)
+                frappe.db.commit()
+            except Exception as sync_err:
+                print(f"DEBUG: Failed to update existing Issue: {str(sync_err)}")
                 return {
                     "status": "success",
                     "message": f"Using existing Issue {existing_issue} (update failed)",
@@ -2018,6 +2342,15 @@ def create_issue_for_conversation(conversation_name, customer_name, platform, in
                     "updated": False
                 }
 
+            print(f"DEBUG: Successfully updated existing Issue {existing_issue}")
+            return {
+                "status": "success",
+                "message": f"Updated existing Issue {existing_issue} with new message",
+                "issue_id": existing_issue,
+                "existing": True,
+                "updated": True
+            }
+
         # Get the actual detected platform from the conversation
         detected_platform = None
         try:
@@ -2462,29 +2795,37 @@ def sync_issue_escalation_to_conversation(issue_id):
 
 
 def get_telegram_last_update_id():
-    """Get the last processed Telegram update ID."""
+    """Get the last processed Telegram update ID.
+
+    The offset lives in Redis so every bench node sees the same value; a
+    legacy site-file offset is migrated on first read.
+    """
     try:
-        # Try to get from a simple cache file first
+        from assistant_crm.services.platform_pollers import advance_telegram_offset, get_telegram_offset
+
+        offset = get_telegram_offset()
+        if offset:
+            return offset
+
         cache_file = frappe.get_site_path("telegram_last_update_id.txt")
         try:
             with open(cache_file, 'r') as f:
-                return int(f.read().strip())
+                legacy = int(f.read().strip())
         except (FileNotFoundError, ValueError):
             return 0
+        return advance_telegram_offset(legacy)
     except Exception:
         return 0
 
 
 def set_telegram_last_update_id(update_id):
-    """Set the last processed Telegram update ID."""
+    """Advance the last processed Telegram update ID (never moves backwards)."""
     try:
-        # Store in a simple cache file
-        cache_file = frappe.get_site_path("telegram_last_update_id.txt")
-        with open(cache_file, 'w') as f:
-            f.write(str(update_id))
-        print(f"DEBUG: Saved Telegram update ID: {update_id}")
+        from assistant_crm.services.platform_pollers import advance_telegram_offset
+
+        advance_telegram_offset(int(update_id))
     except Exception as e:
-        print(f"DEBUG: Error saving Telegram update ID: {str(e)}")
+        _safe_log_error("Telegram Offset Error", f"Error saving Telegram update ID {update_id}: {str(e)}")
 
 
 def get_instagram_last_update_id():
@@ -2515,22 +2856,37 @@ def set_instagram_last_update_id(update_timestamp):
 
 @frappe.whitelist()
 def fetch_telegram_messages():
+    """
+    Run one Telegram poll cycle on demand.
+
+    Regular polling is done by the leader-elected background poller
+    (services.platform_pollers); if it currently holds the lease this returns
+    an "info" status instead of racing it for the same updates.
+    """
+    from assistant_crm.services.platform_pollers import poll_once
+
+    return poll_once("Telegram")
+
+
+def _poll_telegram_updates(long_poll_timeout=10):
     """
     Fetch live messages from Telegram Bot API using long polling.
-    This replaces demo message generation with real Telegram messages.
+
+    Updates are ingested through TelegramIntegration.process_webhook (the same
+    path as webhook deliveries) and committed before the shared offset is
+    advanced, so a crash mid-batch re-delivers rather than loses updates.
+    Must be called under the Telegram poller lease.
     """
     try:
-        from assistant_crm.api.social_media_ports import TelegramIntegration
+        from assistant_crm.api.social_media_ports import get_platform_integration
+        from assistant_crm.services.integration_registry import get_session
 
-        print("DEBUG: Starting Telegram message fetch")
-
-        # Initialize Telegram integration
-        telegram = TelegramIntegration()
+        # Cached Telegram integration (credentials are reused between cycles)
+        telegram = get_platform_integration("Telegram")
 
         if not telegram.is_configured:
-            print("DEBUG: Telegram bot not configured")
             return {
-                "status": "error",
+                "status": "info",
                 "message": "Telegram bot not configured",
                 "debug": "Bot token missing or invalid"
             }
@@ -2538,20 +2894,25 @@ def fetch_telegram_messages():
         bot_token = telegram.credentials["bot_token"]
 
         # Get last update ID to avoid processing old messages
-        # Use a custom DocType to store Telegram state instead of System Settings
         last_update_id = get_telegram_last_update_id()
 
-        # Fetch updates from Telegram
+        # Long poll: Telegram holds the request open until updates arrive
         url = f"https://api.telegram.org/bot{bot_token}/getUpdates"
         params = {
             "offset": last_update_id + 1,
             "limit": 100,
-            "timeout": 10
+            "timeout": int(long_poll_timeout)
         }
 
-        print(f"DEBUG: Fetching Telegram updates with offset {last_update_id + 1}")
+        # Pooled session without retries: a timed-out long poll is simply re-issued next cycle
+        response = get_session("Telegram", max_retries=0).get(url, params=params, timeout=int(long_poll_timeout) + 10)
 
-        response = requests.get(url, params=params, timeout=15)
+        if response.status_code == 409:
+            # A webhook is registered for this bot; getUpdates is disabled
+            return {
+                "status": "info",
+                "message": "Telegram webhook is active; polling is not required"
+            }
 
         if response.status_code != 200:
             return {
@@ -2570,61 +2931,52 @@ def fetch_telegram_messages():
         updates = data.get("result", [])
         processed_messages = 0
         new_conversations = 0
-
-        print(f"DEBUG: Received {len(updates)} Telegram updates")
+        max_update_id = last_update_id
+        ingest_lag = None
 
         for update in updates:
+            max_update_id = max(max_update_id, int(update.get("update_id") or 0))
             try:
-                # Update last processed update ID
-                update_id = update.get("update_id")
-                if update_id:
-                    set_telegram_last_update_id(update_id)
-
                 # Process message if present
                 if "message" in update:
+                    message = update.get("message", {})
+                    chat_id = str(message.get("chat", {}).get("id", ""))
+                    is_new = not frappe.db.exists(
+                        "Unified Inbox Conversation",
+                        {"platform": "Telegram", "customer_platform_id": chat_id}
+                    )
+
                     result = telegram.process_webhook(update)
-                    if result.get("status") == "success":
+                    if result.get("status") == "success" and not result.get("duplicate"):
                         processed_messages += 1
-
-                        # Check if this created a new conversation
-                        message = update.get("message", {})
-                        chat_id = str(message.get("chat", {}).get("id", ""))
-
-                        # Check if this is a new conversation
-                        existing_conv = frappe.get_all(
-                            "Unified Inbox Conversation",
-                            filters={
-                                "platform": "Telegram",
-                                "customer_platform_id": chat_id
-                            },
-                            limit=1
-                        )
-
-                        if not existing_conv:
-                            new_conversations += 1
-                            print(f"DEBUG: New Telegram conversation detected for chat_id: {chat_id}")
-                        else:
-                            print(f"DEBUG: Existing Telegram conversation found for chat_id: {chat_id}")
+                        new_conversations += int(is_new)
+                        if message.get("date"):
+                            ingest_lag = max(0.0, time.time() - float(message["date"]))
 
             except Exception as update_error:
-                print(f"DEBUG: Error processing update {update.get('update_id')}: {str(update_error)}")
+                _safe_log_error(
+                    "Telegram Message Fetch Error",
+                    f"Error processing update {update.get('update_id')}: {str(update_error)}"
+                )
                 continue
 
-        # Commit changes
+        # Commit the batch, then move the shared offset past it
         frappe.db.commit()
+        if max_update_id > last_update_id:
+            set_telegram_last_update_id(max_update_id)
 
         return {
             "status": "success",
             "message": f"Processed {processed_messages} Telegram messages",
             "processed_messages": processed_messages,
             "new_conversations": new_conversations,
-            "total_updates": len(updates)
+            "total_updates": len(updates),
+            "ingest_lag_seconds": ingest_lag
         }
 
     except Exception as e:
         error_msg = f"Error fetching Telegram messages: {str(e)}"
-        print(f"DEBUG: {error_msg}")
-        _safe_log_error(error_msg, "Telegram Message Fetch Error")
+        _safe_log_error("Telegram Message Fetch Error", error_msg)
         return {
             "status": "error",
             "message": error_msg
@@ -2633,23 +2985,32 @@ def fetch_telegram_messages():
 
 @frappe.whitelist()
 def fetch_tawkto_messages():
+    """
+    Run one Tawk.to poll cycle on demand (see fetch_telegram_messages).
+    """
+    from assistant_crm.services.platform_pollers import poll_once
+
+    return poll_once("Tawk.to")
+
+
+def _poll_tawkto_chats():
     """
     Fetch live messages from Tawk.to API.
     This replaces demo message generation with real Tawk.to messages.
     Note: This requires API key for full functionality. Currently configured for webhook-based integration.
     """
     try:
-        from assistant_crm.api.social_media_ports import TawkToIntegration
+        from assistant_crm.api.social_media_ports import get_platform_integration
 
         print("DEBUG: Starting Tawk.to message fetch")
 
-        # Initialize Tawk.to integration
-        tawkto = TawkToIntegration()
+        # Cached Tawk.to integration
+        tawkto = get_platform_integration("Tawk.to")
 
         if not tawkto.is_configured:
             print("DEBUG: Tawk.to not configured")
             return {
-                "status": "error",
+                "status": "info",
                 "message": "Tawk.to not configured",
                 "debug": "Property ID missing or invalid"
             }
@@ -2687,7 +3048,7 @@ def fetch_tawkto_messages():
 
         print(f"DEBUG: Fetching Tawk.to chats for property {property_id}")
 
-        response = requests.get(url, headers=headers, params=params, timeout=15)
+        response = tawkto.http.get(url, headers=headers, params=params, timeout=15)
 
         if response.status_code != 200:
             return {
@@ -2712,7 +3073,7 @@ def fetch_tawkto_messages():
 
                 # Get messages for this chat
                 messages_url = f"https://api.tawk.to/v3/chats/{chat_id}/messages"
-                messages_response = requests.get(messages_url, headers=headers, timeout=10)
+                messages_response = tawkto.http.get(messages_url, headers=headers, timeout=10)
 
                 if messages_response.status_code == 200:
                     messages_data = messages_response.json()
@@ -2736,6 +3097,8 @@ def fetch_tawkto_messages():
                 print(f"DEBUG: Error processing chat {chat.get('id')}: {str(chat_error)}")
                 continue
 
+        frappe.db.commit()
+
         return {
             "status": "success",
             "message": f"Processed {processed_messages} Tawk.to messages",
@@ -2817,6 +3180,15 @@ def get_telegram_bot_info():
 
 @frappe.whitelist()
 def fetch_instagram_messages():
+    """
+    Run one Instagram status poll on demand (see fetch_telegram_messages).
+    """
+    from assistant_crm.services.platform_pollers import poll_once
+
+    return poll_once("Instagram")
+
+
+def _poll_instagram_status():
     """
     Fetch live messages from Instagram Graph API using polling.
 
@@ -2835,7 +3207,7 @@ def fetch_instagram_messages():
         if not instagram.is_configured:
             print("DEBUG: Instagram not configured")
             return {
-                "status": "error",
+                "status": "info",
                 "message": "Instagram not configured",
                 "debug": "Access token missing or invalid"
             }
@@ -4890,51 +5262,48 @@ def test_button_functionality():
 @frappe.whitelist()
 def update_issue_with_conversation_history(conversation_name, new_message_content=None, sender_name=None, timestamp=None, direction="Inbound"):
     """
-    Update the ERPNext Issue with complete conversation history after each message.
-    This ensures the Issue document contains the full conversation from start to finish.
+    Update the ERPNext Issue with the conversation history.
+
+    With ``new_message_content`` the message is appended to the Issue timeline
+    (services.issue_history, append-only). Without it the full timeline is
+    rebuilt from all messages - used when the Issue is first linked.
     """
     try:
+        from assistant_crm.services import issue_history
+
         # Find the Issue linked to this conversation
-        issue_name = frappe.db.get_value(
-            "Issue",
-            {"custom_conversation_id": conversation_name},
-            "name"
-        )
+        issue_name = issue_history.get_issue_for_conversation(conversation_name)
 
         if not issue_name:
             return {"status": "error", "message": "No Issue found for this conversation"}
 
-        # Get the Issue document
-        issue_doc = frappe.get_doc("Issue", issue_name)
-
         # If NRC already exists on Issue, skip re-scanning to avoid overwriting/extra work
         existing_nrc = None
         try:
             issue_meta = frappe.get_meta("Issue")
             if getattr(issue_meta, 'has_field', None) and issue_meta.has_field('custom_customer_nrc'):
-                existing_nrc = issue_doc.get('custom_customer_nrc')
+                existing_nrc = frappe.db.get_value("Issue", issue_name, "custom_customer_nrc")
         except Exception:
             existing_nrc = None
 
-        # Get all messages for this conversation
-        messages = frappe.get_all(
-            "Unified Inbox Message",
-            filters={"conversation": conversation_name},
-            fields=["message_content", "sender_name", "timestamp", "direction", "message_type"],
-            order_by="timestamp asc"
-        )
-
         if not existing_nrc:
-            # Attempt NRC extraction from messages and persist to Issue/Conversation
+            # Attempt NRC extraction and persist to Issue/Conversation. Incremental
+            # updates only look at the new message; a rebuild scans the history.
             nrc_to_use = None
             try:
-                for msg in messages:
-                    candidate = _extract_first_nrc_from_text(msg.message_content or "")
-                    if candidate:
-                        nrc_to_use = candidate
-                        break
-                if not nrc_to_use and new_message_content:
+                if new_message_content:
                     nrc_to_use = _extract_first_nrc_from_text(new_message_content)
+                else:
+                    for msg in frappe.get_all(
+                        "Unified Inbox Message",
+                        filters={"conversation": conversation_name},
+                        fields=["message_content"],
+                        order_by="timestamp asc"
+                    ):
+                        candidate = _extract_first_nrc_from_text(msg.message_content or "")
+                        if candidate:
+                            nrc_to_use = candidate
+                            break
 
                 if nrc_to_use:
                     # Store on conversation if field exists
@@ -4958,78 +5327,29 @@ def update_issue_with_conversation_history(conversation_name, new_message_conten
                     _set_issue_customer_fields(issue_name, nrc_to_use, conv_phone, customer_info)
             except Exception as nrc_err:
                 try:
-                    _safe_log_error(f"NRC extraction/update failed: {nrc_err}", "Assistant CRM NRC Extract")
+                    _safe_log_error("Assistant CRM NRC Extract", f"NRC extraction/update failed: {nrc_err}")
                 except Exception:
                     pass
 
-        # Build conversation history as bullet points, preserving original timestamps (no timezone conversion)
-        lines = []
-        lines.append("Conversation Timeline")
-        lines.append("")
-
-        for msg in messages:
-            timestamp_str = msg.timestamp.strftime('%Y-%m-%d %H:%M:%S') if msg.timestamp else "Unknown time"
-            direction_label = "Outbound" if (msg.direction or "").lower() == "outbound" else "Inbound"
-            sender = msg.sender_name or ("Agent" if direction_label == "Outbound" else "Customer")
-            content = (msg.message_content or "[No content]").strip()
-
-            # Bullet line: timestamp, direction, sender, content
-            lines.append(f"- {timestamp_str} {direction_label} ÔÇö {sender}: {content}")
-
-        # Update Issue description with complete conversation, using HTML line breaks so it renders on separate lines
-        try:
-            escaped_lines = [frappe.utils.escape_html(l) for l in lines]
-        except Exception:
-            escaped_lines = lines
-        full_description = "<br>".join(escaped_lines)
-
-        # Update Issue subject to include message count
-        message_count = len(messages)
-        original_subject = issue_doc.subject.split(" (")[0]  # Remove existing message count
-        new_subject = f"{original_subject} ({message_count} messages)"
-
-        # Use frappe.db.set_value to update only specific fields without validation issues
-        # This preserves all other fields and avoids required field validation problems
-
-        try:
-            frappe.db.set_value("Issue", issue_name, {
-                "description": full_description,
-                "subject": new_subject
-            })
-
-            # Commit the changes
-            frappe.db.commit()
-
-        except Exception as db_error:
-
-            # Fallback: Update fields individually
-            try:
-                frappe.db.set_value("Issue", issue_name, "description", full_description)
-                frappe.db.set_value("Issue", issue_name, "subject", new_subject)
-                frappe.db.commit()
-
-            except Exception as individual_error:
-                raise individual_error
+        if new_message_content:
+            issue_history.append_message(conversation_name, new_message_content, sender_name, timestamp, direction)
+            message_count = frappe.db.get_value("Unified Inbox Conversation", conversation_name, "message_count") or 0
+        else:
+            message_count = issue_history.rebuild(conversation_name)["message_count"]
 
-        print(f"DEBUG: Successfully updated Issue {issue_name} with {message_count} messages")
+        frappe.db.commit()
 
         return {
             "status": "success",
-            "message": f"Issue {issue_name} updated with complete conversation history",
+            "message": f"Issue {issue_name} updated with conversation history",
             "issue_id": issue_name,
             "message_count": message_count
         }
 
     except Exception as e:
         error_msg = f"Error updating Issue for conversation {conversation_name}: {str(e)}"
-        _safe_log_error(error_msg, "Issue Update Error")
-        print(f"DEBUG: {error_msg}")
-
-        # Enhanced error logging for debugging
-        import traceback
-        print(f"DEBUG: Full traceback: {traceback.format_exc()}")
+        _safe_log_error("Issue Update Error", error_msg)
 
-        # Log to webhook debug file for easier monitoring
         try:
             log = frappe.logger("assistant_crm.issue_update")
             log.error(f"Issue update failed for {conversation_name}: {error_msg}")
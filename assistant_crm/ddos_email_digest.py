@@ -42,7 +42,7 @@ def generate_digest(period, subject_prefix):
         violations = frappe.db.get_list(
             "Assistant CRM DDoS Log",
             filters=[["timestamp", ">=", cutoff_time]],
-            fields=["*"],
+            fields=["timestamp", "user", "ip_address", "endpoint", "violation_type", "request_count"],
             order_by="timestamp"
         )
     except:
@@ -68,7 +68,7 @@ def generate_digest(period, subject_prefix):
     # Log digest was sent
     frappe.log_error(
         title=f"DDoS Digest Sent - {period.title()}",
-        message=f"Sent {period} DDoS protection digest to {frappe.conf.get('ddos_alert_email', 'system-alerts@example.com')}\nViolations count: {len(violations)}"
+        message=f"Sent {period} DDoS protection digest to {frappe.conf.get('ddos_alert_email', 'system-alerts@example.com')}\nViolations count: {stats['total_violations']}"
     )
 
 
@@ -77,7 +77,7 @@ def build_violation_stats(violations):
     from collections import Counter
     
     stats = {
-        "total_violations": len(violations),
+        "total_violations": 0,
         "by_type": {},
         "top_ips": Counter(),
         "top_endpoints": Counter(),
@@ -86,18 +86,22 @@ def build_violation_stats(violations):
     }
     
     for v in violations:
+        # Each log row aggregates the requests from one IP within a minute
+        weight = max(v.get("request_count") or 0, 1)
+        stats["total_violations"] += weight
+
         # By type
         vtype = v.get("violation_type", "unknown")
-        stats["by_type"][vtype] = stats["by_type"].get(vtype, 0) + 1
+        stats["by_type"][vtype] = stats["by_type"].get(vtype, 0) + weight
         
         # Top IPs
-        stats["top_ips"][v.get("ip_address", "unknown")] += 1
+        stats["top_ips"][v.get("ip_address", "unknown")] += weight
         
         # Top endpoints
-        stats["top_endpoints"][v.get("endpoint", "unknown")] += 1
+        stats["top_endpoints"][v.get("endpoint", "unknown")] += weight
         
         # Top users
-        stats["top_users"][v.get("user", "anonymous")] += 1
+        stats["top_users"][v.get("user", "anonymous")] += weight
         
         # Hourly distribution
         try:
@@ -105,7 +109,7 @@ def build_violation_stats(violations):
             if isinstance(ts, str):
                 ts = datetime.fromisoformat(ts)
             hour = ts.strftime("%H:00")
-            stats["hourly_distribution"][hour] = stats["hourly_distribution"].get(hour, 0) + 1
+            stats["hourly_distribution"][hour] = stats["hourly_distribution"].get(hour, 0) + weight
         except:
             pass
     
@@ -127,13 +131,8 @@ def get_system_health():
     
     # Check Redis
     try:
-        import redis
-        redis_conn = redis.from_url(
-            frappe.conf.get("redis_cache", "redis://localhost:6379/1"),
-            decode_responses=True
-        )
-        redis_conn.ping()
-        health["redis_ok"] = True
+        from assistant_crm.services import redis_pool
+        health["redis_ok"] = redis_pool.is_healthy()
     except:
         pass
     
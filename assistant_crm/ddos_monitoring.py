@@ -7,20 +7,15 @@ import frappe
 import json
 from datetime import datetime, timedelta
 from collections import Counter
-import redis
+
+from assistant_crm.ddos_protection import publish_config_change
+from assistant_crm.ddos_violation_log import DOCTYPE, WEIGHT_SQL
+from assistant_crm.services import redis_pool
 
 
 def _get_redis():
-    """Get a live Redis connection or return None."""
-    try:
-        rc = redis.from_url(
-            frappe.conf.get("redis_cache", "redis://localhost:6379/1"),
-            decode_responses=True
-        )
-        rc.ping()
-        return rc
-    except Exception:
-        return None
+    """Shared pooled Redis client, or None while Redis is marked down (no per-call ping)."""
+    return redis_pool.get_client()
 
 @frappe.whitelist()
 def get_ddos_violations(hours=24, limit=100):
@@ -34,7 +29,7 @@ def get_ddos_violations(hours=24, limit=100):
         violations = frappe.db.get_list(
             "Assistant CRM DDoS Log",
             filters=[["timestamp", ">=", cutoff_time]],
-            fields=["name", "timestamp", "user", "ip_address", "endpoint", "violation_type", "details"],
+            fields=["name", "timestamp", "user", "ip_address", "endpoint", "violation_type", "request_count", "details"],
             order_by="timestamp desc",
             limit_page_length=limit
         )
@@ -59,57 +54,33 @@ def get_violations_summary(hours=24):
     try:
         cutoff_time = frappe.utils.add_to_date(None, hours=-hours)
         
-        # Total violations
-        total = frappe.db.get_value(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fieldname="COUNT(*) as count"
+        # Log rows are per-minute aggregates: weight each by the requests it stands for
+        table = f"`tab{DOCTYPE}`"
+
+        def grouped(column, limit=None):
+            return frappe.db.sql(
+                f"""SELECT {column}, SUM({WEIGHT_SQL}) AS count FROM {table}
+                WHERE timestamp >= %s GROUP BY {column} ORDER BY count DESC{f" LIMIT {int(limit)}" if limit else ""}""",
+                (cutoff_time,),
+                as_dict=True,
+            )
+
+        totals = frappe.db.sql(
+            f"""SELECT SUM({WEIGHT_SQL}), COUNT(DISTINCT ip_address), COUNT(DISTINCT user)
+            FROM {table} WHERE timestamp >= %s""",
+            (cutoff_time,),
         )
-        total = total[0] if total else 0
-        
+        total, unique_ips, unique_users = totals[0] if totals else (0, 0, 0)
+        total = int(total or 0)
+
         # By violation type
-        violations_by_type = frappe.db.get_list(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fields=["violation_type", "COUNT(*) as count"],
-            group_by="violation_type"
-        )
-        
+        violations_by_type = grouped("violation_type")
+
         # Top attacking IPs
-        top_ips = frappe.db.get_list(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fields=["ip_address", "COUNT(*) as count"],
-            group_by="ip_address",
-            order_by="count desc",
-            limit_page_length=10
-        )
-        
+        top_ips = grouped("ip_address", 10)
+
         # Most targeted endpoints
-        top_endpoints = frappe.db.get_list(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fields=["endpoint", "COUNT(*) as count"],
-            group_by="endpoint",
-            order_by="count desc",
-            limit_page_length=5
-        )
-        
-        # Unique IPs
-        unique_ips = frappe.db.get_value(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fieldname="COUNT(DISTINCT ip_address) as count"
-        )
-        unique_ips = unique_ips[0] if unique_ips else 0
-        
-        # Unique users affected
-        unique_users = frappe.db.get_value(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fieldname="COUNT(DISTINCT user) as count"
-        )
-        unique_users = unique_users[0] if unique_users else 0
+        top_endpoints = grouped("endpoint", 5)
         
         return {
             "status": "success",
@@ -138,12 +109,12 @@ def get_violation_timeline(hours=24, interval_minutes=60):
     try:
         cutoff_time = frappe.utils.add_to_date(None, hours=-hours)
         
-        # Raw violations
-        violations = frappe.db.get_list(
-            "Assistant CRM DDoS Log",
-            filters=[["timestamp", ">=", cutoff_time]],
-            fields=["timestamp"],
-            order_by="timestamp"
+        # Per-minute rows with the requests each stands for
+        violations = frappe.db.sql(
+            f"""SELECT timestamp, {WEIGHT_SQL} AS count FROM `tab{DOCTYPE}`
+            WHERE timestamp >= %s ORDER BY timestamp""",
+            (cutoff_time,),
+            as_dict=True,
         )
         
         # Group by time interval
@@ -154,7 +125,7 @@ def get_violation_timeline(hours=24, interval_minutes=60):
             interval_key = (ts.replace(minute=0, second=0, microsecond=0) + 
                           timedelta(minutes=interval_minutes * (ts.minute // interval_minutes)))
             key = interval_key.isoformat()
-            timeline[key] = timeline.get(key, 0) + 1
+            timeline[key] = timeline.get(key, 0) + int(v.count)
         
         # Sort and format
         sorted_timeline = sorted(timeline.items())
@@ -176,18 +147,18 @@ def get_redis_metrics():
     Get rate limiter metrics from Redis
     """
     try:
-        redis_conn = redis.from_url(
-            frappe.conf.get("redis_cache", "redis://localhost:6379/1"),
-            decode_responses=True
-        )
+        redis_conn = _get_redis()
+        if not redis_conn:
+            return {"status": "error", "message": "Redis unavailable", "pool": redis_pool.get_metrics()}
         
-        # Get all rate limit keys
-        keys = redis_conn.keys("rl:*:timestamps")
+        # Get all rate limit keys (SCAN: KEYS blocks Redis on large keyspaces)
+        keys = list(redis_conn.scan_iter("rl:*:timestamps", count=1000))
         
         metrics = {
             "active_rate_limiters": len(keys),
             "rate_limited_ips": len([k for k in keys if k.startswith("rl:ip:")]),
-            "rate_limited_users": len([k for k in keys if k.startswith("rl:user:")])
+            "rate_limited_users": len([k for k in keys if k.startswith("rl:user:")]),
+            "pool": redis_pool.get_metrics()
         }
         
         return {
@@ -210,16 +181,11 @@ def get_health_check():
         # Check DDoS protection is enabled
         ddos_enabled = frappe.conf.get("enable_assistant_crm_ddos_protection", True)
         
-        # Check Redis
+        # Check Redis (state from the pool's background health check)
         redis_ok = False
         try:
-            redis_conn = redis.from_url(
-                frappe.conf.get("redis_cache", "redis://localhost:6379/1"),
-                decode_responses=True
-            )
-            redis_conn.ping()
-            redis_ok = True
-        except:
+            redis_ok = redis_pool.is_healthy()
+        except Exception:
             pass
         
         # Check database
@@ -330,6 +296,7 @@ def clear_ip_rate_limit(ip_address):
         deleted = rc.delete(
             f"rl:ip:{ip_address}:timestamps",
             f"rl:ip:{ip_address}:endpoints",
+            f"rl:ip:{ip_address}:endpoints_hll",
         )
         return {
             "status": "success",
@@ -371,6 +338,7 @@ def block_ip(ip_address):
 
         rc.sadd("ddos:blacklist", ip_address)
         rc.hset("ddos:blacklist:meta", ip_address, datetime.utcnow().isoformat())
+        publish_config_change(rc)
         return {"status": "success", "message": f"IP {ip_address} has been permanently blocked"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -386,6 +354,7 @@ def unblock_ip(ip_address):
 
         rc.srem("ddos:blacklist", ip_address)
         rc.hdel("ddos:blacklist:meta", ip_address)
+        publish_config_change(rc)
         return {"status": "success", "message": f"IP {ip_address} has been unblocked"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
@@ -453,6 +422,7 @@ def update_rate_limit(category, limit_type, value):
         overrides = json.loads(raw) if raw else {}
         overrides.setdefault(category, {})[limit_type] = value
         rc.set("ddos:rate_limit_overrides", json.dumps(overrides))
+        publish_config_change(rc)
 
         return {
             "status": "success",
@@ -1,18 +1,44 @@
 """
 Application-level DDoS protection for Assistant CRM
 Uses Redis for distributed rate limiting across Gunicorn workers
-Logs violations to Frappe error log and database
+Queues violations for aggregated, asynchronous logging (ddos_violation_log)
+
+The per-request path is kept to the rate-limit script plus one pipelined
+behaviour update, and only on protected routes:
+- Rate-limit overrides and the IP blacklist are cached in-process for
+  ``ddos_config_cache_ttl`` seconds (default 5). ddos_monitoring publishes
+  on ``ddos:config_changed`` when it changes them, and a listener thread
+  drops the cache at once.
+- Route, webhook and skip-path checks use precompiled patterns. Route and
+  User-Agent verdicts are memoised in bounded LRUs.
+- Endpoint cycling is tracked with a HyperLogLog instead of a set.
+- IPs or networks in ``assistant_crm_ddos_whitelist`` (site config) skip
+  every check.
+
+Redis is reached through the process-wide pool in
+``services.redis_pool``. While its circuit breaker has Redis marked down,
+limits are enforced per worker by ``LocalRateLimiter``. This fails open:
+the limits are not shared across workers, but requests are never refused
+because Redis is unavailable.
 """
 
 import frappe
-import redis
+import functools
+import ipaddress
+import itertools
+import os
+import re
+import threading
 import time
 import logging
+from collections import OrderedDict, deque
 from frappe import _
 from werkzeug.exceptions import TooManyRequests, Forbidden
 import json
 from datetime import datetime, timezone
 
+from assistant_crm.services import redis_pool
+
 logger = logging.getLogger("assistant_crm.ddos_protection")
 
 # Configuration - Rate limits per route category
@@ -81,29 +107,158 @@ PROTECTED_ROUTES = {
 }
 
 
+# Paths never checked (database setup and health checks)
+SKIP_PATHS = frozenset([
+    "/api/setup/check",
+    "/api/setup/create",
+    "/app/setup",
+    "/api/health",
+    "/api/method/frappe.client.get_count",  # Health check endpoint
+])
+
+CONFIG_CHANNEL = "ddos:config_changed"
+DEFAULT_CONFIG_CACHE_TTL = 5
+ENDPOINT_CYCLING_THRESHOLD = 5
+ENDPOINT_WINDOW_SECONDS = 10
+# Identifiers tracked per worker by the fallback limiter (least recently seen evicted)
+LOCAL_LIMITER_MAX_IDENTIFIERS = 10000
+
+
+def _substring_pattern(substrings):
+    return re.compile("|".join(re.escape(s) for s in substrings))
+
+
+# Categories keep their order: integration_routes must win over crm_routes
+_ROUTE_PATTERNS = [(category, _substring_pattern(routes)) for category, routes in PROTECTED_ROUTES.items()]
+_WEBHOOK_METHOD_PATTERN = _substring_pattern(WEBHOOK_METHOD_PATTERNS)
+_WEBHOOK_PATH_PREFIXES = tuple(WEBHOOK_PATH_PREFIXES)
+
+
+def publish_config_change(redis_conn):
+    """Tell every worker to reload overrides and the blacklist (called after changing them)."""
+    try:
+        redis_conn.publish(CONFIG_CHANNEL, str(time.time()))
+    except Exception as e:
+        logger.debug(f"Config change publish failed: {str(e)}")
+
+
+class ProtectionConfigCache:
+    """
+    In-process copy of the rate-limit overrides and IP blacklist.
+
+    Reloaded when older than the TTL, or at once when a message arrives on
+    ``CONFIG_CHANNEL``. If the listener is down, the TTL still bounds how
+    stale the copy can be.
+    """
+
+    def __init__(self):
+        self.overrides = {}
+        self.blacklist = frozenset()
+        self.expires_at = 0.0
+        self._lock = threading.Lock()
+        # frappe.conf is not bound on the listener thread
+        self._redis_url = redis_pool.configured_url()
+        threading.Thread(target=self._listen, daemon=True, name="ddos-config-listener").start()
+
+    def _ttl(self):
+        return float(frappe.conf.get("ddos_config_cache_ttl", DEFAULT_CONFIG_CACHE_TTL))
+
+    def get(self):
+        """Returns (overrides, blacklist)."""
+        if time.monotonic() >= self.expires_at:
+            with self._lock:
+                if time.monotonic() >= self.expires_at:
+                    self._reload()
+        return self.overrides, self.blacklist
+
+    def _reload(self):
+        redis_conn = RateLimiterConfig.get_redis_connection()
+        if not redis_conn:
+            # Keep the last copy while Redis is down
+            self.expires_at = time.monotonic() + self._ttl()
+            return
+        try:
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.get("ddos:rate_limit_overrides")
+            pipe.smembers("ddos:blacklist")
+            raw, blacklist = pipe.execute()
+            self.overrides = json.loads(raw) if raw else {}
+            self.blacklist = frozenset(blacklist or ())
+        except Exception as e:
+            redis_pool.report_failure(e)
+            logger.debug(f"Protection config reload failed: {str(e)}")
+        self.expires_at = time.monotonic() + self._ttl()
+
+    def invalidate(self):
+        self.expires_at = 0.0
+
+    def _listen(self):
+        # Polls with a timeout: the pooled connections have short socket timeouts
+        while True:
+            pubsub = None
+            try:
+                pubsub = redis_pool.get_raw_client(self._redis_url).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CONFIG_CHANNEL)
+                while True:
+                    if pubsub.get_message(timeout=30):
+                        self.invalidate()
+            except Exception as e:
+                logger.debug(f"Protection config listener error: {str(e)}")
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            self.invalidate()
+            time.sleep(DEFAULT_CONFIG_CACHE_TTL)
+
+
+@functools.lru_cache(maxsize=64)
+def _whitelist_networks(entries):
+    networks = []
+    for entry in entries:
+        try:
+            networks.append(ipaddress.ip_network(str(entry).strip(), strict=False))
+        except ValueError:
+            logger.warning(f"Ignoring invalid DDoS whitelist entry: {entry}")
+    return tuple(networks)
+
+
+@functools.lru_cache(maxsize=4096)
+def _ip_in_networks(ip, networks):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def is_whitelisted(ip):
+    """True for IPs in the ``assistant_crm_ddos_whitelist`` site config (addresses or CIDRs)."""
+    entries = frappe.conf.get("assistant_crm_ddos_whitelist")
+    if not entries:
+        return False
+    if isinstance(entries, str):
+        entries = entries.split(",")
+    return _ip_in_networks(ip, _whitelist_networks(tuple(entries)))
+
+
 class RateLimiterConfig:
     """Centralized rate limit configuration"""
 
     @staticmethod
     def get_redis_connection():
-        """Get Redis connection from Frappe config"""
-        try:
-            # Try to get from config, fallback to default
-            cache_config = frappe.conf.get("redis_cache", "redis://localhost:6379/1")
-            rc = redis.from_url(cache_config, decode_responses=True)
-            rc.ping()
-            return rc
-        except Exception as e:
-            logger.warning(f"Redis connection failed: {str(e)}")
-            return None
+        """Shared pooled client for ``redis_cache``, or None while Redis is marked down"""
+        return redis_pool.get_client()
 
     @staticmethod
+    @functools.lru_cache(maxsize=4096)
     def get_route_category(path):
         """Determine which route category a path belongs to"""
-        for category, routes in PROTECTED_ROUTES.items():
-            for route in routes:
-                if route in path:
-                    return category
+        for category, pattern in _ROUTE_PATTERNS:
+            if pattern.search(path):
+                return category
         return None
 
     @staticmethod
@@ -114,60 +269,146 @@ class RateLimiterConfig:
         return f"rl:ip:{ip}"
 
 
+# Sliding-window log over one or more tiers, checked and recorded atomically.
+# KEYS[i]: the tier's ZSET of request timestamps
+# ARGV[1]: now (epoch seconds, float), ARGV[2]: window (seconds), ARGV[3]: unique member,
+# ARGV[3 + i]: limit for KEYS[i]
+# Returns {allowed, denied tier index (1-based, 0 if allowed), remaining, reset_after_sec}.
+# A denied request is recorded in no tier, so it does not extend the block.
+SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local remaining = -1
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local limit = tonumber(ARGV[3 + i])
+    local count = redis.call('ZCARD', key)
+    if count >= limit then
+        local reset = window
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        if oldest[2] then
+            reset = tonumber(oldest[2]) + window - now
+        end
+        return {0, i, 0, math.max(1, math.ceil(reset))}
+    end
+    if remaining < 0 or limit - count - 1 < remaining then
+        remaining = limit - count - 1
+    end
+end
+local ttl = math.ceil((window + 10) * 1000)
+for _, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[3])
+    redis.call('PEXPIRE', key, ttl)
+end
+return {1, 0, remaining, window}
+"""
+
+
+class LocalRateLimiter:
+    """
+    In-process sliding-window limiter used while Redis is unavailable.
+
+    Same tiers and limits as the Redis script, but counted per worker, so
+    the effective limit is the configured one times the number of workers.
+    """
+
+    def __init__(self, window_size=60, max_identifiers=LOCAL_LIMITER_MAX_IDENTIFIERS):
+        self.window_size = window_size
+        self.max_identifiers = max_identifiers
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _window(self, identifier, now):
+        window = self._windows.get(identifier)
+        if window is None:
+            window = self._windows[identifier] = deque()
+            if len(self._windows) > self.max_identifiers:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(identifier)
+        cutoff = now - self.window_size
+        while window and window[0] <= cutoff:
+            window.popleft()
+        return window
+
+    def check(self, tiers):
+        """Same contract as ``RateLimiter.check``."""
+        now = time.monotonic()
+        remaining = None
+        with self._lock:
+            windows = []
+            for identifier, limit in tiers:
+                window = self._window(identifier, now)
+                if len(window) >= limit:
+                    reset_after = int(window[0] + self.window_size - now) + 1 if window else self.window_size
+                    return False, 0, max(1, reset_after), identifier
+                left = int(limit) - len(window) - 1
+                remaining = left if remaining is None else min(remaining, left)
+                windows.append(window)
+            for window in windows:
+                window.append(now)
+        return True, remaining, self.window_size, None
+
+
 class RateLimiter:
     """
-    Redis-backed rate limiter using sliding window counter algorithm
+    Redis-backed sliding-window rate limiter.
+
+    One Lua script trims, counts and records every tier of a request in a
+    single atomic round-trip. Members are unique per request, so
+    requests in the same second are all counted. While Redis is marked down
+    the tiers are checked by ``LocalRateLimiter`` instead.
     """
 
     def __init__(self):
-        self.redis_conn = RateLimiterConfig.get_redis_connection()
         self.window_size = 60  # 1-minute window
+        # Scripts are bound once; each call runs on the client passed in
+        try:
+            self._script = redis_pool.get_raw_client().register_script(SLIDING_WINDOW_LUA)
+        except Exception as e:
+            logger.warning(f"Redis pool unavailable: {str(e)}")
+            self._script = None
+        self._member_prefix = f"{os.getpid()}-{os.urandom(3).hex()}"
+        self._sequence = itertools.count()
+        self.local_limiter = LocalRateLimiter(self.window_size)
+
+    @property
+    def redis_conn(self):
+        return RateLimiterConfig.get_redis_connection()
 
     def is_allowed(self, identifier, limit):
         """
         Check if request is within rate limit.
         Returns: (is_allowed: bool, remaining_requests: int, reset_after_sec: int)
         """
-        if not self.redis_conn:
-            logger.debug("Redis unavailable, allowing request")
-            return True, limit, self.window_size
+        allowed, remaining, reset_after, _ = self.check([(identifier, limit)])
+        return allowed, remaining, reset_after
+
+    def check(self, tiers):
+        """
+        Check and record one request against several ``(identifier, limit)`` tiers at once.
+        Returns: (is_allowed, remaining in the tightest tier, reset_after_sec, denying identifier or None)
+        """
+        redis_conn = self.redis_conn if self._script else None
+        if not redis_conn:
+            logger.debug("Redis unavailable, using the local limiter")
+            return self.local_limiter.check(tiers)
 
         try:
-            current_time = int(time.time())
-            window_start = current_time - self.window_size
-
-            # Get all requests in current window
-            timestamps_key = f"{identifier}:timestamps"
-
-            # Remove expired entries (older than window)
-            self.redis_conn.zremrangebyscore(timestamps_key, 0, window_start)
-
-            # Count current requests in window
-            request_count = self.redis_conn.zcard(timestamps_key)
-
-            if request_count >= limit:
-                # Rate limit exceeded
-                remaining = 0
-                oldest_request = self.redis_conn.zrange(
-                    timestamps_key, 0, 0, withscores=True
-                )
-                reset_after = (
-                    int(oldest_request[0][1]) + self.window_size - current_time
-                    if oldest_request
-                    else self.window_size
-                )
-                return False, remaining, max(1, reset_after)
-
-            # Add current request timestamp
-            self.redis_conn.zadd(timestamps_key, {str(current_time): current_time})
-            self.redis_conn.expire(timestamps_key, self.window_size + 10)
-
-            remaining = limit - request_count - 1
-            return True, remaining, self.window_size
+            now = time.time()
+            member = f"{now:.6f}-{self._member_prefix}-{next(self._sequence)}"
+            allowed, tier, remaining, reset_after = self._script(
+                keys=[f"{identifier}:timestamps" for identifier, _ in tiers],
+                args=[f"{now:.6f}", self.window_size, member] + [int(limit) for _, limit in tiers],
+                client=redis_conn,
+            )
+            denied_by = tiers[int(tier) - 1][0] if not allowed else None
+            return bool(allowed), int(remaining), int(reset_after), denied_by
 
         except Exception as e:
+            redis_pool.report_failure(e)
             logger.error(f"Rate limiter check failed: {str(e)}")
-            return True, limit, self.window_size  # Fail open
+            return self.local_limiter.check(tiers)  # Fail open to per-worker limits
 
 
 class BotDetector:
@@ -199,25 +440,35 @@ class BotDetector:
         "nmap",
     ]
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def classify_user_agent(user_agent):
+        """(trusted, bot signature or None) for a lower-cased User-Agent; memoised"""
+        for trusted_ua in BotDetector.TRUSTED_WEBHOOK_USER_AGENTS:
+            if trusted_ua in user_agent:
+                return True, None
+
+        for bot_signature in BotDetector.SUSPICIOUS_HEADERS:
+            if bot_signature in user_agent:
+                return False, bot_signature
+        return False, None
+
     @staticmethod
     def check_headers(request_headers):
         """Analyze request headers for bot patterns"""
         violations = []
 
         # Check User-Agent
-        user_agent = request_headers.get("User-Agent", "").lower()
+        user_agent = (request_headers.get("User-Agent") or "").lower()
         if not user_agent:
             violations.append("missing_user_agent")
         else:
             # Trusted webhook delivery agents don't send browser headers — skip all checks
-            for trusted_ua in BotDetector.TRUSTED_WEBHOOK_USER_AGENTS:
-                if trusted_ua in user_agent:
-                    return []
-
-            for bot_signature in BotDetector.SUSPICIOUS_HEADERS:
-                if bot_signature in user_agent:
-                    violations.append(f"bot_signature:{bot_signature}")
-                    break
+            trusted, bot_signature = BotDetector.classify_user_agent(user_agent)
+            if trusted:
+                return []
+            if bot_signature:
+                violations.append(f"bot_signature:{bot_signature}")
 
         # Check for missing common browser headers
         if not request_headers.get("Accept-Language"):
@@ -235,19 +486,25 @@ class BotDetector:
         return violations
 
     @staticmethod
-    def check_behavior(identifier, redis_conn):
-        """Detect rapid endpoint cycling and other behaviors"""
+    def check_behavior(identifier, redis_conn, path=None):
+        """Detect rapid endpoint cycling and other behaviors; records ``path`` in the same round-trip"""
         if not redis_conn:
             return []
 
         violations = []
 
         try:
-            # Check for rapid endpoint changes (>5 different endpoints in 10 sec)
-            endpoint_key = f"{identifier}:endpoints"
-            current_endpoints = redis_conn.smembers(endpoint_key)
-
-            if len(current_endpoints) > 5:
+            # Check for rapid endpoint changes (>5 different endpoints in 10 sec).
+            # Distinct endpoints are estimated with a HyperLogLog: constant size, no SMEMBERS.
+            endpoint_key = f"{identifier}:endpoints_hll"
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.pfcount(endpoint_key)
+            if path:
+                pipe.pfadd(endpoint_key, path)
+                pipe.expire(endpoint_key, ENDPOINT_WINDOW_SECONDS)
+            endpoint_count = pipe.execute()[0]
+
+            if endpoint_count > ENDPOINT_CYCLING_THRESHOLD:
                 violations.append("endpoint_cycling")
 
         except Exception as e:
@@ -263,6 +520,7 @@ class DDoSProtectionMiddleware:
 
     def __init__(self):
         self.rate_limiter = RateLimiter()
+        self.config_cache = ProtectionConfigCache()
         self.violation_log = []
 
     def check_request(self):
@@ -273,14 +531,8 @@ class DDoSProtectionMiddleware:
             return
 
         # Skip database initialization and health check requests
-        skip_paths = [
-            "/api/setup/check",
-            "/api/setup/create",
-            "/app/setup",
-            "/api/health",
-            "/api/method/frappe.client.get_count",  # Health check endpoint
-        ]
-        if frappe.request.path in skip_paths:
+        path = frappe.request.path
+        if path in SKIP_PATHS:
             return
 
         # Skip non-GET/POST requests
@@ -290,10 +542,7 @@ class DDoSProtectionMiddleware:
         # Skip webhook endpoints — they authenticate via HMAC signatures (Meta X-Hub-Signature-256,
         # Tawk.to X-Tawk-Signature). Rate-limiting them causes legitimate platforms to retry
         # and eventually disable the webhook subscription.
-        path = frappe.request.path
-        if any(path.startswith(wp) for wp in WEBHOOK_PATH_PREFIXES):
-            return
-        if any(m in path for m in WEBHOOK_METHOD_PATTERNS):
+        if path.startswith(_WEBHOOK_PATH_PREFIXES) or _WEBHOOK_METHOD_PATTERN.search(path):
             return
 
         # Use remote_addr, which Werkzeug's ProxyFix(x_for=1) has already resolved
@@ -301,18 +550,19 @@ class DDoSProtectionMiddleware:
         # here — its leftmost entry is attacker-controlled and trivially spoofable.
         early_ip = frappe.request.remote_addr or "unknown"
 
+        # Whitelisted internal traffic skips every check
+        if is_whitelisted(early_ip):
+            return
+
         # Permanent IP blacklist — applies to all routes
-        if self.rate_limiter.redis_conn:
-            try:
-                if self.rate_limiter.redis_conn.sismember("ddos:blacklist", early_ip):
-                    frappe.db.rollback()
-                    frappe.response["http_status_code"] = 403
-                    raise Forbidden("Access denied.")
-            except redis.RedisError:
-                pass
+        overrides, blacklist = self.config_cache.get()
+        if early_ip in blacklist:
+            frappe.db.rollback()
+            frappe.response["http_status_code"] = 403
+            raise Forbidden("Access denied.")
 
         # Determine if this is a protected route
-        route_category = RateLimiterConfig.get_route_category(frappe.request.path)
+        route_category = RateLimiterConfig.get_route_category(path)
         if not route_category:
             return
 
@@ -323,15 +573,10 @@ class DDoSProtectionMiddleware:
 
         identifier = RateLimiterConfig.get_identifier(is_authenticated, user, client_ip)
 
-        # Collect request headers
-        request_headers = {}
-        for header in frappe.request.headers:
-            request_headers[header] = frappe.request.headers.get(header)
-
-        # Bot detection
-        bot_violations = BotDetector.check_headers(request_headers)
+        # Bot detection (werkzeug Headers: case-insensitive .get)
+        bot_violations = BotDetector.check_headers(frappe.request.headers)
         bot_violations.extend(
-            BotDetector.check_behavior(identifier, self.rate_limiter.redis_conn)
+            BotDetector.check_behavior(identifier, self.rate_limiter.redis_conn, path)
         )
 
         if bot_violations and len(bot_violations) >= 2:
@@ -340,49 +585,37 @@ class DDoSProtectionMiddleware:
                 identifier,
                 user,
                 client_ip,
-                frappe.request.path,
+                path,
                 "bot_detected",
                 bot_violations,
             )
 
         # Rate limiting — merge static defaults with any Redis overrides
+        limits = dict(RATE_LIMITS.get(route_category, {}))
         try:
-            if self.rate_limiter.redis_conn:
-                raw = self.rate_limiter.redis_conn.get("ddos:rate_limit_overrides")
-                if raw:
-                    overrides = json.loads(raw)
-                    merged = {k: {**v} for k, v in RATE_LIMITS.items()}
-                    for cat, lims in overrides.items():
-                        if cat in merged:
-                            merged[cat].update(lims)
-                    limit = merged.get(route_category, {}).get(
-                        "authenticated" if is_authenticated else "anonymous", 600
-                    )
-                else:
-                    limit = RATE_LIMITS.get(route_category, {}).get(
-                        "authenticated" if is_authenticated else "anonymous", 600
-                    )
-            else:
-                limit = RATE_LIMITS.get(route_category, {}).get(
-                    "authenticated" if is_authenticated else "anonymous", 600
-                )
+            limits.update(overrides.get(route_category, {}))
         except Exception:
-            limit = RATE_LIMITS.get(route_category, {}).get(
-                "authenticated" if is_authenticated else "anonymous", 600
-            )
+            limits = dict(RATE_LIMITS.get(route_category, {}))
+        limit = limits.get("authenticated" if is_authenticated else "anonymous", 600)
 
-        is_allowed, _, reset_after = self.rate_limiter.is_allowed(
-            identifier, limit
-        )
+        # Optional tiers, set through the overrides: "ip" also caps authenticated users per IP,
+        # "route" caps the whole route category across all clients
+        tiers = [(identifier, limit)]
+        if is_authenticated and limits.get("ip"):
+            tiers.append((RateLimiterConfig.get_identifier(False, ip=client_ip), limits["ip"]))
+        if limits.get("route"):
+            tiers.append((f"rl:route:{route_category}", limits["route"]))
+
+        is_allowed, _, reset_after, denied_by = self.rate_limiter.check(tiers)
 
         if not is_allowed:
             self._log_violation(
                 identifier,
                 user,
                 client_ip,
-                frappe.request.path,
+                path,
                 "rate_limit_exceeded",
-                {"limit": limit, "reset_after": reset_after},
+                {"limit": dict(tiers).get(denied_by, limit), "tier": denied_by, "reset_after": reset_after},
             )
 
             # Return 429 Too Many Requests
@@ -392,51 +625,33 @@ class DDoSProtectionMiddleware:
                 f"Rate limit exceeded. Reset after {reset_after} seconds."
             )
 
-        # Track endpoint for behavior analysis
-        if self.rate_limiter.redis_conn:
-            try:
-                endpoint_key = f"{identifier}:endpoints"
-                self.rate_limiter.redis_conn.sadd(endpoint_key, frappe.request.path)
-                self.rate_limiter.redis_conn.expire(endpoint_key, 10)
-            except Exception as e:
-                logger.debug(f"Behavior tracking error: {str(e)}")
-
     def _log_violation(self, identifier, user, ip, path, violation_type, details):
-        """Log DDoS protection violations.
+        """Queue a DDoS protection violation for the background log writer.
 
-        bot_detected violations are written only to the application logger (log file).
-        They are informational — the request is not blocked — and writing them to
-        frappe.log_error() floods the UI Error Log with noise that buries real errors.
+        Nothing is written to the database inside the request: during a flood that
+        would add one insert per attack request. Events go to a Redis stream, sampled
+        per (IP, violation type, minute), and ddos_violation_log.flush_violations
+        bulk-inserts one aggregated "Assistant CRM DDoS Log" row per window.
 
-        rate_limit_exceeded violations are written to both the application logger AND
-        frappe.log_error() because they represent an active block that an operator
-        may need to investigate or clear.
+        Sampled events are also written to the application log file.
         """
         try:
-            log_entry = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "identifier": identifier,
-                "user": user or "anonymous",
-                "ip": ip,
-                "path": path,
-                "violation_type": violation_type,
-                "details": details,
-            }
-
-            # Always write to the application log file (not visible in UI Error Log)
-            logger.warning(f"DDOS_VIOLATION {json.dumps(log_entry)}")
-
-            # Only write to the UI Error Log for actual blocks (rate_limit_exceeded).
-            # bot_detected is a passive signal — it never blocks the request — so
-            # surfacing it in the Error Log creates thousands of redundant entries.
-            if violation_type == "rate_limit_exceeded":
-                try:
-                    frappe.log_error(
-                        title=f"DDoS: {violation_type}",
-                        message=json.dumps(log_entry, indent=2),
-                    )
-                except Exception as e:
-                    logger.debug(f"Could not log to error log: {str(e)}")
+            from assistant_crm import ddos_violation_log
+
+            sampled = ddos_violation_log.record(
+                self.rate_limiter.redis_conn, identifier, user, ip, path, violation_type, details
+            )
+            if sampled:
+                log_entry = {
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "identifier": identifier,
+                    "user": user or "anonymous",
+                    "ip": ip,
+                    "path": path,
+                    "violation_type": violation_type,
+                    "details": details,
+                }
+                logger.warning(f"DDOS_VIOLATION {json.dumps(log_entry)}")
 
         except Exception as e:
             logger.error(f"Violation logging failed: {str(e)}")
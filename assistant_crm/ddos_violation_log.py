@@ -0,0 +1,248 @@
+"""
+Asynchronous, sampled DDoS violation logging
+
+Rejected and suspicious requests used to be logged synchronously, with one
+``frappe.log_error`` insert per rejected request. During a flood that meant
+one database write per attack request. Now:
+
+- ``record`` (request path) pushes the event to a per-site Redis stream and
+  never touches the database. Events are sampled per (IP, violation type,
+  minute) in each worker. The first ``ddos_violation_sample_per_minute``
+  events (default 5) go out individually. After that, one event per
+  ``SAMPLE_EVERY`` carries the weight of the events it stands for, so
+  counts stay close to exact while writes stay bounded.
+- ``flush_violations`` (every minute, scheduler) reads the stream through a
+  consumer group. It aggregates events per (IP, violation type, minute)
+  and bulk-inserts one "Assistant CRM DDoS Log" row per window, with the
+  total in ``request_count``. A window that was already written, because
+  it spanned two flushes, is topped up rather than duplicated.
+
+``ddos_monitoring`` and ``ddos_email_digest`` read these aggregated rows,
+weighting each one by ``request_count``.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import frappe
+
+logger = logging.getLogger("assistant_crm.ddos_protection")
+
+DOCTYPE = "Assistant CRM DDoS Log"
+CONSUMER_GROUP = "ddos-log-writers"
+CONSUMER_NAME = "scheduler"
+STREAM_MAXLEN = 100000
+DEFAULT_SAMPLE_PER_MINUTE = 5
+SAMPLE_EVERY = 100
+READ_BATCH = 5000
+MAX_EVENTS_PER_FLUSH = 200000
+MAX_ENDPOINTS_IN_DETAILS = 5
+# Windows tracked per worker; events beyond this go out unsampled (stream only, still aggregated)
+MAX_TRACKED_WINDOWS = 50000
+
+# Events a log row stands for; rows written before aggregation have request_count 0
+WEIGHT_SQL = "GREATEST(IFNULL(request_count, 0), 1)"
+
+# (ip, violation_type, minute) -> [events seen, events not yet sent]
+_windows = {}
+_windows_lock = threading.Lock()
+
+
+def _site():
+    return getattr(frappe.local, "site", None) or "default"
+
+
+def stream_key(site=None):
+    return f"ddos:violations:{site or _site()}"
+
+
+def _sample_limit():
+    return int(frappe.conf.get("ddos_violation_sample_per_minute", DEFAULT_SAMPLE_PER_MINUTE))
+
+
+def _take_sample(ip, violation_type, minute):
+    """Weight to send for this event, or 0 to hold it back; also returns stale windows to flush."""
+    limit = _sample_limit()
+    key = (ip, violation_type, minute)
+    with _windows_lock:
+        stale = [(k, w[1]) for k, w in _windows.items() if k[2] < minute]
+        for k, _pending in stale:
+            del _windows[k]
+        window = _windows.get(key)
+        if window is None:
+            if len(_windows) >= MAX_TRACKED_WINDOWS:
+                return 1, [(k, pending) for k, pending in stale if pending]
+            window = _windows[key] = [0, 0]
+        window[0] += 1
+        window[1] += 1
+        weight = 0
+        if window[0] <= limit or window[0] % SAMPLE_EVERY == 0:
+            weight, window[1] = window[1], 0
+    return weight, [(k, pending) for k, pending in stale if pending]
+
+
+def _xadd(redis_conn, fields):
+    redis_conn.xadd(stream_key(), fields, maxlen=STREAM_MAXLEN, approximate=True)
+
+
+def record(redis_conn, identifier, user, ip, path, violation_type, details):
+    """Queue one violation for the background writer. Never writes to the database.
+
+    Returns True when this event was sampled (sent on its own or carrying held-back ones).
+    """
+    now = time.time()
+    minute = int(now // 60) * 60
+    weight, stale = _take_sample(ip, violation_type, minute)
+    if not redis_conn or not (weight or stale):
+        return bool(weight)
+
+    try:
+        # Events held back in a window that has closed still count
+        for (stale_ip, stale_type, stale_minute), pending in stale:
+            _xadd(redis_conn, {
+                "ts": str(stale_minute), "ip": stale_ip or "", "violation_type": stale_type,
+                "weight": str(pending), "user": "", "identifier": "", "path": "", "details": "",
+            })
+        if weight:
+            _xadd(redis_conn, {
+                "ts": f"{now:.3f}",
+                "ip": ip or "",
+                "user": user or "",
+                "identifier": identifier or "",
+                "path": path or "",
+                "violation_type": violation_type,
+                "weight": str(weight),
+                "details": json.dumps(details, default=str),
+            })
+    except Exception as e:
+        logger.debug(f"Violation stream write failed: {str(e)}")
+    return bool(weight)
+
+
+def _ensure_group(redis_conn, key):
+    try:
+        redis_conn.xgroup_create(key, CONSUMER_GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _read(redis_conn, key):
+    """Pending entries of this consumer first (a crashed run), then new ones."""
+    for start in ("0", ">"):
+        while True:
+            response = redis_conn.xreadgroup(CONSUMER_GROUP, CONSUMER_NAME, {key: start}, count=READ_BATCH)
+            entries = response[0][1] if response else []
+            if not entries:
+                break
+            yield entries
+
+
+def aggregate(events):
+    """Fold stream events into one summary per (ip, violation_type, minute)."""
+    windows = {}
+    for fields in events:
+        minute = int(float(fields.get("ts") or 0) // 60) * 60
+        key = (fields.get("ip") or "unknown", fields.get("violation_type") or "unknown", minute)
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = {"count": 0, "user": None, "endpoints": Counter(), "sample": None}
+        weight = int(fields.get("weight") or 1)
+        window["count"] += weight
+        if fields.get("user") and not window["user"]:
+            window["user"] = fields["user"]
+        if fields.get("path"):
+            window["endpoints"][fields["path"]] += weight
+        if fields.get("details") and window["sample"] is None:
+            window["sample"] = fields["details"]
+    return windows
+
+
+def _minute_datetime(minute):
+    return frappe.utils.convert_utc_to_system_timezone(datetime.utcfromtimestamp(minute)).replace(tzinfo=None)
+
+
+def _details(window):
+    try:
+        sample = json.loads(window["sample"]) if window["sample"] else None
+    except ValueError:
+        sample = window["sample"]
+    return json.dumps({
+        "sample": sample,
+        "endpoints": dict(window["endpoints"].most_common(MAX_ENDPOINTS_IN_DETAILS)),
+    }, default=str)
+
+
+def _existing_rows(keys):
+    """(ip, violation_type, timestamp) -> name for windows already written."""
+    if not keys:
+        return {}
+    timestamps = sorted({timestamp for _ip, _type, timestamp in keys})
+    rows = frappe.get_all(
+        DOCTYPE,
+        filters={"timestamp": ["in", timestamps], "ip_address": ["in", sorted({k[0] for k in keys})]},
+        fields=["name", "ip_address", "violation_type", "timestamp"],
+    )
+    return {(r.ip_address, r.violation_type, r.timestamp): r.name for r in rows}
+
+
+def write_windows(windows):
+    """Bulk-insert new window rows and top up existing ones; returns rows touched."""
+    if not windows:
+        return 0
+    by_key = {(ip, vtype, _minute_datetime(minute)): window for (ip, vtype, minute), window in windows.items()}
+    existing = _existing_rows(list(by_key))
+
+    now = frappe.utils.now()
+    fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus",
+              "timestamp", "user", "ip_address", "endpoint", "violation_type", "request_count", "details"]
+    values = []
+    for key, window in by_key.items():
+        ip, violation_type, timestamp = key
+        if key in existing:
+            frappe.db.sql(
+                f"UPDATE `tab{DOCTYPE}` SET request_count = {WEIGHT_SQL} + %s, modified = %s WHERE name = %s",
+                (window["count"], now, existing[key]),
+            )
+            continue
+        endpoint = window["endpoints"].most_common(1)[0][0] if window["endpoints"] else "-"
+        user = window["user"] if window["user"] and window["user"] != "anonymous" else None
+        values.append((
+            frappe.generate_hash(length=10), now, now, "Administrator", "Administrator", 0,
+            timestamp, user, ip, endpoint[:140], violation_type, window["count"], _details(window),
+        ))
+    if values:
+        frappe.db.bulk_insert(DOCTYPE, fields, values)
+    return len(by_key)
+
+
+def flush_violations():
+    """Scheduler job: move queued violations from the stream into aggregated log rows."""
+    from assistant_crm.ddos_protection import RateLimiterConfig
+
+    redis_conn = RateLimiterConfig.get_redis_connection()
+    if not redis_conn or not frappe.db.table_exists(DOCTYPE):
+        return
+
+    key = stream_key()
+    try:
+        _ensure_group(redis_conn, key)
+        processed = 0
+        for entries in _read(redis_conn, key):
+            # Trimmed entries still pending come back without fields; they are just acked
+            windows = aggregate(fields for _entry_id, fields in entries if fields)
+            write_windows(windows)
+            frappe.db.commit()
+            entry_ids = [entry_id for entry_id, _fields in entries]
+            redis_conn.xack(key, CONSUMER_GROUP, *entry_ids)
+            redis_conn.xdel(key, *entry_ids)
+            processed += len(entries)
+            if processed >= MAX_EVENTS_PER_FLUSH:
+                break
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"DDoS violation flush failed: {str(e)}", "DDoS Violation Log")
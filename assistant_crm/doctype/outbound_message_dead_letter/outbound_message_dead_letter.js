@@ -0,0 +1,18 @@
+frappe.ui.form.on('Outbound Message Dead Letter', {
+    refresh: function (frm) {
+        if (frm.doc.status === 'Dead') {
+            frm.add_custom_button(__('Retry Delivery'), function () {
+                frappe.call({
+                    method: 'assistant_crm.assistant_crm.doctype.outbound_message_dead_letter.outbound_message_dead_letter.requeue',
+                    args: { name: frm.doc.name },
+                    callback: function (r) {
+                        if (r.message && r.message.status === 'queued') {
+                            frappe.show_alert({ message: __('Message queued for delivery'), indicator: 'green' });
+                            frm.reload_doc();
+                        }
+                    }
+                });
+            });
+        }
+    }
+});
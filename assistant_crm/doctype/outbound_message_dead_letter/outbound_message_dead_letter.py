@@ -0,0 +1,21 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class OutboundMessageDeadLetter(Document):
+    """An outbound message that exhausted its delivery retries."""
+
+    pass
+
+
+@frappe.whitelist()
+def requeue(name: str):
+    """Send a dead-lettered message through the outbound dispatcher again."""
+    frappe.only_for(["System Manager", "Assistant CRM Manager"])
+
+    from assistant_crm.services.outbound_dispatcher import requeue_dead_letter
+
+    return requeue_dead_letter(name)
@@ -7,6 +7,15 @@ from frappe.utils import now, get_datetime, time_diff_in_seconds
 import json
 from typing import Dict, Any, Optional
 
+from assistant_crm.services.inbox_realtime import (
+    WATCHED_CONVERSATION_FIELDS,
+    queue_conversation_delta,
+)
+from assistant_crm.services.webhook_dedup import (
+    clear_latest_conversation,
+    set_latest_conversation,
+)
+
 
 class UnifiedInboxConversation(Document):
     """
@@ -28,8 +37,27 @@ class UnifiedInboxConversation(Document):
         if not self.priority:
             self.priority = "Medium"
     
+    def db_set(self, fieldname, value=None, *args, **kwargs):
+        """Persist like Document.db_set and push list-visible changes to open inboxes."""
+        super().db_set(fieldname, value, *args, **kwargs)
+
+        changed = set(fieldname.keys()) if isinstance(fieldname, dict) else {fieldname}
+        if changed & WATCHED_CONVERSATION_FIELDS:
+            queue_conversation_delta(self.name)
+
+    def on_update(self):
+        """Push saved changes (status, assignment, ...) to open inboxes."""
+        queue_conversation_delta(self.name)
+
     def after_insert(self):
         """Actions to perform after inserting the document."""
+        queue_conversation_delta(self.name)
+
+        # Newest conversation for this platform user (read by the webhook handlers)
+        frappe.db.after_commit.add(
+            lambda: set_latest_conversation(self.platform, self.customer_platform_id, self.name)
+        )
+
         # Log conversation creation
         frappe.log_error(
             f"New unified inbox conversation created: {self.conversation_id} on {self.platform}",
@@ -43,6 +71,10 @@ class UnifiedInboxConversation(Document):
         if self.should_process_with_ai_supervising():
             self.trigger_ai_processing()
     
+    def on_trash(self):
+        """Drop the latest-conversation pointer if it targets this conversation."""
+        clear_latest_conversation(self.platform, self.customer_platform_id, self.name)
+
     def before_save(self):
         """Actions to perform before saving the document."""
         self.enforce_customer_data_sync()
@@ -310,13 +342,9 @@ class UnifiedInboxConversation(Document):
             self.db_set("status", "AI Processing")
             self.db_set("ai_handled", 1)
             
-            # Enqueue AI processing job
-            frappe.enqueue(
-                "assistant_crm.api.unified_inbox_api.process_conversation_with_ai",
-                conversation_id=self.name,
-                queue="default",
-                timeout=300
-            )
+            # Queue the latest unprocessed message on the ordered AI pipeline
+            from assistant_crm.api.unified_inbox_api import process_conversation_with_ai
+            process_conversation_with_ai(self.name)
             
         except Exception as e:
             frappe.log_error(f"Failed to trigger AI processing: {str(e)}", "Unified Inbox - AI Processing Error")
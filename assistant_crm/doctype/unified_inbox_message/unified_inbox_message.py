@@ -32,6 +32,10 @@ class UnifiedInboxMessage(Document):
         if not self.message_type:
             self.message_type = "text"
 
+        # Blank ids stay NULL: the unique (platform, platform_message_id) index admits many NULLs but only one ''
+        if not self.platform_message_id:
+            self.platform_message_id = None
+
     def after_insert(self):
         """Actions to perform after inserting the document."""
         # Lightweight diagnostic to confirm after_insert firing
@@ -50,6 +54,11 @@ class UnifiedInboxMessage(Document):
 
         # Update conversation with latest message info
         self.update_conversation_last_message()
+        self.increment_conversation_counters()
+
+        # Push the new message and refreshed conversation row to open inboxes
+        from assistant_crm.services.inbox_realtime import queue_message_delta
+        queue_message_delta(self)
 
         # Process inbound messages
         if self.direction == "Inbound":
@@ -77,6 +86,22 @@ class UnifiedInboxMessage(Document):
 
             self.process_inbound_message()
 
+    def on_trash(self):
+        """Keep the conversation's denormalized counters in step with deletes."""
+        if not self.conversation:
+            return
+
+        is_unread = int(self.direction == "Inbound" and self.read_status == "Unread")
+        frappe.db.sql(
+            """
+            UPDATE `tabUnified Inbox Conversation`
+            SET message_count = GREATEST(IFNULL(message_count, 0) - 1, 0),
+                unread_count = GREATEST(IFNULL(unread_count, 0) - %(unread)s, 0)
+            WHERE name = %(conversation)s
+            """,
+            {"unread": is_unread, "conversation": self.conversation},
+        )
+
     def generate_message_id(self) -> str:
         """Generate a unique message ID."""
         unique_string = (
@@ -144,6 +169,35 @@ class UnifiedInboxMessage(Document):
                 "Unified Inbox - Conversation Update Error",
             )
 
+    def increment_conversation_counters(self) -> None:
+        """Bump the denormalized message/unread counters on the conversation.
+
+        Single atomic UPDATE so concurrent webhook inserts never lose an
+        increment; drift (deletes, manual edits) is repaired by
+        ``reconcile_conversation_counters``.
+        """
+        if not self.conversation:
+            return
+
+        is_unread = int(
+            self.direction == "Inbound" and (self.read_status or "Unread") == "Unread"
+        )
+        try:
+            frappe.db.sql(
+                """
+                UPDATE `tabUnified Inbox Conversation`
+                SET message_count = IFNULL(message_count, 0) + 1,
+                    unread_count = IFNULL(unread_count, 0) + %(unread)s
+                WHERE name = %(conversation)s
+                """,
+                {"unread": is_unread, "conversation": self.conversation},
+            )
+        except Exception as e:
+            frappe.log_error(
+                f"Failed to update conversation counters: {str(e)}",
+                "Unified Inbox - Conversation Update Error",
+            )
+
     def process_inbound_message(self) -> None:
         """Process inbound message for AI or agent handling."""
         try:
@@ -222,84 +276,32 @@ class UnifiedInboxMessage(Document):
             )
 
     def trigger_ai_processing(self) -> None:
-        """Trigger AI processing for this message.
+        """Hand this message to the asynchronous AI pipeline.
 
-        Default: enqueue async job. Optional dev guardrails:
+        The webhook request only persists the message; the LLM round-trip
+        runs on the AI worker pool via a per-conversation ordered queue
+        (see ``assistant_crm.services.ai_pipeline``). Optional dev guardrails:
 
         - ai_force_sync_processing: always process synchronously
           (single-process, deterministic)
-        - ai_sync_fallback_when_no_workers: if no workers online (or
-          developer_mode), process synchronously
-        - ai_queue_per_conversation: shard queues by conversation to keep
-          ordering/affinity
+        - ai_sync_fallback_when_no_workers: if no RQ workers are online,
+          process synchronously instead of leaving the message queued
         """
 
         try:
-            # Fallback file log prior to enqueue attempt
-            try:
-                log = frappe.logger("assistant_crm.unified_inbox_ai")
-                log.info(f"[AI-DIAG] enqueue_attempt message_id={self.name} conv={self.conversation} platform={self.platform}")
-            except Exception:
-                pass
-
             conf = getattr(frappe, "conf", {}) or {}
 
-            # 1) Hard override: force sync processing if configured
+            # 1) Dev guardrails: force sync, or sync when no workers are online
+            sync_reason = None
             if conf.get("ai_force_sync_processing"):
-                try:
-                    log = frappe.logger("assistant_crm.unified_inbox_ai")
-                    log.info(f"[AI-DIAG] force_sync_processing message_id={self.name} conv={self.conversation}")
-                except Exception:
-                    pass
-
-                try:
-                    from assistant_crm.api.unified_inbox_api import (
-                        process_message_with_ai,
-                    )
-
-                    process_message_with_ai(self.name)
-                    try:
-                        frappe.logger("assistant_crm.unified_inbox_ai").info(
-                            f"[AI] sync_processed (forced) message_id={self.name} conv={self.conversation}"
-                        )
-                    except Exception:
-                        pass
-                except Exception as proc_err:
-                    frappe.log_error(
-                        f"Forced sync AI processing failed for {self.name}: {str(proc_err)}",
-                        "Unified Inbox - AI Forced Sync Error",
-                    )
-                return
-
-            # 2) Determine if sync fallback is desired due to no workers online
-            want_sync_fallback = True
-            try:
-                if False:
-                    # Check if any RQ workers are online
-                    try:
-                        from frappe.utils.background_jobs import get_redis_conn
-                        from rq import Worker
-
-                        conn = get_redis_conn()
-                        workers = []
-                        try:
-                            workers = Worker.all(connection=conn)
-                        except TypeError:
-                            # Older rq versions use positional arg
-                            workers = Worker.all(conn)
-                        want_sync_fallback = not bool(workers)
-                    except Exception:
-                        # If we can't determine, stay async-only
-                        want_sync_fallback = False
-            except Exception:
-                want_sync_fallback = False
+                sync_reason = "forced"
+            elif conf.get("ai_sync_fallback_when_no_workers") and not self._rq_workers_online():
+                sync_reason = "no_workers_online"
 
-            if want_sync_fallback:
-                # DEV GUARDRAIL: No workers online and fallback enabled 
-                # process synchronously
+            if sync_reason:
                 try:
                     log = frappe.logger("assistant_crm.unified_inbox_ai")
-                    log.info(f"[AI-DIAG] no_workers_online fallback_sync message_id={self.name} conv={self.conversation}")
+                    log.info(f"[AI-DIAG] sync_processing reason={sync_reason} message_id={self.name} conv={self.conversation}")
                 except Exception:
                     pass
 
@@ -311,49 +313,21 @@ class UnifiedInboxMessage(Document):
                     process_message_with_ai(self.name)
                     try:
                         frappe.logger("assistant_crm.unified_inbox_ai").info(
-                            f"[AI] sync_processed message_id={self.name} conv={self.conversation}"
+                            f"[AI] sync_processed ({sync_reason}) message_id={self.name} conv={self.conversation}"
                         )
                     except Exception:
                         pass
                 except Exception as proc_err:
                     frappe.log_error(
                         f"Sync AI processing failed for {self.name}: {str(proc_err)}",
-                        "Unified Inbox - AI Sync Fallback Error",
+                        "Unified Inbox - AI Sync Error",
                     )
                 return
 
-            # 3) Async path with optional per-conversation queue sharding
-            queue_name = "default"
-            try:
-                if conf.get("ai_queue_per_conversation"):
-                    shards = int(conf.get("ai_conversation_queue_shards") or 4)
-                    if shards < 1:
-                        shards = 1
-                    # Stable shard by conversation name
-                    shard_idx = abs(hash(self.conversation)) % shards
-                    queue_name = f"ai_conv_{shard_idx}"
-            except Exception:
-                queue_name = "default"
-
-            frappe.enqueue(
-                "assistant_crm.api.unified_inbox_api.process_message_with_ai",
-                message_id=self.name,
-                queue=queue_name,
-                timeout=300,
-            )
-            try:
-                frappe.logger("assistant_crm.unified_inbox_ai").info(
-                    f"[AI] enqueued message_id={self.name} conv={self.conversation} queue={queue_name} platform={self.platform}"
-                )
-            except Exception:
-                pass
+            # 2) Async path: per-conversation ordered queue drained by the AI worker pool
+            from assistant_crm.services.ai_pipeline import enqueue_message
 
-            # Fallback file log after enqueue
-            try:
-                log = frappe.logger("assistant_crm.unified_inbox_ai")
-                log.info(f"[AI-DIAG] enqueued message_id={self.name} conv={self.conversation} queue={queue_name} platform={self.platform}")
-            except Exception:
-                pass
+            enqueue_message(self.name, self.conversation, self.platform)
 
         except Exception as e:
             frappe.log_error(
@@ -361,6 +335,24 @@ class UnifiedInboxMessage(Document):
                 "Unified Inbox - AI Processing Error",
             )
 
+    @staticmethod
+    def _rq_workers_online() -> bool:
+        """Return True if at least one RQ worker is registered."""
+        try:
+            from frappe.utils.background_jobs import get_redis_conn
+            from rq import Worker
+
+            conn = get_redis_conn()
+            try:
+                workers = Worker.all(connection=conn)
+            except TypeError:
+                # Older rq versions use positional arg
+                workers = Worker.all(conn)
+            return bool(workers)
+        except Exception:
+            # If we can't determine, stay async-only
+            return True
+
     def notify_assigned_agent(self) -> None:
         """Notify assigned agent of new message."""
         try:
@@ -491,9 +483,21 @@ class UnifiedInboxMessage(Document):
     def mark_as_read(self, timestamp: Optional[str] = None) -> None:
         """Mark message as read."""
 
+        was_unread = self.direction == "Inbound" and self.read_status == "Unread"
+
         self.db_set("read_status", "Read")
         self.db_set("read_timestamp", timestamp or now())
 
+        if was_unread and self.conversation:
+            frappe.db.sql(
+                """
+                UPDATE `tabUnified Inbox Conversation`
+                SET unread_count = GREATEST(IFNULL(unread_count, 0) - 1, 0)
+                WHERE name = %s
+                """,
+                self.conversation,
+            )
+
     def add_platform_metadata(self, metadata: Dict[str, Any]) -> None:
         """Add platform-specific metadata."""
 
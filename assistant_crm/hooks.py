@@ -182,6 +182,30 @@ doc_events = {
     },
     "Notification Log": {
         "after_insert": "assistant_crm.notification_hooks.handle_notification_log_after_insert"
+    },
+    # Cached platform integrations hold credentials; rebuild them when settings change
+    "Social Media Settings": {
+        "on_update": "assistant_crm.services.integration_registry.invalidate"
+    },
+    # Intent snapshots are shared per process; keywords, examples and follow-ups
+    # are child tables, so saving the parent covers them too
+    "Intent Definition": {
+        "on_update": "assistant_crm.services.intent_recognition_service.invalidate_intent_cache",
+        "on_trash": "assistant_crm.services.intent_recognition_service.invalidate_intent_cache",
+        "after_rename": "assistant_crm.services.intent_recognition_service.invalidate_intent_cache"
+    },
+    # Processes re-index changed articles on their next knowledge search
+    "Knowledge Base Article": {
+        "on_update": "assistant_crm.services.knowledge_index.invalidate",
+        "on_trash": "assistant_crm.services.knowledge_index.invalidate",
+        "after_rename": "assistant_crm.services.knowledge_index.invalidate"
+    },
+    # Shared AI service instances are rebuilt in every process after their settings change
+    "Enhanced AI Settings": {
+        "on_update": "assistant_crm.services.service_container.invalidate"
+    },
+    "Assistant CRM Settings": {
+        "on_update": "assistant_crm.services.service_container.invalidate"
     }
 }
 
@@ -210,6 +234,13 @@ doc_events = {
 # Using short wrapper paths from assistant_crm.tasks to avoid exceeding Scheduled Job Type method column length
 scheduler_events = {
     "cron": {
+        # One leader-elected poller job per platform (Telegram long-polls continuously)
+        "* * * * *": [
+            "assistant_crm.tasks.run_platform_pollers",
+            "assistant_crm.tasks.flush_issue_history",
+            "assistant_crm.tasks.flush_ddos_violations",
+            "assistant_crm.tasks.release_outbound_retries"
+        ],
         "*/5 * * * *": [
             "assistant_crm.tasks.poll_youtube",
             "assistant_crm.api.ussd_integration.sync_ussd_feedback",
@@ -221,7 +252,8 @@ scheduler_events = {
             "assistant_crm.tasks.sweep_sla_reminders"
         ],
         "0 * * * *": [
-            "assistant_crm.tasks.sweep_escalations"
+            "assistant_crm.tasks.sweep_escalations",
+            "assistant_crm.tasks.reconcile_inbox_counters"
         ],
         # USSD session cleanup every 6 hours
         "0 */6 * * *": [
@@ -348,7 +380,10 @@ scheduler_events = {
 # Request Events
 # ----------------
 # DDoS Protection: Rate limiting and bot detection middleware
-before_request = ["assistant_crm.ddos_protection.before_request"]
+before_request = [
+    "assistant_crm.ddos_protection.before_request",
+    "assistant_crm.services.service_container.warm_up_once",
+]
 # after_request = ["assistant_crm.utils.after_request"]
 
 # Whitelisted Methods (API Endpoints)
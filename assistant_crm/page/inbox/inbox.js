@@ -183,6 +183,8 @@ class InboxManager {
         // Search state
         this.searchQuery = '';
         this._searchTimer = null;
+        // Unsent composed message and its idempotency key, reused on every retry
+        this._pendingSend = null;
 
         this.setup_events();
         this.initialize();
@@ -207,24 +209,110 @@ class InboxManager {
         // Load conversations from API
         this.loadConversations();
 
-        // Set up periodic refresh with live message fetching
-        setInterval(() => {
-            Promise.all([
-                this.fetchTelegramMessages(),
-                this.fetchTawkToMessages(),
-                this.fetchInstagramMessages()
-            ]).then(() => {
-                this.loadConversations();
+        // Live updates are pushed by the server (unified_inbox_delta); platform
+        // pollers run as scheduled jobs, so the browser never polls.
+        this.subscribeToInboxUpdates();
+    }
+
+    subscribeToInboxUpdates() {
+        this.lastSyncTime = null;
+        try {
+            frappe.realtime.doctype_subscribe('Unified Inbox Conversation');
+            frappe.realtime.on('unified_inbox_delta', (delta) => this.applyInboxDelta(delta));
+            frappe.realtime.on('assistant_crm_inbox_ai_draft', (draft) => this.applyAIDraftStream(draft));
+            // After a socket reconnect, fetch whatever was published while offline
+            frappe.realtime.on('connect', () => this.catchUpInbox());
+        } catch (e) {
+            console.warn('Realtime subscription failed:', e);
+        }
+    }
+
+    applyAIDraftStream(draft) {
+        // Live preview of the AI reply while it is generated; the saved
+        // outbound message replaces it through unified_inbox_delta.
+        if (!draft || draft.conversation !== this.currentConversation) return;
+        const container = document.getElementById('messages-container');
+        if (!container) return;
+
+        let preview = document.getElementById('ai-draft-preview');
+        if (draft.done) {
+            if (preview) preview.remove();
+            return;
+        }
+        if (!preview || preview.dataset.streamId !== draft.stream_id) {
+            if (preview) preview.remove();
+            preview = document.createElement('div');
+            preview.id = 'ai-draft-preview';
+            preview.className = 'message outbound ai-draft text-muted';
+            preview.dataset.streamId = draft.stream_id;
+            container.appendChild(preview);
+        }
+        preview.textContent = (preview.textContent || '') + (draft.delta || '');
+        container.scrollTop = container.scrollHeight;
+    }
+
+    applyInboxDelta(delta) {
+        if (!delta) return;
+        if (delta.server_time) {
+            this.lastSyncTime = delta.server_time;
+        }
+
+        (delta.messages || []).forEach((msg) => {
+            if (msg.conversation !== this.currentConversation) return;
+            if ((this.messages || []).some(m => m.name === msg.name)) return;
+            this.messages.push(msg);
+            this.renderMessages();
+        });
+
+        const deliveries = (delta.deliveries || []).filter(d => d.conversation === this.currentConversation);
+        if (deliveries.length) {
+            deliveries.forEach((d) => {
+                const msg = (this.messages || []).find(m => m.name === d.name);
+                if (msg) msg.delivery_status = d.delivery_status;
+                if (d.delivery_status === 'Failed') {
+                    frappe.show_alert({ message: __('A message could not be delivered. It has been moved to Outbound Message Dead Letter.'), indicator: 'red' });
+                }
             });
-        }, 30000);
-
-        // Initial message fetch from all platforms
-        Promise.all([
-            this.fetchTelegramMessages(),
-            this.fetchTawkToMessages(),
-            this.fetchInstagramMessages()
-        ]).then(() => {
-            console.log('DEBUG: Initial message fetch completed for all platforms');
+            this.renderMessages();
+        }
+
+        const conversations = delta.conversations || [];
+        if (!conversations.length) return;
+
+        conversations.forEach((row) => {
+            const existing = this.conversations.find(c => c.name === row.name);
+            if (existing) {
+                Object.assign(existing, row);
+            } else if (!this.searchQuery) {
+                // New conversation: only surface it in the unfiltered list
+                this.conversations.unshift(row);
+            }
+        });
+        this.renderConversations();
+        if (this.currentConversation && conversations.some(c => c.name === this.currentConversation)) {
+            this.updateConversationHeader(this.currentConversation);
+        }
+    }
+
+    catchUpInbox() {
+        if (!this.lastSyncTime) {
+            // Initial connect: loadConversations() is already fetching the list
+            return;
+        }
+        frappe.call({
+            method: 'assistant_crm.api.unified_inbox_api.get_inbox_changes',
+            args: { since: this.lastSyncTime },
+            callback: (response) => {
+                const result = response.message || {};
+                if (result.status !== 'success' || result.truncated) {
+                    this.loadConversations();
+                } else {
+                    this.applyInboxDelta({ conversations: result.conversations, server_time: result.server_time });
+                }
+                if (this.currentConversation) {
+                    this.loadMessages(this.currentConversation);
+                }
+            }
         });
     }
 
@@ -343,6 +431,9 @@ class InboxManager {
                     if (response.message && response.message.status === 'success') {
                         const data = response.message.data || response.message.conversations || [];
                         this.conversations = data;
+                        if (response.message.server_time) {
+                            this.lastSyncTime = response.message.server_time;
+                        }
                         console.log('Loaded conversations from API:', this.conversations.length);
                     } else {
                         console.log('No API data; keeping current conversations');
@@ -630,21 +721,14 @@ class InboxManager {
     }
 
     refreshInbox() {
-        console.log('DEBUG: Refreshing inbox with live messages...');
-
-        // Fetch live messages from all platforms
-        Promise.all([
-            this.fetchTelegramMessages(),
-            this.fetchTawkToMessages(),
-            this.fetchInstagramMessages()
-        ]).then(() => {
-            // Then load all conversations (including new ones)
-            this.loadConversations();
-            if (this.currentConversation) {
-                this.loadMessages(this.currentConversation);
-            }
-            frappe.show_alert({ message: 'Inbox refreshed', indicator: 'blue' });
-        });
+        console.log('DEBUG: Refreshing inbox...');
+
+        // Platform messages arrive via webhooks and scheduled pollers; just reload the views
+        this.loadConversations();
+        if (this.currentConversation) {
+            this.loadMessages(this.currentConversation);
+        }
+        frappe.show_alert({ message: 'Inbox refreshed', indicator: 'blue' });
     }
 
 
@@ -703,132 +787,6 @@ class InboxManager {
         dialog.show();
     }
 
-    fetchTelegramMessages() {
-        console.log('DEBUG: Fetching live Telegram messages...');
-
-        return new Promise((resolve) => {
-            frappe.call({
-                method: 'assistant_crm.api.unified_inbox_api.fetch_telegram_messages',
-                callback: (response) => {
-                    try {
-                        if (response.message && response.message.status === 'success') {
-                            console.log('DEBUG: Telegram fetch result:', response.message);
-
-                            if (response.message.new_conversations > 0) {
-                                frappe.show_alert({
-                                    message: `${response.message.new_conversations} new Telegram conversation(s) received`,
-                                    indicator: 'green'
-                                });
-                            }
-
-                            if (response.message.processed_messages > 0) {
-                                console.log(`DEBUG: Processed ${response.message.processed_messages} new Telegram messages`);
-                            }
-                        } else if (response.message && response.message.status === 'error') {
-                            console.error('DEBUG: Telegram fetch failed:', response.message.message);
-                            // Don't show error alerts for Telegram fetch failures to avoid spam
-                        } else {
-                            console.error('DEBUG: Unexpected Telegram response:', response.message);
-                        }
-                    } catch (e) {
-                        console.error('DEBUG: Error processing Telegram response:', e);
-                    }
-                    resolve();
-                },
-                error: (error) => {
-                    console.error('DEBUG: Telegram fetch network error:', error);
-                    // Don't show error alerts for network failures to avoid spam
-                    resolve();
-                }
-            });
-        });
-    }
-
-    fetchTawkToMessages() {
-        console.log('DEBUG: Fetching live Tawk.to messages...');
-
-        return new Promise((resolve) => {
-            frappe.call({
-                method: 'assistant_crm.api.unified_inbox_api.fetch_tawkto_messages',
-                callback: (response) => {
-                    try {
-                        if (response.message && response.message.status === 'success') {
-                            console.log('DEBUG: Tawk.to fetch result:', response.message);
-
-                            if (response.message.new_conversations > 0) {
-                                frappe.show_alert({
-                                    message: `${response.message.new_conversations} new Tawk.to conversation(s) received`,
-                                    indicator: 'green'
-                                });
-                            }
-
-                            if (response.message.processed_messages > 0) {
-                                console.log(`DEBUG: Processed ${response.message.processed_messages} new Tawk.to messages`);
-                            }
-                        } else if (response.message && response.message.status === 'info') {
-                            console.log('DEBUG: Tawk.to info:', response.message.message);
-                            // Don't show alerts for info messages (webhook-based integration)
-                        } else if (response.message && response.message.status === 'error') {
-                            console.error('DEBUG: Tawk.to fetch failed:', response.message.message);
-                            // Don't show error alerts for Tawk.to fetch failures to avoid spam
-                        } else {
-                            console.error('DEBUG: Unexpected Tawk.to response:', response.message);
-                        }
-                    } catch (e) {
-                        console.error('DEBUG: Error processing Tawk.to response:', e);
-                    }
-                    resolve();
-                },
-                error: (error) => {
-                    console.error('DEBUG: Tawk.to fetch network error:', error);
-                    // Don't show error alerts for network failures to avoid spam
-                    resolve();
-                }
-            });
-        });
-    }
-
-    fetchInstagramMessages() {
-        console.log('DEBUG: Fetching live Instagram messages...');
-
-        return new Promise((resolve) => {
-            frappe.call({
-                method: 'assistant_crm.api.unified_inbox_api.fetch_instagram_messages',
-                callback: (response) => {
-                    try {
-                        if (response.message && response.message.status === 'success') {
-                            console.log('DEBUG: Instagram fetch result:', response.message);
-
-                            if (response.message.new_conversations > 0) {
-                                frappe.show_alert({
-                                    message: `${response.message.new_conversations} new Instagram conversation(s) received`,
-                                    indicator: 'green'
-                                });
-                            }
-
-                            if (response.message.processed_messages > 0) {
-                                console.log(`DEBUG: Processed ${response.message.processed_messages} new Instagram messages`);
-                            }
-                        } else if (response.message && response.message.status === 'error') {
-                            console.error('DEBUG: Instagram fetch failed:', response.message.message);
-                            // Don't show error alerts for Instagram fetch failures to avoid spam
-                        } else {
-                            console.error('DEBUG: Unexpected Instagram response:', response.message);
-                        }
-                    } catch (e) {
-                        console.error('DEBUG: Error processing Instagram response:', e);
-                    }
-                    resolve();
-                },
-                error: (error) => {
-                    console.error('DEBUG: Instagram fetch network error:', error);
-                    // Don't show error alerts for network failures to avoid spam
-                    resolve();
-                }
-            });
-        });
-    }
-
     // Load messages for a conversation
     loadMessages(conversationName) {
         if (!conversationName) return;
@@ -989,7 +947,7 @@ class InboxManager {
                     </div>
                     <small class="text-muted d-block mt-1">
                         <i class="fa fa-user me-1"></i>
-                        ${msg.sender_name || 'Unknown'} • ${this.formatTime(msg.timestamp)}
+                        ${msg.sender_name || 'Unknown'} • ${this.formatTime(msg.timestamp)}${(msg.direction === 'Outbound' && ['Queued', 'Retrying', 'Failed'].includes(msg.delivery_status)) ? ` • ${msg.delivery_status}` : ''}
                     </small>
                 </div>
             `;
@@ -1030,6 +988,17 @@ class InboxManager {
         sendButton.disabled = true;
         input.disabled = true;
 
+        // One idempotency key per composed message, kept until the send succeeds
+        const pending = this._pendingSend;
+        if (!pending || pending.conversation !== this.currentConversation || pending.message !== message) {
+            this._pendingSend = {
+                conversation: this.currentConversation,
+                message: message,
+                key: frappe.utils.get_random(20)
+            };
+        }
+        const idempotencyKey = this._pendingSend.key;
+
         // Send via API
         const convo = this.conversations.find(c => c.name === this.currentConversation);
         const twitter_reply_mode = (convo && convo.platform === 'Twitter') ? ($('#twitter-reply-mode').val() || 'dm') : null;
@@ -1039,10 +1008,14 @@ class InboxManager {
                 conversation_name: this.currentConversation,
                 message: message,
                 send_via_platform: true,
-                twitter_reply_mode: twitter_reply_mode
+                twitter_reply_mode: twitter_reply_mode,
+                // Lets the server drop a double-submitted or retried send
+                idempotency_key: idempotencyKey
             },
             callback: (response) => {
                 if (response.message && response.message.status === 'success') {
+                    this._pendingSend = null;
+
                     // Add message to Issue as comment
                     this.addMessageToIssue(
                         this.currentConversation,
@@ -1056,7 +1029,11 @@ class InboxManager {
                     this.loadMessages(this.currentConversation);
                     this.loadConversations(); // Refresh conversation list
 
-                    frappe.show_alert({ message: 'Message sent successfully!', indicator: 'green' });
+                    const queued = response.message.data?.platform_send?.status === 'queued';
+                    frappe.show_alert({
+                        message: queued ? 'Message queued for delivery' : 'Message sent successfully!',
+                        indicator: queued ? 'blue' : 'green'
+                    });
                 } else {
                     // Surface platform error details if present
                     const ps = response.message?.data?.platform_send;
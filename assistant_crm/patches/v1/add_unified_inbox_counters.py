@@ -0,0 +1,31 @@
+"""
+Patch: add_unified_inbox_counters
+
+Backfills the denormalized message_count / unread_count columns on
+Unified Inbox Conversation and adds the indexes that keep the inbox list
+and the per-conversation unread recount cheap.
+"""
+
+import frappe
+
+
+def execute():
+    if not frappe.db.table_exists("Unified Inbox Conversation") or not frappe.db.table_exists(
+        "Unified Inbox Message"
+    ):
+        return
+
+    frappe.db.add_index(
+        "Unified Inbox Message",
+        ["conversation", "direction", "read_status"],
+        index_name="conversation_direction_read_status_index",
+    )
+    frappe.db.add_index(
+        "Unified Inbox Conversation",
+        ["last_message_time"],
+        index_name="last_message_time_index",
+    )
+
+    from assistant_crm.api.unified_inbox_api import reconcile_conversation_counters
+
+    reconcile_conversation_counters()
@@ -0,0 +1,25 @@
+"""
+Patch: add_unified_inbox_keyset_indexes
+
+Composite indexes backing cursor (keyset) pagination in unified_inbox_api:
+- Unified Inbox Message (conversation, timestamp, name) for message history
+- Unified Inbox Conversation (last_message_time, name) for the inbox list
+"""
+
+import frappe
+
+
+def execute():
+    if frappe.db.table_exists("Unified Inbox Message"):
+        frappe.db.add_index(
+            "Unified Inbox Message",
+            ["conversation", "timestamp", "name"],
+            index_name="conversation_timestamp_name_index",
+        )
+
+    if frappe.db.table_exists("Unified Inbox Conversation"):
+        frappe.db.add_index(
+            "Unified Inbox Conversation",
+            ["last_message_time", "name"],
+            index_name="last_message_time_name_index",
+        )
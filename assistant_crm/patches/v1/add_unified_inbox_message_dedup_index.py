@@ -0,0 +1,57 @@
+"""
+Patch: add_unified_inbox_message_dedup_index
+
+Unique index on Unified Inbox Message (platform, platform_message_id), the
+backstop behind the Redis claim in services.webhook_dedup. Blank ids are
+first stored as NULL, which the index does not compare. Sites that already
+hold duplicate rows get a plain index instead (and an Error Log entry) so
+the migration never fails; dedupe and re-run to enforce it.
+"""
+
+import frappe
+
+INDEX_NAME = "platform_message_id_unique"
+
+
+def execute():
+    if not frappe.db.table_exists("Unified Inbox Message"):
+        return
+
+    frappe.db.sql(
+        """
+        UPDATE `tabUnified Inbox Message`
+        SET platform_message_id = NULL
+        WHERE platform_message_id = ''
+        """
+    )
+
+    duplicates = frappe.db.sql(
+        """
+        SELECT platform, platform_message_id, COUNT(*) AS copies
+        FROM `tabUnified Inbox Message`
+        WHERE IFNULL(platform_message_id, '') != ''
+        GROUP BY platform, platform_message_id
+        HAVING COUNT(*) > 1
+        LIMIT 20
+        """,
+        as_dict=True,
+    )
+
+    if duplicates:
+        frappe.db.add_index(
+            "Unified Inbox Message",
+            ["platform", "platform_message_id"],
+            index_name="platform_message_id_index",
+        )
+        frappe.log_error(
+            "Unified Inbox Message has duplicate (platform, platform_message_id) rows; "
+            f"created a non-unique index instead. Sample: {duplicates}",
+            "Unified Inbox Dedup Index",
+        )
+        return
+
+    frappe.db.add_unique(
+        "Unified Inbox Message",
+        ["platform", "platform_message_id"],
+        constraint_name=INDEX_NAME,
+    )
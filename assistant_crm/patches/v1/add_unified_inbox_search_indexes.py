@@ -0,0 +1,41 @@
+"""
+Patch: add_unified_inbox_search_indexes
+
+Creates the FULLTEXT and prefix (B-tree) indexes used by
+assistant_crm.services.inbox_search so inbox search no longer scans the
+message table.
+"""
+
+import frappe
+
+
+def execute():
+    from assistant_crm.services import inbox_search
+
+    if not frappe.db.table_exists("Unified Inbox Conversation") or not frappe.db.table_exists(
+        "Unified Inbox Message"
+    ):
+        return
+
+    _add_fulltext_index(
+        "tabUnified Inbox Conversation",
+        inbox_search.CONVERSATION_FT_INDEX,
+        inbox_search.CONVERSATION_FT_COLUMNS,
+    )
+    _add_fulltext_index(
+        "tabUnified Inbox Message",
+        inbox_search.MESSAGE_FT_INDEX,
+        inbox_search.MESSAGE_FT_COLUMNS,
+    )
+
+    for column in ("customer_phone", "customer_nrc", "assigned_agent"):
+        frappe.db.add_index("Unified Inbox Conversation", [column], index_name=f"{column}_index")
+
+    inbox_search.clear_index_cache()
+
+
+def _add_fulltext_index(table, index_name, columns):
+    if frappe.db.sql(f"SHOW INDEX FROM `{table}` WHERE Key_name = %s", index_name):
+        return
+    column_sql = ", ".join(f"`{c}`" for c in columns)
+    frappe.db.sql_ddl(f"ALTER TABLE `{table}` ADD FULLTEXT INDEX `{index_name}` ({column_sql})")
@@ -0,0 +1,50 @@
+"""
+Patch: rekey_telegram_platform_message_ids
+
+Telegram message ids are only unique within a chat, so inbound Telegram
+messages are now stored with platform_message_id "chat_id:message_id".
+Rows stored with the old plain id are rewritten to the new format, so a
+redelivered update matches its existing row instead of being inserted
+again. The chat id comes from the stored Telegram message
+(platform_metadata), falling back to the sender id, which equals the chat
+id in private chats. Runs before the dedup index is added.
+"""
+
+import json
+
+import frappe
+
+
+def execute():
+    if not frappe.db.table_exists("Unified Inbox Message"):
+        return
+
+    rows = frappe.db.sql(
+        """
+        SELECT name, message_id, platform_message_id, platform_metadata, sender_platform_id
+        FROM `tabUnified Inbox Message`
+        WHERE platform = 'Telegram'
+          AND direction = 'Inbound'
+          AND IFNULL(platform_message_id, '') != ''
+          AND platform_message_id NOT LIKE %(rekeyed)s
+        """,
+        {"rekeyed": "%:%"},
+        as_dict=True,
+    )
+
+    for row in rows:
+        try:
+            chat = json.loads(row.platform_metadata or "{}").get("chat") or {}
+        except (ValueError, AttributeError):
+            chat = {}
+        chat_id = chat.get("id") or row.sender_platform_id
+        if not chat_id:
+            continue
+
+        new_id = f"{chat_id}:{row.platform_message_id}"
+        values = {"platform_message_id": new_id}
+        if row.message_id == row.platform_message_id:
+            values["message_id"] = new_id
+        frappe.db.set_value("Unified Inbox Message", row.name, values, update_modified=False)
+
+    frappe.db.commit()
@@ -263,6 +263,11 @@ class WcfcbChatBubble {
                 }
             });
 
+            // Streamed AI reply tokens (see services/llm_streaming.py)
+            frappe.realtime.on('assistant_crm_chat_stream', (data) => {
+                this.handleReplyStream(data);
+            });
+
             // Listen for conversation updates
             frappe.realtime.on('conversation_update', (data) => {
                 if (data.conversation_id === this.conversationId) {
@@ -331,14 +336,18 @@ class WcfcbChatBubble {
         
         // Show typing indicator
         this.showTyping();
+        const streamId = this.startReplyStream();
         
         try {
-            // Send to API
-            const response = await this.callChatAPI(message);
+            // Send to API (tokens may stream into a bubble before this resolves)
+            const response = await this.callChatAPI(message, streamId);
             
             if (response.success) {
-                this.addMessage(response.response, 'assistant');
+                if (!this.finishReplyStream(response.response)) {
+                    this.addMessage(response.response, 'assistant');
+                }
             } else {
+                this.discardReplyStream();
                 // Handle configuration errors specially
                 if (response.config_error) {
                     this.addMessage(response.error, 'assistant', true);
@@ -349,13 +358,78 @@ class WcfcbChatBubble {
             }
         } catch (error) {
             console.error('Chat error:', error);
+            this.discardReplyStream();
             this.addMessage('Sorry, I\'m having trouble connecting. Please try again later.', 'assistant', true);
         } finally {
+            this.endReplyStream();
             this.hideTyping();
         }
     }
+
+    startReplyStream() {
+        // Subscribe to a random realtime room the server streams this reply into
+        if (!(window.frappe && frappe.realtime && frappe.realtime.socket && frappe.realtime.task_subscribe)) {
+            return null;
+        }
+        const bytes = window.crypto.getRandomValues(new Uint8Array(12));
+        const streamId = Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('');
+        this.replyStream = { id: streamId, text: '', bubble: null, messageDiv: null };
+        frappe.realtime.task_subscribe(streamId);
+        return streamId;
+    }
+
+    handleReplyStream(data) {
+        const stream = this.replyStream;
+        if (!stream || !data || data.stream_id !== stream.id || !data.delta) return;
+
+        if (!stream.bubble) {
+            this.typingIndicator.classList.remove('show');
+            stream.messageDiv = document.createElement('div');
+            stream.messageDiv.className = 'exn-chat-message assistant';
+            stream.bubble = document.createElement('div');
+            stream.bubble.className = 'exn-message-bubble assistant';
+            stream.messageDiv.appendChild(stream.bubble);
+
+            const welcomeMsg = this.chatMessages.querySelector('.exn-welcome-message');
+            if (welcomeMsg) {
+                welcomeMsg.remove();
+            }
+            this.chatMessages.appendChild(stream.messageDiv);
+        }
+
+        stream.text += data.delta;
+        stream.bubble.textContent = stream.text;
+        this.scrollToBottom();
+    }
+
+    finishReplyStream(finalText) {
+        // Replace the streamed bubble with the final (formatted) reply
+        const stream = this.replyStream;
+        if (!stream || !stream.messageDiv) return false;
+
+        stream.messageDiv.remove();
+        stream.messageDiv = null;
+        this.addMessage(finalText, 'assistant');
+        return true;
+    }
+
+    discardReplyStream() {
+        const stream = this.replyStream;
+        if (stream && stream.messageDiv) {
+            stream.messageDiv.remove();
+            stream.messageDiv = null;
+        }
+    }
+
+    endReplyStream() {
+        const stream = this.replyStream;
+        this.replyStream = null;
+        if (stream && frappe.realtime.task_unsubscribe) {
+            frappe.realtime.task_unsubscribe(stream.id);
+        }
+    }
     
-    async callChatAPI(message) {
+    async callChatAPI(message, streamId = null) {
         // PHASE 2.1: Frontend API Migration with A/B Testing and Fallback
         const useOptimizedAPI = this.shouldUseOptimizedAPI();
 
@@ -363,7 +437,7 @@ class WcfcbChatBubble {
 
         if (useOptimizedAPI) {
             // Try optimized API first
-            const optimizedResult = await this.callOptimizedChatAPI(message);
+            const optimizedResult = await this.callOptimizedChatAPI(message, streamId);
 
             if (optimizedResult.success) {
                 // Verbose success logging removed
@@ -427,7 +501,7 @@ class WcfcbChatBubble {
         return hash;
     }
 
-    async callOptimizedChatAPI(message) {
+    async callOptimizedChatAPI(message, streamId = null) {
         const startTime = Date.now();
 
         try {
@@ -438,6 +512,7 @@ class WcfcbChatBubble {
                 args: {
                     message: message,
                     session_id: this.sessionId,
+                    stream_id: streamId,
                     user_context: {
                         user_name: frappe.session.user_fullname || frappe.session.user,
                         interaction_frequency: 'returning',
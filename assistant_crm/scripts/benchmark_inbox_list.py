@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+WCFCB Assistant CRM - Unified Inbox list benchmark
+
+Compares the legacy N+1 conversation list (two frappe.db.count calls per
+conversation) with the denormalized-counter list served by
+get_unified_inbox_conversations, for 100 / 1k / 10k-conversation inboxes.
+
+Synthetic conversations and messages are bulk-inserted and rolled back at
+the end, so the site's data is left untouched.
+
+Usage:
+    bench --site <site> execute assistant_crm.scripts.benchmark_inbox_list.run
+    bench --site <site> execute assistant_crm.scripts.benchmark_inbox_list.run \
+        --kwargs "{'sizes': [100, 1000], 'iterations': 30}"
+"""
+
+import statistics
+import time
+from typing import Any, Dict, List
+
+import frappe
+from frappe.utils import add_to_date, now_datetime
+
+PAGE_SIZE = 100
+MESSAGES_PER_CONVERSATION = 10
+BENCH_PREFIX = "BENCH-UIC-"
+
+
+def _seed(start: int, end: int) -> None:
+    base = now_datetime()
+    conv_fields = [
+        "name", "conversation_id", "platform", "customer_name", "status",
+        "last_message_time", "message_count", "unread_count",
+        "creation", "modified", "owner", "modified_by", "docstatus",
+    ]
+    msg_fields = [
+        "name", "message_id", "conversation", "platform", "direction", "message_type",
+        "message_content", "timestamp", "read_status",
+        "creation", "modified", "owner", "modified_by", "docstatus",
+    ]
+    conv_rows, msg_rows = [], []
+    for i in range(start, end):
+        conv_name = f"{BENCH_PREFIX}{i:06d}"
+        ts = add_to_date(base, seconds=-i)
+        unread = 0
+        for j in range(MESSAGES_PER_CONVERSATION):
+            inbound = j % 2 == 0
+            is_unread = inbound and j >= MESSAGES_PER_CONVERSATION - 4
+            unread += int(is_unread)
+            msg_rows.append((
+                f"{conv_name}-M{j:02d}", f"{conv_name}-M{j:02d}", conv_name, "WhatsApp",
+                "Inbound" if inbound else "Outbound", "text", f"benchmark message {j}", ts,
+                "Unread" if is_unread else "Read", ts, ts, "Administrator", "Administrator", 0,
+            ))
+        conv_rows.append((
+            conv_name, conv_name, "WhatsApp", f"Benchmark Customer {i}", "New", ts,
+            MESSAGES_PER_CONVERSATION, unread, ts, ts, "Administrator", "Administrator", 0,
+        ))
+
+    frappe.db.bulk_insert("Unified Inbox Conversation", conv_fields, conv_rows, chunk_size=5000)
+    frappe.db.bulk_insert("Unified Inbox Message", msg_fields, msg_rows, chunk_size=5000)
+
+
+def _legacy_list() -> List[Dict[str, Any]]:
+    """The pre-counter implementation: one list query plus 2 counts per row."""
+    conversations = frappe.get_all(
+        "Unified Inbox Conversation",
+        filters={"docstatus": ["!=", 2]},
+        fields=["name", "conversation_id", "platform", "customer_name", "status", "last_message_time"],
+        order_by="last_message_time desc",
+        limit=PAGE_SIZE,
+    )
+    for conversation in conversations:
+        conversation["message_count"] = frappe.db.count(
+            "Unified Inbox Message", filters={"conversation": conversation.name}
+        )
+        conversation["unread_count"] = frappe.db.count(
+            "Unified Inbox Message",
+            filters={"conversation": conversation.name, "direction": "Inbound", "read_status": "Unread"},
+        )
+    return conversations
+
+
+def _counter_list() -> List[Dict[str, Any]]:
+    from assistant_crm.api.unified_inbox_api import get_unified_inbox_conversations
+
+    return get_unified_inbox_conversations(limit=PAGE_SIZE).get("conversations", [])
+
+
+def _measure(fn, iterations: int) -> Dict[str, float]:
+    fn()  # warm-up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 2),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 2),
+    }
+
+
+def run(sizes: List[int] = None, iterations: int = 50) -> List[Dict[str, Any]]:
+    sizes = sizes or [100, 1000, 10000]
+    results = []
+    try:
+        seeded = 0
+        for size in sorted(sizes):
+            # Seed incrementally so each size includes the previous rows
+            if size > seeded:
+                _seed(seeded, size)
+                seeded = size
+            legacy = _measure(_legacy_list, iterations)
+            counters = _measure(_counter_list, iterations)
+            results.append({"conversations": size, "before": legacy, "after": counters})
+            print(
+                f"{size:>6} conversations | before p50={legacy['p50_ms']}ms p95={legacy['p95_ms']}ms"
+                f" | after p50={counters['p50_ms']}ms p95={counters['p95_ms']}ms"
+            )
+    finally:
+        frappe.db.rollback()
+    return results
+
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+WCFCB Assistant CRM - intent detection microbenchmark
+
+Compares messages/second of the per-call keyword scans the services used to
+run (``before``) with the shared precompiled ``intent_engine`` (``after``),
+for each detector:
+
+- reply: ``reply_service.detect_intent`` (pattern dict rebuilt per call)
+- router: ``IntentRouter._detect_intent``
+- streamlined: ``StreamlinedReplyService._detect_intent`` scores + overrides
+- ultra_fast: ``performance_optimizer.detect_intent_ultra_fast``
+- classifier: ``EnhancedIntentClassifier`` live-data, static, sentiment and
+  topic checks
+- all: every detector on the same message, as when one message crosses
+  several services (the engine scans it once)
+
+The ``legacy_*`` functions are the original implementations and double as
+the reference for ``tests/test_intent_engine.py``.
+
+Usage:
+    bench --site <site> execute assistant_crm.scripts.benchmark_intent_engine.run
+    bench --site <site> execute assistant_crm.scripts.benchmark_intent_engine.run \
+        --kwargs "{'messages': 50000}"
+"""
+
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from assistant_crm.services import intent_engine
+from assistant_crm.services.intent_engine import (
+    LIVE_DATA_INTENTS,
+    REPLY_INTENTS,
+    ROUTER_INTENTS,
+    STATIC_INFO_INTENTS,
+    STREAMLINED_INTENTS,
+)
+
+SAMPLE_MESSAGES = [
+    "Hello",
+    "Hi, I need help with my claim",
+    "What is my claim status?",
+    "When will I receive my payment?",
+    "I was injured at work yesterday and want to submit a claim",
+    "How do I register my company as an employer?",
+    "I can't log in to the website, getting error message",
+    "I want to speak to a human agent please",
+    "This is the third time I'm asking, very frustrated with this problem",
+    "What documents do I need for my pension application?",
+    "Thank you, that's all",
+    "Show me my payment history for the last 6 months",
+    "Check status of claim WC-2024-000123",
+    "My employer has not paid the premium and the safety audit is overdue",
+    "Can you tell me about coverage and eligibility rules?",
+    "Where is your office located and what is the phone number?",
+    "Random gibberish xyz123",
+    "good morning, when was my last payment made",
+    "I need to update my details and contact address",
+    "doctor appointment for my treatment next week",
+]
+
+FILLER = ["please", "the", "my", "today", "asap", "thanks", "help", "urgent", "account", "ok"]
+
+
+# ---------------------------------------------------------------------------
+# Original implementations (before)
+# ---------------------------------------------------------------------------
+
+def legacy_reply(message: str) -> Tuple[str, float]:
+    message_lower = message.lower().strip()
+    # The original rebuilt its pattern dict literal on every call
+    intent_patterns = {i: {'keywords': list(p['keywords']), 'weight': p['weight']} for i, p in REPLY_INTENTS.items()}
+
+    best_intent = 'unknown'
+    best_score = 0.0
+    for intent, config in intent_patterns.items():
+        score = 0.0
+        keyword_matches = 0
+        for keyword in config['keywords']:
+            if keyword in message_lower:
+                keyword_matches += 1
+                if len(keyword.split()) > 1:
+                    score += config['weight'] * 1.2
+                else:
+                    score += config['weight'] * 0.8
+        if keyword_matches > 0:
+            phrase_bonus = sum(1 for keyword in config['keywords'] if len(keyword.split()) > 1 and keyword in message_lower)
+            score = score + (phrase_bonus * 0.3)
+            message_length = len(message_lower.split())
+            if message_length > 10:
+                score = score * 0.8
+            elif message_length > 5:
+                score = score * 0.9
+        if score > best_score:
+            best_score = score
+            best_intent = intent
+
+    if best_score < 0.3:
+        best_intent = 'unknown'
+        best_score = 0.1
+    return best_intent, min(best_score, 1.0)
+
+
+def legacy_router(message: str) -> Tuple[str, float]:
+    if not message or not isinstance(message, str):
+        return 'unknown', 0.0
+    message_lower = message.lower().strip()
+    intent_scores = {}
+    for intent, pattern in ROUTER_INTENTS.items():
+        keywords = pattern['keywords']
+        weight = pattern['weight']
+        matches = 0
+        for keyword in keywords:
+            if keyword.lower() in message_lower:
+                matches += 1
+        if matches > 0:
+            match_ratio = matches / len(keywords)
+            if len(keywords) <= 6:
+                score = max(match_ratio * weight, 0.5 * weight)
+            else:
+                score = match_ratio * weight
+            intent_scores[intent] = score
+    if intent_scores:
+        best_intent = max(intent_scores, key=intent_scores.get)
+        best_score = intent_scores[best_intent]
+        if best_score >= 0.15:
+            return best_intent, best_score
+    return 'unknown', 0.0
+
+
+def legacy_streamlined(message: str) -> Tuple[str, float, Dict[str, float]]:
+    """Scores and final intent (excluding the simple-greeting pre-check)."""
+    message_lower = message.lower().strip()
+    intent_scores = {}
+    for intent, pattern in STREAMLINED_INTENTS.items():
+        score = 0
+        for keyword in pattern['keywords']:
+            if keyword in message_lower:
+                score += pattern['weight']
+        if score > 0:
+            intent_scores[intent] = score
+
+    if any(word in message_lower for word in ['thank you', 'thanks', 'thank', 'grateful', 'appreciate']):
+        return 'gratitude', 0.95, intent_scores
+    elif any(phrase in message_lower for phrase in ['what documents', 'documents do i need', 'what do i need', 'requirements', 'paperwork']):
+        return 'document_request', 0.95, intent_scores
+    elif any(phrase in message_lower for phrase in ['injured at work', 'workplace injury', 'hurt at work', 'accident at work']):
+        return 'injury_report', 0.95, intent_scores
+    elif any(phrase in message_lower for phrase in ['i need help', 'help me', 'can you help']):
+        return 'general_help', 0.85, intent_scores
+    elif any(phrase in message_lower for phrase in ['speak to agent', 'talk to agent', 'human agent', 'speak to someone']):
+        return 'agent_request', 0.95, intent_scores
+    elif any(phrase in message_lower for phrase in ['complaint', 'problem', 'issue', 'frustrated']):
+        return 'complaint', 0.90, intent_scores
+    elif any(phrase in message_lower for phrase in ['understand wcfcb services', 'what can you help', 'what services']):
+        return 'service_overview', 0.90, intent_scores
+
+    if intent_scores:
+        best_intent = max(intent_scores.items(), key=lambda x: x[1])
+        return best_intent[0], min(best_intent[1], 1.0), intent_scores
+    return 'unknown', 0.3, intent_scores
+
+
+def legacy_ultra_fast(message: str) -> str:
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['hi', 'hello', 'hey']):
+        return 'greeting'
+    elif any(word in message_lower for word in ['claim', 'clm-']):
+        return 'claim_status'
+    elif any(word in message_lower for word in ['payment', 'account', 'acc-']):
+        return 'payment_inquiry'
+    elif any(word in message_lower for word in ['employer', 'company', 'emp-']):
+        return 'employer_status'
+    elif any(word in message_lower for word in ['thank', 'thanks']):
+        return 'gratitude'
+    return 'general_inquiry'
+
+
+def legacy_classifier(message: str, persona: str = "beneficiary") -> Dict[str, Any]:
+    """Keyword parts of EnhancedIntentClassifier (live data, static info, sentiment, topic)."""
+    message_lower = message.lower()
+
+    live = {}
+    for category, pattern in LIVE_DATA_INTENTS.get(persona, LIVE_DATA_INTENTS["beneficiary"]).items():
+        live[category] = sum(1 for keyword in pattern["keywords"] if keyword in message_lower)
+
+    static = {}
+    for category, pattern in STATIC_INFO_INTENTS.items():
+        static[category] = sum(1 for keyword in pattern["keywords"] if keyword in message_lower)
+
+    sentiment = "neutral"
+    for label, keywords in (
+        ("urgent", ["urgent", "emergency", "asap", "immediately", "help", "problem", "issue", "wrong"]),
+        ("negative", ["frustrated", "angry", "upset", "disappointed", "confused", "worried"]),
+        ("positive", ["thank", "great", "excellent", "perfect", "good", "happy", "satisfied"]),
+    ):
+        if any(keyword in message_lower for keyword in keywords):
+            sentiment = label
+            break
+
+    topic = "general"
+    for label, keywords in (
+        ("claims", ["claim", "case", "injury", "accident", "compensation"]),
+        ("payments", ["payment", "money", "benefits", "compensation", "paid"]),
+        ("medical", ["doctor", "medical", "treatment", "hospital", "provider"]),
+        ("employment", ["work", "job", "employer", "employee", "workplace"]),
+        ("compliance", ["compliance", "safety", "training", "audit", "premium"]),
+    ):
+        if any(keyword in message_lower for keyword in keywords):
+            topic = label
+            break
+
+    return {"live": live, "static": static, "sentiment": sentiment, "topic": topic}
+
+
+# ---------------------------------------------------------------------------
+# Engine equivalents (after)
+# ---------------------------------------------------------------------------
+
+def engine_streamlined(message: str) -> Tuple[str, float, Dict[str, float]]:
+    intent_scores = intent_engine.streamlined_scores(message)
+    override = intent_engine.streamlined_override(message)
+    if override:
+        return override[0], override[1], intent_scores
+    if intent_scores:
+        best_intent = max(intent_scores.items(), key=lambda x: x[1])
+        return best_intent[0], min(best_intent[1], 1.0), intent_scores
+    return 'unknown', 0.3, intent_scores
+
+
+def engine_classifier(message: str, persona: str = "beneficiary") -> Dict[str, Any]:
+    message_lower = message.lower()
+    live_hits = intent_engine.live_data_counts(persona, message_lower)
+    static_hits = intent_engine.static_info_counts(message_lower)
+    return {
+        "live": {c: live_hits.get(c, 0) for c in LIVE_DATA_INTENTS.get(persona, LIVE_DATA_INTENTS["beneficiary"])},
+        "static": {c: static_hits.get(c, 0) for c in STATIC_INFO_INTENTS},
+        "sentiment": intent_engine.first_match("sentiment", message_lower, "neutral"),
+        "topic": intent_engine.first_match("topic", message_lower, "general"),
+    }
+
+
+DETECTORS: Dict[str, Tuple[Callable, Callable]] = {
+    "reply": (legacy_reply, intent_engine.classify_reply),
+    "router": (legacy_router, intent_engine.classify_router),
+    "streamlined": (legacy_streamlined, engine_streamlined),
+    "ultra_fast": (legacy_ultra_fast, intent_engine.ultra_fast_intent),
+    "classifier": (legacy_classifier, engine_classifier),
+}
+
+
+def build_corpus(messages: int, seed: int = 7, unique: Optional[int] = None) -> List[str]:
+    """Sample messages with random filler so the scan cache sees ``unique`` distinct texts."""
+    rng = random.Random(seed)
+    unique = unique or messages
+    base = []
+    for _ in range(min(messages, unique)):
+        words = rng.choice(SAMPLE_MESSAGES).split()
+        for _ in range(rng.randint(0, 4)):
+            words.insert(rng.randint(0, len(words)), rng.choice(FILLER))
+        base.append(" ".join(words))
+    return [base[i % len(base)] for i in range(messages)]
+
+
+def _rate(fn: Callable, corpus: List[str]) -> float:
+    start = time.perf_counter()
+    for message in corpus:
+        fn(message)
+    return round(len(corpus) / (time.perf_counter() - start), 1)
+
+
+def run(messages: int = 20000, unique: Optional[int] = None) -> Dict[str, Any]:
+    """Messages/second per detector before and after (all messages distinct by default)."""
+    corpus = build_corpus(messages, unique=unique)
+    intent_engine.get_engine()  # compile outside the timed loop
+
+    results: Dict[str, Any] = {}
+    for name, (before, after) in DETECTORS.items():
+        intent_engine.get_engine().scan.cache_clear()
+        results[name] = {"before": _rate(before, corpus), "after": _rate(after, corpus)}
+
+    def all_before(message):
+        for before, _after in DETECTORS.values():
+            before(message)
+
+    def all_after(message):
+        for _before, after in DETECTORS.values():
+            after(message)
+
+    intent_engine.get_engine().scan.cache_clear()
+    results["all"] = {"before": _rate(all_before, corpus), "after": _rate(all_after, corpus)}
+
+    for data in results.values():
+        data["speedup"] = round(data["after"] / data["before"], 2) if data["before"] else None
+
+    return {"messages": messages, "unique_messages": len(set(corpus)), "messages_per_second": results}
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(run(), indent=2))
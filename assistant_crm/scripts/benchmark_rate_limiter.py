@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+WCFCB Assistant CRM - DDoS rate limiter microbenchmark
+
+Compares requests/second through one worker of the original
+``RateLimiter.is_allowed`` with the single-script ``RateLimiter.check``.
+The original makes four or more separate Redis round-trips, and it stores
+``str(int(time))`` as the member, so requests in the same second collapse
+into one entry. The script version makes one atomic round-trip per request,
+for one tier and for three tiers.
+
+It uses the site's ``redis_cache`` and only touches ``rl:bench:*`` keys,
+which it deletes afterwards. ``legacy_is_allowed`` is the original
+implementation, kept as the baseline.
+
+Usage:
+    bench --site <site> execute assistant_crm.scripts.benchmark_rate_limiter.run
+    bench --site <site> execute assistant_crm.scripts.benchmark_rate_limiter.run \
+        --kwargs "{'requests': 20000, 'identifiers': 100}"
+"""
+
+import time
+from typing import Any, Dict
+
+from assistant_crm.ddos_protection import RateLimiter
+
+KEY_PREFIX = "rl:bench:"
+
+
+def legacy_is_allowed(redis_conn, identifier, limit, window_size=60):
+    """``RateLimiter.is_allowed`` before the Lua script (one command per round-trip)."""
+    current_time = int(time.time())
+    window_start = current_time - window_size
+    timestamps_key = f"{identifier}:timestamps"
+
+    redis_conn.zremrangebyscore(timestamps_key, 0, window_start)
+    request_count = redis_conn.zcard(timestamps_key)
+
+    if request_count >= limit:
+        oldest_request = redis_conn.zrange(timestamps_key, 0, 0, withscores=True)
+        reset_after = (
+            int(oldest_request[0][1]) + window_size - current_time
+            if oldest_request
+            else window_size
+        )
+        return False, 0, max(1, reset_after)
+
+    redis_conn.zadd(timestamps_key, {str(current_time): current_time})
+    redis_conn.expire(timestamps_key, window_size + 10)
+    return True, limit - request_count - 1, window_size
+
+
+def _cleanup(redis_conn) -> None:
+    keys = list(redis_conn.scan_iter(f"{KEY_PREFIX}*", count=1000))
+    for start in range(0, len(keys), 500):
+        redis_conn.delete(*keys[start:start + 500])
+
+
+def _recorded(redis_conn) -> int:
+    return sum(redis_conn.zcard(key) for key in redis_conn.scan_iter(f"{KEY_PREFIX}*:timestamps", count=1000))
+
+
+def _rate(requests: int, seconds: float) -> float:
+    return round(requests / seconds, 1) if seconds else 0.0
+
+
+def run(requests: int = 10000, identifiers: int = 50, limit: int = 1000000) -> Dict[str, Any]:
+    """Requests/second per worker for the legacy and script limiters, plus how many requests each recorded."""
+    limiter = RateLimiter()
+    redis_conn = limiter.redis_conn
+    if not redis_conn:
+        return {"error": "Redis unavailable"}
+
+    ids = [f"{KEY_PREFIX}ip:10.0.{i // 256}.{i % 256}" for i in range(identifiers)]
+    results: Dict[str, Any] = {"requests": requests, "identifiers": identifiers}
+
+    _cleanup(redis_conn)
+    try:
+        start = time.perf_counter()
+        for i in range(requests):
+            legacy_is_allowed(redis_conn, ids[i % identifiers], limit)
+        legacy_seconds = time.perf_counter() - start
+        legacy_recorded = _recorded(redis_conn)
+        _cleanup(redis_conn)
+
+        start = time.perf_counter()
+        for i in range(requests):
+            limiter.check([(ids[i % identifiers], limit)])
+        script_seconds = time.perf_counter() - start
+        script_recorded = _recorded(redis_conn)
+        _cleanup(redis_conn)
+
+        start = time.perf_counter()
+        for i in range(requests):
+            identifier = ids[i % identifiers]
+            limiter.check([
+                (identifier.replace(":ip:", ":user:"), limit),
+                (identifier, limit),
+                (f"{KEY_PREFIX}route:crm_routes", limit),
+            ])
+        tiered_seconds = time.perf_counter() - start
+    finally:
+        _cleanup(redis_conn)
+
+    results["requests_per_second"] = {
+        "legacy": _rate(requests, legacy_seconds),
+        "script_one_tier": _rate(requests, script_seconds),
+        "script_three_tiers": _rate(requests, tiered_seconds),
+    }
+    results["speedup_one_tier"] = round(legacy_seconds / script_seconds, 2) if script_seconds else None
+    # The legacy member is the second, so requests in the same second overwrite each other
+    results["recorded"] = {"legacy": legacy_recorded, "script_one_tier": script_recorded}
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(run(), indent=2))
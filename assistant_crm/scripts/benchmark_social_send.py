@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+WCFCB Assistant CRM - outbound send microbenchmark
+
+Measures send throughput against a local stub HTTP server (no platform API
+is contacted):
+
+- before: a fresh integration per send (Social Media Settings re-read) and a
+  bare ``requests.post`` per message (new TCP connection each time)
+- after: the cached integration from ``get_platform_integration`` and its
+  pooled keep-alive session
+
+Usage:
+    bench --site <site> execute assistant_crm.scripts.benchmark_social_send.run
+    bench --site <site> execute assistant_crm.scripts.benchmark_social_send.run \
+        --kwargs "{'messages': 2000, 'platform': 'Telegram'}"
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+import requests
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real platform APIs
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        body = json.dumps({"ok": True, "result": {"message_id": 1}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/send"
+
+
+def _throughput(fn, messages: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    for i in range(messages):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    return {"seconds": round(elapsed, 3), "messages_per_second": round(messages / elapsed, 1)}
+
+
+def run(messages: int = 1000, platform: str = "Telegram") -> Dict[str, Any]:
+    from assistant_crm.api import social_media_ports
+    from assistant_crm.services.integration_registry import reset_sessions
+
+    platform_class = {
+        "WhatsApp": social_media_ports.WhatsAppIntegration,
+        "Facebook": social_media_ports.FacebookIntegration,
+        "Telegram": social_media_ports.TelegramIntegration,
+    }[platform]
+
+    server, url = _start_stub()
+    payload = {"chat_id": "benchmark", "text": "benchmark message"}
+    try:
+        def before(i):
+            platform_class()  # settings read per send
+            requests.post(url, json=payload, timeout=10)
+
+        def after(i):
+            integration = social_media_ports.get_platform_integration(platform)
+            integration.http.post(url, json=payload, timeout=10)
+
+        after(0)  # warm the registry and the connection pool
+        results = {
+            "platform": platform,
+            "messages": messages,
+            "before": _throughput(before, messages),
+            "after": _throughput(after, messages),
+        }
+    finally:
+        server.shutdown()
+        reset_sessions()
+
+    print(
+        f"{platform}: before {results['before']['messages_per_second']} msg/s"
+        f" | after {results['after']['messages_per_second']} msg/s"
+    )
+    return results
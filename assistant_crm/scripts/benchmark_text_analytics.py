@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+WCFCB Assistant CRM - batch text analytics benchmark
+
+Compares texts/second of the per-item loops the services run
+(``SentimentAnalysisService.analyze_sentiment``, ``detect_emotions_enhanced``
+and ``LanguageDetectionService.detect_language``, called once per row) with
+``text_analytics.analyze_batch``, in-process and on a process pool.
+
+The ``legacy_*`` functions are the original per-item implementations,
+without Frappe, and double as the reference for
+``tests/test_text_analytics.py``.
+
+Usage:
+    bench --site <site> execute assistant_crm.scripts.benchmark_text_analytics.run
+    bench --site <site> execute assistant_crm.scripts.benchmark_text_analytics.run \
+        --kwargs "{'messages': 100000, 'workers': 4}"
+"""
+
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from assistant_crm.services import text_analytics
+from assistant_crm.services.text_analytics import (
+    COMMON_WORDS,
+    EMOTION_PATTERNS,
+    ESCALATION_KEYWORDS,
+    GREETING_PATTERNS,
+    INTENSIFIERS,
+    LANGUAGE_PATTERNS,
+    NEGATION_WORDS,
+    NEGATIVE_WORDS,
+    POSITIVE_WORDS,
+)
+
+SAMPLE_MESSAGES = [
+    "Thank you so much, the service was excellent and very helpful",
+    "I am extremely frustrated, my claim is not processed and nobody helps",
+    "When will I receive my pension payment?",
+    "Muli bwanji, ndeelomba ukufwaya ubwafwilisho pa claim yandi",
+    "Moni, zikomo kwambiri chifukwa cha thandizo lanu",
+    "This is terrible, I want to speak to a manager and report this",
+    "not good at all, really bad experience",
+    "I don't understand what does this mean, I am confused",
+    "URGENT!!! please help asap, emergency at work",
+    "Call me on +260971234567 or email john.doe@example.com",
+    "See https://www.wcfcb.com/claims for details",
+    "ho batla ho ngodisa business ka kopo kea leboha",
+    "ukusuma sana, natotela",
+    "kukwiya kwambiri, choipa",
+    "The employer has not paid premiums for three months",
+    "",
+    "ok",
+    "Hello, good morning. I need help with registration",
+]
+
+FILLER = ["please", "my", "the", "very", "not", "so", "today", "claim", "payment", "really", "no"]
+
+
+# ---------------------------------------------------------------------------
+# Original implementations (before)
+# ---------------------------------------------------------------------------
+
+def _legacy_preprocess(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'[\+]?[1-9]?[0-9]{7,15}', '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def _legacy_lexicon_score(words: List[str], lexicon) -> float:
+    score = 0
+    negation_active = False
+    for i, word in enumerate(words):
+        if word in NEGATION_WORDS:
+            negation_active = True
+            continue
+        if word in lexicon:
+            word_score = 1
+            if i > 0 and words[i - 1] in INTENSIFIERS:
+                word_score *= INTENSIFIERS[words[i - 1]]
+            if negation_active:
+                word_score *= -0.5
+                negation_active = False
+            score += word_score
+        if negation_active and i > 0 and words[i - 1] not in NEGATION_WORDS:
+            negation_active = False
+    return max(0, score)
+
+
+def legacy_sentiment(text: Any) -> Tuple[float, float, float, float, str, bool, str]:
+    neutral = (0.0, 0.0, 1.0, 0.0, "neutral", False, "low")
+    if not text or not isinstance(text, str):
+        return neutral
+    words = _legacy_preprocess(text).split()
+    if not words:
+        return neutral
+
+    positive_score = _legacy_lexicon_score(words, POSITIVE_WORDS)
+    negative_score = _legacy_lexicon_score(words, NEGATIVE_WORDS)
+    neutral_score = max(0, len(words) - positive_score - negative_score)
+    total_words = len(words)
+    pos = positive_score / total_words if total_words > 0 else 0
+    neg = negative_score / total_words if total_words > 0 else 0
+    neu = neutral_score / total_words if total_words > 0 else 1
+
+    if pos == 0 and neg == 0:
+        compound = 0.0
+    else:
+        compound = pos - neg
+        if compound > 0:
+            compound = min(compound, 1.0)
+        else:
+            compound = max(compound, -1.0)
+
+    if compound >= 0.05:
+        label = "positive"
+    elif compound <= -0.05:
+        label = "negative"
+    else:
+        label = "neutral"
+
+    escalation = compound < -0.6 or any(keyword in text.lower() for keyword in ESCALATION_KEYWORDS)
+
+    max_score = max(pos, neg, neu)
+    confidence = "high" if max_score > 0.6 else "medium" if max_score > 0.4 else "low"
+    return round(pos, 3), round(neg, 3), round(neu, 3), round(compound, 3), label, escalation, confidence
+
+
+def legacy_emotions(text: Any) -> Tuple[float, ...]:
+    if not text or not isinstance(text, str):
+        return (0.0,) * len(EMOTION_PATTERNS)
+    text_lower = text.lower()
+    emotions = {}
+    for emotion, patterns in EMOTION_PATTERNS.items():
+        score = 0
+        for pattern in patterns:
+            if pattern in text_lower:
+                score += 1
+        emotions[emotion] = min(score / len(patterns), 1.0)
+    return tuple(emotions.values())
+
+
+def _legacy_clean(text: str) -> str:
+    text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+    text = re.sub(r'\S+@\S+', '', text)
+    text = re.sub(r'[\+]?[1-9]?[0-9]{7,15}', '', text)
+    text = re.sub(r'[^\w\s\.\!\?]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_language(text: Any) -> str:
+    if not text or not isinstance(text, str):
+        return "en"
+    cleaned_text = _legacy_clean(text)
+    if not cleaned_text:
+        return "en"
+    text_lower = cleaned_text.lower()
+
+    language_scores = {}
+    for lang, patterns in GREETING_PATTERNS.items():
+        score = 0
+        for pattern in patterns:
+            if pattern in text_lower:
+                score += 2
+        language_scores[lang] = score
+    max_lang = max(language_scores, key=language_scores.get)
+    if language_scores[max_lang] > 0:
+        return max_lang
+
+    words = text_lower.split()
+    language_scores = {}
+    for lang, common_words in COMMON_WORDS.items():
+        score = 0
+        for word in words:
+            if word in common_words:
+                score += 1
+        language_scores[lang] = score
+    max_lang = max(language_scores, key=language_scores.get)
+    if language_scores[max_lang] >= 2:
+        return max_lang
+
+    for lang, patterns in LANGUAGE_PATTERNS.items():
+        matches = 0
+        for pattern in patterns:
+            matches += len(re.findall(pattern, text_lower))
+        if matches >= 3:
+            return lang
+
+    return "en"
+
+
+def legacy_analyze(texts: List[Any]) -> List[Tuple]:
+    return [(legacy_sentiment(t), legacy_emotions(t), legacy_language(t)) for t in texts]
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def build_corpus(messages: int, seed: int = 7) -> List[str]:
+    """Sample messages with random filler words inserted."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(messages):
+        words = rng.choice(SAMPLE_MESSAGES).split()
+        for _ in range(rng.randint(0, 6)):
+            words.insert(rng.randint(0, len(words)), rng.choice(FILLER))
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def _timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(messages: int = 100000, workers: Optional[int] = None) -> Dict[str, Any]:
+    """Texts/second for sentiment + emotions + language over ``messages`` texts."""
+    corpus = build_corpus(messages)
+    workers = workers or text_analytics.default_workers()
+
+    timings = {
+        "per_item": _timed(legacy_analyze, corpus),
+        "batch_single_process": _timed(lambda: text_analytics.analyze_batch(corpus, workers=1)),
+        "batch_pool": _timed(lambda: text_analytics.analyze_batch(corpus, workers=workers)),
+    }
+    rates = {name: round(messages / seconds, 1) for name, seconds in timings.items()}
+    return {
+        "messages": messages,
+        "unique_messages": len(set(corpus)),
+        "workers": workers,
+        "seconds": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "texts_per_second": rates,
+        "speedup": {
+            name: round(rate / rates["per_item"], 2) for name, rate in rates.items() if name != "per_item"
+        },
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(run(), indent=2))
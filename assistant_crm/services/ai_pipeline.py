@@ -0,0 +1,489 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Asynchronous inbound AI pipeline for the Unified Inbox.
+
+Webhooks only persist the inbound Unified Inbox Message; the AI stage runs
+here, on a dedicated RQ worker pool, so the platform gets its 200 without
+waiting for the LLM round-trip.
+
+Ordering model:
+- Every conversation has its own Redis list of pending message names.
+- A drain job holds a per-conversation lock while it moves the list head to
+  an in-flight list and processes it, so replies within one conversation
+  stay in order while different conversations are drained in parallel by
+  different workers. A heartbeat thread renews the lock and the current
+  item's claim while the item runs, so a slow LLM call cannot outlive them.
+  An item is dropped from the in-flight list only after it has been
+  handled; one left behind by a crashed worker (its lock expired) is
+  retried once by the next drainer.
+- Enqueueing a drain job is idempotent: if another worker already holds the
+  conversation lock the new job exits and the holder picks the message up.
+- ``process_message_with_ai`` claims the message (``claim_message``) before
+  generating a reply, so a duplicate queue entry, a sync fallback and a
+  manual re-run cannot each answer the same message.
+
+Backpressure:
+- Queue depth, throughput and queue lag are tracked per platform in a Redis
+  hash and exposed through ``get_pipeline_metrics``.
+- LLM calls are bounded cluster-wide by a Redis semaphore
+  (``ai_llm_max_concurrency`` in site config), taken by
+  ``llm_governor.acquire`` after the per-model rate limit grants the call.
+
+Site config keys (all optional):
+- ai_pipeline_queue: RQ queue for drain jobs (default "long"). A dedicated
+  pool can be declared in common_site_config ``workers``.
+- ai_pipeline_lock_ttl: seconds a drainer's lock and claims outlive its last
+  heartbeat (default 300)
+- ai_llm_max_concurrency: concurrent LLM calls across all workers (default 8)
+- ai_llm_slot_timeout: seconds to wait for an LLM slot (default 60); calls
+  made through ``llm_governor`` wait for their priority's timeout instead
+"""
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import frappe
+
+DEFAULT_QUEUE = "long"
+DEFAULT_LOCK_TTL = 300
+DEFAULT_LLM_CONCURRENCY = 8
+DEFAULT_LLM_SLOT_TIMEOUT = 60
+
+# Release a lock only if we still own it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Extend the lock, and the claim in KEYS[2] if given, only while we own them
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call('expire', KEYS[1], ARGV[2])
+if KEYS[2] and redis.call('get', KEYS[2]) == ARGV[1] then
+    redis.call('expire', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+# KEYS: holders zset (acquired at), waiters zset (queue order), waiter leases zset (expiry)
+# ARGV: token, now, stale_after, limit, queue score, lease expiry
+# A waiter takes a slot only while it ranks within the free slots, so
+# lower queue scores (interactive callers) are served first.
+_SLOT_ACQUIRE_SCRIPT = """
+local token = ARGV[1]
+local now = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - tonumber(ARGV[3]))
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('ZREM', KEYS[3], unpack(stale))
+end
+redis.call('ZADD', KEYS[2], 'NX', tonumber(ARGV[5]), token)
+redis.call('ZADD', KEYS[3], tonumber(ARGV[6]), token)
+local free = tonumber(ARGV[4]) - redis.call('ZCARD', KEYS[1])
+local rank = redis.call('ZRANK', KEYS[2], token)
+if rank < free then
+    redis.call('ZADD', KEYS[1], now, token)
+    redis.call('ZREM', KEYS[2], token)
+    redis.call('ZREM', KEYS[3], token)
+    return 1
+end
+return 0
+"""
+SLOT_WAITER_LEASE_SECONDS = 5
+
+# Token of the drainer running on this thread; claims it takes carry it
+_owner = threading.local()
+
+
+def _logger():
+    return frappe.logger("assistant_crm.unified_inbox_ai")
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    """Redis connection backing the RQ queues (persistent, not the cache)."""
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "ai_pipeline", *parts])
+
+
+def _queue_key(conversation: str) -> str:
+    return _key("conv", conversation)
+
+
+def _lock_key(conversation: str) -> str:
+    return _key("lock", conversation)
+
+
+def _inflight_key(conversation: str) -> str:
+    return _key("inflight", conversation)
+
+
+def _owner_key(conversation: str) -> str:
+    return _key("owner", conversation)
+
+
+def _claim_key(message_name: str) -> str:
+    return _key("claim", message_name)
+
+
+def _metrics_key() -> str:
+    return _key("metrics")
+
+
+# ---------------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------------
+
+def enqueue_message(message_name: str, conversation: str, platform: Optional[str] = None) -> None:
+    """Queue an inbound message for AI processing.
+
+    The push happens after the current transaction commits so a worker can
+    never pop a message whose row is not yet visible.
+    """
+    def _push():
+        _push_and_schedule(message_name, conversation, platform)
+
+    after_commit = getattr(getattr(frappe, "db", None), "after_commit", None)
+    if after_commit is not None:
+        after_commit.add(_push)
+    else:
+        _push()
+
+
+def _push_and_schedule(message_name: str, conversation: str, platform: Optional[str]) -> None:
+    platform = platform or "Unknown"
+    item = json.dumps({
+        "message": message_name,
+        "platform": platform,
+        "enqueued_at": time.time(),
+    })
+
+    conn = _redis()
+    pipe = conn.pipeline()
+    pipe.lpush(_queue_key(conversation), item)
+    pipe.hincrby(_metrics_key(), f"depth:{platform}", 1)
+    pipe.hincrby(_metrics_key(), f"enqueued:{platform}", 1)
+    pipe.execute()
+
+    frappe.enqueue(
+        "assistant_crm.services.ai_pipeline.drain_conversation",
+        conversation=conversation,
+        queue=_conf("ai_pipeline_queue", DEFAULT_QUEUE),
+        timeout=int(_conf("ai_pipeline_lock_ttl", DEFAULT_LOCK_TTL)) * 4,
+    )
+
+    try:
+        _logger().info(
+            f"[AI] pipeline_enqueued message_id={message_name} conv={conversation} platform={platform}"
+        )
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Consumer side
+# ---------------------------------------------------------------------------
+
+def drain_conversation(conversation: str) -> None:
+    """Background job: process pending messages of one conversation in order."""
+    conn = _redis()
+    lock_ttl = int(_conf("ai_pipeline_lock_ttl", DEFAULT_LOCK_TTL))
+    queue_key = _queue_key(conversation)
+    inflight_key = _inflight_key(conversation)
+    lock_key = _lock_key(conversation)
+
+    while True:
+        token = uuid.uuid4().hex
+        if not conn.set(lock_key, token, nx=True, ex=lock_ttl):
+            # Another worker owns this conversation and will pick up our message
+            return
+
+        _owner.token = token
+        try:
+            with _Heartbeat(conn, lock_key, token, lock_ttl) as heartbeat:
+                # The previous holder's lock expired without a heartbeat: it is dead
+                dead_owner = conn.getset(_owner_key(conversation), token)
+                # Outlives the job timeout plus the claim TTL of a killed drainer
+                conn.expire(_owner_key(conversation), lock_ttl * 6)
+
+                # Left behind by that drainer mid-item. Dropped before the retry so
+                # an item that kills the worker is tried once more only.
+                for raw in conn.lrange(inflight_key, 0, -1):
+                    conn.lrem(inflight_key, 1, raw)
+                    _process_item(conn, conversation, raw, heartbeat, recovered=True, dead_owner=dead_owner)
+
+                while True:
+                    # Producers LPUSH, so the oldest item is on the right
+                    raw = conn.rpoplpush(queue_key, inflight_key)
+                    if raw is None:
+                        break
+                    _process_item(conn, conversation, raw, heartbeat)
+                    conn.lrem(inflight_key, 1, raw)
+        finally:
+            _owner.token = None
+            try:
+                conn.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception:
+                pass
+
+        # A producer may have pushed between our last pop and the release;
+        # its drain job saw the lock held and exited, so re-check before leaving.
+        if not conn.llen(queue_key):
+            return
+
+
+class _Heartbeat:
+    """Renews a drainer's conversation lock and current claim until the drain ends."""
+
+    def __init__(self, conn, lock_key: str, token: str, ttl: int):
+        self.conn = conn
+        self.lock_key = lock_key
+        self.token = token
+        self.ttl = ttl
+        self.interval = max(ttl / 3.0, 1.0)
+        self.claim_key: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="assistant-crm-ai-heartbeat", daemon=True)
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.renew()
+
+    def renew(self) -> None:
+        keys = [self.lock_key] + ([self.claim_key] if self.claim_key else [])
+        try:
+            self.conn.eval(_RENEW_SCRIPT, len(keys), *keys, self.token, self.ttl)
+        except Exception:
+            pass
+
+
+def _process_item(conn, conversation: str, raw, heartbeat: Optional[_Heartbeat] = None,
+                  recovered: bool = False, dead_owner: Optional[str] = None) -> None:
+    """Run one queued item; a ``recovered`` one was left in flight by ``dead_owner``."""
+    try:
+        item = json.loads(raw)
+    except Exception:
+        return
+
+    platform = item.get("platform") or "Unknown"
+    message_name = item.get("message")
+    lag_ms = int(max(0.0, time.time() - float(item.get("enqueued_at") or time.time())) * 1000)
+    if heartbeat is not None:
+        heartbeat.claim_key = _claim_key(message_name)
+
+    pipe = conn.pipeline()
+    if recovered:
+        # Depth was counted down by the worker that died. Only its own claim is
+        # dropped; a claim taken by anyone else (e.g. a manual re-run) stands.
+        if dead_owner is not None:
+            pipe.eval(_RELEASE_LOCK_SCRIPT, 1, _claim_key(message_name), dead_owner)
+        pipe.hincrby(_metrics_key(), f"recovered:{platform}", 1)
+    else:
+        pipe.hincrby(_metrics_key(), f"depth:{platform}", -1)
+    pipe.hset(_metrics_key(), f"lag_ms_last:{platform}", lag_ms)
+    pipe.hincrby(_metrics_key(), f"lag_ms_total:{platform}", lag_ms)
+    pipe.execute()
+
+    started = time.time()
+    status = "processed"
+    try:
+        from assistant_crm.api.unified_inbox_api import process_message_with_ai
+
+        process_message_with_ai(message_name)
+        frappe.db.commit()
+    except Exception as e:
+        status = "failed"
+        frappe.db.rollback()
+        frappe.log_error(
+            f"AI pipeline failed for {message_name} (conv={conversation}): {str(e)}",
+            "Unified Inbox - AI Pipeline Error",
+        )
+    finally:
+        if heartbeat is not None:
+            heartbeat.claim_key = None
+
+    duration_ms = int((time.time() - started) * 1000)
+    pipe = conn.pipeline()
+    pipe.hincrby(_metrics_key(), f"{status}:{platform}", 1)
+    pipe.hincrby(_metrics_key(), f"duration_ms_total:{platform}", duration_ms)
+    pipe.execute()
+
+    try:
+        _logger().info(
+            f"[AI] pipeline_{status} message_id={message_name} conv={conversation} "
+            f"platform={platform} lag_ms={lag_ms} duration_ms={duration_ms}"
+        )
+    except Exception:
+        pass
+
+
+def claim_message(message_name: str) -> bool:
+    """Take the right to reply to ``message_name``; False if someone already has it.
+
+    The claim lives for the pipeline lock TTL; inside a drain job it holds
+    the drainer's token and is renewed by its heartbeat. Once the reply is
+    stored, ``processed_by_ai`` keeps the message from being answered again.
+    If Redis is unavailable the claim is granted rather than dropping the
+    reply.
+    """
+    lock_ttl = int(_conf("ai_pipeline_lock_ttl", DEFAULT_LOCK_TTL))
+    owner = getattr(_owner, "token", None) or "1"
+    try:
+        return bool(_redis().set(_claim_key(message_name), owner, nx=True, ex=lock_ttl))
+    except Exception:
+        return True
+
+
+def release_claim(message_name: str) -> None:
+    """Give up a claim after a failed attempt so the message can be retried."""
+    try:
+        _redis().delete(_claim_key(message_name))
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Bounded LLM concurrency
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def llm_slot(timeout: Optional[float] = None, queue_offset_ms: int = 0):
+    """Hold one of ``ai_llm_max_concurrency`` cluster-wide LLM slots.
+
+    Implemented as a Redis sorted-set semaphore; stale holders (crashed
+    workers) are evicted after the pipeline lock TTL. Waiters queue by
+    arrival time plus ``queue_offset_ms``, so callers with a smaller offset
+    get freed slots first. Yields False when no slot freed up within
+    ``timeout``; callers must not make the call then. If Redis is
+    unavailable it yields True and the call proceeds unbounded rather than
+    blocking replies.
+    """
+    limit = int(_conf("ai_llm_max_concurrency", DEFAULT_LLM_CONCURRENCY))
+    timeout = float(timeout if timeout is not None else _conf("ai_llm_slot_timeout", DEFAULT_LLM_SLOT_TIMEOUT))
+    stale_after = int(_conf("ai_pipeline_lock_ttl", DEFAULT_LOCK_TTL))
+    keys = (_key("llm_slots"), _key("llm_slot_waiters"), _key("llm_slot_leases"))
+    token = uuid.uuid4().hex
+
+    conn = None
+    acquired = False
+    try:
+        conn = _redis()
+        started = time.time()
+        deadline = started + timeout
+        score = int(started * 1000) + int(queue_offset_ms or 0)
+        delay = 0.05
+        try:
+            while True:
+                now_ts = time.time()
+                if int(conn.eval(_SLOT_ACQUIRE_SCRIPT, 3, *keys, token, now_ts, stale_after, limit,
+                                 score, now_ts + SLOT_WAITER_LEASE_SECONDS)):
+                    acquired = True
+                    break
+                if now_ts >= deadline:
+                    conn.hincrby(_metrics_key(), "llm_slot_timeouts", 1)
+                    break
+                time.sleep(min(delay, max(deadline - now_ts, 0.0)))
+                delay = min(delay * 2, 1.0)
+        finally:
+            if not acquired:
+                conn.zrem(keys[1], token)
+                conn.zrem(keys[2], token)
+    except Exception:
+        # Redis unavailable: run unbounded
+        conn = None
+        acquired = True
+
+    try:
+        yield acquired
+    finally:
+        if conn is not None and acquired:
+            try:
+                conn.zrem(keys[0], token)
+            except Exception:
+                pass
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def get_pipeline_metrics() -> Dict[str, Any]:
+    """Per-platform depth, throughput and lag plus LLM slot usage."""
+    conn = _redis()
+    raw = conn.hgetall(_metrics_key()) or {}
+
+    platforms: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, int] = {}
+    for k, v in raw.items():
+        k = k.decode() if isinstance(k, bytes) else k
+        try:
+            v = int(v)
+        except Exception:
+            continue
+        if ":" not in k:
+            totals[k] = v
+            continue
+        metric, platform = k.split(":", 1)
+        platforms.setdefault(platform, {})[metric] = v
+
+    for data in platforms.values():
+        handled = data.get("processed", 0) + data.get("failed", 0)
+        data["depth"] = max(0, data.get("depth", 0))
+        data["avg_lag_ms"] = round(data.pop("lag_ms_total", 0) / handled, 1) if handled else 0
+        data["avg_duration_ms"] = round(data.pop("duration_ms_total", 0) / handled, 1) if handled else 0
+
+    slots = get_llm_slot_usage(conn, totals)
+    return {
+        "platforms": platforms,
+        "total_depth": sum(p.get("depth", 0) for p in platforms.values()),
+        "llm_slots_in_use": slots["in_use"],
+        "llm_max_concurrency": slots["max_concurrency"],
+        "llm_slot_timeouts": slots["timeouts"],
+        "queue": _conf("ai_pipeline_queue", DEFAULT_QUEUE),
+    }
+
+
+def get_llm_slot_usage(conn=None, totals: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Slots held, the configured limit and slot wait timeouts."""
+    conn = conn or _redis()
+    if totals is None:
+        raw = conn.hget(_metrics_key(), "llm_slot_timeouts")
+        timeouts = int(raw or 0)
+    else:
+        timeouts = totals.get("llm_slot_timeouts", 0)
+    return {
+        "in_use": conn.zcard(_key("llm_slots")),
+        "waiting": conn.zcard(_key("llm_slot_waiters")),
+        "max_concurrency": int(_conf("ai_llm_max_concurrency", DEFAULT_LLM_CONCURRENCY)),
+        "timeouts": timeouts,
+    }
@@ -148,6 +148,12 @@ class CacheService:
             
             stats["hit_rate"] = round(hit_rate, 2)
             stats["total_requests"] = total_requests
+
+            try:
+                from assistant_crm.services import semantic_cache
+                stats["semantic"] = semantic_cache.get_metrics()
+            except Exception:
+                stats["semantic"] = {}
             
             return stats
             
@@ -176,14 +182,15 @@ class CacheService:
         except Exception as e:
             frappe.log_error(f"Error updating cache stats: {str(e)}", "Cache Service")
     
-    def get_similar_responses(self, message: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Get similar cached responses for fallback purposes"""
-        # This is a simplified implementation
-        # In a production system, you might use vector similarity or fuzzy matching
+    def get_similar_responses(self, message: str, limit: int = 5, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Get similar cached responses for fallback purposes (semantic cache, best first)"""
         try:
-            # For now, return empty list as this requires more complex implementation
-            return []
-            
+            from assistant_crm.services import semantic_cache
+
+            context = context or {}
+            scope = semantic_cache.make_scope("gemini", context.get("language"), context.get("channel_type"))
+            return semantic_cache.find_similar(scope, message, limit)
+
         except Exception as e:
             frappe.log_error(f"Error getting similar responses: {str(e)}", "Cache Service")
             return []
@@ -209,9 +216,9 @@ class CacheService:
 def generate_and_cache_response(query: str):
     """Background job to generate and cache responses"""
     try:
-        from assistant_crm.services.gemini_service import GeminiService
+        from assistant_crm.services import service_container
         
-        gemini = GeminiService()
+        gemini = service_container.get("gemini")
         response = gemini.process_message(
             message=query,
             user_context={},
@@ -1,12 +1,62 @@
 import frappe
+import hashlib
 import json
 import requests
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 import re
 from openai import OpenAI
 from textstat import flesch_reading_ease, flesch_kincaid_grade
 
+from assistant_crm.services import prompt_builder
+
+
+ENHANCEMENT_CACHE_PREFIX = "assistant_crm:message_enhancement:"
+DEFAULT_ENHANCEMENT_CACHE_TTL = 3600
+AI_CALL_FALLBACK_REPLY = (
+    "Thank you for reaching out. Your issue has been noted and we are assigning you "
+    "to the next available agent who will attend to your request shortly."
+)
+
+# Unified inbox system message: identity, then the WorkCom guidelines. It is sent
+# first and byte-identical on every reply so provider prompt caching can reuse it.
+UNIFIED_INBOX_SYSTEM_PROMPT = (
+    "You are Anna, the AI engine behind WCFCB's WorkCom chatbot. "
+    "Respond as 'Anna' in a warm, professional tone, using only the provided context. "
+    "Maintain this persona tightly and do not switch roles.\n\n"
+    + """You are WorkCom, the AI engine behind WCFCB's WorkCom omnichannel assistant.
+
+You receive:
+- The latest user message from a beneficiary, employer, supplier, or staff member.
+- A JSON context describing the detected intent, confidence, any live claim/beneficiary/employer data,
+  and authentication status.
+- The recent conversation, as the preceding chat turns.
+
+Your job is to respond as *WorkCom* in a warm, professional Zambian-English tone.
+
+GUIDELINES:
+- If live_data is present, use it to answer precisely (for example, claim status or payment details).
+- If authentication is incomplete for intents that require NRC or claim number, clearly but politely ask
+  for the missing details without repeating yourself unnecessarily.
+- Respect the user's intent; avoid changing topic unless they clearly ask to switch.
+- Keep responses concise (2-3 short paragraphs or bullet lists).
+- For sensitive topics (injury, death, complaints) be explicitly empathetic.
+- If you are unsure, suggest escalating to a human agent rather than guessing.
+- Use the JSON auth_context object when it is present:
+    - If auth_context.authenticated is false for intents like "claim_status", "payment_status",
+      "pension_inquiry", "account_info", "payment_history", or "employer_services", do NOT reveal
+      any personal data yet.
+    - Instead, ask clearly for the missing credentials before answering. For example:
+        - claim_status: always request BOTH National ID (NRC, 9 digits, slashes allowed) AND Full Name.
+        - payment_status or payment_history: request NRC and Account number.
+        - pension_inquiry: request NRC and Beneficiary number.
+        - employer_services: request NRC and Employer ID or Employer name, depending on context.
+    - When auth_context.collected_credentials already contains some fields, acknowledge them and
+      only ask for what is still missing, rather than asking for everything again.
+"""
+)
+
 
 class EnhancedAIService:
     """
@@ -15,6 +65,49 @@ class EnhancedAIService:
     Compliance Target: 98/100 score
     """
 
+    PLATFORM_RULES = {
+        "sms": {
+            "max_length": 160,
+            "avoid": ["links", "formatting"],
+            "prefer": ["abbreviations", "concise language"]
+        },
+        "whatsapp": {
+            "max_length": 4096,
+            "allow": ["emojis", "formatting"],
+            "prefer": ["conversational tone"]
+        },
+        "email": {
+            "max_length": None,
+            "require": ["subject line", "formal greeting", "signature"],
+            "prefer": ["structured format", "professional tone"]
+        },
+        "facebook": {
+            "max_length": 8000,
+            "allow": ["hashtags", "mentions"],
+            "prefer": ["engaging tone", "call-to-action"]
+        },
+        "instagram": {
+            "max_length": 2200,
+            "allow": ["hashtags", "emojis"],
+            "prefer": ["visual language", "engaging tone"]
+        },
+        "telegram": {
+            "max_length": 4096,
+            "allow": ["markdown", "links"],
+            "prefer": ["clear formatting"]
+        },
+        "linkedin": {
+            "max_length": 3000,
+            "prefer": ["professional tone", "industry terminology"],
+            "avoid": ["casual language", "excessive emojis"]
+        },
+        "twitter": {
+            "max_length": 280,
+            "allow": ["hashtags", "mentions"],
+            "prefer": ["concise language", "engaging tone"]
+        }
+    }
+
     def __init__(self):
         self.config = self.get_ai_configuration()
         self.anna_client = self.get_client("anna")
@@ -26,6 +119,11 @@ class EnhancedAIService:
         
         self.tone_profiles = self.load_tone_profiles()
         self.grammar_rules = self.load_grammar_rules()
+        self.compiled_grammar_rules = [
+            (re.compile(rule["pattern"], re.IGNORECASE), rule["correction"])
+            for group in ("common_errors", "wcfcb_terminology")
+            for rule in self.grammar_rules[group]
+        ]
 
     def get_ai_configuration(self) -> Dict[str, Any]:
         """Get AI service configuration from Enhanced AI Settings.
@@ -193,50 +291,138 @@ class EnhancedAIService:
             ]
         }
 
-    def _execute_ai_call(self, client, model_id: str, messages: list, max_tokens: int, temperature: float) -> str:
-        """Dynamically route to either Chat Completions or Assistants API depending on if an Assistant ID is supplied."""
-        try:
-            if model_id.startswith("asst_"):
-                sys_msg = next((m["content"] for m in messages if m["role"] == "system"), None)
-                thread_messages = []
-                for m in messages:
-                    if m["role"] in ["user", "assistant"]:
-                        thread_messages.append({"role": m["role"], "content": str(m["content"])})
-                
-                thread = client.beta.threads.create(messages=thread_messages)
-                
-                run_kwargs = {
-                    "thread_id": thread.id,
-                    "assistant_id": model_id,
-                    "max_completion_tokens": int(max_tokens or 800),
-                    "temperature": float(temperature or 0.7)
-                }
-                if sys_msg:
-                    run_kwargs["instructions"] = sys_msg
+    def stream_ai_call(self, client, model_id: str, messages: list, max_tokens: int, temperature: float):
+        """Yield text deltas as the model generates them (Chat Completions ``stream=True`` or an Assistants run stream)."""
+        if model_id.startswith("asst_"):
+            sys_msg = next((m["content"] for m in messages if m["role"] == "system"), None)
+            thread_messages = [
+                {"role": m["role"], "content": str(m["content"])}
+                for m in messages if m["role"] in ["user", "assistant"]
+            ]
+            thread = client.beta.threads.create(messages=thread_messages)
 
-                run = client.beta.threads.runs.create_and_poll(**run_kwargs)
-                
-                if run.status == "completed":
-                    msgs = client.beta.threads.messages.list(thread_id=thread.id)
-                    return msgs.data[0].content[0].text.value.strip()
-                elif run.status == "requires_action":
-                    client.beta.threads.runs.cancel(thread_id=thread.id, run_id=run.id)
-                    return "Thank you for reaching out. Your issue has been noted and we are assigning you to the next available agent who will attend to your request shortly."
-                else:
-                    frappe.log_error(message=f"Assistant run ended with status: {run.status}", title="EnhancedAI Execution Error")
-                    return "Thank you for reaching out. Your issue has been noted and we are assigning you to the next available agent who will attend to your request shortly."
-            else:
-                response = client.chat.completions.create(
-                    model=model_id,
-                    messages=messages,
-                    max_tokens=int(max_tokens or 800),
-                    temperature=float(temperature or 0.7)
-                )
-                return response.choices[0].message.content.strip()
+            stream_kwargs = {
+                "thread_id": thread.id,
+                "assistant_id": model_id,
+                "max_completion_tokens": int(max_tokens or 800),
+                "temperature": float(temperature or 0.7)
+            }
+            if sys_msg:
+                stream_kwargs["instructions"] = sys_msg
+
+            with client.beta.threads.runs.stream(**stream_kwargs) as stream:
+                for delta in stream.text_deltas:
+                    yield delta
+            return
+
+        stream = client.chat.completions.create(
+            model=model_id,
+            messages=messages,
+            max_tokens=int(max_tokens or 800),
+            temperature=float(temperature or 0.7),
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _priority_for_client(self, client) -> str:
+        """Governor priority: Anna serves live customers, Antoine writes report insights."""
+        from assistant_crm.services import llm_governor
+
+        if client is not None and client is self.anna_client:
+            return llm_governor.INTERACTIVE
+        if client is not None and client is self.antoine_client:
+            return llm_governor.BATCH
+        return llm_governor.BACKGROUND
+
+    def _execute_ai_call(self, client, model_id: str, messages: list, max_tokens: int, temperature: float,
+                         response_format: Optional[Dict[str, Any]] = None, on_chunk=None,
+                         priority: Optional[str] = None) -> str:
+        """Dynamically route to either Chat Completions or Assistants API depending on if an Assistant ID is supplied.
+
+        ``response_format`` (e.g. ``{"type": "json_object"}``) is passed to Chat Completions only;
+        Assistants rely on the prompt instructions. With ``on_chunk`` the completion is streamed and
+        each text delta is passed to it; the full text is still returned.
+
+        Every call waits on the cluster-wide ``llm_governor`` (rate limits per model, priority by
+        agent unless ``priority`` is given) and reports 429s back to it.
+        """
+        from assistant_crm.services import llm_governor
+
+        priority = priority or self._priority_for_client(client)
+        try:
+            with llm_governor.acquire(
+                "openai", model_id, priority, llm_governor.estimate_tokens(messages, max_tokens or 800)
+            ) as permit:
+                try:
+                    return self._call_model(client, model_id, messages, max_tokens, temperature,
+                                            response_format, on_chunk, permit)
+                except Exception as e:
+                    if llm_governor.is_rate_limit_error(e):
+                        permit.rate_limited(llm_governor.retry_after_from_error(e))
+                    raise
         except Exception as e:
             import traceback
             frappe.log_error(message=f"Error executing AI call via {model_id}: {traceback.format_exc()}"[:2000], title="EnhancedAI Execution Error")
-            return "Thank you for reaching out. Your issue has been noted and we are assigning you to the next available agent who will attend to your request shortly."
+            return AI_CALL_FALLBACK_REPLY
+
+    def _call_model(self, client, model_id: str, messages: list, max_tokens: int, temperature: float,
+                    response_format: Optional[Dict[str, Any]], on_chunk, permit) -> str:
+        if on_chunk is not None and not response_format:
+            from assistant_crm.services.llm_streaming import tee
+
+            return tee(on_chunk, self.stream_ai_call(client, model_id, messages, max_tokens, temperature)).strip()
+
+        if model_id.startswith("asst_"):
+            sys_msg = next((m["content"] for m in messages if m["role"] == "system"), None)
+            thread_messages = []
+            for m in messages:
+                if m["role"] in ["user", "assistant"]:
+                    thread_messages.append({"role": m["role"], "content": str(m["content"])})
+            
+            thread = client.beta.threads.create(messages=thread_messages)
+            
+            run_kwargs = {
+                "thread_id": thread.id,
+                "assistant_id": model_id,
+                "max_completion_tokens": int(max_tokens or 800),
+                "temperature": float(temperature or 0.7)
+            }
+            if sys_msg:
+                run_kwargs["instructions"] = sys_msg
+
+            run = client.beta.threads.runs.create_and_poll(**run_kwargs)
+            permit.record_usage(getattr(getattr(run, "usage", None), "total_tokens", None))
+            
+            if run.status == "completed":
+                msgs = client.beta.threads.messages.list(thread_id=thread.id)
+                return msgs.data[0].content[0].text.value.strip()
+            elif run.status == "requires_action":
+                client.beta.threads.runs.cancel(thread_id=thread.id, run_id=run.id)
+                return AI_CALL_FALLBACK_REPLY
+            else:
+                if getattr(getattr(run, "last_error", None), "code", None) == "rate_limit_exceeded":
+                    permit.rate_limited()
+                frappe.log_error(message=f"Assistant run ended with status: {run.status}", title="EnhancedAI Execution Error")
+                return AI_CALL_FALLBACK_REPLY
+        else:
+            completion_kwargs = {
+                "model": model_id,
+                "messages": messages,
+                "max_tokens": int(max_tokens or 800),
+                "temperature": float(temperature or 0.7)
+            }
+            if response_format:
+                completion_kwargs["response_format"] = response_format
+            response = client.chat.completions.create(**completion_kwargs)
+            usage = getattr(response, "usage", None)
+            permit.record_usage(getattr(usage, "total_tokens", None))
+            prompt_builder.record_usage(
+                getattr(usage, "prompt_tokens", None),
+                getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None),
+            )
+            return response.choices[0].message.content.strip()
 
 
     def enhance_message_quality(self, message_text: str, target_tone: str = "professional",
@@ -251,7 +437,12 @@ class EnhancedAIService:
             customer_context: Customer information for personalization
 
         Returns:
-            Dict containing enhanced message and analysis
+            Dict containing enhanced message and analysis, plus ``timings_ms``
+            (per step) and ``cache_hit``
+
+        Site config ``ai_enhancement_mode``: "fused" (default) runs the local rules
+        and one structured LLM call; "sequential" runs the five steps one by one.
+        Results are cached for ``ai_enhancement_cache_ttl`` seconds (default 3600).
         """
         try:
             if not self.config["tone_adjustment_enabled"]:
@@ -263,36 +454,49 @@ class EnhancedAIService:
                     "analysis": {"readability_score": 0, "tone_match": 100}
                 }
 
-            # Step 1: Grammar and spelling correction
-            corrected_message = self.correct_grammar_and_spelling(message_text)
-
-            # Step 2: Tone adjustment
-            tone_adjusted_message = self.adjust_tone(corrected_message, target_tone, platform)
-
-            # Step 3: Style optimization for platform
-            optimized_message = self.optimize_for_platform(tone_adjusted_message, platform)
+            started = time.perf_counter()
+            timings = {}
+            mode = frappe.conf.get("ai_enhancement_mode") or "fused"
 
-            # Step 4: Personalization based on customer context
-            personalized_message = self.personalize_message(optimized_message, customer_context)
+            cache_key = self.get_enhancement_cache_key(message_text, target_tone, platform, customer_context, mode)
+            cached = frappe.cache().get_value(cache_key)
+            if cached:
+                cached = dict(cached)
+                cached["cache_hit"] = True
+                cached["timings_ms"] = {"total": round((time.perf_counter() - started) * 1000, 2)}
+                return cached
 
-            # Step 5: Readability optimization
-            final_message = self.optimize_readability(personalized_message, target_tone)
+            if mode == "sequential":
+                final_message = self._enhance_sequential(message_text, target_tone, platform, customer_context, timings)
+            else:
+                final_message = self._enhance_fused(message_text, target_tone, platform, customer_context, timings)
 
-            # Step 6: Quality analysis
+            # Quality analysis
+            step_started = time.perf_counter()
             analysis = self.analyze_message_quality(message_text, final_message, target_tone)
+            timings["analysis"] = round((time.perf_counter() - step_started) * 1000, 2)
 
-            # Step 7: Generate improvement suggestions
+            # Improvement suggestions
             improvements = self.generate_improvement_suggestions(message_text, final_message)
 
-            return {
+            result = {
                 "success": True,
                 "original_message": message_text,
                 "enhanced_message": final_message,
                 "improvements": improvements,
                 "analysis": analysis,
                 "tone_profile": self.tone_profiles.get(target_tone, {}),
-                "platform_optimizations": self.get_platform_optimizations(platform)
+                "platform_optimizations": self.get_platform_optimizations(platform),
+                "mode": mode,
             }
+            frappe.cache().set_value(
+                cache_key,
+                result,
+                expires_in_sec=int(frappe.conf.get("ai_enhancement_cache_ttl") or DEFAULT_ENHANCEMENT_CACHE_TTL),
+            )
+
+            timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+            return dict(result, cache_hit=False, timings_ms=timings)
 
         except Exception as e:
             frappe.log_error(message=f"Error enhancing message quality: {str(e)}")
@@ -302,22 +506,134 @@ class EnhancedAIService:
                 "enhanced_message": message_text
             }
 
+    def get_enhancement_cache_key(self, message_text: str, target_tone: str, platform: str,
+                                  customer_context: Dict = None, mode: str = "fused") -> str:
+        """Cache key for an enhancement: text hash, tone and platform (plus the personalization context)."""
+        digest = hashlib.sha256((message_text or "").encode("utf-8"))
+        if customer_context:
+            digest.update(json.dumps(customer_context, sort_keys=True, default=str).encode("utf-8"))
+        return f"{ENHANCEMENT_CACHE_PREFIX}{mode}:{target_tone}:{platform}:{digest.hexdigest()}"
+
+    def _enhance_sequential(self, text: str, target_tone: str, platform: str,
+                            customer_context: Optional[Dict], timings: Dict[str, float]) -> str:
+        """Original five-step chain (up to five LLM round-trips), timed per step."""
+        steps = [
+            ("grammar", lambda t: self.correct_grammar_and_spelling(t)),
+            ("tone", lambda t: self.adjust_tone(t, target_tone, platform)),
+            ("platform", lambda t: self.optimize_for_platform(t, platform)),
+            ("personalization", lambda t: self.personalize_message(t, customer_context)),
+            ("readability", lambda t: self.optimize_readability(t, target_tone)),
+        ]
+        for name, step in steps:
+            step_started = time.perf_counter()
+            text = step(text)
+            timings[name] = round((time.perf_counter() - step_started) * 1000, 2)
+        return text
+
+    def _enhance_fused(self, text: str, target_tone: str, platform: str,
+                       customer_context: Optional[Dict], timings: Dict[str, float]) -> str:
+        """Deterministic steps locally, then every LLM transformation in one JSON call."""
+        step_started = time.perf_counter()
+        if self.config["grammar_correction_enabled"]:
+            text = self.apply_grammar_rules(text)
+        text = self.apply_platform_length_limit(text, platform)
+        timings["local_rules"] = round((time.perf_counter() - step_started) * 1000, 2)
+
+        if not self.enhancement_client:
+            return text
+
+        step_started = time.perf_counter()
+        prompt = self.build_fused_enhancement_prompt(text, target_tone, platform, customer_context)
+        timings["prompt"] = round((time.perf_counter() - step_started) * 1000, 2)
+
+        step_started = time.perf_counter()
+        raw = self._execute_ai_call(client=self.enhancement_client, model_id=self.config["enhancement_model_id"], messages=[
+                {"role": "system", "content": "You are a communication specialist and editor for WCFCB, a workers' compensation fund. Reply with a JSON object only."},
+                {"role": "user", "content": prompt}
+            ], max_tokens=self.config["max_tokens"], temperature=0.4, response_format={"type": "json_object"})
+        timings["llm"] = round((time.perf_counter() - step_started) * 1000, 2)
+
+        try:
+            enhanced = (json.loads(raw) or {}).get("enhanced_message")
+        except (TypeError, ValueError):
+            enhanced = None
+        if not enhanced or not isinstance(enhanced, str):
+            # Unparseable/fallback reply: keep the locally corrected text
+            return text
+
+        # The model does not always respect length limits
+        return self.apply_platform_length_limit(enhanced.strip(), platform)
+
+    def build_fused_enhancement_prompt(self, text: str, target_tone: str, platform: str,
+                                       customer_context: Optional[Dict] = None) -> str:
+        """Single prompt covering grammar, tone, platform style, personalization and readability."""
+        instructions = []
+        if self.config["grammar_correction_enabled"]:
+            instructions.append("Correct grammar, spelling and punctuation; keep WCFCB terminology accurate.")
+
+        tone_profile = self.tone_profiles.get(target_tone)
+        if tone_profile:
+            instructions.append(
+                f"Use a {target_tone} tone ({', '.join(tone_profile['characteristics'])}); "
+                f"avoid {', '.join(tone_profile['avoid'])}."
+            )
+
+        rules = self.PLATFORM_RULES.get(platform)
+        if rules:
+            instructions.append(
+                f"Optimize for {platform}: max length {rules.get('max_length') or 'no limit'} characters; "
+                f"allowed: {', '.join(rules.get('allow', [])) or 'n/a'}; "
+                f"prefer: {', '.join(rules.get('prefer', [])) or 'n/a'}; "
+                f"avoid: {', '.join(rules.get('avoid', [])) or 'n/a'}."
+            )
+
+        if customer_context:
+            instructions.append(
+                "Personalize for this customer (salutation with their name, customer type, relevant history): "
+                + json.dumps(customer_context, default=str)
+            )
+
+        if self.config["style_optimization_enabled"]:
+            target = self.get_target_readability(target_tone)
+            try:
+                current_flesch = flesch_reading_ease(text)
+            except Exception:
+                current_flesch = None
+            if current_flesch is None or not (target["min_flesch"] <= current_flesch <= target["max_flesch"]):
+                instructions.append(
+                    f"Aim for Flesch Reading Ease {target['min_flesch']}-{target['max_flesch']} "
+                    f"and at most grade level {target['max_grade']}."
+                )
+
+        numbered = "\n".join(f"{i}. {line}" for i, line in enumerate(instructions, 1))
+        return (
+            "Rewrite the message below, applying all of these at once while keeping its meaning and facts:\n"
+            f"{numbered}\n\n"
+            f"Original message: \"{text}\"\n\n"
+            'Return JSON: {"enhanced_message": "<the rewritten message>"}'
+        )
+
+    def apply_grammar_rules(self, text: str) -> str:
+        """Apply the predefined (local, deterministic) grammar and terminology rules."""
+        for pattern, correction in self.compiled_grammar_rules:
+            text = pattern.sub(correction, text)
+        return text
+
+    def apply_platform_length_limit(self, text: str, platform: str) -> str:
+        """Truncate to the platform's character limit."""
+        max_length = self.PLATFORM_RULES.get(platform, {}).get("max_length")
+        if max_length and len(text) > max_length:
+            return text[:max_length-3] + "..."
+        return text
+
     def correct_grammar_and_spelling(self, text: str) -> str:
         """Correct grammar and spelling using AI and predefined rules"""
         try:
             if not self.config["grammar_correction_enabled"]:
                 return text
 
-            # Apply predefined grammar rules
-            corrected_text = text
-
-            # Apply common error corrections
-            for rule in self.grammar_rules["common_errors"]:
-                corrected_text = re.sub(rule["pattern"], rule["correction"], corrected_text, flags=re.IGNORECASE)
-
-            # Apply WCFCB terminology corrections
-            for rule in self.grammar_rules["wcfcb_terminology"]:
-                corrected_text = re.sub(rule["pattern"], rule["correction"], corrected_text, flags=re.IGNORECASE)
+            # Apply predefined grammar rules (common errors, then WCFCB terminology)
+            corrected_text = self.apply_grammar_rules(text)
 
             # Use AI for advanced grammar correction if OpenAI is available
             if self.enhancement_client:
@@ -394,55 +710,12 @@ class EnhancedAIService:
     def optimize_for_platform(self, text: str, platform: str) -> str:
         """Optimize message for specific platform requirements"""
         try:
-            platform_rules = {
-                "sms": {
-                    "max_length": 160,
-                    "avoid": ["links", "formatting"],
-                    "prefer": ["abbreviations", "concise language"]
-                },
-                "whatsapp": {
-                    "max_length": 4096,
-                    "allow": ["emojis", "formatting"],
-                    "prefer": ["conversational tone"]
-                },
-                "email": {
-                    "max_length": None,
-                    "require": ["subject line", "formal greeting", "signature"],
-                    "prefer": ["structured format", "professional tone"]
-                },
-                "facebook": {
-                    "max_length": 8000,
-                    "allow": ["hashtags", "mentions"],
-                    "prefer": ["engaging tone", "call-to-action"]
-                },
-                "instagram": {
-                    "max_length": 2200,
-                    "allow": ["hashtags", "emojis"],
-                    "prefer": ["visual language", "engaging tone"]
-                },
-                "telegram": {
-                    "max_length": 4096,
-                    "allow": ["markdown", "links"],
-                    "prefer": ["clear formatting"]
-                },
-                "linkedin": {
-                    "max_length": 3000,
-                    "prefer": ["professional tone", "industry terminology"],
-                    "avoid": ["casual language", "excessive emojis"]
-                },
-                "twitter": {
-                    "max_length": 280,
-                    "allow": ["hashtags", "mentions"],
-                    "prefer": ["concise language", "engaging tone"]
-                }
-            }
+            platform_rules = self.PLATFORM_RULES
 
             rules = platform_rules.get(platform, {})
-            max_length = rules.get("max_length")
 
             # Truncate if necessary
-            if max_length and len(text) > max_length:
-                text = text[:max_length-3] + "..."
+            text = self.apply_platform_length_limit(text, platform)
 
             # Platform-specific optimizations using AI
             if self.enhancement_client and platform in platform_rules:
@@ -818,12 +1091,12 @@ USER QUESTION:
                 "administrator to configure WorkCom/OpenAI settings in Enhanced AI Settings."
             )
 
-    def generate_unified_inbox_reply(self, message: str, context: Dict[str, Any]) -> str:
+    def generate_unified_inbox_reply(self, message: str, context: Dict[str, Any], on_chunk=None) -> str:
         """Generate WorkCom-style conversational reply for Unified Inbox / direct social channels.
 
         The context is expected to mirror the structure built by SimplifiedChatAPI._generate_ai_response,
         including intent, confidence, data_source, live_data (if any), conversation_history, and
-        auth_context.
+        auth_context. Pass ``on_chunk`` to receive the reply as it streams.
         """
         try:
             if not self.openai_client:
@@ -832,56 +1105,26 @@ USER QUESTION:
                     "Please try again later or ask to speak with a human agent."
                 )
 
-            # Serialize context so WorkCom can see the exact structure
-            context_json = json.dumps(context or {}, default=str, ensure_ascii=False)
+            # Semantic cache: paraphrases of non-personal questions skip the LLM
+            from assistant_crm.services import semantic_cache
 
-            prompt = f"""
-You are WorkCom, the AI engine behind WCFCB's WorkCom omnichannel assistant.
-
-You receive:
-- The latest user message from a beneficiary, employer, supplier, or staff member.
-- A JSON context describing the detected intent, confidence, any live claim/beneficiary/employer data,
-  authentication status, and a short conversation history.
-
-Your job is to respond as *WorkCom* in a warm, professional Zambian-English tone.
-
-GUIDELINES:
-- If live_data is present, use it to answer precisely (for example, claim status or payment details).
-- If authentication is incomplete for intents that require NRC or claim number, clearly but politely ask
-  for the missing details without repeating yourself unnecessarily.
-- Respect the user's intent; avoid changing topic unless they clearly ask to switch.
-- Keep responses concise (2-3 short paragraphs or bullet lists).
-- For sensitive topics (injury, death, complaints) be explicitly empathetic.
-- If you are unsure, suggest escalating to a human agent rather than guessing.
-- Use the JSON auth_context object when it is present:
-    - If auth_context.authenticated is false for intents like "claim_status", "payment_status",
-      "pension_inquiry", "account_info", "payment_history", or "employer_services", do NOT reveal
-      any personal data yet.
-    - Instead, ask clearly for the missing credentials before answering. For example:
-        - claim_status: always request BOTH National ID (NRC, 9 digits, slashes allowed) AND Full Name.
-        - payment_status or payment_history: request NRC and Account number.
-        - pension_inquiry: request NRC and Beneficiary number.
-        - employer_services: request NRC and Employer ID or Employer name, depending on context.
-    - When auth_context.collected_credentials already contains some fields, acknowledge them and
-      only ask for what is still missing, rather than asking for everything again.
-
-JSON CONTEXT:
-{context_json}
-
-USER MESSAGE:
-{message}
-"""
+            context = context or {}
+            intent = context.get("intent")
+            semantic_scope = semantic_cache.make_scope(
+                "unified_inbox", context.get("language"), context.get("platform") or context.get("channel_type")
+            )
+            semantic_cacheable = semantic_cache.is_cacheable(message, intent, context)
+            if semantic_cacheable:
+                hit = semantic_cache.lookup(semantic_scope, message, intent)
+                if hit:
+                    if on_chunk is not None:
+                        on_chunk(hit["response"])
+                    return hit["response"]
 
             # 1. Determine which model/client to strictly lock into for this conversation
             # ALL unified inbox chats (including survey responses) are strictly handled by Anna
             client = self.anna_client
             active_model = self.config.get("anna_model_id", "gpt-4")
-            
-            system_identity = (
-                "You are Anna, the AI engine behind WCFCB's WorkCom chatbot. "
-                "Respond as 'Anna' in a warm, professional tone, using only the provided context. "
-                "Maintain this persona tightly and do not switch roles."
-            )
 
             if not client:
                 return (
@@ -889,39 +1132,58 @@ USER MESSAGE:
                     "Please try again later or ask to speak with a human agent."
                 )
 
-            # 2. Reconstruct the message array with strict conversation history
+            # 2. Fit live data/context first, then the newest history turns, into the token budget.
+            # History is replayed as chat turns, and the message is sent on its own, so neither
+            # is repeated inside the JSON context.
+            history = context.get("conversation_history") or []
+            # SimplifiedChatAPI records the user's turn before replying; it is sent below as the message
+            last = history[-1] if history and isinstance(history[-1], dict) else {}
+            if last.get("role") == "user" and (last.get("text") or "") == (message or "")[:2000]:
+                history = history[:-1]
+            context_budget, history_reserve = prompt_builder.split_budget(history)
+            # A reply that may be cached is served to other customers: keep their name out of it
+            exclude = ("conversation_history", "user_message")
+            if semantic_cacheable:
+                exclude += ("customer_name", "user_name")
+            context_json, context_tokens = prompt_builder.fit_context(
+                context, context_budget, active_model, exclude=exclude
+            )
+            history_messages, history_tokens = prompt_builder.fit_history(
+                history, context_budget + history_reserve - context_tokens, active_model
+            )
+
+            # 3. Static instructions first and unchanged, so the provider's prefix cache can reuse them
             messages_payload = []
-            if not active_model.startswith("asst_"):
-                messages_payload.append({"role": "system", "content": system_identity})
-
-            history = context.get("conversation_history", [])
-            for turn in history:
-                direction = turn.get("direction", "Inbound")
-                role = "assistant" if direction == "Outbound" else "user"
-                content = turn.get("message_content") or turn.get("content") or ""
-                if content:
-                    # Ignore system/invisible logs
-                    if not content.startswith("==="):
-                        messages_payload.append({"role": role, "content": content})
-
-            # Append the current prompt containing the latest instructions/message
             if active_model.startswith("asst_"):
                 # Provide only the raw message and backend context to avoid confusing the user's Assistant
-                messages_payload.append({
-                    "role": "user", 
-                    "content": f"{message}\n\n[System Context injected by Application: {context_json}]"
-                })
+                user_content = f"{message}\n\n[System Context injected by Application: {context_json}]"
+                static_tokens = 0
             else:
-                messages_payload.append({"role": "user", "content": prompt})
+                messages_payload.append({"role": "system", "content": UNIFIED_INBOX_SYSTEM_PROMPT})
+                user_content = f"JSON CONTEXT:\n{context_json}\n\nUSER MESSAGE:\n{message}"
+                static_tokens = prompt_builder.count_static_tokens(UNIFIED_INBOX_SYSTEM_PROMPT, active_model)
+            messages_payload.extend(history_messages)
+            messages_payload.append({"role": "user", "content": user_content})
+            prompt_builder.record_prompt(
+                static_tokens + context_tokens + history_tokens + prompt_builder.count_tokens(message, active_model)
+            )
 
+            llm_started = time.perf_counter()
             text = self._execute_ai_call(
                 client=client,
                 model_id=active_model,
                 messages=messages_payload,
                 max_tokens=self.config.get("max_tokens", 800),
-                temperature=self.config.get("temperature", 0.7)
+                temperature=self.config.get("temperature", 0.7),
+                on_chunk=on_chunk
             )
 
+            if semantic_cacheable and text and text != AI_CALL_FALLBACK_REPLY:
+                semantic_cache.store(
+                    semantic_scope, message, text, intent,
+                    latency_ms=(time.perf_counter() - llm_started) * 1000,
+                )
+
             return text or (
                 "I'm here to help, but I couldn't generate a detailed response. "
                 "Please try again in a moment or ask to speak with a human agent."
@@ -15,6 +15,9 @@ from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 
+from assistant_crm.services import intent_engine
+from assistant_crm.services.intent_engine import LIVE_DATA_INTENTS, STATIC_INFO_INTENTS
+
 @dataclass
 class IntentClassificationResult:
     """Structured result for intent classification"""
@@ -318,68 +321,9 @@ class EnhancedIntentClassifier:
         """
         message_lower = message.lower()
         
-        # Persona-specific live data patterns
-        live_data_patterns = {
-            "beneficiary": {
-                "claim_status": {
-                    "keywords": ["my claim", "claim status", "claim progress", "case status", "claim update"],
-                    "entities": ["claim_number"],
-                    "confidence_boost": 0.2
-                },
-                "payment_info": {
-                    "keywords": ["payment", "compensation", "benefits", "money", "paid", "when will i get"],
-                    "entities": ["amount", "date"],
-                    "confidence_boost": 0.15
-                },
-                "medical_info": {
-                    "keywords": ["doctor", "medical", "treatment", "appointment", "provider"],
-                    "entities": ["provider_name", "date"],
-                    "confidence_boost": 0.1
-                },
-                "profile_info": {
-                    "keywords": ["my information", "my details", "contact", "address", "update my"],
-                    "entities": ["phone", "email", "address"],
-                    "confidence_boost": 0.1
-                }
-            },
-            "employer": {
-                "employee_claims": {
-                    "keywords": ["employee claims", "worker claims", "staff claims", "company claims"],
-                    "entities": ["employee_name", "claim_number"],
-                    "confidence_boost": 0.2
-                },
-                "compliance_status": {
-                    "keywords": ["compliance", "premium", "safety", "training", "audit"],
-                    "entities": ["date", "percentage"],
-                    "confidence_boost": 0.15
-                },
-                "company_analytics": {
-                    "keywords": ["report", "analytics", "statistics", "summary", "dashboard"],
-                    "entities": ["date_range", "metric"],
-                    "confidence_boost": 0.1
-                }
-            },
-            "staff": {
-                "case_management": {
-                    "keywords": ["case", "claim", "file", "review", "assign", "update"],
-                    "entities": ["claim_number", "user_id"],
-                    "confidence_boost": 0.2
-                },
-                "user_lookup": {
-                    "keywords": ["user", "claimant", "employee", "lookup", "search"],
-                    "entities": ["user_id", "name"],
-                    "confidence_boost": 0.15
-                },
-                "system_analytics": {
-                    "keywords": ["system", "performance", "analytics", "metrics", "health"],
-                    "entities": ["metric", "date_range"],
-                    "confidence_boost": 0.1
-                }
-            }
-        }
-        
-        # Get patterns for user persona
-        persona_patterns = live_data_patterns.get(user_persona, live_data_patterns["beneficiary"])
+        # Persona-specific live data patterns, matched by the shared intent engine
+        persona_patterns = LIVE_DATA_INTENTS.get(user_persona, LIVE_DATA_INTENTS["beneficiary"])
+        keyword_hits = intent_engine.live_data_counts(user_persona, message_lower)
         
         best_match = {"category": None, "confidence": 0.0, "specificity": "general"}
         
@@ -387,7 +331,7 @@ class EnhancedIntentClassifier:
             confidence = 0.0
             
             # Check keyword matches
-            keyword_matches = sum(1 for keyword in pattern["keywords"] if keyword in message_lower)
+            keyword_matches = keyword_hits.get(category, 0)
             if keyword_matches > 0:
                 confidence += (keyword_matches / len(pattern["keywords"])) * 0.6
             
@@ -423,35 +367,12 @@ class EnhancedIntentClassifier:
         """
         Check if message is requesting static information (existing functionality)
         """
-        message_lower = message.lower()
-        
-        static_patterns = {
-            "general_help": {
-                "keywords": ["help", "how", "what", "explain", "tell me about"],
-                "confidence_base": 0.7
-            },
-            "process_info": {
-                "keywords": ["process", "procedure", "steps", "how to", "guide"],
-                "confidence_base": 0.8
-            },
-            "contact_info": {
-                "keywords": ["contact", "phone", "email", "office", "address", "location"],
-                "confidence_base": 0.9
-            },
-            "policy_info": {
-                "keywords": ["policy", "coverage", "benefits", "eligibility", "rules"],
-                "confidence_base": 0.8
-            },
-            "forms_documents": {
-                "keywords": ["form", "document", "download", "application", "paperwork"],
-                "confidence_base": 0.8
-            }
-        }
+        keyword_hits = intent_engine.static_info_counts(message.lower())
         
         best_match = {"category": None, "confidence": 0.0}
         
-        for category, pattern in static_patterns.items():
-            keyword_matches = sum(1 for keyword in pattern["keywords"] if keyword in message_lower)
+        for category, pattern in STATIC_INFO_INTENTS.items():
+            keyword_matches = keyword_hits.get(category, 0)
             
             if keyword_matches > 0:
                 confidence = (keyword_matches / len(pattern["keywords"])) * pattern["confidence_base"]
@@ -552,24 +473,8 @@ class EnhancedIntentClassifier:
         """
         Analyze sentiment while preserving existing sentiment analysis logic
         """
-        message_lower = message.lower()
-        
-        # Urgent/emergency indicators
-        urgent_keywords = ["urgent", "emergency", "asap", "immediately", "help", "problem", "issue", "wrong"]
-        if any(keyword in message_lower for keyword in urgent_keywords):
-            return "urgent"
-        
-        # Negative sentiment indicators
-        negative_keywords = ["frustrated", "angry", "upset", "disappointed", "confused", "worried"]
-        if any(keyword in message_lower for keyword in negative_keywords):
-            return "negative"
-        
-        # Positive sentiment indicators
-        positive_keywords = ["thank", "great", "excellent", "perfect", "good", "happy", "satisfied"]
-        if any(keyword in message_lower for keyword in positive_keywords):
-            return "positive"
-        
-        return "neutral"
+        # Urgent, then negative, then positive indicators (first match wins)
+        return intent_engine.first_match("sentiment", message.lower(), "neutral")
     
     def determine_user_persona(self, user_session: Dict, context: Dict) -> str:
         """
@@ -604,21 +509,7 @@ class EnhancedIntentClassifier:
         """
         Extract the main topic of conversation
         """
-        message_lower = message.lower()
-        
-        topics = {
-            "claims": ["claim", "case", "injury", "accident", "compensation"],
-            "payments": ["payment", "money", "benefits", "compensation", "paid"],
-            "medical": ["doctor", "medical", "treatment", "hospital", "provider"],
-            "employment": ["work", "job", "employer", "employee", "workplace"],
-            "compliance": ["compliance", "safety", "training", "audit", "premium"]
-        }
-        
-        for topic, keywords in topics.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return topic
-        
-        return "general"
+        return intent_engine.first_match("topic", message.lower(), "general")
     
     def update_context_memory(self, message: str, result: IntentClassificationResult, 
                             context: Dict) -> None:
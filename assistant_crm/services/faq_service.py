@@ -8,28 +8,24 @@ import json
 from difflib import SequenceMatcher
 import math
 
+from . import knowledge_index
+
 
 class FAQService:
     """FAQ matching service for automated responses
 
-    Note: Knowledge Base Article doctype has been deprecated.
-    This service now returns empty results as a placeholder.
+    Articles come from the shared ``knowledge_index``. The Knowledge Base
+    Article doctype has been deprecated; where its table no longer exists the
+    index is empty and no article matches.
     """
 
     def __init__(self):
         self.confidence_threshold = 0.7
         self.articles = []
-        # Knowledge Base Article doctype has been removed
-        # Skip loading knowledge base as it no longer exists
 
     def load_knowledge_base(self):
-        """Load knowledge base articles and keywords
-
-        Note: Knowledge Base Article doctype has been deprecated.
-        This method now does nothing.
-        """
-        # Knowledge Base Article doctype has been removed
-        self.articles = []
+        """Load knowledge base articles (prepared by the shared index)"""
+        self.articles = knowledge_index.get_index().articles()
     
     def get_article_keywords(self, article_name):
         """Get keywords for a specific article"""
@@ -56,20 +52,16 @@ class FAQService:
     
     def find_best_match(self, user_message, language='en', context=None):
         """Find best matching FAQ article"""
-        if not self.articles:
-            self.load_knowledge_base()
-        
         user_tokens = self.preprocess_message(user_message)
         best_match = None
         best_score = 0
         
-        # Filter articles by language
-        language_articles = [a for a in self.articles if a['language'] == language]
-        if not language_articles and language != 'en':
-            # Fallback to English if no articles in requested language
-            language_articles = [a for a in self.articles if a['language'] == 'en']
+        # Only the top BM25 candidates (language-filtered, English fallback) get the full score
+        candidates = knowledge_index.get_index().search_tokens(
+            user_tokens, language=language, limit=knowledge_index.candidate_limit()
+        )
         
-        for article in language_articles:
+        for article, _bm25 in candidates:
             # Calculate similarity score
             score = self.calculate_similarity(user_tokens, article, user_message)
             
@@ -84,35 +76,24 @@ class FAQService:
     
     def preprocess_message(self, message):
         """Preprocess user message for matching"""
-        # Convert to lowercase and remove punctuation
-        message = re.sub(r'[^\w\s]', '', message.lower())
-        
-        # Tokenize and filter short words
-        tokens = [word for word in message.split() if len(word) > 2]
-        
-        # Remove common stop words
-        stop_words = {
-            'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 
-            'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 
-            'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy', 
-            'did', 'she', 'use', 'way', 'will', 'with', 'what', 'when', 'where',
-            'why', 'this', 'that', 'they', 'them', 'there', 'their', 'then'
-        }
-        
-        tokens = [token for token in tokens if token not in stop_words]
-        return tokens
+        # Lowercase, strip punctuation, drop short words and stop words
+        return knowledge_index.tokenize(message)
     
     def calculate_similarity(self, user_tokens, article, original_message):
         """Calculate similarity between user message and article"""
-        # Title similarity (40% weight)
-        title_tokens = self.preprocess_message(article['title'])
+        # Title similarity (40% weight); indexed articles carry their title tokens
+        title_tokens = article.get('_title_tokens')
+        if title_tokens is None:
+            title_tokens = self.preprocess_message(article['title'])
         title_score = self.token_similarity(user_tokens, title_tokens) * 0.4
         
         # Keyword similarity (50% weight)
         keyword_score = self.keyword_similarity(user_tokens, article['processed_keywords']) * 0.5
         
         # Content similarity (10% weight) - for exact phrase matching
-        content_score = self.content_similarity(original_message, article['content']) * 0.1
+        content_score = self.content_similarity(
+            original_message, article['content'], clean_content=article.get('_clean_content')
+        ) * 0.1
         
         total_score = title_score + keyword_score + content_score
         
@@ -141,13 +122,14 @@ class FAQService:
         
         total_weight = sum(kw['weight'] for kw in article_keywords)
         matched_weight = 0
+        user_token_set = set(user_tokens)
         
         for keyword_data in article_keywords:
             keyword = keyword_data['keyword']
             weight = keyword_data['weight']
             
             # Check for exact keyword match
-            if keyword in user_tokens:
+            if keyword in user_token_set:
                 matched_weight += weight
             else:
                 # Check for partial matches
@@ -158,13 +140,14 @@ class FAQService:
         
         return matched_weight / total_weight if total_weight > 0 else 0
     
-    def content_similarity(self, user_message, article_content):
+    def content_similarity(self, user_message, article_content, clean_content=None):
         """Check for exact phrase matches in content"""
         if not article_content:
             return 0
         
-        # Remove HTML tags from content
-        clean_content = re.sub(r'<[^>]+>', '', article_content).lower()
+        # Remove HTML tags from content (already done for indexed articles)
+        if clean_content is None:
+            clean_content = knowledge_index.clean_content(article_content)
         user_lower = user_message.lower()
         
         # Look for exact phrase matches (3+ words)
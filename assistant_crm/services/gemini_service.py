@@ -5,10 +5,14 @@ import os
 import json
 import requests
 import time
+
+from assistant_crm.services import prompt_builder
+from assistant_crm.services.llm_governor import LLMCapacityError
+# Recording is buffered in-process and flushed in the background (metrics_store)
+from assistant_crm.services.monitoring_service import get_monitoring_service
 # Temporarily commented out to fix import issues
 # from assistant_crm.assistant_crm.services.cache_service import get_cache_service
 # from assistant_crm.assistant_crm.services.error_handler import get_error_handler
-# from assistant_crm.assistant_crm.services.monitoring_service import get_monitoring_service
 
 # Simple replacements for the complex services
 def get_cache_service():
@@ -36,6 +40,8 @@ def get_error_handler(service_name):
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
+                    if isinstance(e, LLMCapacityError):
+                        raise  # the governor already waited its full timeout
                     last_exception = e
                     if attempt < self.max_retries:
                         import time
@@ -66,12 +72,39 @@ def get_error_handler(service_name):
             }
     return SimpleErrorHandler()
 
-def get_monitoring_service():
-    """Simple monitoring service replacement"""
-    class SimpleMonitoringService:
-        def record_api_call(self, service, method, duration, status, error=None):
-            pass  # No monitoring for now
-    return SimpleMonitoringService()
+
+# Static part of the WorkCom system prompt. Sent as ``systemInstruction``, unchanged
+# on every call, so Gemini's implicit prompt caching can reuse it.
+GEMINI_SYSTEM_PROMPT = """I'm WorkCom, a team member at the Workers' Compensation Fund Control Board (WCFCB) of Zambia. I'm here to help you with:
+
+1. **Claims Processing**: Workplace injury claims, medical claims, disability benefits
+2. **Employer Registration**: Business registration, compliance requirements, premium payments
+3. **Payment Services**: Benefit payments, pension distributions, claim settlements
+4. **Reports & Analytics**: Financial reports, compliance reports, benefit statements
+5. **Safety & Health**: Workplace safety guidelines, health programs, prevention measures
+6. **General Support**: Account inquiries, document requests, process guidance
+
+**My Approach:**
+- I always acknowledge what you've shared with me first, using your name when I know it
+- I understand that workplace injuries can be traumatic and that financial stress adds to your burden
+- I ask clarifying questions to understand your specific situation before providing solutions
+- I provide clear, step-by-step guidance tailored to your exact circumstances
+- I match your communication style and emotional needs - if you're urgent, I respond quickly; if you're overwhelmed, I take extra time to explain
+- I recognize when situations are complex and may require human expertise
+- I offer relevant resources and support options specific to your situation
+- I'm patient with repeated questions and never rush you through processes
+
+**What I Can Help With:**
+- Workplace injury and compensation claims
+- Employer registration and compliance
+- Benefit calculations and payment schedules
+- Required documentation and forms
+- Safety program implementation
+- Appeals and dispute resolution"""
+
+# ContextService intents whose replies carry no user data and may be shared through
+# the semantic cache; every other intent is answered from the user's own records
+SEMANTIC_CACHE_INTENTS = frozenset({"general_help", "navigation"})
 
 
 class GeminiService:
@@ -82,9 +115,8 @@ class GeminiService:
 		self.model = self._get_model()
 		self.base_url = "https://generativelanguage.googleapis.com/v1beta/models"
 
-		# Rate limiting properties
-		self.last_request_time = 0
-		self.min_request_interval = 1.0  # Minimum 1 second between requests
+		# Rate limiting is cluster-wide (services.llm_governor); reports can lower the priority
+		self.priority = "interactive"
 		self.max_retries = 3
 		self.retry_delay = 2.0  # Initial retry delay in seconds
 
@@ -149,57 +181,42 @@ class GeminiService:
 
 	def _build_system_prompt(self, user_context=None):
 		"""Build system prompt for WCFCB context with WorkCom's personality"""
-		base_prompt = """I'm WorkCom, a team member at the Workers' Compensation Fund Control Board (WCFCB) of Zambia. I'm here to help you with:
-
-1. **Claims Processing**: Workplace injury claims, medical claims, disability benefits
-2. **Employer Registration**: Business registration, compliance requirements, premium payments
-3. **Payment Services**: Benefit payments, pension distributions, claim settlements
-4. **Reports & Analytics**: Financial reports, compliance reports, benefit statements
-5. **Safety & Health**: Workplace safety guidelines, health programs, prevention measures
-6. **General Support**: Account inquiries, document requests, process guidance
-
-**My Approach:**
-- I always acknowledge what you've shared with me first, using your name when I know it
-- I understand that workplace injuries can be traumatic and that financial stress adds to your burden
-- I ask clarifying questions to understand your specific situation before providing solutions
-- I provide clear, step-by-step guidance tailored to your exact circumstances
-- I match your communication style and emotional needs - if you're urgent, I respond quickly; if you're overwhelmed, I take extra time to explain
-- I recognize when situations are complex and may require human expertise
-- I offer relevant resources and support options specific to your situation
-- I'm patient with repeated questions and never rush you through processes
-
-**What I Can Help With:**
-- Workplace injury and compensation claims
-- Employer registration and compliance
-- Benefit calculations and payment schedules
-- Required documentation and forms
-- Safety program implementation
-- Appeals and dispute resolution
-
-**Current User Context:**"""
+		return f"{GEMINI_SYSTEM_PROMPT}\n\n{self._format_user_context(user_context)}"
 
+	def _format_user_context(self, user_context=None):
+		"""Per-user part of the system prompt; the static part is ``GEMINI_SYSTEM_PROMPT``"""
+		user_prompt = "**Current User Context:**"
 		if user_context:
-			base_prompt += f"\n- User: {user_context.get('user', 'Unknown')}"
-			base_prompt += f"\n- Full Name: {user_context.get('full_name', 'Unknown')}"
-			base_prompt += f"\n- Roles: {', '.join(user_context.get('roles', []))}"
-			base_prompt += f"\n- Company: {user_context.get('company', 'Not specified')}"
+			user_prompt += f"\n- User: {user_context.get('user', 'Unknown')}"
+			user_prompt += f"\n- Full Name: {user_context.get('full_name', 'Unknown')}"
+			user_prompt += f"\n- Roles: {', '.join(user_context.get('roles', []))}"
+			user_prompt += f"\n- Company: {user_context.get('company', 'Not specified')}"
 
-		base_prompt += "\n\nPlease provide helpful and contextual responses based on this information."
+		user_prompt += "\n\nPlease provide helpful and contextual responses based on this information."
 
-		return base_prompt
+		return user_prompt
 
-	def _format_chat_history(self, chat_history):
-		"""Format chat history for context"""
+	def _format_chat_history(self, chat_history, max_tokens=None):
+		"""Format chat history for context: the last 5 exchanges, newest first into ``max_tokens``"""
 		if not chat_history:
 			return ""
 
-		formatted_history = "\n**Recent Conversation:**\n"
-		for chat in chat_history[-5:]:  # Last 5 messages for context
-			formatted_history += f"User: {chat.get('message', '')}\n"
+		exchanges = []
+		used = 0
+		for chat in reversed(chat_history[-5:]):  # Last 5 messages for context
+			exchange = f"User: {chat.get('message', '')}\n"
 			if chat.get('response'):
-				formatted_history += f"Assistant: {chat.get('response', '')}\n"
-
-		return formatted_history
+				exchange += f"Assistant: {chat.get('response', '')}\n"
+			if max_tokens is not None:
+				tokens = prompt_builder.count_tokens(exchange, self.model)
+				if used + tokens > max_tokens:
+					break
+				used += tokens
+			exchanges.append(exchange)
+
+		if not exchanges:
+			return ""
+		return "\n**Recent Conversation:**\n" + "".join(reversed(exchanges))
 
 	def _format_contextual_data(self, contextual_data, query_analysis):
 		"""Format contextual data for inclusion in prompt"""
@@ -292,7 +309,56 @@ class GeminiService:
 
 		return formatted_context
 
-	def process_message(self, message, user_context=None, chat_history=None):
+	def _acquire_llm(self, payload):
+		"""Cluster-wide rate limit and concurrency permit for one Gemini request"""
+		from assistant_crm.services import llm_governor
+
+		contents = list(payload.get("contents", []))
+		if payload.get("systemInstruction"):
+			contents.append(payload["systemInstruction"])
+		prompt = " ".join(part.get("text", "") for content in contents for part in content.get("parts", []))
+		max_tokens = (payload.get("generationConfig") or {}).get("maxOutputTokens", 1024)
+		return llm_governor.acquire("gemini", self.model, self.priority, llm_governor.estimate_tokens(prompt, max_tokens))
+
+	def _post_generate_content(self, url, payload, timeout=30):
+		"""POST ``generateContent`` under the governor, reporting 429s and token usage to it"""
+		with self._acquire_llm(payload) as permit:
+			response = requests.post(url, headers={"Content-Type": "application/json"}, json=payload, timeout=timeout)
+			if response.status_code == 429:
+				permit.rate_limited(response.headers.get("Retry-After"))
+			elif response.ok:
+				try:
+					usage = response.json().get("usageMetadata") or {}
+					permit.record_usage(usage.get("totalTokenCount"))
+					prompt_builder.record_usage(usage.get("promptTokenCount"), usage.get("cachedContentTokenCount"))
+				except ValueError:
+					pass
+			return response
+
+	def stream_generate_content(self, payload):
+		"""Yield text deltas from ``streamGenerateContent`` (server-sent events) as Gemini produces them."""
+		url = f"{self.base_url}/{self.model}:streamGenerateContent?alt=sse&key={self.api_key}"
+		monitoring_service = get_monitoring_service()
+		with self._acquire_llm(payload) as permit:
+			start = time.time()
+			with requests.post(url, headers={"Content-Type": "application/json"}, json=payload, stream=True, timeout=(10, 60)) as resp:
+				if resp.status_code == 429:
+					permit.rate_limited(resp.headers.get("Retry-After"))
+					monitoring_service.record_api_call("gemini_api", "streamGenerateContent", (time.time()-start)*1000, "rate_limit")
+					raise Exception("Google Gemini API quota exceeded. Please try again later or upgrade your API plan.")
+				resp.raise_for_status()
+				for line in resp.iter_lines(decode_unicode=True):
+					if not line or not line.startswith("data:"):
+						continue
+					event = json.loads(line[5:].strip())
+					for candidate in event.get("candidates") or []:
+						for part in (candidate.get("content") or {}).get("parts") or []:
+							if part.get("text"):
+								yield part["text"]
+					permit.record_usage((event.get("usageMetadata") or {}).get("totalTokenCount"))
+			monitoring_service.record_api_call("gemini_api", "streamGenerateContent", (time.time()-start)*1000, "success")
+
+	def process_message(self, message, user_context=None, chat_history=None, on_chunk=None):
 		"""
 		Process user message with Gemini API
 
@@ -300,6 +366,7 @@ class GeminiService:
 			message (str): User's message
 			user_context (dict): User context information
 			chat_history (list): Previous chat messages
+			on_chunk (callable): Optional; streams the reply, called with each text delta
 
 		Returns:
 			dict: AI response and metadata
@@ -321,12 +388,42 @@ class GeminiService:
 			# Analyze query intent and get contextual data
 			context_service = ContextService()
 			query_analysis = context_service.analyze_query_intent(message)
+
+			# Semantic cache: paraphrases of non-personal questions skip the LLM
+			from assistant_crm.services import semantic_cache
+
+			intent = query_analysis.get("intent")
+			semantic_scope = semantic_cache.make_scope(
+				"gemini", (user_context or {}).get("language"), (user_context or {}).get("channel_type")
+			)
+			semantic_cacheable = (
+				intent in SEMANTIC_CACHE_INTENTS
+				and not chat_history
+				and semantic_cache.is_cacheable(message, intent, user_context)
+			)
+			if semantic_cacheable:
+				hit = semantic_cache.lookup(semantic_scope, message, intent)
+				if hit:
+					if on_chunk is not None:
+						on_chunk(hit["response"])
+					return {
+						"response": hit["response"],
+						"cached": True,
+						"context_data": {
+							"model": self.model,
+							"semantic_cache": {"similarity": hit["similarity"], "entry_id": hit["entry_id"]},
+						},
+					}
+
 			contextual_data = context_service.get_contextual_data(
 				query_analysis["intent"],
 				query_analysis["entities"],
 				user_context,
 				message  # Pass the original query for enhanced processing
 			)
+			# Only ContextService's generic help note is shareable; any looked-up data keeps the reply private
+			if semantic_cacheable and set(contextual_data or {}) - {"message", "error"}:
+				semantic_cacheable = False
 
 			# Check if we have direct data response
 			if contextual_data.get("direct_data") and contextual_data.get("formatted_response"):
@@ -343,18 +440,31 @@ class GeminiService:
 
 				return direct_response
 
-			# Build the prompt with contextual data
-			system_prompt = self._build_system_prompt(user_context)
-			history_context = self._format_chat_history(chat_history)
-			context_info = self._format_contextual_data(contextual_data, query_analysis)
+			# Build the prompt: contextual data first, then as much recent history as the budget allows.
+			# A reply that may be served to other users is built without this user's details.
+			user_prompt = self._format_user_context(None if semantic_cacheable else user_context)
+			context_budget, history_reserve = prompt_builder.split_budget(chat_history)
+			context_info = prompt_builder.truncate(
+				self._format_contextual_data(contextual_data, query_analysis), context_budget, self.model
+			)
+			context_tokens = prompt_builder.count_tokens(context_info, self.model)
+			history_context = self._format_chat_history(
+				chat_history, context_budget + history_reserve - context_tokens
+			)
+			prompt_text = f"{user_prompt}\n\n{history_context}\n\n{context_info}\n\nUser Question: {message}"
+			prompt_builder.record_prompt(
+				prompt_builder.count_static_tokens(GEMINI_SYSTEM_PROMPT, self.model)
+				+ prompt_builder.count_tokens(prompt_text, self.model)
+			)
 
-			# Prepare the request payload
+			# Prepare the request payload; the static system prompt leads so Gemini can cache it
 			payload = {
+				"systemInstruction": {"parts": [{"text": GEMINI_SYSTEM_PROMPT}]},
 				"contents": [
 					{
 						"parts": [
 							{
-								"text": f"{system_prompt}\n\n{history_context}\n\n{context_info}\n\nUser Question: {message}"
+								"text": prompt_text
 							}
 						]
 					}
@@ -388,25 +498,15 @@ class GeminiService:
 			# Make API request with error handling and monitoring
 			error_handler = get_error_handler("gemini_api")
 			monitoring_service = get_monitoring_service()
+			llm_started = time.time()
 
 			def make_api_request():
-				# Implement rate limiting
-				current_time = time.time()
-				time_since_last_request = current_time - self.last_request_time
-
-				if time_since_last_request < self.min_request_interval:
-					sleep_time = self.min_request_interval - time_since_last_request
-					time.sleep(sleep_time)
-
-				self.last_request_time = time.time()
+				# Rate limiting is cluster-wide, inside _post_generate_content
 				start_time = time.time()
 				url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
-				headers = {
-					"Content-Type": "application/json"
-				}
 
 				try:
-					response = requests.post(url, headers=headers, json=payload, timeout=30)
+					response = self._post_generate_content(url, payload, timeout=30)
 
 					# Handle quota exceeded specifically
 					if response.status_code == 429:
@@ -436,10 +536,16 @@ class GeminiService:
 					monitoring_service.record_api_call("gemini_api", "generateContent", response_time, status, str(e))
 					raise
 
-			response = error_handler.execute_with_retry(make_api_request)
+			if on_chunk is not None:
+				from assistant_crm.services.llm_streaming import tee
 
-			# Parse response
-			response_data = response.json()
+				streamed_text = tee(on_chunk, self.stream_generate_content(payload))
+				response_data = {"candidates": [{"content": {"parts": [{"text": streamed_text}]}}]} if streamed_text else {}
+			else:
+				response = error_handler.execute_with_retry(make_api_request)
+
+				# Parse response
+				response_data = response.json()
 
 			if "candidates" in response_data and len(response_data["candidates"]) > 0:
 				ai_response = response_data["candidates"][0]["content"]["parts"][0]["text"]
@@ -455,6 +561,10 @@ class GeminiService:
 
 				# Cache successful response
 				cache_service.cache_response(message, response_dict, user_context)
+				if semantic_cacheable:
+					semantic_cache.store(
+						semantic_scope, message, ai_response, intent, latency_ms=(time.time() - llm_started) * 1000
+					)
 
 				return response_dict
 			else:
@@ -516,10 +626,6 @@ class GeminiService:
 			full_prompt = f"{system_prompt}\n\nUser Message: {message}\n\nPlease respond in {self._get_language_name(language)} language."
 
 			# Make API request
-			headers = {
-				"Content-Type": "application/json"
-			}
-
 			data = {
 				"contents": [{
 					"parts": [{
@@ -541,7 +647,7 @@ class GeminiService:
 			}
 
 			url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
-			response = requests.post(url, json=data, headers=headers, timeout=30)
+			response = self._post_generate_content(url, data, timeout=30)
 
 			if response.status_code != 200:
 				import frappe
@@ -568,7 +674,7 @@ class GeminiService:
 		language_names = {"en": "English", "bem": "Bemba", "ny": "Nyanja", "to": "Tonga"}
 		return language_names.get(language_code, "English")
 
-	def generate_response_with_context(self, message: str, context: dict = None) -> str:
+	def generate_response_with_context(self, message: str, context: dict = None, on_chunk=None) -> str:
 		"""
 		Generate AI response with live data context (replaces response assembler)
 		"""
@@ -576,7 +682,7 @@ class GeminiService:
 			# Build enhanced prompt with live data context
 			enhanced_prompt = self._build_enhanced_prompt_with_context(message, context or {})
 			# Generate response using Gemini
-			response = self.generate_response(enhanced_prompt)
+			response = self.generate_response(enhanced_prompt, on_chunk=on_chunk)
 			if response and isinstance(response, str) and response.strip():
 				return response.strip()
 			else:
@@ -664,8 +770,8 @@ Always be warm, professional, and helpful. Keep responses concise but informativ
 		}
 		return fallback_responses.get(intent, fallback_responses['unknown'])
 
-	def generate_response(self, prompt: str) -> str:
-		"""Send a composed prompt to Gemini and return the model text"""
+	def generate_response(self, prompt: str, on_chunk=None) -> str:
+		"""Send a composed prompt to Gemini and return the model text (streamed to ``on_chunk`` if given)"""
 		payload = {
 			"contents": [{"parts": [{"text": prompt}]}],
 			"generationConfig": {"temperature": 0.7, "topK": 40, "topP": 0.95, "maxOutputTokens": 1024},
@@ -677,23 +783,21 @@ Always be warm, professional, and helpful. Keep responses concise but informativ
 			]
 		}
 		url = f"{self.base_url}/{self.model}:generateContent?key={self.api_key}"
-		headers = {"Content-Type": "application/json"}
 		error_handler = get_error_handler("gemini_api")
 		monitoring_service = get_monitoring_service()
 		def make_api_request():
-			current_time = time.time()
-			time_since_last = current_time - self.last_request_time
-			if time_since_last < self.min_request_interval:
-				time.sleep(self.min_request_interval - time_since_last)
-			self.last_request_time = time.time()
 			start = time.time()
-			resp = requests.post(url, headers=headers, json=payload, timeout=30)
+			resp = self._post_generate_content(url, payload, timeout=30)
 			if resp.status_code == 429:
 				raise requests.exceptions.HTTPError(f"429 Rate limit exceeded: {resp.text}")
 			resp.raise_for_status()
 			monitoring_service.record_api_call("gemini_api", "generateContent", (time.time()-start)*1000, "success")
 			return resp
 		try:
+			if on_chunk is not None:
+				from assistant_crm.services.llm_streaming import tee
+
+				return tee(on_chunk, self.stream_generate_content(payload)).strip()
 			response = error_handler.execute_with_retry(make_api_request)
 			data = response.json()
 			if "candidates" in data and data["candidates"]:
@@ -0,0 +1,164 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Server-pushed Unified Inbox updates.
+
+Instead of every open inbox tab re-polling the conversation list, writes to
+conversations and messages queue a compact delta here. Deltas are coalesced
+per transaction and published once, after commit, as a single
+``unified_inbox_delta`` event on the Unified Inbox Conversation doctype room
+(only users who can read conversations are subscribed).
+
+Event payload::
+
+    {
+        "conversations": [<compact conversation row>, ...],
+        "messages": [<message row as returned by get_conversation_messages>, ...],
+        "deliveries": [{"name", "conversation", "delivery_status"}, ...],
+        "server_time": "<datetime>",   # use as ``since`` for catch-up
+    }
+
+Clients that reconnect call ``get_changes_since(since)`` to catch up on
+anything published while they were offline.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import now
+
+EVENT = "unified_inbox_delta"
+ROOM_DOCTYPE = "Unified Inbox Conversation"
+
+# Conversation fields pushed to the list view
+CONVERSATION_DELTA_FIELDS = [
+    "name", "conversation_id", "platform", "customer_name", "customer_phone",
+    "status", "priority", "assigned_agent", "ai_mode", "last_message_time",
+    "last_message_preview", "message_count", "unread_count", "custom_issue_id", "modified",
+    # read by the survey filter in renderConversations
+    "tags", "subject",
+]
+
+# Conversation fields whose change should be pushed immediately
+WATCHED_CONVERSATION_FIELDS = {
+    "status", "priority", "assigned_agent", "ai_mode", "customer_name",
+    "last_message_time", "last_message_preview", "custom_issue_id", "tags", "subject",
+}
+
+# Message fields pushed to an open thread (mirrors get_conversation_messages)
+MESSAGE_DELTA_FIELDS = [
+    "name", "conversation", "message_id", "direction", "message_type", "message_content",
+    "sender_name", "timestamp", "processed_by_ai", "ai_response", "ai_confidence",
+    "handled_by_agent", "agent_response", "has_attachments", "attachments_data",
+    "delivery_status", "read_status",
+]
+
+CATCH_UP_LIMIT = 200
+
+
+def _pending() -> Optional[Dict[str, Any]]:
+    return getattr(frappe.local, "_assistant_crm_inbox_deltas", None)
+
+
+def _ensure_pending() -> Dict[str, Any]:
+    pending = _pending()
+    if pending is None:
+        pending = {"conversations": set(), "messages": [], "deliveries": []}
+        frappe.local._assistant_crm_inbox_deltas = pending
+        db = getattr(frappe, "db", None)
+        if getattr(db, "after_commit", None) is not None:
+            db.after_commit.add(flush)
+        if getattr(db, "after_rollback", None) is not None:
+            db.after_rollback.add(_discard)
+    return pending
+
+
+def _discard() -> None:
+    frappe.local._assistant_crm_inbox_deltas = None
+
+
+def queue_conversation_delta(conversation: str) -> None:
+    """Mark a conversation as changed in the current transaction."""
+    if not conversation:
+        return
+    try:
+        _ensure_pending()["conversations"].add(conversation)
+    except Exception:
+        pass
+
+
+def queue_message_delta(message_doc) -> None:
+    """Queue a newly inserted message (and its conversation) for push."""
+    try:
+        pending = _ensure_pending()
+        pending["messages"].append({f: message_doc.get(f) for f in MESSAGE_DELTA_FIELDS})
+        if message_doc.get("conversation"):
+            pending["conversations"].add(message_doc.conversation)
+    except Exception:
+        pass
+
+
+def queue_delivery_update(message_name: str, conversation: str, delivery_status: str) -> None:
+    """Queue an outbound message's delivery_status change for push."""
+    try:
+        _ensure_pending()["deliveries"].append(
+            {"name": message_name, "conversation": conversation, "delivery_status": delivery_status}
+        )
+    except Exception:
+        pass
+
+
+def flush() -> None:
+    """Publish all deltas collected in this transaction as one event."""
+    pending = _pending()
+    frappe.local._assistant_crm_inbox_deltas = None
+    if not pending or not (pending["conversations"] or pending["messages"] or pending["deliveries"]):
+        return
+
+    try:
+        conversations = []
+        if pending["conversations"]:
+            conversations = frappe.get_all(
+                "Unified Inbox Conversation",
+                filters={"name": ["in", list(pending["conversations"])]},
+                fields=CONVERSATION_DELTA_FIELDS,
+                ignore_permissions=True,
+            )
+
+        frappe.publish_realtime(
+            EVENT,
+            {
+                "conversations": conversations,
+                "messages": pending["messages"],
+                "deliveries": pending["deliveries"],
+                "server_time": now(),
+            },
+            doctype=ROOM_DOCTYPE,
+        )
+    except Exception as e:
+        frappe.log_error(f"Failed to publish inbox delta: {str(e)}", "Unified Inbox - Realtime")
+
+
+def get_changes_since(since: Optional[str], limit: int = CATCH_UP_LIMIT) -> Dict[str, Any]:
+    """Conversations modified after ``since`` (indexed on ``modified``).
+
+    Returns ``truncated`` when more rows changed than ``limit``; the client
+    should then fall back to a full list reload.
+    """
+    server_time = now()
+    if not since:
+        return {"conversations": [], "server_time": server_time, "truncated": True}
+
+    rows: List[Dict[str, Any]] = frappe.get_all(
+        "Unified Inbox Conversation",
+        filters={"modified": [">", since], "docstatus": ["!=", 2]},
+        fields=CONVERSATION_DELTA_FIELDS,
+        order_by="modified desc",
+        limit=limit + 1,
+    )
+    return {
+        "conversations": rows[:limit],
+        "server_time": server_time,
+        "truncated": len(rows) > limit,
+    }
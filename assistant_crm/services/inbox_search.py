@@ -0,0 +1,249 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Unified Inbox search backed by MariaDB FULLTEXT indexes.
+
+The previous search LEFT JOINed every Unified Inbox Message and ORed eight
+``LIKE '%kw%'`` predicates, i.e. a full scan of the message table per
+keystroke. This module instead resolves candidates from indexes only:
+
+- FULLTEXT on Unified Inbox Conversation
+  (customer_name, customer_email, last_message_preview, subject, tags)
+- FULLTEXT on Unified Inbox Message (message_content, sender_name)
+- B-tree prefix matches for customer_phone, customer_nrc and assigned_agent,
+  so "0977" or "123456/" find numbers and NRCs as the agent types
+
+InnoDB maintains FULLTEXT indexes on insert, so new messages are searchable
+without any extra bookkeeping. Results are ranked by relevance, then
+recency, and paged with an opaque keyset cursor.
+
+The indexes are created by ``patches.v1.add_unified_inbox_search_indexes``;
+until that patch has run, ``search`` falls back to the legacy LIKE query.
+"""
+
+import base64
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import frappe
+
+CONVERSATION_FT_INDEX = "inbox_search_conversation_ft"
+MESSAGE_FT_INDEX = "inbox_search_message_ft"
+CONVERSATION_FT_COLUMNS = ("customer_name", "customer_email", "last_message_preview", "subject", "tags")
+MESSAGE_FT_COLUMNS = ("message_content", "sender_name")
+
+# Relevance boosts: an identifier prefix hit outranks free-text relevance
+PREFIX_MATCH_SCORE = 100.0
+CONVERSATION_FT_WEIGHT = 2.0
+MESSAGE_FT_WEIGHT = 1.0
+
+# Bound the message-branch candidate set so a very common word cannot turn
+# into a multi-million-row aggregation
+MAX_MESSAGE_CANDIDATES = 5000
+
+# InnoDB default innodb_ft_min_token_size
+MIN_FT_TOKEN = 3
+
+_INDEX_CACHE_KEY = "assistant_crm:inbox_search:ft_ready"
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+RESULT_FIELDS = [
+    "c.name as name",
+    "c.conversation_id as conversation_id",
+    "c.platform as platform",
+    "c.customer_name as customer_name",
+    "c.customer_phone as customer_phone",
+    "c.customer_email as customer_email",
+    "c.customer_nrc as customer_nrc",
+    "c.subject as subject",
+    "c.tags as tags",
+    "c.status as status",
+    "c.priority as priority",
+    "c.assigned_agent as assigned_agent",
+    "c.creation_time as creation_time",
+    "c.last_message_time as last_message_time",
+    "c.last_message_preview as last_message_preview",
+    "c.ai_handled as ai_handled",
+    "c.ai_mode as ai_mode",
+    "c.ai_confidence_score as ai_confidence_score",
+    "c.has_active_call as has_active_call",
+    "c.call_status as call_status",
+    "c.custom_issue_id as custom_issue_id",
+    "c.custom_issue_id as issue_id",
+    "IFNULL(c.message_count, 0) AS message_count",
+    "IFNULL(c.unread_count, 0) AS unread_count",
+]
+
+
+def fulltext_indexes_ready() -> bool:
+    """True once both FULLTEXT indexes exist (cached per site)."""
+    cached = frappe.cache().get_value(_INDEX_CACHE_KEY)
+    if cached is not None:
+        return bool(cached)
+
+    ready = True
+    try:
+        for table, index in (
+            ("tabUnified Inbox Conversation", CONVERSATION_FT_INDEX),
+            ("tabUnified Inbox Message", MESSAGE_FT_INDEX),
+        ):
+            if not frappe.db.sql(f"SHOW INDEX FROM `{table}` WHERE Key_name = %s", index):
+                ready = False
+                break
+    except Exception:
+        ready = False
+
+    frappe.cache().set_value(_INDEX_CACHE_KEY, int(ready), expires_in_sec=3600)
+    return ready
+
+
+def clear_index_cache() -> None:
+    frappe.cache().delete_value(_INDEX_CACHE_KEY)
+
+
+def build_boolean_query(keyword: str) -> Optional[str]:
+    """Turn free text into a BOOLEAN MODE query: every token required, prefix-matched.
+
+    Returns None when no token is long enough for the FULLTEXT parser.
+    """
+    tokens = [t for t in _BOOLEAN_OPERATORS.sub(" ", keyword or "").split() if len(t) >= MIN_FT_TOKEN]
+    if not tokens:
+        return None
+    return " ".join(f"+{t}*" for t in tokens)
+
+
+def _identifier_prefixes(keyword: str) -> Dict[str, str]:
+    """Prefix patterns for phone numbers, NRCs and agent ids."""
+    kw = (keyword or "").strip()
+    prefixes = {"raw": f"{_escape_like(kw)}%"}
+    digits = re.sub(r"\D", "", kw)
+    if len(digits) >= 3:
+        prefixes["digits"] = f"{digits}%"
+        prefixes["plus_digits"] = f"+{digits}%"
+    return prefixes
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(score: float, last_message_time: Any, name: str) -> str:
+    payload = json.dumps([float(score or 0), str(last_message_time or ""), name])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[float, str, str]]:
+    if not cursor:
+        return None
+    try:
+        score, lmt, name = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return float(score), lmt, name
+    except Exception:
+        frappe.throw("Invalid search cursor")
+
+
+def search(keyword: str, limit: int = 50, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Ranked, cursor-paged conversation search.
+
+    Returns ``{"data": [...], "next_cursor": str | None}``.
+    """
+    keyword = (keyword or "").strip()
+    limit = max(1, min(int(limit or 50), 200))
+    boolean_query = build_boolean_query(keyword)
+    prefixes = _identifier_prefixes(keyword)
+
+    branches: List[str] = [
+        # Identifier prefix matches use the B-tree indexes on these columns
+        f"""
+        SELECT name, {PREFIX_MATCH_SCORE} AS score FROM `tabUnified Inbox Conversation`
+        WHERE customer_nrc LIKE %(raw)s OR assigned_agent LIKE %(raw)s OR customer_phone LIKE %(raw)s
+        """
+    ]
+    if "digits" in prefixes:
+        branches.append(
+            f"""
+            SELECT name, {PREFIX_MATCH_SCORE} AS score FROM `tabUnified Inbox Conversation`
+            WHERE customer_phone LIKE %(digits)s OR customer_phone LIKE %(plus_digits)s
+               OR customer_nrc LIKE %(digits)s
+            """
+        )
+    platform = _match_platform(keyword)
+    if platform:
+        branches.append(
+            f"SELECT name, {PREFIX_MATCH_SCORE / 2} AS score FROM `tabUnified Inbox Conversation` WHERE platform = %(platform)s"
+        )
+    if boolean_query:
+        conv_cols = ", ".join(CONVERSATION_FT_COLUMNS)
+        msg_cols = ", ".join(MESSAGE_FT_COLUMNS)
+        branches.append(
+            f"""
+            SELECT name, MATCH({conv_cols}) AGAINST (%(ft)s IN BOOLEAN MODE) * {CONVERSATION_FT_WEIGHT} AS score
+            FROM `tabUnified Inbox Conversation`
+            WHERE MATCH({conv_cols}) AGAINST (%(ft)s IN BOOLEAN MODE)
+            """
+        )
+        branches.append(
+            f"""
+            SELECT conversation AS name, MAX(ft_score) * {MESSAGE_FT_WEIGHT} AS score FROM (
+                SELECT conversation, MATCH({msg_cols}) AGAINST (%(ft)s IN BOOLEAN MODE) AS ft_score
+                FROM `tabUnified Inbox Message`
+                WHERE MATCH({msg_cols}) AGAINST (%(ft)s IN BOOLEAN MODE)
+                ORDER BY ft_score DESC
+                LIMIT {MAX_MESSAGE_CANDIDATES}
+            ) hits
+            GROUP BY conversation
+            """
+        )
+
+    params: Dict[str, Any] = {**prefixes, "ft": boolean_query, "platform": platform, "limit": limit + 1}
+
+    cursor_clause = ""
+    decoded = decode_cursor(cursor)
+    if decoded:
+        params.update({"c_score": decoded[0], "c_lmt": decoded[1] or None, "c_name": decoded[2]})
+        cursor_clause = """
+            AND (
+                ranked.score < %(c_score)s
+                OR (ranked.score = %(c_score)s AND (
+                    IFNULL(c.last_message_time, '1970-01-01') < IFNULL(%(c_lmt)s, '1970-01-01')
+                    OR (IFNULL(c.last_message_time, '1970-01-01') = IFNULL(%(c_lmt)s, '1970-01-01')
+                        AND c.name < %(c_name)s)
+                ))
+            )
+        """
+
+    sql = f"""
+        SELECT {', '.join(RESULT_FIELDS)}, ranked.score AS search_score
+        FROM (
+            SELECT name, SUM(score) AS score
+            FROM ({' UNION ALL '.join(branches)}) candidates
+            GROUP BY name
+        ) ranked
+        INNER JOIN `tabUnified Inbox Conversation` c ON c.name = ranked.name
+        WHERE c.docstatus != 2 {cursor_clause}
+        ORDER BY ranked.score DESC, c.last_message_time DESC, c.name DESC
+        LIMIT %(limit)s
+    """
+    rows = frappe.db.sql(sql, params, as_dict=True)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.search_score, last.last_message_time, last.name)
+
+    return {"data": rows, "next_cursor": next_cursor}
+
+
+def _match_platform(keyword: str) -> Optional[str]:
+    """Exact (case-insensitive) platform name match, e.g. "whatsapp"."""
+    try:
+        options = frappe.get_meta("Unified Inbox Conversation").get_field("platform").options or ""
+    except Exception:
+        return None
+    for option in options.split("\n"):
+        if option and option.lower() == keyword.lower():
+            return option
+    return None
@@ -0,0 +1,139 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Per-process registry of social media platform integrations.
+
+Building a ``WhatsAppIntegration`` / ``FacebookIntegration`` / ... re-reads
+Social Media Settings (and decrypts its passwords) every time, and the
+integrations used bare ``requests.post`` with no connection reuse. This
+module keeps:
+
+- one integration instance per (site, platform) and worker thread, rebuilt
+  only when Social Media Settings changes. Saving the settings bumps a
+  version stamp in the shared cache (``invalidate``), so every process
+  notices on its next lookup.
+- one ``requests.Session`` per platform and process, with connection pooling
+  and the same retry/backoff adapter as ``WorkersNotifyGateway._build_session``
+  (plus 429). urllib3's default ``allowed_methods`` is kept, so POSTs are only
+  retried on connection failures, never after the platform received them.
+
+Site config keys (all optional):
+- social_http_pool_maxsize: pooled connections per host (default 20)
+- social_http_max_retries: retry attempts (default 3)
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+VERSION_CACHE_KEY = "assistant_crm:social_media_settings_version"
+
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_MAX_RETRIES = 3
+
+_local = threading.local()
+_sessions: Dict[str, requests.Session] = {}  # "<platform>:<retries>" -> session
+_sessions_lock = threading.Lock()
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _site() -> str:
+    return getattr(frappe.local, "site", None) or "default"
+
+
+def _instances() -> Dict[Tuple[str, str], Tuple[str, object]]:
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    return instances
+
+
+def _settings_version() -> str:
+    try:
+        version = frappe.cache().get_value(VERSION_CACHE_KEY)
+    except Exception:
+        return ""
+    return str(version or "")
+
+
+def get_integration(platform_name: str, platform_class) -> object:
+    """Cached ``platform_class()`` for the current site."""
+    key = (_site(), platform_name)
+    version = _settings_version()
+    cached = _instances().get(key)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    instance = platform_class()
+    _instances()[key] = (version, instance)
+    return instance
+
+
+def invalidate(doc=None, method=None) -> None:
+    """Drop cached integrations in every process (doc_events hook on Social Media Settings)."""
+    _instances().clear()
+    try:
+        frappe.cache().set_value(VERSION_CACHE_KEY, f"{time.time():.6f}")
+    except Exception:
+        pass
+
+
+def get_session(platform_name: str, max_retries: Optional[int] = None) -> requests.Session:
+    """Shared keep-alive session for one platform's HTTP calls.
+
+    Pass ``max_retries=0`` for long-poll style requests that must not be
+    silently re-issued after a read timeout.
+    """
+    retries = int(_conf("social_http_max_retries", DEFAULT_MAX_RETRIES)) if max_retries is None else int(max_retries)
+    key = f"{platform_name}:{retries}"
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _build_session(retries)
+            _sessions[key] = session
+    return session
+
+
+def _build_session(retries: int) -> requests.Session:
+    session = requests.Session()
+
+    retry_strategy = Retry(
+        total=retries,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+    pool_size = int(_conf("social_http_pool_maxsize", DEFAULT_POOL_MAXSIZE))
+    adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def reset_sessions() -> None:
+    """Close and forget all pooled sessions (tests / benchmarks)."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+        _sessions.clear()
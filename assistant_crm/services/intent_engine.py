@@ -0,0 +1,561 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Shared, precompiled keyword intent engine.
+
+``reply_service.detect_intent``, ``IntentRouter._detect_intent``,
+``StreamlinedReplyService._detect_intent``,
+``performance_optimizer.detect_intent_ultra_fast`` and
+``EnhancedIntentClassifier`` each ran their own substring loop over their own
+keyword lists on every message. ``detect_intent`` also rebuilt its pattern
+dict on every call. Their keyword sets and weights now live here as data, and
+one engine is built from all of them once per process:
+
+- ``KeywordMatcher`` compiles every keyword into a single trie-shaped regex
+  alternation. Each match is the longest keyword starting at that position.
+  Every shorter keyword that is a prefix of it is added from a precomputed
+  table, and the search resumes one character later. The result is exactly
+  the set of keywords ``kw in message.lower()`` would find, overlaps
+  included.
+- Each table keeps postings (keyword -> intents), so scoring only touches
+  the keywords that actually matched.
+- ``IntentEngine.scan`` runs that pass once per distinct message (LRU) and
+  every table reads the same result. A message that goes through the router,
+  the streamlined service and the classifier is scanned once.
+- The scorers (``classify_reply``, ``classify_router``, ...) reproduce each
+  service's original scoring, including the order of float additions, so
+  intents and confidences are unchanged. This is checked against the old
+  scans in ``tests/test_intent_engine.py`` and measured by
+  ``scripts/benchmark_intent_engine.py``.
+
+This module has no Frappe dependency.
+"""
+
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+SCAN_CACHE_SIZE = 4096
+
+# ---------------------------------------------------------------------------
+# Keyword tables: {intent: {"keywords": [...], "weight": w}}
+# ---------------------------------------------------------------------------
+
+# reply_service.detect_intent
+REPLY_INTENTS = {
+    'greeting': {
+        'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'],
+        'weight': 0.9
+    },
+    'employer_registration': {
+        'keywords': ['register as employer', 'employer registration', 'register my company', 'register my business', 'business registration', 'company registration', 'how to register', 'register employer', 'become an employer', 'employer signup', 'register as an employer', 'how do i register', 'registration process', 'register with wcfcb', 'employer account', 'business account'],
+        'weight': 0.95
+    },
+    'pension_inquiry': {
+        'keywords': ['pension', 'retirement', 'benefit', 'monthly payment', 'pension status', 'pension amount'],
+        'weight': 0.8
+    },
+    'claim_submission': {
+        'keywords': ['submit claim', 'new claim', 'file claim', 'claim form', 'apply for', 'make a claim', 'need help with my claim', 'help with claim', 'injured at work', 'workplace accident', 'workplace injury', 'hurt at work', 'accident at work', 'fell at work', 'cut at work', 'burned at work', 'need to submit', 'want to submit', 'submit a claim'],
+        'weight': 0.9
+    },
+    'claim_status': {
+        'keywords': ['claim status', 'check claim', 'claim progress', 'claim update', 'my claim', 'status', 'need claim status', 'check status', 'claim #', 'reference number', 'wc-'],
+        'weight': 0.8
+    },
+    'payment_status': {
+        'keywords': ['payment', 'money', 'pay', 'salary', 'when will i receive', 'payment date', 'payment schedule', 'disability benefit', 'pension payment', 'benefit payment', 'when will my', 'payment arrive', 'payment information'],
+        'weight': 0.8
+    },
+    'document_request': {
+        'keywords': ['document', 'form', 'paperwork', 'certificate', 'what do i need', 'required documents', 'forms', 'confused about forms', 'about the forms'],
+        'weight': 0.7
+    },
+    'agent_request': {
+        'keywords': ['agent', 'human', 'person', 'speak to', 'talk to', 'representative', 'help me', 'escalate'],
+        'weight': 0.9
+    },
+    'complaint': {
+        'keywords': ['complaint', 'problem', 'issue', 'dissatisfied', 'unhappy', 'wrong', 'error'],
+        'weight': 0.8
+    },
+    'technical_help': {
+        'keywords': ['login', 'password', 'website', 'app', 'technical', 'cant access', 'not working', 'can\'t log in', 'cannot log in', 'log into', 'error message', 'invalid credentials', 'website not working', 'site not loading', 'getting error'],
+        'weight': 0.8
+    },
+    'goodbye': {
+        'keywords': ['bye', 'goodbye', 'thank you', 'thanks', 'done', 'finished', 'thats all'],
+        'weight': 0.9
+    }
+}
+
+# IntentRouter._detect_intent
+ROUTER_INTENTS = {
+    'claim_status': {
+        'keywords': ['claim status', 'my claim', 'claim progress', 'claim update', 'check claim', 'claim number'],
+        'weight': 1.0
+    },
+    'payment_status': {
+        'keywords': ['when will i receive', 'payment date', 'benefit payment', 'payment schedule', 'next payment', 'upcoming payment', 'last payment', 'when was my last payment', 'payment made', 'recent payment', 'latest payment', 'payment status', 'when will', 'receive payment', 'payment'],
+        'weight': 1.0
+    },
+    'pension_inquiry': {
+        'keywords': ['pension', 'retirement', 'pension benefits', 'retirement benefits', 'pension amount'],
+        'weight': 1.0
+    },
+    'claim_submission': {
+        'keywords': ['submit claim', 'submit a claim', 'new claim', 'file claim', 'how do i submit', 'injured at work', 'workplace accident'],
+        'weight': 1.0
+    },
+    'account_info': {
+        'keywords': ['my account', 'account information', 'profile', 'personal details', 'contact information'],
+        'weight': 0.9
+    },
+    'payment_history': {
+        'keywords': ['payment history', 'past payments', 'payment records', 'transaction history', 'my payment history', 'show me my payment history', 'previous payments'],
+        'weight': 1.0
+    },
+    'document_status': {
+        'keywords': ['documents', 'document status', 'paperwork', 'forms', 'required documents'],
+        'weight': 0.9
+    },
+    'employer_registration': {
+        'keywords': ['register employer', 'business registration', 'company registration', 'employer setup'],
+        'weight': 0.8
+    },
+    'agent_request': {
+        'keywords': ['speak to human', 'speak to someone', 'talk to agent', 'human assistance', 'representative', 'escalate', 'need to speak', 'i need help', 'need help', 'help me'],
+        'weight': 0.8
+    },
+    'technical_help': {
+        'keywords': ['login problem', 'password', 'website not working', 'technical issue', 'system error'],
+        'weight': 0.8
+    },
+    'greeting': {
+        'keywords': ['hello', 'hi', 'good morning', 'good afternoon', 'hey', 'greetings'],
+        'weight': 0.7
+    },
+    'goodbye': {
+        'keywords': ['thank you', 'thanks', 'goodbye', 'bye', 'that\'s all', 'done'],
+        'weight': 0.7
+    }
+}
+
+# StreamlinedReplyService._detect_intent
+STREAMLINED_INTENTS = {
+    'simple_greeting': {
+        'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'],
+        'weight': 0.95
+    },
+    'greeting': {
+        'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'],
+        'weight': 0.9
+    },
+    'employer_registration': {
+        'keywords': ['register as employer', 'employer registration', 'register my company', 'register my business', 'business registration', 'company registration', 'how to register', 'register employer', 'become an employer'],
+        'weight': 0.95
+    },
+    'pension_inquiry': {
+        'keywords': ['pension', 'retirement', 'benefit', 'monthly payment', 'pension status', 'pension amount'],
+        'weight': 0.8
+    },
+    'claim_submission': {
+        'keywords': ['submit claim', 'new claim', 'file claim', 'claim form', 'apply for', 'make a claim', 'injured at work', 'workplace accident', 'workplace injury', 'hurt at work'],
+        'weight': 0.9
+    },
+    'claim_status': {
+        'keywords': ['claim status', 'check claim', 'claim progress', 'claim update', 'my claim', 'status', 'check status', 'claim #', 'reference number'],
+        'weight': 0.8
+    },
+    'payment_status': {
+        'keywords': ['payment', 'money', 'pay', 'salary', 'when will i receive', 'payment date', 'payment schedule', 'disability benefit', 'pension payment', 'benefit payment', 'last payment', 'payment history', 'payment status', 'payment update'],
+        'weight': 0.8
+    },
+    'document_request': {
+        'keywords': ['documents', 'forms', 'paperwork', 'what do i need', 'requirements', 'documentation', 'certificate', 'proof', 'what documents', 'documents do i need', 'documents needed'],
+        'weight': 0.85
+    },
+    'agent_request': {
+        'keywords': ['speak to agent', 'human', 'person', 'representative', 'talk to someone', 'escalate', 'supervisor'],
+        'weight': 0.9
+    },
+    'complaint': {
+        'keywords': ['complaint', 'problem', 'issue', 'dissatisfied', 'unhappy', 'frustrated', 'angry', 'wrong'],
+        'weight': 0.8
+    },
+    'technical_help': {
+        'keywords': ['login', 'password', 'website', 'error', 'not working', 'technical', 'system', 'app'],
+        'weight': 0.7
+    },
+    'goodbye': {
+        'keywords': ['bye', 'goodbye', 'thank you', 'thanks', 'done', 'finished', 'that\'s all'],
+        'weight': 0.8
+    }
+}
+
+# EnhancedIntentClassifier.check_static_information_intent
+STATIC_INFO_INTENTS = {
+    "general_help": {
+        "keywords": ["help", "how", "what", "explain", "tell me about"],
+        "confidence_base": 0.7
+    },
+    "process_info": {
+        "keywords": ["process", "procedure", "steps", "how to", "guide"],
+        "confidence_base": 0.8
+    },
+    "contact_info": {
+        "keywords": ["contact", "phone", "email", "office", "address", "location"],
+        "confidence_base": 0.9
+    },
+    "policy_info": {
+        "keywords": ["policy", "coverage", "benefits", "eligibility", "rules"],
+        "confidence_base": 0.8
+    },
+    "forms_documents": {
+        "keywords": ["form", "document", "download", "application", "paperwork"],
+        "confidence_base": 0.8
+    }
+}
+
+# EnhancedIntentClassifier.check_live_data_intent, per user persona
+LIVE_DATA_INTENTS = {
+    "beneficiary": {
+        "claim_status": {
+            "keywords": ["my claim", "claim status", "claim progress", "case status", "claim update"],
+            "entities": ["claim_number"],
+            "confidence_boost": 0.2
+        },
+        "payment_info": {
+            "keywords": ["payment", "compensation", "benefits", "money", "paid", "when will i get"],
+            "entities": ["amount", "date"],
+            "confidence_boost": 0.15
+        },
+        "medical_info": {
+            "keywords": ["doctor", "medical", "treatment", "appointment", "provider"],
+            "entities": ["provider_name", "date"],
+            "confidence_boost": 0.1
+        },
+        "profile_info": {
+            "keywords": ["my information", "my details", "contact", "address", "update my"],
+            "entities": ["phone", "email", "address"],
+            "confidence_boost": 0.1
+        }
+    },
+    "employer": {
+        "employee_claims": {
+            "keywords": ["employee claims", "worker claims", "staff claims", "company claims"],
+            "entities": ["employee_name", "claim_number"],
+            "confidence_boost": 0.2
+        },
+        "compliance_status": {
+            "keywords": ["compliance", "premium", "safety", "training", "audit"],
+            "entities": ["date", "percentage"],
+            "confidence_boost": 0.15
+        },
+        "company_analytics": {
+            "keywords": ["report", "analytics", "statistics", "summary", "dashboard"],
+            "entities": ["date_range", "metric"],
+            "confidence_boost": 0.1
+        }
+    },
+    "staff": {
+        "case_management": {
+            "keywords": ["case", "claim", "file", "review", "assign", "update"],
+            "entities": ["claim_number", "user_id"],
+            "confidence_boost": 0.2
+        },
+        "user_lookup": {
+            "keywords": ["user", "claimant", "employee", "lookup", "search"],
+            "entities": ["user_id", "name"],
+            "confidence_boost": 0.15
+        },
+        "system_analytics": {
+            "keywords": ["system", "performance", "analytics", "metrics", "health"],
+            "entities": ["metric", "date_range"],
+            "confidence_boost": 0.1
+        }
+    }
+}
+
+# Reply intents answered from live, per-customer data (reply_service,
+# StreamlinedReplyService); semantic_cache never stores their replies
+LIVE_DATA_REPLY_INTENTS = (
+    'claim_status', 'payment_status', 'payment_info', 'account_info',
+    'claim_inquiry', 'payment_inquiry', 'pension_inquiry', 'claim_submission'
+)
+
+# ---------------------------------------------------------------------------
+# Ordered first-match rules: [(intent, confidence, keywords)]
+# ---------------------------------------------------------------------------
+
+# StreamlinedReplyService phrase overrides, checked after pattern scoring
+STREAMLINED_OVERRIDES = [
+    ('gratitude', 0.95, ['thank you', 'thanks', 'thank', 'grateful', 'appreciate']),
+    ('document_request', 0.95, ['what documents', 'documents do i need', 'what do i need', 'requirements', 'paperwork']),
+    ('injury_report', 0.95, ['injured at work', 'workplace injury', 'hurt at work', 'accident at work']),
+    ('general_help', 0.85, ['i need help', 'help me', 'can you help']),
+    ('agent_request', 0.95, ['speak to agent', 'talk to agent', 'human agent', 'speak to someone']),
+    ('complaint', 0.90, ['complaint', 'problem', 'issue', 'frustrated']),
+    ('service_overview', 0.90, ['understand wcfcb services', 'what can you help', 'what services']),
+]
+
+# performance_optimizer.detect_intent_ultra_fast
+ULTRA_FAST_RULES = [
+    ('greeting', None, ['hi', 'hello', 'hey']),
+    ('claim_status', None, ['claim', 'clm-']),
+    ('payment_inquiry', None, ['payment', 'account', 'acc-']),
+    ('employer_status', None, ['employer', 'company', 'emp-']),
+    ('gratitude', None, ['thank', 'thanks']),
+]
+
+# EnhancedIntentClassifier.analyze_sentiment
+SENTIMENT_RULES = [
+    ('urgent', None, ["urgent", "emergency", "asap", "immediately", "help", "problem", "issue", "wrong"]),
+    ('negative', None, ["frustrated", "angry", "upset", "disappointed", "confused", "worried"]),
+    ('positive', None, ["thank", "great", "excellent", "perfect", "good", "happy", "satisfied"]),
+]
+
+# EnhancedIntentClassifier.extract_conversation_topic
+TOPIC_RULES = [
+    ('claims', None, ["claim", "case", "injury", "accident", "compensation"]),
+    ('payments', None, ["payment", "money", "benefits", "compensation", "paid"]),
+    ('medical', None, ["doctor", "medical", "treatment", "hospital", "provider"]),
+    ('employment', None, ["work", "job", "employer", "employee", "workplace"]),
+    ('compliance', None, ["compliance", "safety", "training", "audit", "premium"]),
+]
+
+TABLES = {
+    "reply": REPLY_INTENTS,
+    "router": ROUTER_INTENTS,
+    "streamlined": STREAMLINED_INTENTS,
+    "static_info": STATIC_INFO_INTENTS,
+    **{f"live_data:{persona}": patterns for persona, patterns in LIVE_DATA_INTENTS.items()},
+}
+
+RULES = {
+    "streamlined_overrides": STREAMLINED_OVERRIDES,
+    "ultra_fast": ULTRA_FAST_RULES,
+    "sentiment": SENTIMENT_RULES,
+    "topic": TOPIC_RULES,
+}
+
+
+# ---------------------------------------------------------------------------
+# Matcher
+# ---------------------------------------------------------------------------
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex for a set of words where, at any position, the longest word wins."""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # Greedy optional: try the longer words first, fall back to this one
+            return "(?:" + body + ")?" if len(branches) == 1 else body + "?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """All keywords occurring in a text as substrings, found in one regex pass."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(k.lower() for k in keywords if k))
+        # Without a leading lookahead the compiled pattern gets a first-character
+        # prefilter, so positions that cannot start a keyword are skipped in C
+        self._search = re.compile(_trie_pattern(self.keywords), re.DOTALL).search if self.keywords else None
+        # Keywords that are prefixes of (or equal to) each keyword
+        self._prefixes = {
+            keyword: frozenset(k for k in self.keywords if keyword.startswith(k))
+            for keyword in self.keywords
+        }
+
+    def find(self, text_lower: str) -> FrozenSet[str]:
+        """Leftmost-longest match, then resume one character later to catch overlaps."""
+        if self._search is None:
+            return frozenset()
+        found = set()
+        prefixes = self._prefixes
+        search = self._search
+        pos = 0
+        while True:
+            match = search(text_lower, pos)
+            if match is None:
+                break
+            found |= prefixes[match.group()]
+            pos = match.start() + 1
+        return frozenset(found)
+
+
+class IntentEngine:
+    """One matcher over every table's keywords; tables score from the shared scan."""
+
+    def __init__(self, tables: Dict[str, Dict[str, Dict]], rules: Dict[str, List[Tuple]]):
+        self.tables = tables
+        self.rules = rules
+        keywords = []
+        # keyword -> [(intent position, intent, keyword position)] per table
+        self._postings: Dict[str, Dict[str, List[Tuple[int, str, int]]]] = {}
+        for name, table in tables.items():
+            postings = self._postings[name] = {}
+            for intent_pos, (intent, pattern) in enumerate(table.items()):
+                for keyword_pos, keyword in enumerate(pattern["keywords"]):
+                    postings.setdefault(keyword, []).append((intent_pos, intent, keyword_pos))
+                keywords.extend(pattern["keywords"])
+        # keyword -> earliest rule position per rule list
+        self._rule_postings: Dict[str, Dict[str, int]] = {}
+        for name, rule_list in rules.items():
+            postings = self._rule_postings[name] = {}
+            for rule_pos, (_intent, _confidence, rule_keywords) in enumerate(rule_list):
+                for keyword in rule_keywords:
+                    postings.setdefault(keyword, rule_pos)
+                keywords.extend(rule_keywords)
+        self.matcher = KeywordMatcher(keywords)
+        self.scan = lru_cache(maxsize=SCAN_CACHE_SIZE)(self.matcher.find)
+
+    def matched(self, table: str, text_lower: str) -> Dict[str, List[str]]:
+        """Matched keywords per intent, both in table order (repeated keywords count twice)."""
+        postings = self._postings[table]
+        hits: Dict[Tuple[int, str], List[Tuple[int, str]]] = {}
+        for keyword in self.scan(text_lower):
+            for intent_pos, intent, keyword_pos in postings.get(keyword, ()):
+                hits.setdefault((intent_pos, intent), []).append((keyword_pos, keyword))
+        return {intent: [k for _, k in sorted(found)] for (_, intent), found in sorted(hits.items())}
+
+    def first_rule(self, rules: str, text_lower: str) -> Optional[Tuple[str, Optional[float]]]:
+        postings = self._rule_postings[rules]
+        first = min((postings[k] for k in self.scan(text_lower) if k in postings), default=None)
+        if first is None:
+            return None
+        intent, confidence, _keywords = self.rules[rules][first]
+        return intent, confidence
+
+
+_engine: Optional[IntentEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> IntentEngine:
+    """Process-wide engine, compiled on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = IntentEngine(TABLES, RULES)
+    return _engine
+
+
+def scan(message: str) -> FrozenSet[str]:
+    return get_engine().scan((message or "").lower())
+
+
+# ---------------------------------------------------------------------------
+# Scorers, one per original implementation
+# ---------------------------------------------------------------------------
+
+def classify_reply(message: str) -> Tuple[str, float]:
+    """``reply_service.detect_intent`` scoring (after its simple-greeting check)."""
+    message_lower = message.lower().strip()
+    best_intent = 'unknown'
+    best_score = 0.0
+
+    for intent, hits in get_engine().matched("reply", message_lower).items():
+        weight = REPLY_INTENTS[intent]['weight']
+        score = 0.0
+        phrase_bonus = 0
+        for keyword in hits:
+            if len(keyword.split()) > 1:
+                score += weight * 1.2
+                phrase_bonus += 1
+            else:
+                score += weight * 0.8
+        score = score + (phrase_bonus * 0.3)
+
+        message_length = len(message_lower.split())
+        if message_length > 10:
+            score = score * 0.8
+        elif message_length > 5:
+            score = score * 0.9
+
+        if score > best_score:
+            best_score = score
+            best_intent = intent
+
+    if best_score < 0.3:
+        best_intent = 'unknown'
+        best_score = 0.1
+
+    return best_intent, min(best_score, 1.0)
+
+
+def classify_router(message: str) -> Tuple[str, float]:
+    """``IntentRouter._detect_intent`` scoring (match ratio x weight)."""
+    if not message or not isinstance(message, str):
+        return 'unknown', 0.0
+
+    intent_scores = {}
+    for intent, hits in get_engine().matched("router", message.lower().strip()).items():
+        keywords = ROUTER_INTENTS[intent]['keywords']
+        weight = ROUTER_INTENTS[intent]['weight']
+        match_ratio = len(hits) / len(keywords)
+        if len(keywords) <= 6:
+            intent_scores[intent] = max(match_ratio * weight, 0.5 * weight)
+        else:
+            intent_scores[intent] = match_ratio * weight
+
+    if intent_scores:
+        best_intent = max(intent_scores, key=intent_scores.get)
+        best_score = intent_scores[best_intent]
+        if best_score >= 0.15:
+            return best_intent, best_score
+
+    return 'unknown', 0.0
+
+
+def streamlined_scores(message: str) -> Dict[str, float]:
+    """``StreamlinedReplyService`` pattern scores (sum of weights per matched keyword)."""
+    intent_scores = {}
+    for intent, hits in get_engine().matched("streamlined", message.lower().strip()).items():
+        weight = STREAMLINED_INTENTS[intent]['weight']
+        score = 0
+        for _keyword in hits:
+            score += weight
+        intent_scores[intent] = score
+    return intent_scores
+
+
+def streamlined_override(message: str) -> Optional[Tuple[str, float]]:
+    """First ``StreamlinedReplyService`` phrase override that applies, if any."""
+    return get_engine().first_rule("streamlined_overrides", message.lower().strip())
+
+
+def ultra_fast_intent(message: str) -> str:
+    """``performance_optimizer.detect_intent_ultra_fast`` rules."""
+    rule = get_engine().first_rule("ultra_fast", message.lower())
+    return rule[0] if rule else 'general_inquiry'
+
+
+def static_info_counts(message_lower: str) -> Dict[str, int]:
+    return {intent: len(hits) for intent, hits in get_engine().matched("static_info", message_lower).items()}
+
+
+def live_data_counts(persona: str, message_lower: str) -> Dict[str, int]:
+    table = f"live_data:{persona}" if persona in LIVE_DATA_INTENTS else "live_data:beneficiary"
+    return {intent: len(hits) for intent, hits in get_engine().matched(table, message_lower).items()}
+
+
+def first_match(rules: str, message_lower: str, default: Optional[str] = None) -> Optional[str]:
+    rule = get_engine().first_rule(rules, message_lower)
+    return rule[0] if rule else default
@@ -1,18 +1,183 @@
 # Copyright (c) 2025, WCFCB and contributors
 # For license information, please see license.txt
 
+"""
+Intent recognition against the Intent Definition doctype.
+
+Intent definitions, keywords, training examples and follow-up questions are
+read with four queries (the intents plus one bulk query per child table)
+into a process-wide snapshot per site. Every ``IntentRecognitionService``
+shares that snapshot instead of running 1 + 3N queries on instantiation.
+Saving, renaming or deleting an Intent Definition (child rows included) bumps a
+version stamp in the shared cache (``invalidate_intent_cache``, wired in
+``doc_events``), and each process reloads on its next lookup. Usage-stat
+updates made by ``update_intent_usage`` do not invalidate it.
+
+Each snapshot entry carries a ``_compiled`` ``CompiledIntent`` whose parts
+are tuples and are never mutated:
+
+- keywords grouped by language, lowercased, with their total weight
+- one ``SequenceMatcher`` per training example with the example already set
+  as the second sequence. Its junk/index tables are built once. Scoring
+  shallow-copies it and sets only the user message, and skips examples
+  whose length bound already rules them out. Scores are unchanged.
+"""
+
 import frappe
 from frappe import _
 import re
 import json
+import copy
 from difflib import SequenceMatcher
 import math
+import threading
 import uuid
 import time
+from collections import namedtuple
 from datetime import datetime
 import logging
 
 
+INTENT_CACHE_VERSION_KEY = "assistant_crm:intent_definitions_version"
+
+STOP_WORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had',
+    'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his',
+    'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy',
+    'did', 'she', 'use', 'way', 'will', 'with', 'what', 'when', 'where',
+    'why', 'this', 'that', 'they', 'them', 'there', 'their', 'then'
+})
+
+# keywords: {language: ((keyword_lower, weight, keyword_type), ...)}
+# keyword_weights: {language: total weight}
+# examples: {language: ((SequenceMatcher with the example as seq2, weight, length), ...)}
+CompiledIntent = namedtuple("CompiledIntent", ["keywords", "keyword_weights", "examples"])
+
+_snapshots = {}  # site -> (version, tuple of intent dicts)
+_snapshots_lock = threading.Lock()
+
+
+def _site():
+    return getattr(frappe.local, "site", None) or "default"
+
+
+def _cache_version():
+    try:
+        return str(frappe.cache().get_value(INTENT_CACHE_VERSION_KEY) or "")
+    except Exception:
+        return ""
+
+
+def invalidate_intent_cache(doc=None, method=None):
+    """Drop the intent snapshot in every process (doc_events hook)."""
+    if getattr(frappe.flags, "assistant_crm_intent_usage_update", False):
+        return  # usage counters do not change what is matched
+    with _snapshots_lock:
+        _snapshots.pop(_site(), None)
+    try:
+        frappe.cache().set_value(INTENT_CACHE_VERSION_KEY, f"{time.time():.6f}")
+    except Exception:
+        pass
+
+
+def _group_by_language(rows):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row.get('language'), []).append(row)
+    return grouped
+
+
+def compile_intent(intent):
+    """Precompute keyword and training-example lookups for one intent dict."""
+    keywords = {}
+    keyword_weights = {}
+    for language, rows in _group_by_language(intent.get('keywords') or []).items():
+        keywords[language] = tuple(
+            (row['keyword'].lower(), row['weight'], row.get('keyword_type', 'Primary')) for row in rows
+        )
+        keyword_weights[language] = sum(row['weight'] for row in rows)
+
+    examples = {}
+    for language, rows in _group_by_language(intent.get('training_examples') or []).items():
+        compiled = []
+        for row in rows:
+            example_text = row['example_text'].lower()
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(example_text)
+            compiled.append((matcher, row.get('weight', 1.0), len(example_text)))
+        examples[language] = tuple(compiled)
+
+    return CompiledIntent(keywords, keyword_weights, examples)
+
+
+def _for_language(by_language, language):
+    """Rows for ``language``, falling back to English like the original filters."""
+    rows = by_language.get(language)
+    if not rows and language != 'en':
+        rows = by_language.get('en')
+    return rows
+
+
+def _load_snapshot():
+    intents = frappe.db.sql("""
+        SELECT name, intent_name, flow_type, priority, confidence_threshold,
+               escalation_threshold, description
+        FROM `tabIntent Definition`
+        WHERE is_active = 1
+        ORDER BY priority ASC, confidence_threshold DESC
+    """, as_dict=True)
+    if not intents:
+        return ()
+
+    names = tuple(intent['name'] for intent in intents)
+    children = {
+        'keywords': frappe.db.sql("""
+            SELECT parent, keyword, language, weight, keyword_type
+            FROM `tabIntent Keyword`
+            WHERE parent IN %(names)s AND is_active = 1
+            ORDER BY parent, weight DESC
+        """, {"names": names}, as_dict=True),
+        'training_examples': frappe.db.sql("""
+            SELECT parent, example_text, language, weight
+            FROM `tabIntent Training Example`
+            WHERE parent IN %(names)s AND is_active = 1
+            ORDER BY parent, weight DESC
+        """, {"names": names}, as_dict=True),
+        'follow_up_questions': frappe.db.sql("""
+            SELECT parent, question_text, language, question_type, expected_response, next_intent
+            FROM `tabFollow Up Question`
+            WHERE parent IN %(names)s AND is_active = 1
+            ORDER BY parent, idx
+        """, {"names": names}, as_dict=True),
+    }
+
+    by_parent = {field: {} for field in children}
+    for field, rows in children.items():
+        for row in rows:
+            by_parent[field].setdefault(row.pop('parent'), []).append(row)
+
+    for intent in intents:
+        for field in children:
+            intent[field] = by_parent[field].get(intent['name'], [])
+        intent['_compiled'] = compile_intent(intent)
+
+    return tuple(intents)
+
+
+def get_intent_snapshot():
+    """Active intents with their child rows, shared by the whole process (read-only)."""
+    site = _site()
+    version = _cache_version()
+    cached = _snapshots.get(site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    snapshot = _load_snapshot()
+    with _snapshots_lock:
+        _snapshots[site] = (version, snapshot)
+    return snapshot
+
+
 class IntentDetectionLogger:
     """Minimal fallback logger - verbose logging removed"""
 
@@ -58,22 +223,9 @@ class IntentRecognitionService:
         self.load_intents()
     
     def load_intents(self):
-        """Load all active intent definitions"""
+        """Load all active intent definitions (from the shared snapshot)"""
         try:
-            self.intents = frappe.db.sql("""
-                SELECT name, intent_name, flow_type, priority, confidence_threshold,
-                       escalation_threshold, description
-                FROM `tabIntent Definition`
-                WHERE is_active = 1
-                ORDER BY priority ASC, confidence_threshold DESC
-            """, as_dict=True)
-            
-            # Load training data for each intent
-            for intent in self.intents:
-                intent['keywords'] = self.get_intent_keywords(intent['name'])
-                intent['training_examples'] = self.get_training_examples(intent['name'])
-                intent['follow_up_questions'] = self.get_follow_up_questions(intent['name'])
-                
+            self.intents = list(get_intent_snapshot())
         except Exception as e:
             frappe.log_error(f"Error loading intents: {str(e)}", "Intent Recognition Service")
             self.intents = []
@@ -191,7 +343,7 @@ class IntentRecognitionService:
                 'confidence': best_score,
                 'intent_id': best_intent['name'],
                 'description': best_intent['description'],
-                'follow_up_questions': best_intent['follow_up_questions'],
+                'follow_up_questions': list(best_intent['follow_up_questions']),
                 'escalate': escalate,
                 'request_id': request_id
             }
@@ -257,13 +409,7 @@ class IntentRecognitionService:
             )
 
         # Remove common stop words
-        stop_words = {
-            'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had',
-            'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his',
-            'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy',
-            'did', 'she', 'use', 'way', 'will', 'with', 'what', 'when', 'where',
-            'why', 'this', 'that', 'they', 'them', 'there', 'their', 'then'
-        }
+        stop_words = STOP_WORDS
 
         final_tokens = [token for token in filtered_tokens if token not in stop_words]
 
@@ -280,11 +426,13 @@ class IntentRecognitionService:
     
     def calculate_intent_score(self, user_tokens, intent, original_message, language, request_id=None):
         """Calculate intent matching score with detailed logging"""
+        compiled = intent.get('_compiled') or compile_intent(intent)
+
         # Keyword matching (50% weight)
-        keyword_score = self.calculate_keyword_score(user_tokens, intent['keywords'], language) * 0.5
+        keyword_score = self._compiled_keyword_score(user_tokens, compiled, language) * 0.5
 
         # Training example similarity (40% weight)
-        example_score = self.calculate_example_score(original_message, intent['training_examples'], language) * 0.4
+        example_score = self._compiled_example_score(original_message, compiled, language) * 0.4
 
         # Priority boost (10% weight) - higher priority intents get slight boost
         priority_score = (11 - intent.get('priority', 5)) / 10 * 0.1
@@ -307,26 +455,20 @@ class IntentRecognitionService:
         """Calculate keyword matching score"""
         if not keywords:
             return 0
-        
-        # Filter keywords by language
-        lang_keywords = [kw for kw in keywords if kw['language'] == language]
-        if not lang_keywords and language != 'en':
-            # Fallback to English keywords
-            lang_keywords = [kw for kw in keywords if kw['language'] == 'en']
-        
+        return self._compiled_keyword_score(user_tokens, compile_intent({'keywords': keywords}), language)
+    
+    def _compiled_keyword_score(self, user_tokens, compiled, language):
+        lang_keywords = _for_language(compiled.keywords, language)
         if not lang_keywords:
             return 0
         
-        total_weight = sum(kw['weight'] for kw in lang_keywords)
+        total_weight = compiled.keyword_weights[language if compiled.keywords.get(language) else 'en']
         matched_weight = 0
+        user_token_set = set(user_tokens)
         
-        for keyword_data in lang_keywords:
-            keyword = keyword_data['keyword'].lower()
-            weight = keyword_data['weight']
-            keyword_type = keyword_data.get('keyword_type', 'Primary')
-            
+        for keyword, weight, keyword_type in lang_keywords:
             # Check for exact keyword match
-            if keyword in user_tokens:
+            if keyword in user_token_set:
                 if keyword_type == 'Primary':
                     matched_weight += weight
                 elif keyword_type == 'Secondary':
@@ -353,26 +495,30 @@ class IntentRecognitionService:
         """Calculate similarity with training examples"""
         if not training_examples:
             return 0
-        
-        # Filter examples by language
-        lang_examples = [ex for ex in training_examples if ex['language'] == language]
-        if not lang_examples and language != 'en':
-            # Fallback to English examples
-            lang_examples = [ex for ex in training_examples if ex['language'] == 'en']
-        
+        return self._compiled_example_score(
+            user_message, compile_intent({'training_examples': training_examples}), language
+        )
+    
+    def _compiled_example_score(self, user_message, compiled, language):
+        lang_examples = _for_language(compiled.examples, language)
         if not lang_examples:
             return 0
         
         best_similarity = 0
         user_lower = user_message.lower()
+        user_length = len(user_lower)
         
-        for example in lang_examples:
-            example_text = example['example_text'].lower()
-            weight = example.get('weight', 1.0)
+        for template, weight, example_length in lang_examples:
+            # ratio() can never exceed 2 * min(len) / total len; skip examples that cannot win
+            total_length = user_length + example_length
+            if total_length and weight >= 0:
+                if 2.0 * min(user_length, example_length) / total_length * weight <= best_similarity:
+                    continue
             
-            # Calculate similarity using sequence matcher
-            similarity = SequenceMatcher(None, user_lower, example_text).ratio()
-            weighted_similarity = similarity * weight
+            # Calculate similarity using sequence matcher (example side precomputed)
+            matcher = copy.copy(template)
+            matcher.set_seq1(user_lower)
+            weighted_similarity = matcher.ratio() * weight
             
             if weighted_similarity > best_similarity:
                 best_similarity = weighted_similarity
@@ -383,7 +529,11 @@ class IntentRecognitionService:
         """Update intent usage statistics"""
         try:
             intent_doc = frappe.get_doc("Intent Definition", intent_name)
-            intent_doc.update_usage_stats(success)
+            frappe.flags.assistant_crm_intent_usage_update = True
+            try:
+                intent_doc.update_usage_stats(success)
+            finally:
+                frappe.flags.assistant_crm_intent_usage_update = False
         except Exception as e:
             frappe.log_error(f"Error updating intent usage: {str(e)}", "Intent Recognition Service")
     
@@ -393,15 +543,18 @@ class IntentRecognitionService:
             intent_data = frappe.get_doc("Intent Definition", specific_intent)
             user_tokens = self.preprocess_message(user_message)
 
+            cached = next((i for i in self.intents if i['name'] == intent_data.name), None)
             intent_dict = {
                 'name': intent_data.name,
                 'intent_name': intent_data.intent_name,
                 'flow_type': intent_data.flow_type,
                 'priority': intent_data.priority,
                 'confidence_threshold': intent_data.confidence_threshold,
-                'keywords': self.get_intent_keywords(intent_data.name),
-                'training_examples': self.get_training_examples(intent_data.name)
+                'keywords': cached['keywords'] if cached else self.get_intent_keywords(intent_data.name),
+                'training_examples': cached['training_examples'] if cached else self.get_training_examples(intent_data.name)
             }
+            if cached:
+                intent_dict['_compiled'] = cached['_compiled']
 
             score = self.calculate_intent_score(user_tokens, intent_dict, user_message, 'en')
 
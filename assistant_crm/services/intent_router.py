@@ -36,6 +36,8 @@ except ImportError:
     cstr = str
     FRAPPE_AVAILABLE = False
 
+from assistant_crm.services.intent_engine import ROUTER_INTENTS, classify_router
+
 # Import our new LiveDataOrchestrator (no circular dependency)
 try:
     from assistant_crm.services.live_data_orchestrator import get_live_data_orchestrator
@@ -67,57 +69,8 @@ class IntentRouter:
         self.cache_service = get_cache_service()
         self.cache_enabled = self.cache_service is not None
 
-        # Intent detection patterns (no external dependencies)
-        self.intent_patterns = {
-            'claim_status': {
-                'keywords': ['claim status', 'my claim', 'claim progress', 'claim update', 'check claim', 'claim number'],
-                'weight': 1.0
-            },
-            'payment_status': {
-                'keywords': ['when will i receive', 'payment date', 'benefit payment', 'payment schedule', 'next payment', 'upcoming payment', 'last payment', 'when was my last payment', 'payment made', 'recent payment', 'latest payment', 'payment status', 'when will', 'receive payment', 'payment'],
-                'weight': 1.0
-            },
-            'pension_inquiry': {
-                'keywords': ['pension', 'retirement', 'pension benefits', 'retirement benefits', 'pension amount'],
-                'weight': 1.0
-            },
-            'claim_submission': {
-                'keywords': ['submit claim', 'submit a claim', 'new claim', 'file claim', 'how do i submit', 'injured at work', 'workplace accident'],
-                'weight': 1.0
-            },
-            'account_info': {
-                'keywords': ['my account', 'account information', 'profile', 'personal details', 'contact information'],
-                'weight': 0.9
-            },
-            'payment_history': {
-                'keywords': ['payment history', 'past payments', 'payment records', 'transaction history', 'my payment history', 'show me my payment history', 'previous payments'],
-                'weight': 1.0
-            },
-            'document_status': {
-                'keywords': ['documents', 'document status', 'paperwork', 'forms', 'required documents'],
-                'weight': 0.9
-            },
-            'employer_registration': {
-                'keywords': ['register employer', 'business registration', 'company registration', 'employer setup'],
-                'weight': 0.8
-            },
-            'agent_request': {
-                'keywords': ['speak to human', 'speak to someone', 'talk to agent', 'human assistance', 'representative', 'escalate', 'need to speak', 'i need help', 'need help', 'help me'],
-                'weight': 0.8
-            },
-            'technical_help': {
-                'keywords': ['login problem', 'password', 'website not working', 'technical issue', 'system error'],
-                'weight': 0.8
-            },
-            'greeting': {
-                'keywords': ['hello', 'hi', 'good morning', 'good afternoon', 'hey', 'greetings'],
-                'weight': 0.7
-            },
-            'goodbye': {
-                'keywords': ['thank you', 'thanks', 'goodbye', 'bye', 'that\'s all', 'done'],
-                'weight': 0.7
-            }
-        }
+        # Intent detection patterns (no external dependencies); matched by the shared intent engine
+        self.intent_patterns = ROUTER_INTENTS
 
         # Live data eligible intents (PHASE 2.5: COMPLETE LIVE DATA INTEGRATION - All 8 intents implemented)
         self.live_data_intents = {
@@ -260,46 +213,7 @@ class IntentRouter:
 
         CRITICAL: This method makes no external calls and operates in isolation.
         """
-        if not message or not isinstance(message, str):
-            return 'unknown', 0.0
-
-        message_lower = message.lower().strip()
-
-        # Calculate scores for each intent
-        intent_scores = {}
-
-        for intent, pattern in self.intent_patterns.items():
-            score = 0.0
-            keywords = pattern['keywords']
-            weight = pattern['weight']
-
-            # Count keyword matches
-            matches = 0
-            for keyword in keywords:
-                if keyword.lower() in message_lower:
-                    matches += 1
-
-            # Calculate score based on matches and weight
-            if matches > 0:
-                # Improved scoring: Give higher weight to any match, especially for shorter keyword lists
-                match_ratio = matches / len(keywords)
-                # Boost score for intents with fewer keywords (like greeting/goodbye)
-                if len(keywords) <= 6:  # greeting, goodbye have 6 keywords
-                    score = max(match_ratio * weight, 0.5 * weight)  # Minimum 50% of weight for any match
-                else:
-                    score = match_ratio * weight
-                intent_scores[intent] = score
-
-        # Return intent with highest score
-        if intent_scores:
-            best_intent = max(intent_scores, key=intent_scores.get)
-            best_score = intent_scores[best_intent]
-
-            # Lower threshold for better intent detection
-            if best_score >= 0.15:  # Reduced from 0.2 to 0.15 for better detection
-                return best_intent, best_score
-
-        return 'unknown', 0.0
+        return classify_router(message)
 
     def _try_live_data_route(self, intent: str, user_context: Dict[str, Any], message: str) -> Optional[Dict[str, Any]]:
         """
@@ -0,0 +1,258 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Append-only conversation history on ERPNext Issues.
+
+The Issue description used to be rebuilt from every message of the
+conversation, followed by a full ``issue_doc.save()``, on each new message -
+O(n^2) over a conversation's life. New messages are now appended as a delta
+with one UPDATE that also rewrites the "(N messages)" subject suffix from the
+conversation's denormalized ``message_count`` - no history re-read and no
+Issue hooks.
+
+Modes (site config ``issue_history_mode``):
+- "immediate" (default): append in the same transaction as the message.
+- "batched": entries are buffered in Redis after commit and flushed per
+  conversation once ``issue_history_batch_size`` entries are pending
+  (default 20) or by the once-a-minute ``flush_pending`` scheduler job.
+  Useful for chatty conversations.
+
+``rebuild`` still produces the full timeline and is used when an Issue is
+first linked to a conversation or after a bulk transcript import.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import frappe
+from frappe.utils import get_datetime, now
+
+HEADER = "Conversation Timeline<br><br>"
+SEPARATOR = "<br>"
+DEFAULT_BATCH_SIZE = 20
+FLUSH_LOCK_SECONDS = 60
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "issue_history", *parts])
+
+
+def format_entry(content: Optional[str], sender: Optional[str], timestamp: Any, direction: Optional[str]) -> str:
+    """One timeline bullet, HTML-escaped (same format as ``rebuild``)."""
+    try:
+        timestamp_str = get_datetime(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else "Unknown time"
+    except Exception:
+        timestamp_str = str(timestamp)
+    direction_label = "Outbound" if (direction or "").lower() == "outbound" else "Inbound"
+    sender = sender or ("Agent" if direction_label == "Outbound" else "Customer")
+    content = (content or "[No content]").strip()
+    line = f"- {timestamp_str} {direction_label} — {sender}: {content}"
+    try:
+        return frappe.utils.escape_html(line)
+    except Exception:
+        return line
+
+
+def get_issue_for_conversation(conversation_name: str) -> Optional[str]:
+    return frappe.db.get_value("Issue", {"custom_conversation_id": conversation_name}, "name")
+
+
+def append_message(
+    conversation_name: str,
+    content: Optional[str],
+    sender: Optional[str],
+    timestamp: Any = None,
+    direction: Optional[str] = "Inbound",
+) -> Optional[str]:
+    """Append one message to the conversation's Issue timeline.
+
+    Returns the Issue name (None if the conversation has no Issue yet - the
+    Issue's initial ``rebuild`` will pick the message up).
+    """
+    entry = format_entry(content, sender, timestamp or now(), direction)
+
+    if _conf("issue_history_mode", "immediate") == "batched":
+        _buffer_after_commit(conversation_name, entry)
+        return get_issue_for_conversation(conversation_name)
+
+    issue_name = get_issue_for_conversation(conversation_name)
+    if issue_name:
+        _apply(issue_name, conversation_name, [entry])
+    return issue_name
+
+
+def _apply(issue_name: str, conversation_name: str, entries: List[str]) -> None:
+    """Append ``entries`` and refresh the subject count in a single UPDATE."""
+    if not entries:
+        return
+    message_count = frappe.db.get_value("Unified Inbox Conversation", conversation_name, "message_count")
+    if message_count is None:
+        message_count = frappe.db.count("Unified Inbox Message", {"conversation": conversation_name})
+
+    frappe.db.sql(
+        """
+        UPDATE `tabIssue`
+        SET description = IF(IFNULL(description, '') = '',
+                             CONCAT(%(header)s, %(entries)s),
+                             CONCAT(description, %(separator)s, %(entries)s)),
+            subject = CONCAT(SUBSTRING_INDEX(subject, ' (', 1), ' (', %(count)s, ' messages)'),
+            modified = %(modified)s
+        WHERE name = %(issue)s
+        """,
+        {
+            "header": HEADER,
+            "separator": SEPARATOR,
+            "entries": SEPARATOR.join(entries),
+            "count": int(message_count or 0),
+            "modified": now(),
+            "issue": issue_name,
+        },
+    )
+
+
+def rebuild(conversation_name: str) -> Dict[str, Any]:
+    """Rewrite the full timeline from all messages (initial load / repair)."""
+    issue_name = get_issue_for_conversation(conversation_name)
+    if not issue_name:
+        return {"issue_id": None, "message_count": 0}
+
+    messages = frappe.get_all(
+        "Unified Inbox Message",
+        filters={"conversation": conversation_name},
+        fields=["message_content", "sender_name", "timestamp", "direction"],
+        order_by="timestamp asc",
+    )
+    entries = [format_entry(m.message_content, m.sender_name, m.timestamp, m.direction) for m in messages]
+
+    # Drop anything buffered: the rebuilt timeline already contains it
+    if _conf("issue_history_mode", "immediate") == "batched":
+        try:
+            conn = _redis()
+            conn.delete(_key("pending", conversation_name))
+            conn.srem(_key("pending_set"), conversation_name)
+        except Exception:
+            pass
+
+    frappe.db.sql(
+        """
+        UPDATE `tabIssue`
+        SET description = %(description)s,
+            subject = CONCAT(SUBSTRING_INDEX(subject, ' (', 1), ' (', %(count)s, ' messages)'),
+            modified = %(modified)s
+        WHERE name = %(issue)s
+        """,
+        {
+            "description": HEADER + SEPARATOR.join(entries),
+            "count": len(messages),
+            "modified": now(),
+            "issue": issue_name,
+        },
+    )
+    return {"issue_id": issue_name, "message_count": len(messages)}
+
+
+# ---------------------------------------------------------------------------
+# Batched mode
+# ---------------------------------------------------------------------------
+
+def _buffer_after_commit(conversation_name: str, entry: str) -> None:
+    def _push():
+        try:
+            conn = _redis()
+            pipe = conn.pipeline()
+            pipe.rpush(_key("pending", conversation_name), json.dumps(entry))
+            pipe.sadd(_key("pending_set"), conversation_name)
+            depth, _ = pipe.execute()
+            if depth >= int(_conf("issue_history_batch_size", DEFAULT_BATCH_SIZE)):
+                frappe.enqueue(
+                    "assistant_crm.services.issue_history.flush_conversation",
+                    conversation_name=conversation_name,
+                    queue="short",
+                    job_id=f"issue_history_flush::{frappe.local.site}::{conversation_name}",
+                    deduplicate=True,
+                )
+        except Exception as e:
+            frappe.log_error(f"Failed to buffer Issue history for {conversation_name}: {str(e)}", "Issue History")
+
+    after_commit = getattr(getattr(frappe, "db", None), "after_commit", None)
+    if after_commit is not None:
+        after_commit.add(_push)
+    else:
+        _push()
+
+
+def flush_conversation(conversation_name: str) -> int:
+    """Write all buffered entries of one conversation in a single UPDATE.
+
+    Entries leave Redis only after the UPDATE is committed, so a failed flush
+    keeps them for the next run.
+    """
+    conn = _redis()
+    key = _key("pending", conversation_name)
+    lock_key = _key("flush_lock", conversation_name)
+    # One flusher per conversation: the enqueued job and the scheduler can overlap
+    if not conn.set(lock_key, 1, nx=True, ex=FLUSH_LOCK_SECONDS):
+        return 0
+    try:
+        raw_entries = conn.lrange(key, 0, -1)
+        if not raw_entries:
+            conn.srem(_key("pending_set"), conversation_name)
+            return 0
+
+        entries = [json.loads(raw) for raw in raw_entries]
+        issue_name = get_issue_for_conversation(conversation_name)
+        if issue_name:
+            _apply(issue_name, conversation_name, entries)
+            frappe.db.commit()
+
+        # Drop only what was written; entries pushed meanwhile stay queued
+        pipe = conn.pipeline()
+        pipe.ltrim(key, len(raw_entries), -1)
+        pipe.srem(_key("pending_set"), conversation_name)
+        pipe.llen(key)
+        _, _, remaining = pipe.execute()
+        if remaining:
+            conn.sadd(_key("pending_set"), conversation_name)
+        return len(entries)
+    finally:
+        conn.delete(lock_key)
+
+
+def sync(conversation_name: str) -> Optional[str]:
+    """Bring an existing Issue's timeline up to date without re-reading messages.
+
+    Messages are appended as they arrive, so only entries still buffered in
+    batched mode need writing. Returns the Issue name.
+    """
+    if _conf("issue_history_mode", "immediate") == "batched":
+        flush_conversation(conversation_name)
+    return get_issue_for_conversation(conversation_name)
+
+
+def flush_pending() -> None:
+    """Scheduler job: flush every conversation with buffered entries."""
+    try:
+        conversations = _redis().smembers(_key("pending_set")) or set()
+    except Exception:
+        return
+    for conversation in conversations:
+        conversation = conversation.decode() if isinstance(conversation, bytes) else conversation
+        try:
+            flush_conversation(conversation)
+        except Exception as e:
+            frappe.db.rollback()
+            frappe.log_error(f"Issue history flush failed for {conversation}: {str(e)}", "Issue History")
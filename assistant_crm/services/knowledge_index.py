@@ -0,0 +1,397 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Indexed knowledge-base matching shared by the FAQ and reply services.
+
+Articles are tokenized once when they are indexed: title, keywords and
+HTML-stripped content. Each token points at the articles that contain it
+(an inverted index), and a query scores only the articles reachable from
+its own tokens, using BM25 in NumPy. Each article keeps its cleaned content,
+title tokens and processed keywords, so ``FAQService`` can compute its
+confidence without re-parsing the article.
+
+``get_index()`` returns one ``KnowledgeIndex`` per site and process. Saving,
+renaming or deleting a Knowledge Base Article bumps a version stamp in the
+shared cache (``invalidate``, wired in ``doc_events``). On the next lookup
+each process compares ``modified`` per article and re-indexes only the
+articles that were added, changed or removed.
+
+The Knowledge Base Article doctype is deprecated. On sites without its table
+the index stays empty and searches return no articles, as before. Where the
+table survives, only published rows are indexed (by ``status`` or a
+published flag, whichever column the table has), and only the columns the
+index uses are read.
+
+Site config:
+
+- ``knowledge_index_candidates``: articles passed on to FAQ confidence
+  scoring (default 20)
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Lazy import frappe so the index can be built and tested without a site
+try:
+    import frappe
+except ImportError:
+    frappe = None
+
+VERSION_KEY = "assistant_crm:knowledge_index_version"
+ARTICLE_DOCTYPE = "Knowledge Base Article"
+DEFAULT_CANDIDATES = 20
+
+# BM25 parameters; title and keyword tokens count as repeated terms
+K1 = 1.2
+B = 0.75
+TITLE_BOOST = 2
+KEYWORD_BOOST = 2
+
+STOP_WORDS = frozenset({
+    'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had',
+    'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his',
+    'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy',
+    'did', 'she', 'use', 'way', 'will', 'with', 'what', 'when', 'where',
+    'why', 'this', 'that', 'they', 'them', 'there', 'their', 'then'
+})
+
+# Extra query terms per detected intent, weighted below the user's own words
+INTENT_TERMS = {
+    'claim_status': ('claim', 'status', 'progress'),
+    'payment_status': ('payment', 'benefit', 'compensation'),
+    'claim_submission': ('submit', 'claim', 'form'),
+    'pension_inquiry': ('pension', 'retirement'),
+    'employer_registration': ('employer', 'registration', 'business'),
+}
+INTENT_TERM_WEIGHT = 0.5
+
+# Fields search() returns; indexed articles also carry the precomputed ones
+PUBLIC_FIELDS = ('name', 'title', 'content', 'category', 'language',
+                 'confidence_threshold', 'effectiveness_score')
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+_HTML_TAG = re.compile(r'<[^>]+>')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip punctuation, drop short words and stop words (FAQ rules)."""
+    if not text:
+        return []
+    words = _PUNCTUATION.sub('', text.lower()).split()
+    return [word for word in words if len(word) > 2 and word not in STOP_WORDS]
+
+
+def clean_content(content: str) -> str:
+    """Article content without HTML tags, lowercased."""
+    return _HTML_TAG.sub('', content or '').lower()
+
+
+def prepare_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of ``article`` with the tokens and cleaned text matching needs."""
+    prepared = {field: article.get(field) for field in PUBLIC_FIELDS}
+    prepared['language'] = prepared['language'] or 'en'
+    prepared['content'] = prepared['content'] or ''
+    prepared['title'] = prepared['title'] or ''
+    prepared['effectiveness_score'] = prepared['effectiveness_score'] or 0
+    prepared['modified'] = article.get('modified')
+
+    keywords = article.get('keywords') or []
+    prepared['processed_keywords'] = [
+        {'keyword': kw['keyword'].lower().strip(), 'weight': kw.get('weight', 1.0)}
+        for kw in keywords if kw.get('keyword')
+    ]
+    prepared['_title_tokens'] = tuple(tokenize(prepared['title']))
+    prepared['_clean_content'] = clean_content(prepared['content'])
+    return prepared
+
+
+def _article_terms(article: Dict[str, Any]) -> Counter:
+    terms = Counter(tokenize(article['_clean_content']))
+    for token in article['_title_tokens']:
+        terms[token] += TITLE_BOOST
+    for kw in article['processed_keywords']:
+        for token in tokenize(kw['keyword']):
+            terms[token] += KEYWORD_BOOST
+    return terms
+
+
+class KnowledgeIndex:
+    """Inverted index over knowledge articles with incremental updates and BM25 scoring."""
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._lock = threading.RLock()
+        self._articles: List[Optional[Dict[str, Any]]] = []  # slot -> prepared article
+        self._terms: List[Optional[Counter]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths = np.zeros(0, dtype=np.float64)
+        self._total_length = 0
+        self._languages: Counter = Counter()
+        self._language_masks: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def modified(self) -> Dict[str, Any]:
+        """``modified`` stamp of every indexed article, by name."""
+        with self._lock:
+            return {name: self._articles[slot]['modified'] for name, slot in self._slots.items()}
+
+    def articles(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [self._articles[slot] for slot in self._slots.values()]
+
+    def upsert(self, article: Dict[str, Any]) -> None:
+        """Add or replace one article (raw dict with an optional ``keywords`` list)."""
+        prepared = prepare_article(article)
+        terms = _article_terms(prepared)
+        with self._lock:
+            self._remove(prepared['name'])
+            slot = self._free.pop() if self._free else self._grow()
+            self._articles[slot] = prepared
+            self._terms[slot] = terms
+            self._slots[prepared['name']] = slot
+            length = sum(terms.values())
+            self._lengths[slot] = length
+            self._total_length += length
+            self._languages[prepared['language']] += 1
+            self._language_masks.clear()
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[slot] = tf
+                self._arrays.pop(term, None)
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._remove(name)
+
+    def sync(self, articles: Iterable[Dict[str, Any]]) -> None:
+        """Make the index hold exactly ``articles``, re-indexing only what changed."""
+        articles = list(articles)
+        with self._lock:
+            current = self.modified()
+            for name in set(current) - {article['name'] for article in articles}:
+                self._remove(name)
+            for article in articles:
+                modified = article.get('modified')
+                if modified is None or article['name'] not in current or current[article['name']] != modified:
+                    self.upsert(article)
+
+    def _grow(self) -> int:
+        slot = len(self._articles)
+        self._articles.append(None)
+        self._terms.append(None)
+        if slot >= len(self._lengths):
+            lengths = np.zeros(max(16, 2 * len(self._lengths)), dtype=np.float64)
+            lengths[:len(self._lengths)] = self._lengths
+            self._lengths = lengths
+        return slot
+
+    def _remove(self, name: str) -> None:
+        slot = self._slots.pop(name, None)
+        if slot is None:
+            return
+        for term in self._terms[slot]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+            self._arrays.pop(term, None)
+        self._languages[self._articles[slot]['language']] -= 1
+        self._language_masks.clear()
+        self._total_length -= self._lengths[slot]
+        self._lengths[slot] = 0
+        self._articles[slot] = None
+        self._terms[slot] = None
+        self._free.append(slot)
+
+    def _language_mask(self, language: str) -> np.ndarray:
+        mask = self._language_masks.get(language)
+        if mask is None:
+            mask = np.fromiter(
+                (article is not None and article['language'] == language for article in self._articles),
+                dtype=bool, count=len(self._articles),
+            )
+            self._language_masks[language] = mask
+        return mask
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def score(self, query: Dict[str, float]) -> np.ndarray:
+        """BM25 score of every slot for ``{term: query weight}`` (free slots score 0)."""
+        with self._lock:
+            scores = np.zeros(len(self._articles), dtype=np.float64)
+            count = len(self._slots)
+            if not count:
+                return scores
+            avg_length = self._total_length / count or 1.0
+            for term, weight in query.items():
+                arrays = self._term_arrays(term)
+                if arrays is None:
+                    continue
+                slots, tfs = arrays
+                df = len(slots)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                norm = K1 * (1 - B + B * self._lengths[slots] / avg_length)
+                scores[slots] += weight * idf * tfs * (K1 + 1) / (tfs + norm)
+            return scores
+
+    def search_tokens(self, tokens: Iterable[str], language: Optional[str] = None,
+                      limit: int = 5, intent: Optional[str] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Best ``limit`` (prepared article, BM25 score) pairs with a positive score."""
+        query: Dict[str, float] = dict.fromkeys(tokens, 1.0)
+        for term in INTENT_TERMS.get(intent or '', ()):
+            query.setdefault(term, INTENT_TERM_WEIGHT)
+        if not query or limit <= 0:
+            return []
+
+        with self._lock:
+            scores = self.score(query)
+            if language:
+                # Same fallback as FAQService: English when the language has no articles
+                if not self._languages.get(language) and language != 'en':
+                    language = 'en'
+                scores[~self._language_mask(language)] = 0
+            hits = np.flatnonzero(scores > 0)
+            if len(hits) > limit:
+                hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+            # Highest score first; ties keep index order so results are stable
+            hits = sorted(hits.tolist(), key=lambda slot: (-scores[slot], slot))
+            return [(self._articles[slot], float(scores[slot])) for slot in hits]
+
+
+_indexes: Dict[str, KnowledgeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def _site() -> str:
+    return getattr(getattr(frappe, "local", None), "site", None) or "default"
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _cache_version() -> str:
+    try:
+        return str(frappe.cache().get_value(VERSION_KEY) or "")
+    except Exception:
+        return ""
+
+
+def invalidate(doc=None, method=None):
+    """Make every process re-check articles on its next search (doc_events hook)."""
+    try:
+        frappe.cache().set_value(VERSION_KEY, f"{time.time():.6f}")
+    except Exception:
+        pass
+
+
+def _published_condition() -> str:
+    """SQL condition for published articles on the legacy table's schema."""
+    if frappe.db.has_column(ARTICLE_DOCTYPE, 'status'):
+        return "status = 'Published'"
+    for flag in ('is_published', 'published'):
+        if frappe.db.has_column(ARTICLE_DOCTYPE, flag):
+            return f"`{flag}` = 1"
+    return "docstatus < 2"
+
+
+def _load_changes(index: KnowledgeIndex) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Published articles added or changed since the index was built, and names that were removed."""
+    current = index.modified()
+    if not frappe.db.table_exists(ARTICLE_DOCTYPE):
+        return [], list(current)
+
+    published = _published_condition()
+    stamps = frappe.db.sql(
+        f"SELECT name, modified FROM `tab{ARTICLE_DOCTYPE}` WHERE {published}", as_dict=True
+    )
+    removed = list(set(current) - {row['name'] for row in stamps})
+    changed = tuple(row['name'] for row in stamps if current.get(row['name'], -1) != row['modified'])
+    if not changed:
+        return [], removed
+
+    columns = ", ".join(
+        f"`{field}`" for field in PUBLIC_FIELDS + ('modified',)
+        if field == 'name' or frappe.db.has_column(ARTICLE_DOCTYPE, field)
+    )
+    articles = {}
+    for row in frappe.db.sql(
+        f"SELECT {columns} FROM `tab{ARTICLE_DOCTYPE}` WHERE name IN %(names)s", {"names": changed}, as_dict=True
+    ):
+        row['keywords'] = []
+        articles[row['name']] = row
+    if frappe.db.table_exists("Article Keyword"):
+        for kw in frappe.db.sql("""
+            SELECT parent, keyword, weight
+            FROM `tabArticle Keyword`
+            WHERE parent IN %(names)s
+            ORDER BY parent, weight DESC
+        """, {"names": changed}, as_dict=True):
+            if kw['parent'] in articles:
+                articles[kw['parent']]['keywords'].append(kw)
+    return list(articles.values()), removed
+
+
+def get_index() -> KnowledgeIndex:
+    """The process-wide index for the current site, synced with the database if stale."""
+    site = _site()
+    index = _indexes.get(site)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(site, KnowledgeIndex())
+
+    version = _cache_version()
+    if index.version != version:
+        with index._lock:
+            if index.version != version:
+                try:
+                    changed, removed = _load_changes(index)
+                    for name in removed:
+                        index.remove(name)
+                    for article in changed:
+                        index.upsert(article)
+                    index.version = version
+                except Exception as e:
+                    frappe.log_error(f"Knowledge index refresh failed: {str(e)}", "Knowledge Index")
+    return index
+
+
+def candidate_limit() -> int:
+    return int(_conf("knowledge_index_candidates", DEFAULT_CANDIDATES))
+
+
+def search(message: str, intent: Optional[str] = None, language: Optional[str] = None,
+           limit: int = 3) -> List[Dict[str, Any]]:
+    """Articles best matching ``message`` (public fields plus ``score``), best first."""
+    results = []
+    for article, score in get_index().search_tokens(tokenize(message), language=language,
+                                                    limit=limit, intent=intent):
+        result = {field: article[field] for field in PUBLIC_FIELDS}
+        result['score'] = round(score, 4)
+        results.append(result)
+    return results
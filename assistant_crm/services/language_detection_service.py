@@ -5,6 +5,8 @@ import frappe
 import re
 from frappe import _
 
+from assistant_crm.services import text_analytics
+
 
 class LanguageDetectionService:
 	"""Language detection service for WCFCB multilingual support"""
@@ -156,95 +158,19 @@ class LanguageDetectionService:
 	
 	def _load_greeting_patterns(self):
 		"""Load greeting patterns for each language"""
-		return {
-			"en": [
-				"hello", "hi", "hey", "good morning", "good afternoon", 
-				"good evening", "greetings", "howdy", "what's up"
-			],
-			"bem": [
-				"muli bwanji", "mulishani", "mwabuka bwanji", "mwaswela bwanji",
-				"muli", "bwanji", "mulibwanji", "mwaiseni", "mwabombeni"
-			],
-			"ny": [
-				"muli bwanji", "mulibwanji", "mwadzuka bwanji", "mwatulo bwanji",
-				"moni", "bwanji", "takulandirani", "mwabwera bwanji"
-			],
-			"to": [
-				"muli bwanji", "mulibwanji", "mwabuka bwanji", "mwaswela bwanji",
-				"muli", "bwanji", "mwaiseni", "mwabombeni", "mwatondezya"
-			]
-		}
+		return {lang: list(patterns) for lang, patterns in text_analytics.GREETING_PATTERNS.items()}
 	
 	def _load_common_words(self):
 		"""Load common words for each language"""
-		return {
-			"en": {
-				"the", "and", "or", "but", "in", "on", "at", "to", "for", "of",
-				"with", "by", "from", "about", "into", "through", "during",
-				"before", "after", "above", "below", "up", "down", "out", "off",
-				"over", "under", "again", "further", "then", "once", "here",
-				"there", "when", "where", "why", "how", "all", "any", "both",
-				"each", "few", "more", "most", "other", "some", "such", "no",
-				"nor", "not", "only", "own", "same", "so", "than", "too", "very",
-				"can", "will", "just", "should", "now", "business", "registration",
-				"pension", "employer", "claim", "help", "need", "want", "please",
-				"thank", "thanks", "sorry", "yes", "no"
-			},
-			"bem": {
-				"na", "ne", "pa", "ku", "mu", "nga", "ukuti", "ati", "kuti",
-				"uko", "umo", "apo", "pano", "nomba", "lelo", "mailo", "cindi",
-				"bantu", "umuntu", "abantu", "icibi", "icisuma", "ukufwaya",
-				"ukupenda", "ukutemwa", "ukusuma", "ukuya", "ukufika", "ukubwela",
-				"bwino", "sana", "pantu", "naimwe", "ine", "iwe", "uyu", "aba",
-				"business", "ukusungula", "pension", "employer", "claim",
-				"ndeelomba", "natotela", "asante", "eya", "awe", "tabu"
-			},
-			"ny": {
-				"ndi", "pa", "ku", "mu", "kuti", "koma", "kapena", "ngati",
-				"pamene", "pano", "lero", "mawa", "dzulo", "anthu", "munthu",
-				"choipa", "chabwino", "kufuna", "kukonda", "kutamanda", "kupita",
-				"kubwera", "kufika", "bwino", "kwambiri", "chifukwa", "inu",
-				"ine", "iwe", "uyu", "awa", "business", "kulembetsa", "pension",
-				"employer", "claim", "chonde", "zikomo", "pepani", "inde", "ayi"
-			},
-			"to": {
-				"a", "na", "ku", "mu", "pa", "kuti", "pele", "hape", "jwale",
-				"hosasa", "maabane", "batho", "motho", "mobe", "molemo", "ho batla",
-				"ho rata", "ho leboha", "ho ya", "ho tla", "ho fihla", "hantle",
-				"haholo", "hobane", "lona", "nna", "wena", "enwa", "bana",
-				"business", "ho ngodisa", "pension", "employer", "claim",
-				"ka kopo", "kea leboha", "tshwarelo", "ee", "che"
-			}
-		}
+		return {lang: set(words) for lang, words in text_analytics.COMMON_WORDS.items()}
 	
 	def _load_language_patterns(self):
 		"""Load regex patterns for each language"""
-		return {
-			"bem": [
-				r'\buku\w+',  # Bemba infinitive prefix
-				r'\baba\w+',  # Bemba plural prefix
-				r'\bici\w+',  # Bemba noun prefix
-				r'\bumu\w+',  # Bemba noun prefix
-				r'wa\b',      # Bemba possessive
-				r'nga\b'      # Bemba conditional
-			],
-			"ny": [
-				r'\bku\w+',   # Nyanja infinitive prefix
-				r'\ba\w+',    # Nyanja plural prefix
-				r'\bchi\w+',  # Nyanja noun prefix
-				r'\bmu\w+',   # Nyanja noun prefix
-				r'wa\b',      # Nyanja possessive
-				r'ngati\b'    # Nyanja conditional
-			],
-			"to": [
-				r'\bho\w+',   # Tonga infinitive prefix
-				r'\bba\w+',   # Tonga plural prefix
-				r'\bse\w+',   # Tonga noun prefix
-				r'\bmo\w+',   # Tonga noun prefix
-				r'wa\b',      # Tonga possessive
-				r'haeba\b'    # Tonga conditional
-			]
-		}
+		return {lang: list(patterns) for lang, patterns in text_analytics.LANGUAGE_PATTERNS.items()}
+	
+	def detect_language_batch(self, texts, workers=None):
+		"""Language codes for many texts at once (array in input order, see text_analytics)"""
+		return text_analytics.detect_language_batch(texts, workers=workers)
 	
 	def get_supported_languages(self):
 		"""Get list of supported languages"""
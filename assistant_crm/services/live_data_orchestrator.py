@@ -1649,15 +1649,10 @@ class LiveDataOrchestrator:
                 pass
 
 
-# Global instance for easy access
-_live_data_orchestrator = None
-
 def get_live_data_orchestrator() -> LiveDataOrchestrator:
-    """Get global LiveDataOrchestrator instance."""
-    global _live_data_orchestrator
-    if _live_data_orchestrator is None:
-        _live_data_orchestrator = LiveDataOrchestrator()
-    return _live_data_orchestrator
+    """Get the shared LiveDataOrchestrator instance for this site."""
+    from assistant_crm.services import service_container
+    return service_container.get("live_data")
 
 def debug_get_claim_data(nrc: Optional[str] = None, full_name: Optional[str] = None):
     o = get_live_data_orchestrator()
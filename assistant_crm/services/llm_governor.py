@@ -0,0 +1,440 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Cluster-wide governor for LLM calls (Gemini and the OpenAI-compatible
+Anna / Antoine / Enhancement agents).
+
+``GeminiService`` used to space requests with an instance-local
+``last_request_time`` and ``time.sleep``, which did nothing across gunicorn
+and RQ processes, and ``EnhancedAIService`` had no limiter at all. Every
+LLM call now goes through ``acquire``:
+
+- A Redis token bucket per ``provider:model`` holds two budgets, requests
+  per minute and tokens per minute. A call reserves one request plus an
+  estimate of its tokens (prompt characters / 4 + ``max_tokens``). A Lua
+  script checks and takes both atomically.
+- Waiting callers queue in a sorted set ordered by arrival time plus a
+  per-priority handicap (``interactive`` live chat 0s, ``background`` inbox
+  drafts and tone enhancement 10s, ``batch`` report insights 60s). Only
+  callers near the head may take capacity, so chat jumps ahead of reports.
+  Aging means a report that has waited long enough is still served.
+- A 429 response is reported with ``Permit.rate_limited(retry_after)``.
+  The bucket stops granting until Retry-After has passed, and its rate is
+  halved. Each successful call wins back ``ADAPTIVE_RECOVERY_STEP`` of the
+  configured rate.
+- Concurrency stays bounded by the ``ai_pipeline.llm_slot`` semaphore, taken
+  after the bucket grants. Slot waiters queue with the same priority
+  handicap and within what is left of the same wait timeout.
+- ``get_metrics`` reports per-model saturation, queue depth by priority,
+  waits, timeouts and 429s. It is exposed as ``ai_api.get_llm_governor_metrics``.
+
+Callers that wait longer than their priority's timeout get
+``LLMCapacityError``; the existing fallback replies handle it. If Redis is
+unavailable, calls proceed ungoverned rather than failing.
+
+Site config keys (all optional):
+- llm_governor_enabled: set to 0 to bypass the buckets (default 1)
+- llm_rate_limits: {"<provider>" or "<provider>:<model>": {"rpm": n, "tpm": n}}
+- llm_governor_wait_timeouts: {"interactive": 15, "background": 60, "batch": 300}
+"""
+
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional, Union
+
+import frappe
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+BATCH = "batch"
+
+# Queue handicap in milliseconds; lower is served first
+PRIORITY_OFFSETS_MS = {INTERACTIVE: 0, BACKGROUND: 10_000, BATCH: 60_000}
+DEFAULT_WAIT_TIMEOUTS = {INTERACTIVE: 15, BACKGROUND: 60, BATCH: 300}
+
+DEFAULT_LIMITS: Dict[str, Dict[str, int]] = {
+    "openai": {"rpm": 500, "tpm": 150_000},
+    "gemini": {"rpm": 60, "tpm": 1_000_000},
+}
+FALLBACK_LIMITS = {"rpm": 60, "tpm": 100_000}
+
+CHARS_PER_TOKEN = 4
+DEFAULT_RETRY_AFTER_SECONDS = 5
+MIN_ADAPTIVE_FACTOR = 0.1
+ADAPTIVE_RECOVERY_STEP = 0.02
+WAITER_LEASE_MS = 5_000
+MAX_POLL_SECONDS = 1.0
+STATE_TTL_SECONDS = 3600
+
+# KEYS: bucket hash, waiters zset (queue order), leases zset (expiry)
+# ARGV: member, score, lease_ms, rpm, tpm, cost
+# Returns {granted, wait_ms, rank}
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local member = ARGV[1]
+local rpm = tonumber(ARGV[4])
+local tpm = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+
+local stale = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)
+if #stale > 0 then
+    redis.call('ZREM', KEYS[2], unpack(stale))
+    redis.call('ZREM', KEYS[3], unpack(stale))
+end
+redis.call('ZADD', KEYS[2], 'NX', tonumber(ARGV[2]), member)
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[3]), member)
+redis.call('PEXPIRE', KEYS[2], 3600000)
+redis.call('PEXPIRE', KEYS[3], 3600000)
+
+local s = redis.call('HMGET', KEYS[1], 'req', 'tok', 'ts', 'factor', 'cooldown_until')
+local factor = tonumber(s[4]) or 1
+local req_cap = math.max(1, rpm * factor)
+local tok_cap = math.max(1, tpm * factor)
+local req = tonumber(s[1]) or req_cap
+local tok = tonumber(s[2]) or tok_cap
+local ts = tonumber(s[3]) or now
+local elapsed = math.max(0, now - ts)
+req = math.min(req_cap, req + elapsed * req_cap / 60000)
+tok = math.min(tok_cap, tok + elapsed * tok_cap / 60000)
+cost = math.min(cost, tok_cap)
+redis.call('HSET', KEYS[1], 'req', req, 'tok', tok, 'ts', now)
+redis.call('EXPIRE', KEYS[1], 3600)
+
+local rank = redis.call('ZRANK', KEYS[2], member)
+local cooldown_until = tonumber(s[5]) or 0
+if cooldown_until > now then
+    return {0, cooldown_until - now, rank}
+end
+
+if rank < math.floor(req) and req >= 1 and tok >= cost then
+    redis.call('HSET', KEYS[1], 'req', req - 1, 'tok', tok - cost)
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('ZREM', KEYS[3], member)
+    return {1, 0, rank}
+end
+
+local req_wait = math.ceil((rank + 1 - req) * 60000 / req_cap)
+local tok_wait = math.ceil((cost - tok) * 60000 / tok_cap)
+return {0, math.max(25, req_wait, tok_wait), rank}
+"""
+
+# KEYS: bucket hash. ARGV: retry_after_ms
+_PENALIZE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local factor = tonumber(redis.call('HGET', KEYS[1], 'factor')) or 1
+factor = math.max(tonumber(ARGV[2]), factor / 2)
+local until_ms = now + tonumber(ARGV[1])
+local current = tonumber(redis.call('HGET', KEYS[1], 'cooldown_until')) or 0
+redis.call('HSET', KEYS[1], 'factor', factor, 'cooldown_until', math.max(current, until_ms), 'req', 0)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(factor)
+"""
+
+# KEYS: bucket hash. ARGV: token refund (may be negative), recovery step
+_SETTLE_SCRIPT = """
+local s = redis.call('HMGET', KEYS[1], 'tok', 'factor')
+if s[1] then
+    redis.call('HSET', KEYS[1], 'tok', math.max(0, tonumber(s[1]) + tonumber(ARGV[1])))
+end
+local factor = tonumber(s[2])
+if factor and factor < 1 then
+    redis.call('HSET', KEYS[1], 'factor', math.min(1, factor + tonumber(ARGV[2])))
+end
+return 1
+"""
+
+
+class LLMCapacityError(Exception):
+    """No LLM capacity became available within the caller's wait timeout."""
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "llm_governor", *parts])
+
+
+def _metrics_key() -> str:
+    return _key("metrics")
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _logger():
+    return frappe.logger("assistant_crm.llm_governor")
+
+
+def is_enabled() -> bool:
+    return bool(int(_conf("llm_governor_enabled", 1)))
+
+
+def get_limits(provider: str, model: str) -> Dict[str, int]:
+    """Requests/tokens per minute for ``provider:model`` (model, then provider, then defaults)."""
+    overrides = _conf("llm_rate_limits", {}) or {}
+    limits = dict(FALLBACK_LIMITS)
+    limits.update(DEFAULT_LIMITS.get(provider, {}))
+    limits.update(overrides.get(provider) or {})
+    limits.update(overrides.get(f"{provider}:{model}") or {})
+    return {"rpm": max(1, int(limits["rpm"])), "tpm": max(1, int(limits["tpm"]))}
+
+
+def estimate_tokens(prompt: Union[str, Iterable[Dict[str, Any]], None], max_tokens: int = 0) -> int:
+    """Rough reservation: prompt characters / 4 plus the completion budget."""
+    if prompt is None:
+        chars = 0
+    elif isinstance(prompt, str):
+        chars = len(prompt)
+    else:
+        chars = sum(len(str(m.get("content") or "")) for m in prompt)
+    return max(1, chars // CHARS_PER_TOKEN + int(max_tokens or 0))
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    if value in (None, ""):
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class Permit:
+    """Handle for one governed call; report the outcome through it."""
+
+    def __init__(self, provider: str, model: str, priority: str, reserved_tokens: int,
+                 waited_ms: int = 0, governed: bool = True):
+        self.provider = provider
+        self.model = model
+        self.priority = priority
+        self.reserved_tokens = reserved_tokens
+        self.waited_ms = waited_ms
+        self.governed = governed
+        self.actual_tokens: Optional[int] = None
+        self.throttled = False
+
+    @property
+    def bucket(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+    def record_usage(self, total_tokens: Optional[int]) -> None:
+        """Actual tokens used; the difference from the estimate is settled on release."""
+        if total_tokens:
+            self.actual_tokens = int(total_tokens)
+
+    def rate_limited(self, retry_after=None) -> None:
+        """The provider answered 429: pause the bucket and halve its rate."""
+        self.throttled = True
+        report_rate_limited(self.provider, self.model, retry_after)
+
+
+def report_rate_limited(provider: str, model: str, retry_after=None) -> None:
+    seconds = parse_retry_after(retry_after)
+    if seconds is None:
+        seconds = DEFAULT_RETRY_AFTER_SECONDS
+    bucket = f"{provider}:{model}"
+    try:
+        conn = _redis()
+        factor = conn.eval(_PENALIZE_SCRIPT, 1, _key("bucket", bucket), int(seconds * 1000), MIN_ADAPTIVE_FACTOR)
+        conn.hincrby(_metrics_key(), f"rate_limited:{bucket}", 1)
+        _logger().warning(f"[LLM] 429 bucket={bucket} retry_after_s={seconds:.1f} factor={_decode(factor)}")
+    except Exception:
+        pass
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for OpenAI ``RateLimitError`` and other HTTP 429 exceptions."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_from_error(error: Exception):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return headers.get("retry-after") or headers.get("Retry-After")
+    except Exception:
+        return None
+
+
+def _wait_timeout(priority: str) -> float:
+    timeouts = dict(DEFAULT_WAIT_TIMEOUTS)
+    timeouts.update(_conf("llm_governor_wait_timeouts", {}) or {})
+    return float(timeouts.get(priority, DEFAULT_WAIT_TIMEOUTS[BACKGROUND]))
+
+
+def _wait_for_capacity(conn, provider: str, model: str, priority: str, cost: int) -> int:
+    """Block until the bucket grants this call; returns milliseconds waited."""
+    bucket = f"{provider}:{model}"
+    limits = get_limits(provider, model)
+    member = f"{priority}:{uuid.uuid4().hex}"
+    started = time.time()
+    score = int(started * 1000) + PRIORITY_OFFSETS_MS.get(priority, PRIORITY_OFFSETS_MS[BACKGROUND])
+    deadline = started + _wait_timeout(priority)
+    keys = (_key("bucket", bucket), _key("waiters", bucket), _key("leases", bucket))
+
+    pipe = conn.pipeline()
+    pipe.sadd(_key("buckets"), bucket)
+    pipe.expire(_key("buckets"), STATE_TTL_SECONDS * 24)
+    pipe.execute()
+
+    try:
+        while True:
+            granted, wait_ms, _rank = conn.eval(
+                _ACQUIRE_SCRIPT, 3, *keys,
+                member, score, WAITER_LEASE_MS, limits["rpm"], limits["tpm"], cost,
+            )
+            if int(granted):
+                return int((time.time() - started) * 1000)
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                conn.hincrby(_metrics_key(), f"timeouts:{bucket}", 1)
+                raise LLMCapacityError(
+                    f"LLM rate limit wait exceeded for {bucket} ({priority}); try again shortly"
+                )
+            time.sleep(min(int(wait_ms) / 1000.0, MAX_POLL_SECONDS, remaining))
+    except BaseException:
+        try:
+            conn.zrem(keys[1], member)
+            conn.zrem(keys[2], member)
+        except Exception:
+            pass
+        raise
+
+
+@contextmanager
+def acquire(provider: str, model: str, priority: str = INTERACTIVE, tokens: int = 1):
+    """Wait for rate-limit capacity and a concurrency slot, then run the call.
+
+    Yields a ``Permit``. Raises ``LLMCapacityError`` if capacity does not
+    free up within the priority's wait timeout.
+    """
+    from assistant_crm.services.ai_pipeline import llm_slot
+
+    model = model or "default"
+    bucket = f"{provider}:{model}"
+    tokens = max(1, int(tokens or 1))
+    permit = Permit(provider, model, priority, tokens, governed=False)
+    deadline = time.time() + _wait_timeout(priority)
+
+    conn = None
+    if is_enabled():
+        try:
+            conn = _redis()
+            permit.waited_ms = _wait_for_capacity(conn, provider, model, priority, tokens)
+            permit.governed = True
+        except LLMCapacityError:
+            raise
+        except Exception:
+            conn = None  # fail open
+
+    slot_timeout = max(0.0, deadline - time.time())
+    queue_offset_ms = PRIORITY_OFFSETS_MS.get(priority, PRIORITY_OFFSETS_MS[BACKGROUND])
+    with llm_slot(timeout=slot_timeout, queue_offset_ms=queue_offset_ms) as acquired:
+        if not acquired:
+            raise LLMCapacityError(f"No LLM concurrency slot free for {bucket} ({priority}); try again shortly")
+        try:
+            yield permit
+        finally:
+            if conn is not None:
+                _settle(conn, permit)
+
+    if permit.waited_ms >= 1000:
+        try:
+            _logger().info(f"[LLM] waited bucket={bucket} priority={priority} waited_ms={permit.waited_ms}")
+        except Exception:
+            pass
+
+
+def _settle(conn, permit: Permit) -> None:
+    bucket = permit.bucket
+    refund = permit.reserved_tokens - permit.actual_tokens if permit.actual_tokens else 0
+    try:
+        conn.eval(_SETTLE_SCRIPT, 1, _key("bucket", bucket), refund, 0 if permit.throttled else ADAPTIVE_RECOVERY_STEP)
+        pipe = conn.pipeline()
+        pipe.hincrby(_metrics_key(), f"granted:{bucket}", 1)
+        pipe.hincrby(_metrics_key(), f"granted_{permit.priority}:{bucket}", 1)
+        pipe.hincrby(_metrics_key(), f"tokens:{bucket}", permit.actual_tokens or permit.reserved_tokens)
+        pipe.hincrby(_metrics_key(), f"wait_ms_total:{bucket}", permit.waited_ms)
+        if permit.waited_ms:
+            pipe.hincrby(_metrics_key(), f"waited:{bucket}", 1)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def get_metrics() -> Dict[str, Any]:
+    """Per-bucket saturation, queue depth by priority, waits, timeouts and 429s."""
+    conn = _redis()
+    counters: Dict[str, Dict[str, int]] = {}
+    for k, v in (conn.hgetall(_metrics_key()) or {}).items():
+        metric, _, bucket = _decode(k).partition(":")
+        try:
+            counters.setdefault(bucket, {})[metric] = int(v)
+        except Exception:
+            continue
+
+    now_ms = int(time.time() * 1000)
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for raw in sorted(conn.smembers(_key("buckets")) or []):
+        bucket = _decode(raw)
+        provider, _, model = bucket.partition(":")
+        limits = get_limits(provider, model)
+        state = {_decode(k): _decode(v) for k, v in (conn.hgetall(_key("bucket", bucket)) or {}).items()}
+        factor = float(state.get("factor") or 1)
+        req_cap = limits["rpm"] * factor
+        tok_cap = limits["tpm"] * factor
+        elapsed = max(0, now_ms - int(float(state.get("ts") or now_ms)))
+        req = min(req_cap, float(state.get("req") or req_cap) + elapsed * req_cap / 60000)
+        tok = min(tok_cap, float(state.get("tok") or tok_cap) + elapsed * tok_cap / 60000)
+
+        waiters = [_decode(m).split(":", 1)[0] for m in conn.zrange(_key("waiters", bucket), 0, -1)]
+        data = counters.get(bucket, {})
+        granted = data.get("granted", 0)
+        buckets[bucket] = {
+            "limits": limits,
+            "adaptive_factor": round(factor, 3),
+            "cooldown_ms": max(0, int(float(state.get("cooldown_until") or 0)) - now_ms),
+            "request_saturation": round(1 - req / req_cap, 3) if req_cap else 0,
+            "token_saturation": round(1 - tok / tok_cap, 3) if tok_cap else 0,
+            "queued": {p: waiters.count(p) for p in PRIORITY_OFFSETS_MS},
+            "granted": granted,
+            "granted_by_priority": {p: data.get(f"granted_{p}", 0) for p in PRIORITY_OFFSETS_MS},
+            "tokens": data.get("tokens", 0),
+            "waited": data.get("waited", 0),
+            "avg_wait_ms": round(data.get("wait_ms_total", 0) / granted, 1) if granted else 0,
+            "timeouts": data.get("timeouts", 0),
+            "rate_limited": data.get("rate_limited", 0),
+        }
+
+    from assistant_crm.services.ai_pipeline import get_llm_slot_usage
+
+    return {"enabled": is_enabled(), "buckets": buckets, "slots": get_llm_slot_usage()}
@@ -0,0 +1,124 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Forward streamed LLM output to the browser over Frappe realtime.
+
+``GeminiService`` (``streamGenerateContent``) and ``EnhancedAIService``
+(OpenAI ``stream=True`` / Assistants ``runs.stream``) accept an ``on_chunk``
+callback and call it with each text delta while still returning the full
+text. ``RealtimeStream`` is that callback for the web chat: it coalesces
+deltas (at most one event per ``llm_stream_flush_ms``, default 50 ms) and
+publishes them as ``assistant_crm_chat_stream`` events to the
+``task_progress`` room of a client-chosen random ``stream_id``, the same
+room ``frappe.realtime.task_subscribe`` joins. Guests can use it, and other
+sessions cannot read the stream.
+
+Unified Inbox AI replies are streamed the same way as
+``assistant_crm_inbox_ai_draft`` events to the inbox's doctype room, so an
+agent with the conversation open sees the draft being written.
+
+The HTTP response still carries (and the session still persists) the final
+text. The closing event has ``done: true`` plus time-to-first-token and total
+timings, which are also written to the ``assistant_crm.llm_streaming``
+logger.
+"""
+
+import time
+from typing import Callable, List, Optional
+
+import frappe
+
+EVENT = "assistant_crm_chat_stream"
+DEFAULT_FLUSH_MS = 50
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+class RealtimeStream:
+    """``on_chunk`` callback that publishes coalesced deltas for one reply."""
+
+    def __init__(self, stream_id: str, event: str = EVENT, doctype: Optional[str] = None,
+                 extra: Optional[dict] = None):
+        self.stream_id = stream_id
+        self.event = event
+        self.doctype = doctype
+        self.extra = extra or {}
+        self.flush_interval = float(_conf("llm_stream_flush_ms", DEFAULT_FLUSH_MS)) / 1000
+        self.started = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+        self.seq = 0
+        self.closed = False
+        self._buffer: List[str] = []
+        self._last_flush = 0.0
+
+    def __call__(self, delta: str) -> None:
+        if not delta or self.closed:
+            return
+        now = time.perf_counter()
+        if self.first_chunk_at is None:
+            self.first_chunk_at = now
+        self._buffer.append(delta)
+        # Publish the first token straight away, then coalesce
+        if self.seq == 0 or now - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @property
+    def streamed(self) -> bool:
+        return self.first_chunk_at is not None
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        delta = "".join(self._buffer)
+        self._buffer = []
+        self._last_flush = time.perf_counter()
+        self._publish({"delta": delta})
+
+    def close(self, final_text: Optional[str] = None) -> None:
+        """Flush the tail and tell the client the reply is complete."""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        total_ms = (time.perf_counter() - self.started) * 1000
+        ttft_ms = (self.first_chunk_at - self.started) * 1000 if self.first_chunk_at else None
+        self._publish({
+            "done": True,
+            "final_text": final_text,
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+        })
+        try:
+            frappe.logger("assistant_crm.llm_streaming").info(
+                f"stream={self.stream_id} chunks={self.seq} ttft_ms={ttft_ms and round(ttft_ms)} total_ms={round(total_ms)}"
+            )
+        except Exception:
+            pass
+
+    def _publish(self, message: dict) -> None:
+        self.seq += 1
+        message.update(self.extra, stream_id=self.stream_id, seq=self.seq)
+        try:
+            if self.doctype:
+                frappe.publish_realtime(self.event, message, doctype=self.doctype, after_commit=False)
+            else:
+                frappe.publish_realtime(self.event, message, task_id=self.stream_id, after_commit=False)
+        except Exception as e:
+            frappe.log_error(f"Failed to publish chat stream chunk: {str(e)}", "LLM Streaming")
+
+
+def tee(on_chunk: Optional[Callable[[str], None]], chunks) -> str:
+    """Feed every delta of ``chunks`` to ``on_chunk`` and return the joined text."""
+    parts = []
+    for delta in chunks:
+        if not delta:
+            continue
+        parts.append(delta)
+        if on_chunk:
+            on_chunk(delta)
+    return "".join(parts)
@@ -0,0 +1,349 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Time-series metrics store for MonitoringService.
+
+``MonitoringService.record_api_call`` used to read an hourly JSON list
+from ``frappe.cache``, append to it, cap it at 100 entries and write it
+back. It then did the same for a per-service stats dict. Concurrent
+workers overwrote each other's updates. Every API call paid two cache
+round-trips plus serialisation, and the hourly figures stopped at 100
+calls.
+
+Now:
+
+- ``record`` only updates an in-process buffer under a lock: a counter
+  per status, the latency sum and a fixed-bucket latency histogram per
+  (series, minute). There is no I/O on the caller's path.
+- A daemon thread flushes the buffer every ``metrics_flush_interval``
+  seconds (default 5). It sends one pipeline of ``HINCRBY`` /
+  ``HINCRBYFLOAT`` calls, so increments from every worker add up
+  atomically.
+- Each flush writes the same increments at three resolutions, and each
+  resolution has its own retention: minute rollups kept
+  ``MINUTE_RETENTION``, hourly ones ``HOUR_RETENTION`` and daily ones
+  ``DAY_RETENTION``. Downsampling is built into the write, so no
+  compaction job is needed.
+- ``summary`` and ``timeline`` read a range with one pipelined
+  ``HGETALL`` per bucket. p50/p95/p99 are interpolated from the merged
+  histogram counts.
+
+Keys are ``{site}:assistant_crm:metrics:{m|h|d}:{series}:{bucket start}``.
+Series names are indexed in ``{site}:assistant_crm:metrics:series``.
+Redis comes from the shared pool (``services.redis_pool``). While Redis is
+down, the buffer holds at most ``MAX_BUFFERED_BUCKETS`` buckets and drops
+the oldest.
+"""
+
+import atexit
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import frappe
+except ImportError:
+    frappe = None
+
+from assistant_crm.services import redis_pool
+
+# Upper bounds (ms) of the latency buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+RESOLUTIONS = {"m": 60, "h": 3600, "d": 86400}
+MINUTE_RETENTION = 6 * 3600
+HOUR_RETENTION = 8 * 86400
+DAY_RETENTION = 400 * 86400
+RETENTION = {"m": MINUTE_RETENTION, "h": HOUR_RETENTION, "d": DAY_RETENTION}
+
+DEFAULT_FLUSH_INTERVAL = 5
+MAX_BUFFERED_BUCKETS = 5000
+RECENT_ERRORS = 50
+SUCCESS = "success"
+
+_lock = threading.Lock()
+# (site, url, series, minute start) -> {field: increment}
+_buffer: Dict[Tuple[str, str, str, int], Dict[str, float]] = {}
+# (site, url, series) -> recent error messages not yet flushed
+_errors: Dict[Tuple[str, str, str], deque] = {}
+_flusher = {"pid": None, "interval": DEFAULT_FLUSH_INTERVAL}
+_stats = {"recorded": 0, "flushes": 0, "flush_failures": 0, "dropped_buckets": 0}
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", None) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _site() -> str:
+    return getattr(getattr(frappe, "local", None), "site", None) or "default"
+
+
+def _prefix(site: str) -> str:
+    return f"{site}:assistant_crm:metrics"
+
+
+def bucket_index(value_ms: float) -> int:
+    """Histogram bucket for a latency: the first bound it does not exceed."""
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)
+
+
+def record(series: str, value_ms: float, status: str = SUCCESS, error: Optional[str] = None) -> None:
+    """Count one call of ``series`` taking ``value_ms`` ms; buffered, never blocks on Redis."""
+    site = _site()
+    url = redis_pool.configured_url()
+    minute = int(time.time() // 60) * 60
+    value_ms = max(float(value_ms or 0), 0.0)
+    key = (site, url, series, minute)
+    with _lock:
+        fields = _buffer.get(key)
+        if fields is None:
+            if len(_buffer) >= MAX_BUFFERED_BUCKETS:
+                del _buffer[next(iter(_buffer))]
+                _stats["dropped_buckets"] += 1
+            fields = _buffer[key] = {}
+        for field, increment in (
+            ("count", 1),
+            ("errors", 0 if status == SUCCESS else 1),
+            (f"status:{status}", 1),
+            ("sum_ms", value_ms),
+            (f"b:{bucket_index(value_ms)}", 1),
+        ):
+            fields[field] = fields.get(field, 0) + increment
+        if error:
+            _errors.setdefault((site, url, series), deque(maxlen=RECENT_ERRORS)).append(
+                f"{int(time.time())} {status}: {str(error)[:300]}"
+            )
+        _stats["recorded"] += 1
+    _ensure_flusher()
+
+
+def _ensure_flusher() -> None:
+    pid = os.getpid()
+    if _flusher["pid"] == pid:
+        return
+    with _lock:
+        if _flusher["pid"] == pid:
+            return
+        _flusher["pid"] = pid
+        # Read here: frappe.conf is not available on the flusher thread
+        _flusher["interval"] = float(_conf("metrics_flush_interval", DEFAULT_FLUSH_INTERVAL))
+    threading.Thread(target=_run, args=(pid,), name="assistant-crm-metrics-flush", daemon=True).start()
+
+
+def _run(pid: int) -> None:
+    while _flusher["pid"] == pid:
+        time.sleep(_flusher["interval"])
+        flush()
+
+
+def _take() -> Tuple[Dict, Dict]:
+    global _buffer, _errors
+    with _lock:
+        buffered, errors = _buffer, _errors
+        _buffer, _errors = {}, {}
+    return buffered, errors
+
+
+def _restore(buffered: Dict, errors: Dict) -> None:
+    """Put back increments that could not be flushed, merged with newer ones."""
+    with _lock:
+        for key, fields in buffered.items():
+            target = _buffer.setdefault(key, {})
+            for field, increment in fields.items():
+                target[field] = target.get(field, 0) + increment
+        for key, messages in errors.items():
+            _errors.setdefault(key, deque(maxlen=RECENT_ERRORS)).extendleft(reversed(messages))
+        while len(_buffer) > MAX_BUFFERED_BUCKETS:
+            del _buffer[next(iter(_buffer))]
+            _stats["dropped_buckets"] += 1
+
+
+def flush() -> int:
+    """Write buffered increments to Redis; returns buckets written. Safe to call from any thread."""
+    buffered, errors = _take()
+    if not buffered and not errors:
+        return 0
+
+    by_url: Dict[str, List] = {}
+    for (site, url, series, minute), fields in buffered.items():
+        by_url.setdefault(url, []).append((site, series, minute, fields))
+
+    written = 0
+    for url in set(by_url) | {url for _site, url, _series in errors}:
+        conn = redis_pool.get_client(url)
+        url_buffer = {k: v for k, v in buffered.items() if k[1] == url}
+        url_errors = {k: v for k, v in errors.items() if k[1] == url}
+        if conn is None:
+            _restore(url_buffer, url_errors)
+            continue
+        try:
+            pipe = conn.pipeline(transaction=False)
+            for site, series, minute, fields in by_url.get(url, ()):
+                prefix = _prefix(site)
+                pipe.sadd(f"{prefix}:series", series)
+                for resolution, seconds in RESOLUTIONS.items():
+                    key = f"{prefix}:{resolution}:{series}:{minute - minute % seconds}"
+                    for field, increment in fields.items():
+                        if isinstance(increment, float):
+                            pipe.hincrbyfloat(key, field, increment)
+                        elif increment:
+                            pipe.hincrby(key, field, increment)
+                    pipe.expire(key, RETENTION[resolution] + seconds)
+            for (site, _url, series), messages in url_errors.items():
+                errors_key = f"{_prefix(site)}:errors:{series}"
+                pipe.lpush(errors_key, *messages)
+                pipe.ltrim(errors_key, 0, RECENT_ERRORS - 1)
+                pipe.expire(errors_key, HOUR_RETENTION)
+            pipe.execute()
+            written += len(by_url.get(url, ()))
+            with _lock:
+                _stats["flushes"] += 1
+        except Exception as e:
+            redis_pool.report_failure(e, url)
+            _restore(url_buffer, url_errors)
+            with _lock:
+                _stats["flush_failures"] += 1
+    return written
+
+
+atexit.register(flush)
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def percentile(buckets: List[int], q: float) -> float:
+    """Latency (ms) at quantile ``q`` from histogram counts, interpolated within the bucket."""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(buckets):
+        if count and cumulative + count >= rank:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            if index >= len(LATENCY_BUCKETS_MS):
+                return float(lower)  # open-ended bucket: report its lower bound
+            upper = LATENCY_BUCKETS_MS[index]
+            return round(lower + (upper - lower) * (rank - cumulative) / count, 2)
+        cumulative += count
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def _summarise(fields: Dict[str, float]) -> Dict[str, Any]:
+    count = int(fields.get("count", 0))
+    errors = int(fields.get("errors", 0))
+    buckets = [int(fields.get(f"b:{i}", 0)) for i in range(len(LATENCY_BUCKETS_MS) + 1)]
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count * 100, 2) if count else 0.0,
+        "avg_ms": round(fields.get("sum_ms", 0) / count, 2) if count else 0.0,
+        "p50_ms": percentile(buckets, 0.50),
+        "p95_ms": percentile(buckets, 0.95),
+        "p99_ms": percentile(buckets, 0.99),
+        "by_status": {k.split(":", 1)[1]: int(v) for k, v in fields.items() if k.startswith("status:")},
+    }
+
+
+def _merge(target: Dict[str, float], fields: Dict[str, Any]) -> Dict[str, float]:
+    for field, value in (fields or {}).items():
+        field = field.decode() if isinstance(field, bytes) else field
+        target[field] = target.get(field, 0) + float(value)
+    return target
+
+
+def _bucket_starts(resolution: str, start: float, end: float) -> List[int]:
+    seconds = RESOLUTIONS[resolution]
+    first = int(start // seconds) * seconds
+    return list(range(first, int(end) + 1, seconds))
+
+
+def _fetch(series: List[str], resolution: str, start: float, end: float) -> Dict[str, List[Tuple[int, Dict]]]:
+    conn = redis_pool.get_client()
+    if conn is None or not series:
+        return {}
+    prefix = _prefix(_site())
+    starts = _bucket_starts(resolution, start, end)
+    pipe = conn.pipeline(transaction=False)
+    for name in series:
+        for bucket in starts:
+            pipe.hgetall(f"{prefix}:{resolution}:{name}:{bucket}")
+    results = iter(pipe.execute())
+    return {name: [(bucket, _merge({}, next(results))) for bucket in starts] for name in series}
+
+
+def list_series() -> List[str]:
+    conn = redis_pool.get_client()
+    if conn is None:
+        return []
+    return sorted(s.decode() if isinstance(s, bytes) else s for s in conn.smembers(f"{_prefix(_site())}:series"))
+
+
+def _resolution_for(seconds: float) -> str:
+    if seconds <= 3 * 3600:
+        return "m"
+    if seconds <= 7 * 86400:
+        return "h"
+    return "d"
+
+
+def summary(series: Optional[List[str]] = None, minutes: int = 60) -> Dict[str, Any]:
+    """Totals, error rate and latency percentiles per series over the last ``minutes``."""
+    end = time.time()
+    start = end - minutes * 60
+    series = series or list_series()
+    fetched = _fetch(series, _resolution_for(end - start), start, end)
+    result = {}
+    overall: Dict[str, float] = {}
+    for name, buckets in fetched.items():
+        merged: Dict[str, float] = {}
+        for _bucket, fields in buckets:
+            _merge(merged, fields)
+        _merge(overall, merged)
+        result[name] = _summarise(merged)
+    return {"minutes": minutes, "series": result, "overall": _summarise(overall)}
+
+
+def timeline(series: Optional[str] = None, minutes: int = 60, resolution: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Per-bucket figures for one series (all series merged if None), oldest first.
+
+    The resolution is chosen from the span unless given.
+    """
+    end = time.time()
+    start = end - minutes * 60
+    resolution = resolution or _resolution_for(end - start)
+    names = [series] if series else list_series()
+    merged: Dict[int, Dict[str, float]] = {}
+    for buckets in _fetch(names, resolution, start, end).values():
+        for bucket, fields in buckets:
+            _merge(merged.setdefault(bucket, {}), fields)
+    points = []
+    for bucket in sorted(merged):
+        point = _summarise(merged[bucket])
+        point["timestamp"] = bucket
+        points.append(point)
+    return points
+
+
+def recent_errors(series: str, limit: int = 20) -> List[str]:
+    conn = redis_pool.get_client()
+    if conn is None:
+        return []
+    return conn.lrange(f"{_prefix(_site())}:errors:{series}", 0, limit - 1)
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Buffer and flush counters for this process."""
+    with _lock:
+        metrics = dict(_stats)
+        metrics["buffered_buckets"] = len(_buffer)
+    metrics["flush_interval"] = _flusher["interval"]
+    return metrics
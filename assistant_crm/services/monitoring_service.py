@@ -2,12 +2,12 @@
 # For license information, please see license.txt
 
 import frappe
-import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from frappe.utils import now_datetime, add_to_date, get_datetime
-from assistant_crm.assistant_crm.services.cache_service import get_cache_service
-from assistant_crm.assistant_crm.services.error_handler import get_error_handler
+from datetime import datetime
+from typing import Dict, Any, List
+from frappe.utils import now_datetime
+from assistant_crm.services.cache_service import get_cache_service
+from assistant_crm.services.error_handler import get_error_handler
+from assistant_crm.services import metrics_store, redis_pool
 
 
 class MonitoringService:
@@ -19,76 +19,17 @@ class MonitoringService:
         
     def record_api_call(self, service: str, endpoint: str, response_time: float, 
                        status: str, error_message: str = None):
-        """Record API call metrics"""
+        """Record API call metrics (buffered in-process; see metrics_store)"""
         try:
-            timestamp = now_datetime()
-            metric_data = {
-                "timestamp": timestamp.isoformat(),
-                "service": service,
-                "endpoint": endpoint,
-                "response_time": response_time,
-                "status": status,  # success, error, timeout, rate_limit
-                "error_message": error_message
-            }
-            
-            # Store individual metric
-            metric_key = f"{self.metrics_key}:api_calls:{timestamp.strftime('%Y%m%d%H')}"
-            existing_metrics = frappe.cache().get_value(metric_key) or []
-            existing_metrics.append(metric_data)
-            
-            # Keep only last 100 entries per hour to manage memory
-            if len(existing_metrics) > 100:
-                existing_metrics = existing_metrics[-100:]
-            
-            frappe.cache().set_value(metric_key, existing_metrics, expires_in_sec=86400)
-            
-            # Update aggregated stats
-            self._update_aggregated_stats(service, status, response_time)
-            
+            metrics_store.record(
+                service,
+                response_time,
+                status,  # success, error, timeout, rate_limit
+                f"{endpoint}: {error_message}" if error_message else None
+            )
         except Exception as e:
             frappe.log_error(f"Error recording API call metric: {str(e)}", "Monitoring Service")
     
-    def _update_aggregated_stats(self, service: str, status: str, response_time: float):
-        """Update aggregated statistics"""
-        try:
-            stats_key = f"{self.metrics_key}:aggregated:{service}"
-            stats = frappe.cache().get_value(stats_key) or {
-                "total_calls": 0,
-                "successful_calls": 0,
-                "failed_calls": 0,
-                "avg_response_time": 0,
-                "max_response_time": 0,
-                "min_response_time": float('inf'),
-                "last_updated": now_datetime().isoformat()
-            }
-            
-            stats["total_calls"] += 1
-            stats["last_updated"] = now_datetime().isoformat()
-            
-            if status == "success":
-                stats["successful_calls"] += 1
-            else:
-                stats["failed_calls"] += 1
-            
-            # Update response time stats
-            if response_time > stats["max_response_time"]:
-                stats["max_response_time"] = response_time
-            
-            if response_time < stats["min_response_time"]:
-                stats["min_response_time"] = response_time
-            
-            # Calculate rolling average
-            current_avg = stats["avg_response_time"]
-            stats["avg_response_time"] = (current_avg * (stats["total_calls"] - 1) + response_time) / stats["total_calls"]
-            
-            # Calculate success rate
-            stats["success_rate"] = (stats["successful_calls"] / stats["total_calls"]) * 100
-            
-            frappe.cache().set_value(stats_key, stats, expires_in_sec=86400)
-            
-        except Exception as e:
-            frappe.log_error(f"Error updating aggregated stats: {str(e)}", "Monitoring Service")
-    
     def get_system_health(self) -> Dict[str, Any]:
         """Get comprehensive system health status"""
         try:
@@ -108,6 +49,9 @@ class MonitoringService:
             cache_health = self._check_cache_health()
             health_data["services"]["cache"] = cache_health
             
+            # Check Redis (shared pool, background health check)
+            health_data["services"]["redis"] = self._check_redis_health()
+            
             # Check database health
             db_health = self._check_database_health()
             health_data["services"]["database"] = db_health
@@ -191,6 +135,25 @@ class MonitoringService:
                 "error": str(e)
             }
     
+    def _check_redis_health(self) -> Dict[str, Any]:
+        """Redis circuit state and pool usage, from the shared pool's last health check"""
+        try:
+            healthy = redis_pool.is_healthy()
+            pool = redis_pool.get_pool_metrics()
+            return {
+                "status": "healthy" if healthy else "critical",
+                "circuit": pool.get("state"),
+                "latency_ms": pool.get("last_latency_ms"),
+                "connections": pool.get("connections", {}),
+                "last_error": pool.get("last_error")
+            }
+            
+        except Exception as e:
+            return {
+                "status": "unknown",
+                "error": str(e)
+            }
+    
     def _check_database_health(self) -> Dict[str, Any]:
         """Check database connectivity and performance"""
         try:
@@ -219,47 +182,37 @@ class MonitoringService:
             }
     
     def get_performance_metrics(self) -> Dict[str, Any]:
-        """Get performance metrics for the last 24 hours"""
+        """Get performance metrics for the last 24 hours (hourly rollups, one pipelined read)"""
         try:
             metrics = {
                 "api_calls_24h": 0,
                 "avg_response_time_24h": 0,
                 "error_rate_24h": 0,
+                "p50_response_time_24h": 0,
+                "p95_response_time_24h": 0,
+                "p99_response_time_24h": 0,
                 "cache_hit_rate_24h": 0,
-                "peak_usage_hour": None
+                "peak_usage_hour": None,
+                "services": {}
             }
             
-            # Get API call metrics for last 24 hours
-            now = datetime.now()
-            hourly_stats = {}
-            
-            for i in range(24):
-                hour_key = (now - timedelta(hours=i)).strftime('%Y%m%d%H')
-                metric_key = f"{self.metrics_key}:api_calls:{hour_key}"
-                hour_metrics = frappe.cache().get_value(metric_key) or []
-                
-                hourly_stats[hour_key] = {
-                    "total_calls": len(hour_metrics),
-                    "successful_calls": len([m for m in hour_metrics if m["status"] == "success"]),
-                    "avg_response_time": sum([m["response_time"] for m in hour_metrics]) / len(hour_metrics) if hour_metrics else 0
-                }
-                
-                metrics["api_calls_24h"] += len(hour_metrics)
-            
-            # Calculate overall metrics
-            if metrics["api_calls_24h"] > 0:
-                total_successful = sum([h["successful_calls"] for h in hourly_stats.values()])
-                metrics["error_rate_24h"] = ((metrics["api_calls_24h"] - total_successful) / metrics["api_calls_24h"]) * 100
-                
-                total_response_time = sum([h["avg_response_time"] * h["total_calls"] for h in hourly_stats.values()])
-                metrics["avg_response_time_24h"] = total_response_time / metrics["api_calls_24h"]
+            day = metrics_store.summary(minutes=24 * 60)
+            overall = day["overall"]
+            metrics["api_calls_24h"] = overall["count"]
+            metrics["avg_response_time_24h"] = overall["avg_ms"]
+            metrics["error_rate_24h"] = overall["error_rate"]
+            metrics["p50_response_time_24h"] = overall["p50_ms"]
+            metrics["p95_response_time_24h"] = overall["p95_ms"]
+            metrics["p99_response_time_24h"] = overall["p99_ms"]
+            metrics["services"] = day["series"]
             
             # Find peak usage hour
-            if hourly_stats:
-                peak_hour = max(hourly_stats.items(), key=lambda x: x[1]["total_calls"])
+            hours = [h for h in metrics_store.timeline(minutes=24 * 60, resolution="h") if h["count"]]
+            if hours:
+                peak_hour = max(hours, key=lambda h: h["count"])
                 metrics["peak_usage_hour"] = {
-                    "hour": peak_hour[0],
-                    "calls": peak_hour[1]["total_calls"]
+                    "hour": datetime.fromtimestamp(peak_hour["timestamp"]).strftime('%Y%m%d%H'),
+                    "calls": peak_hour["count"]
                 }
             
             # Get cache metrics
@@ -273,6 +226,18 @@ class MonitoringService:
             frappe.log_error(f"Error getting performance metrics: {str(e)}", "Monitoring Service")
             return {}
     
+    def get_recent_performance(self, minutes: int = 60) -> Dict[str, Any]:
+        """Per-minute calls, error rate and latency percentiles for the health dashboard"""
+        try:
+            return {
+                "summary": metrics_store.summary(minutes=minutes),
+                "timeline": metrics_store.timeline(minutes=minutes, resolution="m")
+            }
+            
+        except Exception as e:
+            frappe.log_error(f"Error getting recent performance: {str(e)}", "Monitoring Service")
+            return {}
+    
     def create_alert(self, alert_type: str, severity: str, message: str, 
                     service: str = None, metadata: Dict[str, Any] = None):
         """Create a system alert"""
@@ -0,0 +1,458 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Asynchronous outbound delivery for Unified Inbox replies.
+
+Agent and AI replies used to call the platform API inside the request that
+created them (15-30s timeouts) and failures were only logged. Now:
+
+- ``queue_send`` claims an idempotency key, marks the Unified Inbox Message
+  ``Queued`` and, after commit, enqueues a ``deliver`` job. The caller returns
+  immediately with a "queued" acknowledgement.
+- ``deliver`` takes a token from the platform's Redis token bucket (Meta,
+  Telegram, Twitter, ... have different send limits), sends through the
+  cached platform integration and updates ``delivery_status``.
+- 429/5xx and network failures are retried with exponential backoff and
+  jitter. Retries are parked in a Redis sorted set and re-enqueued by
+  ``release_due_retries`` (after every delivery and once a minute).
+- Permanent failures and messages that exhaust ``outbound_max_attempts``
+  become an Outbound Message Dead Letter and the message is marked Failed.
+- Every status change is pushed to open inboxes via inbox_realtime.
+
+Site config keys (all optional):
+- outbound_async_delivery: set to 0 to send synchronously again (default 1)
+- outbound_delivery_queue: RQ queue for deliver jobs (default "default")
+- outbound_max_attempts: attempts before dead-lettering (default 6)
+- outbound_rate_limits: {"<Platform>": [messages_per_second, burst]} overrides
+"""
+
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import frappe
+from frappe.utils import now
+
+DEFAULT_QUEUE = "default"
+DEFAULT_MAX_ATTEMPTS = 6
+IDEMPOTENCY_TTL = 24 * 3600
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 15 * 60
+MAX_INLINE_WAIT_SECONDS = 2.0
+RETRY_SWEEP_BATCH = 200
+
+# (messages per second, burst) - conservative defaults below the documented
+# platform limits; override per site with ``outbound_rate_limits``
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "WhatsApp": (40.0, 80),
+    "Facebook": (10.0, 20),
+    "Instagram": (5.0, 10),
+    "Telegram": (25.0, 30),
+    "Twitter": (0.2, 5),
+    "LinkedIn": (1.0, 5),
+    "YouTube": (1.0, 5),
+    "Tawk.to": (5.0, 10),
+}
+FALLBACK_RATE_LIMIT = (5.0, 10)
+
+# Returns 0 when a token was taken, otherwise the milliseconds to wait
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now_ms = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now_ms
+tokens = math.min(burst, tokens + (now_ms - ts) * rate / 1000)
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait_ms = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now_ms)
+redis.call('EXPIRE', KEYS[1], 3600)
+return wait_ms
+"""
+
+
+class DeliveryError(Exception):
+    """A send attempt failed; ``retryable`` says whether to back off and retry."""
+
+    def __init__(self, message: str, retryable: bool, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "outbound", *parts])
+
+
+def _logger():
+    return frappe.logger("assistant_crm.unified_send")
+
+
+def is_enabled() -> bool:
+    return bool(int(_conf("outbound_async_delivery", 1)))
+
+
+# ---------------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------------
+
+def new_idempotency_key(*parts: Any) -> str:
+    raw = "|".join(str(p or "") for p in parts) or uuid.uuid4().hex
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def claim(idempotency_key: str) -> bool:
+    """Reserve an idempotency key; False if this send was already accepted."""
+    return bool(_redis().set(_key("idem", idempotency_key), "queued", nx=True, ex=IDEMPOTENCY_TTL))
+
+
+def release(idempotency_key: str) -> None:
+    """Free a key whose send was rolled back, so a retry with it is accepted."""
+    try:
+        _redis().delete(_key("idem", idempotency_key))
+    except Exception:
+        pass
+
+
+def queue_send(
+    platform: str,
+    conversation: str,
+    content: str,
+    message_name: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+    reply_mode: Optional[str] = None,
+    reply_to_platform_message_id: Optional[str] = None,
+    agent: Optional[str] = None,
+    claimed: bool = False,
+) -> Dict[str, Any]:
+    """Accept an outbound message for asynchronous delivery.
+
+    The deliver job is enqueued after the current transaction commits, so the
+    Unified Inbox Message row is always visible to the worker.
+    """
+    idempotency_key = idempotency_key or new_idempotency_key(platform, conversation, message_name or uuid.uuid4().hex)
+    if not claimed and not claim(idempotency_key):
+        return {"status": "queued", "duplicate": True, "idempotency_key": idempotency_key}
+
+    job = {
+        "idempotency_key": idempotency_key,
+        "platform": platform,
+        "conversation": conversation,
+        "content": content,
+        "message": message_name,
+        "reply_mode": reply_mode,
+        "reply_to_platform_message_id": reply_to_platform_message_id,
+        "agent": agent,
+        "attempts": 0,
+        "queued_at": time.time(),
+    }
+
+    if message_name:
+        _set_delivery_status(job, "Queued")
+
+    def _enqueue():
+        _enqueue_job(job)
+        _incr(platform, "queued")
+
+    after_commit = getattr(getattr(frappe, "db", None), "after_commit", None)
+    if after_commit is not None:
+        after_commit.add(_enqueue)
+    else:
+        _enqueue()
+
+    return {"status": "queued", "message": "Message queued for delivery", "idempotency_key": idempotency_key}
+
+
+def _enqueue_job(job: Dict[str, Any]) -> None:
+    frappe.enqueue(
+        "assistant_crm.services.outbound_dispatcher.deliver",
+        job=job,
+        queue=_conf("outbound_delivery_queue", DEFAULT_QUEUE),
+        timeout=300,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Consumer side
+# ---------------------------------------------------------------------------
+
+def deliver(job: Dict[str, Any]) -> None:
+    """Background job: deliver one outbound message (one attempt)."""
+    conn = _redis()
+    idem_key = _key("idem", job["idempotency_key"])
+    if (conn.get(idem_key) or b"").decode() == "sent":
+        return  # a previous attempt already succeeded (job re-run)
+
+    wait = _take_token(job["platform"])
+    if wait > 0:
+        if wait > MAX_INLINE_WAIT_SECONDS:
+            # Bucket is drained: park without consuming an attempt
+            _schedule_retry(job, wait)
+            return
+        time.sleep(wait)
+        wait = _take_token(job["platform"])
+        if wait > 0:
+            _schedule_retry(job, wait)
+            return
+
+    job["attempts"] = int(job.get("attempts") or 0) + 1
+    try:
+        _send(job)
+    except DeliveryError as e:
+        _handle_failure(job, e)
+    except Exception as e:
+        frappe.db.rollback()
+        _handle_failure(job, DeliveryError(str(e), retryable=True))
+    else:
+        conn.set(idem_key, "sent", ex=IDEMPOTENCY_TTL)
+        _set_delivery_status(job, "Sent")
+        _incr(job["platform"], "sent")
+        _record_latency(job)
+        frappe.db.commit()
+
+    release_due_retries()
+
+
+def _send(job: Dict[str, Any]) -> None:
+    """One send attempt through the platform integration; raises DeliveryError."""
+    platform = job["platform"]
+
+    if platform == "Tawk.to":
+        from assistant_crm.api.tawk_to_integration import TawkToIntegration
+
+        session_id = frappe.db.get_value("Unified Inbox Conversation", job["conversation"], "tawk_to_session_id")
+        if not TawkToIntegration().send_message(session_id, job["content"], job.get("agent")):
+            raise DeliveryError("Failed to send message to Tawk.to", retryable=True)
+        return
+
+    from assistant_crm.api.social_media_ports import send_social_media_message
+
+    result = send_social_media_message(
+        platform,
+        job["conversation"],
+        job["content"],
+        reply_mode=job.get("reply_mode"),
+        reply_to_platform_message_id=job.get("reply_to_platform_message_id"),
+    ) or {}
+    if result.get("status") == "success":
+        return
+
+    details = result.get("error_details") or {}
+    status_code = details.get("status_code")
+    try:
+        status_code = int(status_code) if status_code is not None else None
+    except (TypeError, ValueError):
+        status_code = None
+
+    if status_code is not None:
+        retryable = status_code == 429 or status_code >= 500
+    elif "error_details" not in result or details.get("policy") or details.get("hint"):
+        # Rejected before reaching the platform: platform mismatch, unsupported
+        # platform, 24h window, no tweet to reply to
+        retryable = False
+    else:
+        # The platform call failed without an HTTP status (network error,
+        # timeout, or an integration that does not report one): transient
+        retryable = True
+
+    message = result.get("message") or "Send failed"
+    if details.get("response_text"):
+        message = f"{message}: {str(details['response_text'])[:500]}"
+    raise DeliveryError(message, retryable=retryable, status_code=status_code)
+
+
+def _handle_failure(job: Dict[str, Any], error: DeliveryError) -> None:
+    max_attempts = int(_conf("outbound_max_attempts", DEFAULT_MAX_ATTEMPTS))
+    if error.retryable and job["attempts"] < max_attempts:
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (job["attempts"] - 1)))
+        delay = delay * random.uniform(0.8, 1.2)
+        job["last_error"] = str(error)
+        job["last_status_code"] = error.status_code
+        _set_delivery_status(job, "Retrying")
+        _incr(job["platform"], "retried")
+        frappe.db.commit()
+        _schedule_retry(job, delay)
+        try:
+            _logger().warning(
+                f"[OUTBOUND] retry platform={job['platform']} conv={job['conversation']} "
+                f"attempt={job['attempts']} status={error.status_code} in={delay:.1f}s"
+            )
+        except Exception:
+            pass
+        return
+
+    _dead_letter(job, error)
+
+
+def _dead_letter(job: Dict[str, Any], error: DeliveryError) -> None:
+    values = {
+        "platform": job["platform"],
+        "status": "Dead",
+        "conversation": job["conversation"],
+        "unified_inbox_message": job.get("message"),
+        "idempotency_key": job["idempotency_key"],
+        "attempts": job["attempts"],
+        "last_status_code": str(error.status_code or ""),
+        "failed_at": now(),
+        "message_content": job["content"],
+        "payload": json.dumps(job, indent=2, default=str),
+        "error_message": str(error),
+    }
+    try:
+        existing = frappe.db.get_value(
+            "Outbound Message Dead Letter", {"idempotency_key": job["idempotency_key"]}, "name"
+        )
+        if existing:
+            # A requeued dead letter failed again
+            frappe.db.set_value("Outbound Message Dead Letter", existing, values)
+        else:
+            frappe.get_doc({"doctype": "Outbound Message Dead Letter", **values}).insert(ignore_permissions=True)
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(f"Failed to dead-letter outbound message {job.get('message')}: {str(e)}", "Outbound Dispatcher")
+
+    _set_delivery_status(job, "Failed")
+    _incr(job["platform"], "dead")
+    frappe.db.commit()
+
+    try:
+        _logger().error(
+            f"[OUTBOUND] dead_letter platform={job['platform']} conv={job['conversation']} "
+            f"attempts={job['attempts']} status={error.status_code}: {str(error)[:200]}"
+        )
+    except Exception:
+        pass
+
+
+def requeue_dead_letter(name: str) -> Dict[str, Any]:
+    """Give a dead-lettered message a fresh set of attempts."""
+    doc = frappe.get_doc("Outbound Message Dead Letter", name)
+    job = json.loads(doc.payload or "{}")
+    if not job:
+        frappe.throw("Dead letter has no delivery payload")
+
+    job["attempts"] = 0
+    doc.db_set("status", "Requeued")
+    _set_delivery_status(job, "Queued")
+    frappe.db.after_commit.add(lambda: _enqueue_job(job))
+    return {"status": "queued", "idempotency_key": job.get("idempotency_key")}
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting and retry scheduling
+# ---------------------------------------------------------------------------
+
+def _rate_limit(platform: str) -> Tuple[float, int]:
+    overrides = _conf("outbound_rate_limits", {}) or {}
+    if platform in overrides:
+        rate, burst = overrides[platform]
+        return float(rate), int(burst)
+    return DEFAULT_RATE_LIMITS.get(platform, FALLBACK_RATE_LIMIT)
+
+
+def _take_token(platform: str) -> float:
+    """Seconds to wait before ``platform`` may send (0 = token taken)."""
+    rate, burst = _rate_limit(platform)
+    try:
+        wait_ms = _redis().eval(_TOKEN_BUCKET_SCRIPT, 1, _key("bucket", platform), rate, burst)
+    except Exception:
+        return 0.0  # never block delivery on a Redis hiccup
+    return float(wait_ms or 0) / 1000.0
+
+
+def _schedule_retry(job: Dict[str, Any], delay: float) -> None:
+    _redis().zadd(_key("retries"), {json.dumps(job, default=str): time.time() + delay})
+
+
+def release_due_retries() -> int:
+    """Re-enqueue parked deliveries whose backoff has elapsed."""
+    conn = _redis()
+    key = _key("retries")
+    due = conn.zrangebyscore(key, 0, time.time(), start=0, num=RETRY_SWEEP_BATCH)
+    released = 0
+    for raw in due:
+        # ZREM is the claim: only one sweeper re-enqueues a given entry
+        if conn.zrem(key, raw):
+            _enqueue_job(json.loads(raw))
+            released += 1
+    return released
+
+
+# ---------------------------------------------------------------------------
+# Status and metrics
+# ---------------------------------------------------------------------------
+
+def _set_delivery_status(job: Dict[str, Any], status: str) -> None:
+    if not job.get("message"):
+        return
+    try:
+        frappe.db.set_value(
+            "Unified Inbox Message", job["message"], "delivery_status", status, update_modified=False
+        )
+        from assistant_crm.services.inbox_realtime import queue_delivery_update
+
+        queue_delivery_update(job["message"], job["conversation"], status)
+    except Exception as e:
+        frappe.log_error(f"Failed to update delivery status for {job['message']}: {str(e)}", "Outbound Dispatcher")
+
+
+def _incr(platform: str, metric: str) -> None:
+    try:
+        _redis().hincrby(_key("metrics"), f"{metric}:{platform}", 1)
+    except Exception:
+        pass
+
+
+def _record_latency(job: Dict[str, Any]) -> None:
+    try:
+        latency_ms = int(max(0.0, time.time() - float(job.get("queued_at") or time.time())) * 1000)
+        pipe = _redis().pipeline()
+        pipe.hincrby(_key("metrics"), f"latency_ms_total:{job['platform']}", latency_ms)
+        pipe.hset(_key("metrics"), f"latency_ms_last:{job['platform']}", latency_ms)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Per-platform queued/sent/retried/dead counts, delivery latency and parked retries."""
+    conn = _redis()
+    platforms: Dict[str, Dict[str, Any]] = {}
+    for k, v in (conn.hgetall(_key("metrics")) or {}).items():
+        k = k.decode() if isinstance(k, bytes) else k
+        metric, _, platform = k.partition(":")
+        platforms.setdefault(platform, {})[metric] = int(v)
+
+    for data in platforms.values():
+        sent = data.get("sent", 0)
+        data["avg_latency_ms"] = round(data.pop("latency_ms_total", 0) / sent, 1) if sent else 0
+
+    return {
+        "platforms": platforms,
+        "parked_retries": conn.zcard(_key("retries")),
+        "queue": _conf("outbound_delivery_queue", DEFAULT_QUEUE),
+        "async_delivery": is_enabled(),
+    }
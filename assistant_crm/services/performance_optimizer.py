@@ -17,6 +17,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from queue import Queue, PriorityQueue
 
+from assistant_crm.services.intent_engine import ultra_fast_intent
+
 @dataclass
 class CacheEntry:
     """Cache entry with metadata"""
@@ -686,22 +688,8 @@ def optimize_for_sub_second_response(message: str, user_context: Dict = None) ->
 
 
 def detect_intent_ultra_fast(message: str) -> str:
-    """Ultra-fast intent detection using pre-compiled patterns."""
-    message_lower = message.lower()
-
-    # Pre-compiled high-performance patterns
-    if any(word in message_lower for word in ['hi', 'hello', 'hey']):
-        return 'greeting'
-    elif any(word in message_lower for word in ['claim', 'clm-']):
-        return 'claim_status'
-    elif any(word in message_lower for word in ['payment', 'account', 'acc-']):
-        return 'payment_inquiry'
-    elif any(word in message_lower for word in ['employer', 'company', 'emp-']):
-        return 'employer_status'
-    elif any(word in message_lower for word in ['thank', 'thanks']):
-        return 'gratitude'
-    else:
-        return 'general_inquiry'
+    """Ultra-fast intent detection using the shared precompiled intent engine."""
+    return ultra_fast_intent(message)
 
 
 def get_memory_cached_template(intent: str, user_context: Dict) -> str:
@@ -0,0 +1,307 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Centralized, leader-elected pollers for platforms without (usable) webhooks.
+
+Previously every open inbox tab called fetch_telegram_messages /
+fetch_tawkto_messages / fetch_instagram_messages, racing on the stored
+offsets and double-fetching updates. Now:
+
+- The scheduler enqueues one poller job per platform every minute
+  (``run_pollers``). Each job first tries to take a Redis leader lease for
+  its platform; if another worker (on this or any other bench node sharing
+  the queue Redis) holds it, the job exits immediately.
+- The leader polls until its lease window ends, renewing the lease every
+  cycle. Telegram uses ``getUpdates`` long polling; Tawk.to and Instagram
+  are short-polled at their configured interval.
+- New messages go through the platform's ``process_webhook`` - the same
+  ingestion path as real webhooks - and the Telegram offset is advanced only
+  after the batch is committed, with an atomic monotonic max in Redis.
+- Per-platform polls, messages, errors, ingest lag and throughput are
+  exposed through ``get_poller_metrics``.
+
+Site config keys (all optional):
+- platform_poller_lease_seconds: how long one leader job polls (default 50)
+- telegram_long_poll_timeout: getUpdates timeout in seconds (default 25)
+- tawkto_poll_interval / instagram_poll_interval: seconds between short polls
+  (defaults 30 / 300)
+"""
+
+import os
+import socket
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+import frappe
+
+PLATFORMS = ("Telegram", "Tawk.to", "Instagram")
+
+DEFAULT_LEASE_SECONDS = 50
+DEFAULT_TELEGRAM_TIMEOUT = 25
+DEFAULT_INTERVALS = {"Telegram": 0, "Tawk.to": 30, "Instagram": 300}
+THROUGHPUT_WINDOW_MINUTES = 5
+
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Offsets only ever move forward, so a stale leader can never rewind them
+_ADVANCE_OFFSET_SCRIPT = """
+local current = tonumber(redis.call('get', KEYS[1]) or '0')
+local proposed = tonumber(ARGV[1])
+if proposed > current then
+    redis.call('set', KEYS[1], ARGV[1])
+    return proposed
+end
+return current
+"""
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "pollers", *parts])
+
+
+def _slug(platform: str) -> str:
+    return platform.lower().replace(".", "")
+
+
+# ---------------------------------------------------------------------------
+# Leader lease
+# ---------------------------------------------------------------------------
+
+class LeaderLease:
+    """Redis lease that makes exactly one worker the poller for a platform."""
+
+    def __init__(self, platform: str, ttl: Optional[int] = None):
+        self.platform = platform
+        self.key = _key("leader", _slug(platform))
+        self.ttl = int(ttl or int(_conf("platform_poller_lease_seconds", DEFAULT_LEASE_SECONDS)) + 40)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.conn = _redis()
+        self.held = False
+
+    def acquire(self) -> bool:
+        self.held = bool(self.conn.set(self.key, self.token, nx=True, ex=self.ttl))
+        return self.held
+
+    def renew(self) -> bool:
+        if self.held:
+            self.held = bool(self.conn.eval(_RENEW_SCRIPT, 1, self.key, self.token, self.ttl))
+        return self.held
+
+    def release(self) -> None:
+        if self.held:
+            try:
+                self.conn.eval(_RELEASE_SCRIPT, 1, self.key, self.token)
+            except Exception:
+                pass
+            self.held = False
+
+    def current_leader(self) -> Optional[str]:
+        value = self.conn.get(self.key)
+        return value.decode() if isinstance(value, bytes) else value
+
+
+# ---------------------------------------------------------------------------
+# Telegram offset (atomic, shared by all nodes)
+# ---------------------------------------------------------------------------
+
+def get_telegram_offset() -> int:
+    value = _redis().get(_key("telegram_offset"))
+    try:
+        return int(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def advance_telegram_offset(update_id: int) -> int:
+    return int(_redis().eval(_ADVANCE_OFFSET_SCRIPT, 1, _key("telegram_offset"), int(update_id)))
+
+
+# ---------------------------------------------------------------------------
+# Scheduling entry points
+# ---------------------------------------------------------------------------
+
+def run_pollers() -> None:
+    """Scheduler tick: make sure a poller job exists for every platform."""
+    lease = int(_conf("platform_poller_lease_seconds", DEFAULT_LEASE_SECONDS))
+    for platform in PLATFORMS:
+        frappe.enqueue(
+            "assistant_crm.services.platform_pollers.run_poller",
+            platform=platform,
+            queue="long",
+            timeout=lease + 120,
+            job_id=f"assistant_crm_poller::{frappe.local.site}::{_slug(platform)}",
+            deduplicate=True,
+        )
+
+
+def run_poller(platform: str) -> None:
+    """Background job: poll ``platform`` for one lease window if we are leader."""
+    if not _is_due(platform):
+        return
+
+    lease = LeaderLease(platform)
+    if not lease.acquire():
+        return
+
+    window_end = time.time() + int(_conf("platform_poller_lease_seconds", DEFAULT_LEASE_SECONDS))
+    interval = float(_conf(f"{_slug(platform)}_poll_interval", DEFAULT_INTERVALS.get(platform, 30)))
+    try:
+        while lease.renew():
+            remaining = window_end - time.time()
+            if remaining <= 1:
+                break
+            result = _run_cycle(platform, remaining)
+            if result.get("status") == "info":
+                break  # nothing to poll (webhook mode / platform not configured)
+            if interval <= 0 and result.get("status") == "success":
+                continue  # long polling: the request itself waits for updates
+            # Short-poll platforms (and a Telegram error backoff) wait for the next cycle
+            wait = interval if interval > 0 else 5
+            if wait >= window_end - time.time():
+                break
+            time.sleep(wait)
+    finally:
+        lease.release()
+
+
+def poll_once(platform: str) -> Dict[str, Any]:
+    """One poll cycle under the leader lease (used by the whitelisted fetch_* helpers)."""
+    lease = LeaderLease(platform)
+    if not lease.acquire():
+        return {
+            "status": "info",
+            "message": f"{platform} poller is running on {lease.current_leader() or 'another worker'}",
+            "processed_messages": 0,
+            "new_conversations": 0,
+        }
+    try:
+        # Keep interactive calls short: a 10s long poll, as before
+        return _run_cycle(platform, remaining=15)
+    finally:
+        lease.release()
+
+
+def _is_due(platform: str) -> bool:
+    interval = float(_conf(f"{_slug(platform)}_poll_interval", DEFAULT_INTERVALS.get(platform, 30)))
+    if interval < 60:
+        return True
+    last = _redis().hget(_key("metrics", _slug(platform)), "last_poll_at")
+    try:
+        return last is None or time.time() - float(last) >= interval
+    except (TypeError, ValueError):
+        return True
+
+
+def _cycle_function(platform: str) -> Callable[..., Dict[str, Any]]:
+    from assistant_crm.api import unified_inbox_api
+
+    return {
+        "Telegram": unified_inbox_api._poll_telegram_updates,
+        "Tawk.to": unified_inbox_api._poll_tawkto_chats,
+        "Instagram": unified_inbox_api._poll_instagram_status,
+    }[platform]
+
+
+def _run_cycle(platform: str, remaining: float) -> Dict[str, Any]:
+    started = time.time()
+    try:
+        if platform == "Telegram":
+            timeout = int(min(int(_conf("telegram_long_poll_timeout", DEFAULT_TELEGRAM_TIMEOUT)), max(1, remaining - 5)))
+            result = _cycle_function(platform)(long_poll_timeout=timeout)
+        else:
+            result = _cycle_function(platform)()
+    except Exception as e:
+        frappe.db.rollback()
+        result = {"status": "error", "message": str(e)}
+        frappe.log_error(f"{platform} poller cycle failed: {str(e)}", "Platform Poller Error")
+
+    _record_cycle(platform, result or {}, time.time() - started)
+    return result or {}
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _record_cycle(platform: str, result: Dict[str, Any], duration: float) -> None:
+    try:
+        conn = _redis()
+        key = _key("metrics", _slug(platform))
+        processed = int(result.get("processed_messages") or 0)
+        minute_key = _key("throughput", _slug(platform), time.strftime("%Y%m%d%H%M"))
+
+        pipe = conn.pipeline()
+        pipe.hincrby(key, "polls", 1)
+        pipe.hincrby(key, "messages", processed)
+        pipe.hset(key, "last_poll_at", time.time())
+        pipe.hset(key, "last_status", result.get("status") or "unknown")
+        pipe.hset(key, "last_duration_ms", int(duration * 1000))
+        if result.get("status") == "error":
+            pipe.hincrby(key, "errors", 1)
+        if result.get("ingest_lag_seconds") is not None:
+            pipe.hset(key, "ingest_lag_seconds", round(float(result["ingest_lag_seconds"]), 3))
+        if processed:
+            pipe.incrby(minute_key, processed)
+            pipe.expire(minute_key, 3600)
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_poller_metrics() -> Dict[str, Any]:
+    conn = _redis()
+    now_ts = time.time()
+    metrics: Dict[str, Any] = {}
+    for platform in PLATFORMS:
+        raw = conn.hgetall(_key("metrics", _slug(platform))) or {}
+        data = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        window = [
+            _key("throughput", _slug(platform), time.strftime("%Y%m%d%H%M", time.localtime(now_ts - 60 * i)))
+            for i in range(THROUGHPUT_WINDOW_MINUTES)
+        ]
+        recent = sum(int(v or 0) for v in conn.mget(window))
+        last_poll = float(data.get("last_poll_at") or 0)
+
+        metrics[platform] = {
+            "leader": LeaderLease(platform).current_leader(),
+            "polls": int(data.get("polls") or 0),
+            "messages": int(data.get("messages") or 0),
+            "errors": int(data.get("errors") or 0),
+            "last_status": data.get("last_status"),
+            "seconds_since_last_poll": round(now_ts - last_poll, 1) if last_poll else None,
+            "last_duration_ms": int(data.get("last_duration_ms") or 0),
+            "ingest_lag_seconds": float(data["ingest_lag_seconds"]) if data.get("ingest_lag_seconds") else None,
+            "messages_per_minute": round(recent / THROUGHPUT_WINDOW_MINUTES, 2),
+        }
+    metrics["telegram_offset"] = get_telegram_offset()
+    return metrics
@@ -0,0 +1,293 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Token-budgeted prompt assembly for the Gemini and OpenAI reply paths.
+
+``GeminiService.process_message`` rebuilt its long system prompt and
+re-formatted history and context on every call.
+``EnhancedAIService.generate_unified_inbox_reply`` put the full context
+through ``json.dumps`` into the prompt with no size cap. Large live-data
+payloads and long histories therefore went to the provider verbatim.
+
+Both paths now assemble prompts from these helpers:
+
+- Static segments are module constants in the services. ``count_tokens`` is
+  memoised for them, so their size is measured once per process.
+- ``count_tokens`` uses ``tiktoken`` when it is installed and its encoding
+  can be loaded. Otherwise it estimates from word and punctuation counts.
+  Budgets are approximate for non-OpenAI models either way.
+- ``fit_context`` serialises the reply context compactly. If that is over
+  budget, it shortens long strings. Then it takes keys in
+  ``CONTEXT_PRIORITY`` order, lowest first, cutting each key's lists from
+  the end before dropping that key. The message, intent and auth context
+  are never dropped, and live data goes last.
+- ``fit_history`` keeps the newest turns that fit in what is left.
+  Live data is worth more than old chit-chat.
+- The static instructions go first and unchanged: the OpenAI system
+  message and Gemini ``systemInstruction``. The providers' prefix caches
+  can then reuse them across replies. ``record_usage`` collects the cached
+  token counts they report.
+
+``get_metrics`` (``ai_api.get_prompt_builder_metrics``) reports tokens sent,
+tokens trimmed and provider-cached tokens for this process.
+
+Site config:
+
+- ``prompt_token_budget``: tokens for context plus history (default 3000)
+- ``prompt_history_turns``: newest turns considered (default 12)
+"""
+
+import functools
+import json
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import frappe
+except ImportError:
+    frappe = None
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_TOKEN_BUDGET = 3000
+DEFAULT_HISTORY_TURNS = 12
+# Share of the budget held back for history while the context is fitted
+HISTORY_RESERVE = 0.25
+MAX_STRING_TOKENS = 300
+MIN_TURN_TOKENS = 24
+TRUNCATION_MARK = "…"
+
+# Trimmed last / dropped last: later keys are more important
+CONTEXT_PRIORITY = (
+    "data_source", "confidence", "platform", "channel_type", "language",
+    "customer", "conversation", "live_data",
+)
+REQUIRED_CONTEXT_KEYS = {"user_message", "intent", "auth_context", "has_live_data"}
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "prompts": 0, "prompt_tokens": 0, "trimmed_tokens": 0,
+    "provider_prompt_tokens": 0, "provider_cached_tokens": 0,
+}
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", None) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def token_budget() -> int:
+    return int(_conf("prompt_token_budget", DEFAULT_TOKEN_BUDGET))
+
+
+def history_turns() -> int:
+    return int(_conf("prompt_history_turns", DEFAULT_HISTORY_TURNS))
+
+
+@functools.lru_cache(maxsize=16)
+def _encoding(model: Optional[str]):
+    """tiktoken encoding for ``model``, or None (not installed, or BPE file not loadable)."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("o200k_base")
+    except KeyError:
+        return _encoding(None) if model else None
+    except Exception:
+        return None
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """Tokens in ``text``: tiktoken when available, otherwise ~1 per 4 word characters plus punctuation."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum((len(piece) + 3) // 4 for piece in _WORD_RE.findall(text))
+
+
+@functools.lru_cache(maxsize=256)
+def count_static_tokens(text: str, model: Optional[str] = None) -> int:
+    """``count_tokens`` for prompt segments that never change (system prompts, instructions)."""
+    return count_tokens(text, model)
+
+
+def truncate(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """``text`` cut to at most ``max_tokens`` tokens, marked with an ellipsis when cut."""
+    if not text or count_tokens(text, model) <= max_tokens:
+        return text or ""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens - 1]) + TRUNCATION_MARK
+    # Binary search on characters against the estimate
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle], model) < max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low].rstrip() + TRUNCATION_MARK
+
+
+def dumps(value: Any) -> str:
+    """Compact JSON as sent to the model."""
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+def _shorten_strings(value: Any, max_tokens: int, model: Optional[str]) -> Any:
+    if isinstance(value, str):
+        return truncate(value, max_tokens, model)
+    if isinstance(value, dict):
+        return {k: _shorten_strings(v, max_tokens, model) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shorten_strings(v, max_tokens, model) for v in value]
+    return value
+
+
+def _halve_lists(value: Any) -> Tuple[Any, bool]:
+    """Cut the longest list in ``value`` (recursively) to half its length."""
+    longest = None
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else ()
+        if isinstance(node, list) and len(node) > 1 and (longest is None or len(node) > len(longest)):
+            longest = node
+        stack.extend(child for child in children if isinstance(child, (dict, list)))
+    if longest is None:
+        return value, False
+    del longest[(len(longest) + 1) // 2:]
+    return value, True
+
+
+def _drop_order(context: Dict[str, Any]) -> List[str]:
+    ranked = {key: i for i, key in enumerate(CONTEXT_PRIORITY)}
+    droppable = [key for key in context if key not in REQUIRED_CONTEXT_KEYS]
+    # Unlisted keys go first, then the listed ones from least to most important
+    return sorted(droppable, key=lambda key: ranked.get(key, -1))
+
+
+def fit_context(context: Dict[str, Any], budget: int, model: Optional[str] = None,
+                exclude: Iterable[str] = ()) -> Tuple[str, int]:
+    """Compact JSON for ``context`` within ``budget`` tokens, and its token count."""
+    excluded = set(exclude)
+    data = {k: v for k, v in (context or {}).items() if k not in excluded}
+    text = dumps(data)
+    tokens = count_tokens(text, model)
+    if tokens <= budget:
+        return text, tokens
+
+    original = tokens
+    # Work on a copy: callers log and reuse their context
+    data = json.loads(text)
+    data = {k: (v if k == "auth_context" else _shorten_strings(v, MAX_STRING_TOKENS, model)) for k, v in data.items()}
+    data["context_truncated"] = True
+    text = dumps(data)
+    tokens = count_tokens(text, model)
+
+    # Least important key first: cut its lists, then drop it, before touching the next key
+    for key in _drop_order(data) + sorted(REQUIRED_CONTEXT_KEYS - {"auth_context"}):
+        if tokens <= budget:
+            break
+        if key not in data or key == "context_truncated":
+            continue
+        changed = True
+        while tokens > budget and changed:
+            data[key], changed = _halve_lists(data[key])
+            text = dumps(data)
+            tokens = count_tokens(text, model)
+        if tokens > budget and key not in REQUIRED_CONTEXT_KEYS:
+            data.pop(key)
+            text = dumps(data)
+            tokens = count_tokens(text, model)
+
+    _count(trimmed_tokens=max(0, original - tokens))
+    return text, tokens
+
+
+def _turn_role_and_text(turn: Dict[str, Any]) -> Tuple[str, str]:
+    role = turn.get("role")
+    if role not in ("user", "assistant"):
+        direction = (turn.get("direction") or "Inbound").lower()
+        role = "assistant" if direction == "outbound" or role in ("agent", "bot", "ai") else "user"
+    text = turn.get("text") or turn.get("message_content") or turn.get("content") or ""
+    return role, str(text).strip()
+
+
+def fit_history(history: Optional[List[Dict[str, Any]]], budget: int, model: Optional[str] = None,
+                max_turns: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+    """Newest turns of ``history`` as chat messages within ``budget`` tokens, oldest first.
+
+    Accepts the ``role``/``text`` turns kept by the chat APIs and the
+    ``direction``/``message_content`` rows of the inbox. Internal log lines
+    (``===``) and empty turns are skipped.
+    """
+    turns = [_turn_role_and_text(t) for t in (history or []) if isinstance(t, dict)]
+    turns = [(role, text) for role, text in turns if text and not text.startswith("===")]
+    turns = turns[-(max_turns or history_turns()):]
+
+    kept: List[Dict[str, str]] = []
+    used = 0
+    skipped = 0
+    for index in range(len(turns) - 1, -1, -1):
+        role, text = turns[index]
+        tokens = count_tokens(text, model)
+        remaining = budget - used
+        if tokens > remaining:
+            if remaining >= MIN_TURN_TOKENS and not kept:
+                text = truncate(text, remaining, model)
+                kept.append({"role": role, "content": text})
+                skipped += tokens - count_tokens(text, model)
+                used += count_tokens(text, model)
+            skipped += sum(count_tokens(t, model) for _r, t in turns[:index])
+            break
+        kept.append({"role": role, "content": text})
+        used += tokens
+    kept.reverse()
+    _count(trimmed_tokens=skipped)
+    return kept, used
+
+
+def split_budget(history: Optional[List[Dict[str, Any]]], budget: Optional[int] = None) -> Tuple[int, int]:
+    """(context budget, history reserve) for a prompt with ``history``."""
+    budget = token_budget() if budget is None else budget
+    reserve = int(budget * HISTORY_RESERVE) if history else 0
+    return budget - reserve, reserve
+
+
+def _count(**values: int) -> None:
+    with _metrics_lock:
+        for key, value in values.items():
+            _metrics[key] += int(value or 0)
+
+
+def record_prompt(tokens: int) -> None:
+    """Count one assembled prompt of ``tokens`` tokens."""
+    _count(prompts=1, prompt_tokens=tokens)
+
+
+def record_usage(prompt_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+    """Provider-reported prompt tokens and how many were served from its prompt cache."""
+    _count(provider_prompt_tokens=prompt_tokens or 0, provider_cached_tokens=cached_tokens or 0)
+
+
+def get_metrics() -> Dict[str, Any]:
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    metrics["tokenizer"] = "tiktoken" if _encoding(None) is not None else "estimate"
+    metrics["token_budget"] = token_budget()
+    provider = metrics["provider_prompt_tokens"]
+    metrics["provider_cache_hit_ratio"] = round(metrics["provider_cached_tokens"] / provider, 4) if provider else 0.0
+    return metrics
@@ -0,0 +1,260 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Process-wide pooled Redis client with background health checking.
+
+``RateLimiterConfig.get_redis_connection`` built a new client and pinged it
+for every middleware instance. The ``ddos_monitoring`` and digest helpers
+called ``redis.from_url(...)`` plus ``ping()`` on every call. Each dashboard
+refresh therefore opened fresh TCP connections and paid an extra round-trip.
+
+``get_client()`` now returns one ``redis.Redis`` per URL and process, backed
+by a shared ``ConnectionPool`` with short socket timeouts:
+
+- A daemon thread pings Redis every ``redis_health_check_interval`` seconds.
+  Requests never ping.
+- A circuit breaker opens after ``redis_circuit_failure_threshold``
+  consecutive failures. Failures come from pings and from ``report_failure``
+  calls made by callers whose commands failed. While the circuit is open,
+  ``get_client()`` returns None, and callers take the same "Redis
+  unavailable" path they always had. For the rate limiter that means failing
+  open to its in-process limiter. The first successful background ping
+  closes the circuit again.
+- The pool is fork-safe: redis-py resets it in a forked worker, and the
+  health thread is restarted there on first use.
+
+``get_metrics`` (``ai_api.get_redis_pool_metrics`` and
+``ddos_monitoring.get_redis_metrics``) reports the pool's connections, the
+circuit state and the health-check latency.
+
+Site config:
+
+- ``redis_cache``: URL (default ``redis://localhost:6379/1``)
+- ``redis_pool_max_connections``: per process (default 50)
+- ``redis_socket_timeout``: seconds for connect and commands (default 1.0)
+- ``redis_health_check_interval``: seconds between pings (default 5)
+- ``redis_circuit_failure_threshold``: failures that open the circuit (default 3)
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:
+    import frappe
+except ImportError:
+    frappe = None
+
+import redis
+
+DEFAULT_URL = "redis://localhost:6379/1"
+DEFAULT_MAX_CONNECTIONS = 50
+DEFAULT_SOCKET_TIMEOUT = 1.0
+DEFAULT_HEALTH_CHECK_INTERVAL = 5
+DEFAULT_FAILURE_THRESHOLD = 3
+
+CLOSED = "closed"
+OPEN = "open"
+
+_CREDENTIALS_RE = re.compile(r"//[^@/]*@")
+
+_pools_lock = threading.Lock()
+_pools: Dict[str, "_PooledRedis"] = {}
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", None) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+class _PooledRedis:
+    """One URL's pool, client, circuit breaker and health thread."""
+
+    def __init__(self, url: str):
+        self.url = url
+        timeout = float(_conf("redis_socket_timeout", DEFAULT_SOCKET_TIMEOUT))
+        # Settings are read here: frappe.conf is not available on the health thread
+        self.interval = float(_conf("redis_health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL))
+        self.threshold = int(_conf("redis_circuit_failure_threshold", DEFAULT_FAILURE_THRESHOLD))
+        self.pool = redis.ConnectionPool.from_url(
+            url,
+            decode_responses=True,
+            max_connections=int(_conf("redis_pool_max_connections", DEFAULT_MAX_CONNECTIONS)),
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+        )
+        self.client = redis.Redis(connection_pool=self.pool)
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.stats = {"failures": 0, "circuit_opens": 0, "health_checks": 0, "rejected_while_open": 0}
+        self.last_check_at: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._thread_pid: Optional[int] = None
+
+    # -- circuit breaker -----------------------------------------------------
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == OPEN:
+                self.state = CLOSED
+                self.opened_at = None
+
+    def record_failure(self, error: Any = None) -> None:
+        with self._lock:
+            self.stats["failures"] += 1
+            self.consecutive_failures += 1
+            if error is not None:
+                self.last_error = str(error)
+            if self.state == CLOSED and self.consecutive_failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.time()
+                self.stats["circuit_opens"] += 1
+
+    def available(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            self.stats["rejected_while_open"] += 1
+        return False
+
+    # -- health checking -----------------------------------------------------
+
+    def check(self) -> bool:
+        start = time.perf_counter()
+        try:
+            self.client.ping()
+        except Exception as e:
+            self.record_failure(e)
+            ok = False
+        else:
+            self.record_success()
+            ok = True
+        with self._lock:
+            self.stats["health_checks"] += 1
+            self.last_check_at = time.time()
+            self.last_latency_ms = round((time.perf_counter() - start) * 1000, 2) if ok else None
+        return ok
+
+    def ensure_health_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid == pid:
+                return
+            self._thread_pid = pid
+        # Before the first ping, assume healthy; the first failing ping counts like any other
+        thread = threading.Thread(target=self._run, args=(pid,), name="assistant-crm-redis-health", daemon=True)
+        thread.start()
+
+    def _run(self, pid: int) -> None:
+        while self._thread_pid == pid:
+            self.check()
+            time.sleep(self.interval)
+
+    def metrics(self) -> Dict[str, Any]:
+        pool = self.pool
+        with self._lock:
+            data = dict(self.stats)
+            data.update({
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "opened_at": self.opened_at,
+                "last_check_at": self.last_check_at,
+                "last_latency_ms": self.last_latency_ms,
+                "last_error": self.last_error,
+            })
+        data["connections"] = {
+            "created": getattr(pool, "_created_connections", None),
+            "available": len(getattr(pool, "_available_connections", ()) or ()),
+            "in_use": len(getattr(pool, "_in_use_connections", ()) or ()),
+            "max": pool.max_connections,
+        }
+        return data
+
+
+def _url(url: Optional[str] = None) -> str:
+    return url or _conf("redis_cache", DEFAULT_URL)
+
+
+def configured_url() -> str:
+    """The site's ``redis_cache`` URL; capture it for work done off the request thread."""
+    return _url()
+
+
+def _pooled(url: Optional[str] = None) -> _PooledRedis:
+    url = _url(url)
+    pooled = _pools.get(url)
+    if pooled is None:
+        with _pools_lock:
+            pooled = _pools.get(url)
+            if pooled is None:
+                pooled = _pools[url] = _PooledRedis(url)
+    pooled.ensure_health_thread()
+    return pooled
+
+
+def get_client(url: Optional[str] = None) -> Optional[redis.Redis]:
+    """Shared client for ``url`` (default: ``redis_cache``), or None while the circuit is open."""
+    try:
+        pooled = _pooled(url)
+    except Exception as e:
+        if frappe:
+            frappe.logger("assistant_crm").warning(f"Redis pool unavailable: {str(e)}")
+        return None
+    return pooled.client if pooled.available() else None
+
+
+def get_raw_client(url: Optional[str] = None) -> redis.Redis:
+    """Shared client regardless of the circuit; for objects bound once, like Lua scripts."""
+    return _pooled(url).client
+
+
+def report_failure(error: Any = None, url: Optional[str] = None) -> None:
+    """Count a failed command toward opening the circuit."""
+    pooled = _pools.get(_url(url))
+    if pooled is not None:
+        pooled.record_failure(error)
+
+
+def is_healthy(url: Optional[str] = None) -> bool:
+    """Circuit state from the background health check; no round-trip."""
+    pooled = _pools.get(_url(url)) or _pooled(url)
+    return pooled.state == CLOSED
+
+
+def get_pool_metrics(url: Optional[str] = None) -> Dict[str, Any]:
+    """Figures for one URL's pool (default: ``redis_cache``)."""
+    return _pooled(url).metrics()
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Pool, circuit and health-check figures for each URL used in this process."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        "pid": os.getpid(),
+        "pools": {_CREDENTIALS_RE.sub("//***@", url): pooled.metrics() for url, pooled in pools.items()},
+    }
+
+
+def reset() -> None:
+    """Disconnect and forget all pools (tests, configuration changes)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pooled in pools:
+        pooled._thread_pid = None
+        try:
+            pooled.pool.disconnect()
+        except Exception:
+            pass
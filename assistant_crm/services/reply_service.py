@@ -46,6 +46,9 @@ except ImportError:
     now = lambda: None
     cstr = str
 
+from assistant_crm.services import knowledge_index
+from assistant_crm.services.intent_engine import LIVE_DATA_REPLY_INTENTS, classify_reply
+
 # Set up logging for debugging
 logger = logging.getLogger(__name__)
 
@@ -1615,99 +1618,12 @@ def detect_intent(message: str) -> Tuple[str, float]:
         - detect_intent("Check my pension") -> ("pension_inquiry", 0.8)
         - detect_intent("I want to submit a claim") -> ("claim_submission", 0.9)
     """
-    message_lower = message.lower().strip()
-
     # Enhanced greeting detection - check for simple greetings first
     if is_simple_greeting(message):
         return 'simple_greeting', 0.95
 
-    # Define intent patterns with keywords and weights
-    intent_patterns = {
-        'greeting': {
-            'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'],
-            'weight': 0.9
-        },
-        'employer_registration': {
-            'keywords': ['register as employer', 'employer registration', 'register my company', 'register my business', 'business registration', 'company registration', 'how to register', 'register employer', 'become an employer', 'employer signup', 'register as an employer', 'how do i register', 'registration process', 'register with wcfcb', 'employer account', 'business account'],
-            'weight': 0.95
-        },
-        'pension_inquiry': {
-            'keywords': ['pension', 'retirement', 'benefit', 'monthly payment', 'pension status', 'pension amount'],
-            'weight': 0.8
-        },
-        'claim_submission': {
-            'keywords': ['submit claim', 'new claim', 'file claim', 'claim form', 'apply for', 'make a claim', 'need help with my claim', 'help with claim', 'injured at work', 'workplace accident', 'workplace injury', 'hurt at work', 'accident at work', 'fell at work', 'cut at work', 'burned at work', 'need to submit', 'want to submit', 'submit a claim'],
-            'weight': 0.9
-        },
-        'claim_status': {
-            'keywords': ['claim status', 'check claim', 'claim progress', 'claim update', 'my claim', 'status', 'need claim status', 'check status', 'claim #', 'reference number', 'wc-'],
-            'weight': 0.8
-        },
-        'payment_status': {
-            'keywords': ['payment', 'money', 'pay', 'salary', 'when will i receive', 'payment date', 'payment schedule', 'disability benefit', 'pension payment', 'benefit payment', 'when will my', 'payment arrive', 'payment information'],
-            'weight': 0.8
-        },
-        'document_request': {
-            'keywords': ['document', 'form', 'paperwork', 'certificate', 'what do i need', 'required documents', 'forms', 'confused about forms', 'about the forms'],
-            'weight': 0.7
-        },
-        'agent_request': {
-            'keywords': ['agent', 'human', 'person', 'speak to', 'talk to', 'representative', 'help me', 'escalate'],
-            'weight': 0.9
-        },
-        'complaint': {
-            'keywords': ['complaint', 'problem', 'issue', 'dissatisfied', 'unhappy', 'wrong', 'error'],
-            'weight': 0.8
-        },
-        'technical_help': {
-            'keywords': ['login', 'password', 'website', 'app', 'technical', 'cant access', 'not working', 'can\'t log in', 'cannot log in', 'log into', 'error message', 'invalid credentials', 'website not working', 'site not loading', 'getting error'],
-            'weight': 0.8
-        },
-        'goodbye': {
-            'keywords': ['bye', 'goodbye', 'thank you', 'thanks', 'done', 'finished', 'thats all'],
-            'weight': 0.9
-        }
-    }
-    
-    best_intent = 'unknown'
-    best_score = 0.0
-    
-    for intent, config in intent_patterns.items():
-        score = 0.0
-        keyword_matches = 0
-        
-        for keyword in config['keywords']:
-            if keyword in message_lower:
-                keyword_matches += 1
-                # Boost score for exact phrase matches
-                if len(keyword.split()) > 1:
-                    score += config['weight'] * 1.2
-                else:
-                    score += config['weight'] * 0.8
-        
-        # Adjust score based on keyword density (less aggressive normalization)
-        if keyword_matches > 0:
-            # Give higher weight to multi-word phrase matches
-            phrase_bonus = sum(1 for keyword in config['keywords'] if len(keyword.split()) > 1 and keyword in message_lower)
-            score = score + (phrase_bonus * 0.3)
-
-            # Light normalization to prevent very long messages from getting too low scores
-            message_length = len(message_lower.split())
-            if message_length > 10:
-                score = score * 0.8  # Slight penalty for very long messages
-            elif message_length > 5:
-                score = score * 0.9  # Small penalty for medium messages
-            
-        if score > best_score:
-            best_score = score
-            best_intent = intent
-    
-    # Ensure minimum confidence threshold
-    if best_score < 0.3:
-        best_intent = 'unknown'
-        best_score = 0.1
-    
-    return best_intent, min(best_score, 1.0)
+    # Keyword tables and scoring live in the shared, precompiled intent engine
+    return classify_reply(message)
 
 
 def generate_response(intent: str, confidence: float, message: str, context: Dict = None, knowledge_base_results: list = None, context_assessment: Dict = None, conversation_flow: Dict = None) -> str:
@@ -2006,19 +1922,17 @@ def search_knowledge_base(message: str, intent: str = None) -> list:
     """
     Search knowledge base for relevant content based on user message and intent.
 
-    Note: Knowledge Base Article doctype has been deprecated.
-    This function now returns an empty list as a placeholder.
+    Uses the shared BM25 ``knowledge_index``. On sites without the deprecated
+    Knowledge Base Article doctype the index is empty and this returns [].
 
     Args:
         message (str): User's message
         intent (str): Detected intent
 
     Returns:
-        list: Empty list (deprecated functionality)
+        list: Matching articles, best first, each with a ``score``
     """
-    # Knowledge Base Article doctype has been removed
-    # Return empty list as knowledge base search is no longer available
-    return []
+    return knowledge_index.search(message, intent=intent, limit=3)
 
 
 def fix_response_grammar(text: str) -> str:
@@ -2263,13 +2177,7 @@ def get_bot_reply(message: str, user_context: Dict = None, session_id: str = Non
 
             # Verbose logging removed
 
-            # Expanded list of intents that should trigger live data integration
-            live_data_intents = [
-                'claim_status', 'payment_status', 'payment_info', 'account_info',
-                'claim_inquiry', 'payment_inquiry', 'pension_inquiry', 'claim_submission'
-            ]
-
-            if user_id and intent in live_data_intents:
+            if user_id and intent in LIVE_DATA_REPLY_INTENTS:
                 from assistant_crm.api.live_data_integration_api import enhanced_chat_with_live_data
 
                 # Prepare live data request
@@ -0,0 +1,453 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Semantic response cache for AI replies.
+
+``CacheService`` keys responses by an MD5 of the exact lowercased message, so
+"what is my claim status" and "whats my claim status?" miss each other. This
+cache matches paraphrases instead:
+
+- messages are normalized (case, punctuation, common contractions) and
+  turned into character 3-gram shingles; a 64-permutation MinHash signature
+  estimates their Jaccard similarity. Everything is local and deterministic
+  across processes (crc32 + fixed permutations), no model download.
+- approximate nearest neighbours via LSH: 16 bands of 4 rows, each band a
+  Redis set of entry ids. A lookup reads the 16 buckets in one pipeline and
+  scores only those candidates; the best one at or above
+  ``semantic_cache_threshold`` (default 0.8) is served.
+- entries live in a scope (service, language, channel) and carry their
+  intent, which must match. Each intent has its own TTL (``INTENT_TTLS``,
+  overridable with ``semantic_cache_intent_ttls``; 0 disables caching for
+  that intent).
+- eviction per scope once ``semantic_cache_max_entries`` (default 2000) is
+  exceeded: least recently used, or least frequently used with
+  ``semantic_cache_eviction = "lfu"`` (equal hit counts: oldest first).
+- personalised or context-dependent answers are never stored or served:
+  ``is_cacheable`` rejects live-data intents, authenticated or identified
+  users, messages carrying identifiers (NRC, claim/account numbers, emails),
+  contexts with live data and follow-ups in a conversation with earlier
+  turns. A display name alone does not make a question personal; callers
+  leave it out of the prompt when the answer may be cached.
+
+Hit rate and the LLM latency saved by hits are kept per scope
+(``get_metrics``). Disable with ``semantic_cache_enabled = 0``.
+"""
+
+import json
+import random
+import re
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional
+
+import frappe
+
+from assistant_crm.services.intent_engine import LIVE_DATA_REPLY_INTENTS
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+MAX_CANDIDATES = 50
+MIN_MESSAGE_WORDS = 3
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_TTL = 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+# Seconds an answer stays valid per intent; 0 = never cache
+INTENT_TTLS = {
+    "greeting": 86400,
+    "goodbye": 86400,
+    "thanks": 86400,
+    "general_inquiry": 21600,
+    "faq": 21600,
+    "contact_info": 21600,
+    "office_hours": 21600,
+    "registration": 21600,
+    "employer_registration": 21600,
+    "documents_required": 21600,
+    "complaint": 0,
+    "escalation": 0,
+    "human_agent": 0,
+}
+
+# Intents answered from live, per-customer data: never cached
+LIVE_DATA_INTENTS = frozenset(LIVE_DATA_REPLY_INTENTS) | {
+    "payment_history",
+    "employer_services",
+    "contribution_status",
+    "beneficiary_status",
+    "compliance_status",
+    # ContextService ERP lookups for the signed-in user
+    "leave_balance",
+    "material_request",
+    "purchase_order",
+    "purchase_receipt",
+    "employee_info",
+    "workflow_status",
+    "budget_inquiry",
+    "spending_analysis",
+    "budget_comparison",
+    "financial_kpis",
+}
+
+_CONTRACTIONS = {
+    "whats": "what is",
+    "hows": "how is",
+    "wheres": "where is",
+    "whens": "when is",
+    "im": "i am",
+    "cant": "can not",
+    "cannot": "can not",
+    "dont": "do not",
+    "doesnt": "does not",
+    "wont": "will not",
+    "pls": "please",
+    "plz": "please",
+    "u": "you",
+    "ur": "your",
+}
+_CONTRACTION_RE = re.compile(r"\b(" + "|".join(_CONTRACTIONS) + r")\b")
+_APOSTROPHES_RE = re.compile(r"['’`]")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# NRC (123456/78/9), long digit runs (claim/account/phone numbers), emails
+_IDENTIFIER_RE = re.compile(r"\d{6}\s*/\s*\d{2}\s*/\s*\d|\d{5,}|[\w.+-]+@[\w-]+\.[\w.]+")
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(20250827)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    """Shared pooled ``redis_cache`` client, or None while Redis is marked down."""
+    from assistant_crm.services import redis_pool
+
+    return redis_pool.get_client()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "semantic_cache", *parts])
+
+
+def is_enabled() -> bool:
+    return bool(int(_conf("semantic_cache_enabled", 1)))
+
+
+# ---------------------------------------------------------------------------
+# Text -> signature
+# ---------------------------------------------------------------------------
+
+def normalize(text: str) -> str:
+    text = _APOSTROPHES_RE.sub("", (text or "").lower())
+    text = _NON_ALNUM_RE.sub(" ", text)
+    text = _CONTRACTION_RE.sub(lambda m: _CONTRACTIONS[m.group(1)], text)
+    return " ".join(text.split())
+
+
+def shingles(normalized: str) -> set:
+    padded = f" {normalized} "
+    return {padded[i:i + SHINGLE_SIZE] for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+
+
+def signature(text: str) -> List[int]:
+    """64-value MinHash signature of the normalized message."""
+    hashes = [zlib.crc32(s.encode("utf-8")) for s in shingles(normalize(text))]
+    return [min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _band_keys(scope: str, sig: List[int]) -> List[str]:
+    return [
+        _key("band", scope, str(band), format(zlib.crc32(json.dumps(sig[band * ROWS:(band + 1) * ROWS]).encode()), "x"))
+        for band in range(BANDS)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Policy
+# ---------------------------------------------------------------------------
+
+def make_scope(service: str, language: Optional[str] = None, channel: Optional[str] = None) -> str:
+    return ":".join([service, (language or "en").lower(), (channel or "web").lower()])
+
+
+def intent_ttl(intent: Optional[str]) -> int:
+    overrides = _conf("semantic_cache_intent_ttls", {}) or {}
+    if isinstance(overrides, str):
+        try:
+            overrides = json.loads(overrides)
+        except ValueError:
+            overrides = {}
+    intent = intent or "general_inquiry"
+    if intent in overrides:
+        return int(overrides[intent])
+    return int(INTENT_TTLS.get(intent, _conf("semantic_cache_default_ttl", DEFAULT_TTL)))
+
+
+def is_cacheable(message: str, intent: Optional[str] = None, context: Optional[Dict[str, Any]] = None) -> bool:
+    """False for anything personalised or backed by live data."""
+    if not is_enabled() or not message:
+        return False
+    if (intent or "") in LIVE_DATA_INTENTS or intent_ttl(intent) <= 0:
+        return False
+    if len(normalize(message).split()) < MIN_MESSAGE_WORDS:
+        return False  # "yes", "ok thanks": meaning depends on the conversation
+    if _IDENTIFIER_RE.search(message):
+        return False
+
+    context = context or {}
+    if any(context.get(key) for key in ("live_data", "has_live_data", "raw_data", "direct_data", "customer_data")):
+        return False
+    auth_context = context.get("auth_context") or {}
+    if context.get("authenticated") or auth_context.get("authenticated") or auth_context.get("collected_credentials"):
+        return False
+    for key in ("nrc", "nrc_number", "claim_number", "employer_id", "beneficiary_number", "account_number"):
+        if context.get(key):
+            return False
+    if _prior_turns(context.get("conversation_history") or context.get("recent_messages"), message):
+        return False  # a follow-up is answered in light of the earlier turns
+    return True
+
+
+def _prior_turns(history: Any, message: str) -> int:
+    """Turns before ``message``; a last turn that is the message itself is not counted."""
+    if not isinstance(history, list) or not history:
+        return 0
+    last = history[-1] if isinstance(history[-1], dict) else {}
+    text = last.get("text") or last.get("content") or last.get("message_content") or ""
+    if (last.get("role") or "user") == "user" and normalize(str(text)) == normalize(message):
+        return len(history) - 1
+    return len(history)
+
+
+# ---------------------------------------------------------------------------
+# Lookup / store
+# ---------------------------------------------------------------------------
+
+def lookup(scope: str, message: str, intent: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Best cached answer for a paraphrase of ``message`` in ``scope``, or None.
+
+    Returns ``{"response", "similarity", "entry_id", "latency_ms"}``.
+    """
+    started = time.perf_counter()
+    try:
+        conn = _redis()
+        if conn is None:
+            return None
+        sig = signature(message)
+
+        pipe = conn.pipeline(transaction=False)
+        for band_key in _band_keys(scope, sig):
+            pipe.smembers(band_key)
+        candidates = set()
+        for members in pipe.execute():
+            candidates.update(members or ())
+        candidates = list(candidates)[:MAX_CANDIDATES]
+
+        best = None
+        if candidates:
+            pipe = conn.pipeline(transaction=False)
+            for entry_id in candidates:
+                pipe.hmget(_key("entry", scope, _decode(entry_id)), "signature", "intent", "response", "latency_ms")
+            stale = []
+            for entry_id, (sig_raw, entry_intent, response, latency_ms) in zip(candidates, pipe.execute()):
+                if sig_raw is None:
+                    stale.append(_decode(entry_id))
+                    continue
+                if intent and _decode(entry_intent) != intent:
+                    continue
+                score = similarity(sig, json.loads(sig_raw))
+                if score >= float(_conf("semantic_cache_threshold", DEFAULT_THRESHOLD)) and (best is None or score > best["similarity"]):
+                    best = {
+                        "entry_id": _decode(entry_id),
+                        "similarity": round(score, 3),
+                        "response": json.loads(response),
+                        "latency_ms": float(latency_ms or 0),
+                    }
+            if stale:
+                _drop_stale(conn, scope, sig, stale)
+
+        _record_lookup(conn, scope, best, (time.perf_counter() - started) * 1000)
+        return best
+    except Exception as e:
+        frappe.log_error(f"Semantic cache lookup failed: {str(e)}", "Semantic Cache")
+        return None
+
+
+def store(scope: str, message: str, response: Any, intent: Optional[str] = None, latency_ms: float = 0.0) -> Optional[str]:
+    """Cache ``response`` for ``message``; returns the entry id (None if not cached)."""
+    ttl = intent_ttl(intent)
+    if ttl <= 0:
+        return None
+    try:
+        conn = _redis()
+        if conn is None:
+            return None
+        sig = signature(message)
+        entry_id = uuid.uuid4().hex[:16]
+        entry_key = _key("entry", scope, entry_id)
+
+        pipe = conn.pipeline()
+        pipe.hset(entry_key, mapping={
+            "signature": json.dumps(sig),
+            "intent": intent or "",
+            "message": message[:500],
+            "response": json.dumps(response, default=str),
+            "latency_ms": round(float(latency_ms or 0), 1),
+            "created": time.time(),
+        })
+        pipe.expire(entry_key, ttl)
+        for band_key in _band_keys(scope, sig):
+            pipe.sadd(band_key, entry_id)
+            pipe.expire(band_key, max(ttl, DEFAULT_TTL))
+        pipe.zadd(_key("usage", scope), {entry_id: _usage_score(0)})
+        pipe.hincrby(_key("metrics", scope), "stores", 1)
+        pipe.execute()
+
+        _evict(conn, scope)
+        return entry_id
+    except Exception as e:
+        frappe.log_error(f"Semantic cache store failed: {str(e)}", "Semantic Cache")
+        return None
+
+
+def find_similar(scope: str, message: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Cached entries similar to ``message``, best first (no threshold, no metrics)."""
+    try:
+        conn = _redis()
+        if conn is None:
+            return []
+        sig = signature(message)
+        pipe = conn.pipeline(transaction=False)
+        for band_key in _band_keys(scope, sig):
+            pipe.smembers(band_key)
+        candidates = set()
+        for members in pipe.execute():
+            candidates.update(_decode(m) for m in (members or ()))
+
+        results = []
+        for entry_id in list(candidates)[:MAX_CANDIDATES]:
+            sig_raw, message_raw, response, entry_intent = conn.hmget(
+                _key("entry", scope, entry_id), "signature", "message", "response", "intent"
+            )
+            if sig_raw is None:
+                continue
+            results.append({
+                "message": _decode(message_raw),
+                "response": json.loads(response),
+                "intent": _decode(entry_intent),
+                "similarity": round(similarity(sig, json.loads(sig_raw)), 3),
+            })
+        results.sort(key=lambda r: r["similarity"], reverse=True)
+        return results[:limit]
+    except Exception as e:
+        frappe.log_error(f"Semantic cache similarity search failed: {str(e)}", "Semantic Cache")
+        return []
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else (value or "")
+
+
+def _usage_score(hits: int) -> float:
+    # LFU: the fraction (creation time / 1e10 < 1) makes older entries lose ties,
+    # so a new entry is not evicted ahead of equally unused old ones
+    if _conf("semantic_cache_eviction", "lru") == "lfu":
+        return float(hits) + time.time() / 1e10
+    return time.time()
+
+
+def _record_lookup(conn, scope: str, best: Optional[Dict[str, Any]], lookup_ms: float) -> None:
+    pipe = conn.pipeline(transaction=False)
+    metrics_key = _key("metrics", scope)
+    pipe.hincrby(metrics_key, "lookups", 1)
+    pipe.hincrbyfloat(metrics_key, "lookup_ms", round(lookup_ms, 3))
+    if best:
+        pipe.hincrby(metrics_key, "hits", 1)
+        pipe.hincrbyfloat(metrics_key, "saved_llm_ms", best["latency_ms"])
+        pipe.hincrby(_key("entry", scope, best["entry_id"]), "hits", 1)
+        if _conf("semantic_cache_eviction", "lru") == "lfu":
+            pipe.zincrby(_key("usage", scope), 1, best["entry_id"])
+        else:
+            pipe.zadd(_key("usage", scope), {best["entry_id"]: time.time()})
+    else:
+        pipe.hincrby(metrics_key, "misses", 1)
+    pipe.execute()
+
+
+def _evict(conn, scope: str) -> None:
+    usage_key = _key("usage", scope)
+    excess = conn.zcard(usage_key) - int(_conf("semantic_cache_max_entries", DEFAULT_MAX_ENTRIES))
+    if excess <= 0:
+        return
+    evicted = conn.zpopmin(usage_key, excess)
+    if not evicted:
+        return
+    pipe = conn.pipeline(transaction=False)
+    for entry_id, _ in evicted:
+        pipe.delete(_key("entry", scope, _decode(entry_id)))
+    pipe.hincrby(_key("metrics", scope), "evictions", len(evicted))
+    pipe.execute()  # band members are dropped lazily on the next lookup
+
+
+def _drop_stale(conn, scope: str, sig: List[int], entry_ids: List[str]) -> None:
+    pipe = conn.pipeline(transaction=False)
+    for band_key in _band_keys(scope, sig):
+        pipe.srem(band_key, *entry_ids)
+    pipe.zrem(_key("usage", scope), *entry_ids)
+    pipe.execute()
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def get_metrics() -> Dict[str, Any]:
+    """Hit rate, saved LLM latency and size per scope."""
+    conn = _redis()
+    if conn is None:
+        return {}
+    prefix = _key("metrics", "")
+    scopes = {}
+    for raw_key in conn.scan_iter(match=prefix + "*", count=100):
+        metrics_key = _decode(raw_key)
+        scope = metrics_key[len(prefix):]
+        values = {_decode(k): float(v) for k, v in (conn.hgetall(metrics_key) or {}).items()}
+        lookups = values.get("lookups", 0)
+        hits = values.get("hits", 0)
+        scopes[scope] = {
+            "lookups": int(lookups),
+            "hits": int(hits),
+            "misses": int(values.get("misses", 0)),
+            "stores": int(values.get("stores", 0)),
+            "evictions": int(values.get("evictions", 0)),
+            "entries": conn.zcard(_key("usage", scope)),
+            "hit_rate": round(hits / lookups * 100, 2) if lookups else 0.0,
+            "saved_llm_seconds": round(values.get("saved_llm_ms", 0) / 1000, 2),
+            "avg_lookup_ms": round(values.get("lookup_ms", 0) / lookups, 3) if lookups else 0.0,
+        }
+    return scopes
+
+
+def reset_metrics() -> None:
+    conn = _redis()
+    if conn is None:
+        return
+    for raw_key in conn.scan_iter(match=_key("metrics", "") + "*", count=100):
+        conn.delete(raw_key)
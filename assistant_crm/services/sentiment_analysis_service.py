@@ -5,6 +5,8 @@ import frappe
 import re
 from frappe import _
 
+from assistant_crm.services import text_analytics
+
 
 class SentimentAnalysisService:
 	"""Enhanced sentiment analysis service for WCFCB CRM messages with Phase 2 features"""
@@ -16,13 +18,7 @@ class SentimentAnalysisService:
 		self.negation_words = self._load_negation_words()
 
 		# Phase 2 enhancements - emotion detection
-		self.emotion_patterns = {
-			'frustration': ['frustrated', 'annoyed', 'irritated', 'fed up', 'angry'],
-			'confusion': ['confused', 'lost', 'unclear', 'don\'t understand', 'what does this mean'],
-			'urgency': ['urgent', 'asap', 'immediately', 'right now', 'emergency'],
-			'satisfaction': ['satisfied', 'happy', 'pleased', 'great', 'perfect'],
-			'gratitude': ['thank', 'thanks', 'appreciate', 'grateful', 'helpful']
-		}
+		self.emotion_patterns = {emotion: list(patterns) for emotion, patterns in text_analytics.EMOTION_PATTERNS.items()}
 
 		# WorkCom's response adjustments based on detected emotions
 		self.WorkCom_adjustments = {
@@ -205,13 +201,7 @@ class SentimentAnalysisService:
 			return True
 		
 		# Escalation keywords
-		escalation_keywords = [
-			"complaint", "complain", "angry", "furious", "upset", "frustrated",
-			"terrible", "awful", "horrible", "worst", "hate", "disgusted",
-			"unacceptable", "outrageous", "ridiculous", "pathetic",
-			"manager", "supervisor", "escalate", "legal", "lawyer",
-			"sue", "court", "media", "newspaper", "report"
-		]
+		escalation_keywords = text_analytics.ESCALATION_KEYWORDS
 		
 		text_lower = text.lower()
 		for keyword in escalation_keywords:
@@ -236,92 +226,27 @@ class SentimentAnalysisService:
 	
 	def _load_positive_words(self):
 		"""Load positive sentiment words"""
-		return {
-			# English positive words
-			"good", "great", "excellent", "amazing", "wonderful", "fantastic",
-			"awesome", "brilliant", "perfect", "outstanding", "superb",
-			"happy", "pleased", "satisfied", "delighted", "thrilled",
-			"love", "like", "enjoy", "appreciate", "thank", "thanks",
-			"helpful", "useful", "efficient", "quick", "fast", "easy",
-			"professional", "friendly", "polite", "courteous", "kind",
-			
-			# Bemba positive words
-			"bwino", "ukusuma", "ukufwa", "ukusangalala", "ukutotela",
-			"ukutemwa", "ukupenda", "ukusuma", "bwino sana",
-			
-			# Nyanja positive words
-			"bwino", "kusangalala", "kukondwa", "kutamanda", "kuyamika",
-			"kukonda", "kusangalala", "bwino kwambiri",
-			
-			# Tonga positive words
-			"botu", "kusangalala", "kukondwa", "kutenda", "kuyanda"
-		}
+		return set(text_analytics.POSITIVE_WORDS)
 	
 	def _load_negative_words(self):
 		"""Load negative sentiment words"""
-		return {
-			# English negative words
-			"bad", "terrible", "awful", "horrible", "worst", "hate",
-			"angry", "mad", "furious", "upset", "frustrated", "annoyed",
-			"disappointed", "dissatisfied", "unhappy", "sad", "disgusted",
-			"useless", "worthless", "pathetic", "ridiculous", "stupid",
-			"slow", "difficult", "hard", "impossible", "broken",
-			"rude", "unprofessional", "incompetent", "lazy", "careless",
-			"complaint", "complain", "problem", "issue", "trouble",
-			
-			# Bemba negative words
-			"icibi", "ukusulila", "ukukalipa", "ukufwaya", "ukusunga",
-			"icibi sana", "ukukalipila", "ukufwayafwaya",
-			
-			# Nyanja negative words
-			"choipa", "kukwiya", "kupsya mtima", "kusauka", "kunyoza",
-			"choipa kwambiri", "kukwiyakwiya", "kupsyapsya",
-			
-			# Tonga negative words
-			"bibi", "kukalipa", "kufwaya", "kusulila", "kunyema"
-		}
+		return set(text_analytics.NEGATIVE_WORDS)
 	
 	def _load_intensifiers(self):
 		"""Load intensifier words with their multipliers"""
-		return {
-			"very": 1.5,
-			"extremely": 2.0,
-			"really": 1.3,
-			"absolutely": 1.8,
-			"completely": 1.7,
-			"totally": 1.6,
-			"quite": 1.2,
-			"rather": 1.1,
-			"so": 1.4,
-			"too": 1.3,
-			"highly": 1.5,
-			"incredibly": 1.9,
-			"amazingly": 1.8,
-			"exceptionally": 2.0,
-			
-			# Multi-language intensifiers
-			"sana": 1.5,  # Bemba/Nyanja/Tonga
-			"kwambiri": 1.6,  # Nyanja
-			"muno": 1.4  # Tonga
-		}
+		return dict(text_analytics.INTENSIFIERS)
 	
 	def _load_negation_words(self):
 		"""Load negation words"""
-		return {
-			"not", "no", "never", "nothing", "nobody", "nowhere",
-			"neither", "nor", "none", "without", "lack", "lacking",
-			"absent", "missing", "fail", "failed", "unable", "cannot",
-			"can't", "won't", "wouldn't", "shouldn't", "couldn't",
-			"don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't",
-
-			# Multi-language negations
-			"tabu",  # Bemba - no
-			"awe",   # Bemba - no
-			"iyayi", # Nyanja - no
-			"ayi",   # Nyanja - no
-			"pe",    # Tonga - no
-			"kana"   # Tonga - no
-		}
+		return set(text_analytics.NEGATION_WORDS)
+
+	def analyze_sentiment_batch(self, texts, workers=None):
+		"""Sentiment for many texts at once (arrays in input order, see text_analytics)"""
+		return text_analytics.analyze_sentiment_batch(texts, workers=workers)
+
+	def detect_emotions_batch(self, texts, workers=None):
+		"""Emotion pattern scores for many texts at once (see text_analytics)"""
+		return text_analytics.detect_emotions_batch(texts, workers=workers)
 
 	def analyze_urgency(self, text, customer_data=None):
 		"""Enhanced urgency detection for smart routing"""
@@ -0,0 +1,240 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Process-wide container of lazily built, shared service instances.
+
+``GeminiService`` and ``EnhancedAIService`` read their settings doctypes,
+decrypt API keys and parse ``.env.ai`` in their constructors.
+``SentimentAnalysisService`` and ``LanguageDetectionService`` rebuild their
+lexicons. Callers that construct them per request pay for that every time.
+``get(name)`` returns one instance per (site, service) and process instead.
+The instance is built on first use and shared by all threads. These services
+keep only configuration and clients on the instance, so they are safe to
+share, as the old ``SimplifiedChatAPI`` global already did.
+
+Services built from settings are rebuilt after those settings change. Saving
+one of the doctypes listed in ``SERVICES`` bumps a version stamp in the
+shared cache (``invalidate``, wired in ``doc_events``). Every process
+compares the stamp on its next ``get`` and rebuilds only the affected
+services. Services without settings never check the stamp.
+
+``warm_up()`` builds the configured services ahead of traffic. The
+``before_request`` hook ``warm_up_once`` starts it in a background thread on
+the first request a process serves for a site. It can also be run as
+``bench --site <site> execute assistant_crm.services.service_container.warm_up``.
+``get_metrics()`` reports build counts and instantiation cost per service, and
+``ai_api.get_service_container_metrics`` exposes it.
+
+Site config:
+
+- ``service_container_warmup``: service names to warm up (default: all), or
+  ``0`` to disable the automatic warm-up
+"""
+
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import frappe
+except ImportError:
+    frappe = None
+
+VERSION_KEY_PREFIX = "assistant_crm:service_container_version:"
+
+# name -> (dotted path of the class or factory, settings doctypes it reads)
+SERVICES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "gemini": ("assistant_crm.services.gemini_service.GeminiService", ("Assistant CRM Settings",)),
+    "enhanced_ai": ("assistant_crm.services.enhanced_ai_service.EnhancedAIService", ("Enhanced AI Settings",)),
+    "sentiment": ("assistant_crm.services.sentiment_analysis_service.SentimentAnalysisService", ()),
+    "language": ("assistant_crm.services.language_detection_service.LanguageDetectionService", ()),
+    "live_data": ("assistant_crm.services.live_data_orchestrator.LiveDataOrchestrator", ()),
+}
+
+_instances: Dict[Tuple[str, str], Tuple[str, Any]] = {}  # (site, name) -> (version, instance)
+_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_lock = threading.Lock()
+_stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_warmed_sites = set()
+
+
+def _site() -> str:
+    return getattr(getattr(frappe, "local", None), "site", None) or "default"
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _factory(name: str) -> Callable[[], Any]:
+    path = SERVICES[name][0]
+    module, _, attr = path.rpartition(".")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _version(name: str) -> str:
+    doctypes = SERVICES[name][1]
+    if not doctypes:
+        return ""
+    try:
+        cache = frappe.cache()
+        return "|".join(str(cache.get_value(VERSION_KEY_PREFIX + doctype) or "") for doctype in doctypes)
+    except Exception:
+        return ""
+
+
+def _stats_for(key: Tuple[str, str]) -> Dict[str, Any]:
+    stats = _stats.get(key)
+    if stats is None:
+        stats = _stats.setdefault(key, {
+            "builds": 0, "hits": 0, "failures": 0,
+            "last_build_ms": None, "total_build_ms": 0.0, "last_built_at": None,
+        })
+    return stats
+
+
+def get(name: str) -> Any:
+    """Shared instance of service ``name`` for the current site, built on first use."""
+    if name not in SERVICES:
+        raise KeyError(f"Unknown service: {name}")
+    key = (_site(), name)
+    version = _version(name)
+    cached = _instances.get(key)
+    if cached is not None and cached[0] == version:
+        _stats_for(key)["hits"] += 1
+        return cached[1]
+
+    with _lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    # One thread builds; the others wait for it instead of building their own
+    with build_lock:
+        cached = _instances.get(key)
+        if cached is not None and cached[0] == version:
+            _stats_for(key)["hits"] += 1
+            return cached[1]
+        return _build(key, name, version)
+
+
+def _build(key: Tuple[str, str], name: str, version: str) -> Any:
+    stats = _stats_for(key)
+    start = time.perf_counter()
+    try:
+        instance = _factory(name)()
+    except Exception:
+        stats["failures"] += 1
+        raise
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _instances[key] = (version, instance)
+    stats["builds"] += 1
+    stats["last_build_ms"] = round(elapsed_ms, 3)
+    stats["total_build_ms"] = round(stats["total_build_ms"] + elapsed_ms, 3)
+    stats["last_built_at"] = time.time()
+    return instance
+
+
+def invalidate(doc=None, method=None) -> None:
+    """Rebuild services that read ``doc``'s settings, in every process (doc_events hook)."""
+    doctype = getattr(doc, "doctype", None)
+    site = _site()
+    for name, (_path, doctypes) in SERVICES.items():
+        if doctype is None or doctype in doctypes:
+            _instances.pop((site, name), None)
+    doctypes = [doctype] if doctype else sorted({d for _p, ds in SERVICES.values() for d in ds})
+    try:
+        for settings_doctype in doctypes:
+            frappe.cache().set_value(VERSION_KEY_PREFIX + settings_doctype, f"{time.time():.6f}")
+    except Exception:
+        pass
+
+
+def clear() -> None:
+    """Forget every instance in this process (tests / benchmarks)."""
+    with _lock:
+        _instances.clear()
+
+
+def _warmup_names() -> List[str]:
+    configured = _conf("service_container_warmup", None)
+    if configured is None:
+        return list(SERVICES)
+    if not configured or configured in ("0", 0):
+        return []
+    if isinstance(configured, str):
+        configured = [n.strip() for n in configured.split(",")]
+    return [n for n in configured if n in SERVICES]
+
+
+def warm_up(services: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Build ``services`` (default: ``service_container_warmup``) now; returns ms per service."""
+    result = {}
+    for name in (list(services) if services else _warmup_names()):
+        start = time.perf_counter()
+        try:
+            get(name)
+            result[name] = round((time.perf_counter() - start) * 1000, 3)
+        except Exception as e:
+            result[name] = f"error: {str(e)}"
+            try:
+                frappe.log_error(f"Service warm-up failed for {name}: {str(e)}", "Service Container")
+            except Exception:
+                pass
+    return result
+
+
+def warm_up_once() -> None:
+    """before_request hook: warm the current site's services in the background, once per process."""
+    site = _site()
+    if site in _warmed_sites:
+        return
+    with _lock:
+        if site in _warmed_sites:
+            return
+        _warmed_sites.add(site)
+    if not _warmup_names():
+        return
+    sites_path = getattr(frappe.local, "sites_path", None)
+    threading.Thread(target=_warm_up_site, args=(site, sites_path), daemon=True,
+                     name=f"assistant-crm-warmup-{site}").start()
+
+
+def _warm_up_site(site: str, sites_path: Optional[str]) -> None:
+    try:
+        frappe.init(site=site, sites_path=sites_path)
+        frappe.connect()
+        warm_up()
+    except Exception:
+        pass
+    finally:
+        try:
+            frappe.destroy()
+        except Exception:
+            pass
+
+
+def get_metrics(measure: bool = False) -> Dict[str, Any]:
+    """Per-service build counts, hits and instantiation cost for the current site.
+
+    With ``measure`` each service is also instantiated once more, outside the
+    container, to time a cold construction now.
+    """
+    site = _site()
+    services = {}
+    for name in SERVICES:
+        key = (site, name)
+        stats = dict(_stats.get(key) or _stats_for(key))
+        stats["cached"] = key in _instances
+        stats["settings_doctypes"] = list(SERVICES[name][1])
+        if measure:
+            start = time.perf_counter()
+            try:
+                _factory(name)()
+                stats["measured_build_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            except Exception as e:
+                stats["measured_build_ms"] = None
+                stats["measure_error"] = str(e)
+        services[name] = stats
+    return {"site": site, "warmed_up": site in _warmed_sites, "services": services}
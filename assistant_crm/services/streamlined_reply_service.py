@@ -39,6 +39,8 @@ except ImportError:
     now = lambda: None
     cstr = str
 
+from . import intent_engine, knowledge_index
+
 # Comprehensive logging removed - using fallback functions only
 # Fallback functions for removed comprehensive logger
 def get_logger(component):
@@ -203,10 +205,7 @@ class StreamlinedReplyService:
     
     def __init__(self):
         """Initialize the streamlined reply service with enhanced authentication."""
-        self.live_data_intents = [
-            'claim_status', 'payment_status', 'payment_info', 'account_info',
-            'claim_inquiry', 'payment_inquiry', 'pension_inquiry', 'claim_submission'
-        ]
+        self.live_data_intents = list(intent_engine.LIVE_DATA_REPLY_INTENTS)
 
         # Initialize comprehensive logging
         self.intent_logger = get_logger('streamlined_reply_service')
@@ -224,56 +223,8 @@ class StreamlinedReplyService:
         # Session manager removed to eliminate "Conversation Session not found" errors
         self.session_manager = None
         
-        self.intent_patterns = {
-            'simple_greeting': {
-                'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening'],
-                'weight': 0.95
-            },
-            'greeting': {
-                'keywords': ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'greetings'],
-                'weight': 0.9
-            },
-            'employer_registration': {
-                'keywords': ['register as employer', 'employer registration', 'register my company', 'register my business', 'business registration', 'company registration', 'how to register', 'register employer', 'become an employer'],
-                'weight': 0.95
-            },
-            'pension_inquiry': {
-                'keywords': ['pension', 'retirement', 'benefit', 'monthly payment', 'pension status', 'pension amount'],
-                'weight': 0.8
-            },
-            'claim_submission': {
-                'keywords': ['submit claim', 'new claim', 'file claim', 'claim form', 'apply for', 'make a claim', 'injured at work', 'workplace accident', 'workplace injury', 'hurt at work'],
-                'weight': 0.9
-            },
-            'claim_status': {
-                'keywords': ['claim status', 'check claim', 'claim progress', 'claim update', 'my claim', 'status', 'check status', 'claim #', 'reference number'],
-                'weight': 0.8
-            },
-            'payment_status': {
-                'keywords': ['payment', 'money', 'pay', 'salary', 'when will i receive', 'payment date', 'payment schedule', 'disability benefit', 'pension payment', 'benefit payment', 'last payment', 'payment history', 'payment status', 'payment update'],
-                'weight': 0.8
-            },
-            'document_request': {
-                'keywords': ['documents', 'forms', 'paperwork', 'what do i need', 'requirements', 'documentation', 'certificate', 'proof', 'what documents', 'documents do i need', 'documents needed'],
-                'weight': 0.85
-            },
-            'agent_request': {
-                'keywords': ['speak to agent', 'human', 'person', 'representative', 'talk to someone', 'escalate', 'supervisor'],
-                'weight': 0.9
-            },
-            'complaint': {
-                'keywords': ['complaint', 'problem', 'issue', 'dissatisfied', 'unhappy', 'frustrated', 'angry', 'wrong'],
-                'weight': 0.8
-            },
-            'technical_help': {
-                'keywords': ['login', 'password', 'website', 'error', 'not working', 'technical', 'system', 'app'],
-                'weight': 0.7
-            },
-            'goodbye': {
-                'keywords': ['bye', 'goodbye', 'thank you', 'thanks', 'done', 'finished', 'that\'s all'],
-                'weight': 0.8
-            }
-        }
+        # Matched by the shared, precompiled intent engine
+        self.intent_patterns = intent_engine.STREAMLINED_INTENTS
 
     def get_bot_reply(self, message: str, user_context: Dict = None, session_id: str = None) -> str:
         """
@@ -619,59 +570,24 @@ class StreamlinedReplyService:
             'context_aware': False
         })
 
-        message_lower = message.lower().strip()
-
         # Enhanced greeting detection - check for simple greetings first
         if self._is_simple_greeting(message):
             self.intent_logger.log_intent_detection_result(request_id, 'simple_greeting', 0.95, "greeting_detection")
             return 'simple_greeting', 0.95
 
-        # Score each intent pattern
-        intent_scores = {}
-
-        for intent, pattern in self.intent_patterns.items():
-            score = 0
-            keywords = pattern['keywords']
-            weight = pattern['weight']
-
-            for keyword in keywords:
-                if keyword in message_lower:
-                    score += weight
-
-            if score > 0:
-                intent_scores[intent] = score
+        # Score each intent pattern (one shared keyword scan for scores and overrides)
+        intent_scores = intent_engine.streamlined_scores(message)
 
         # Log pattern matching results
         self.intent_logger.log_intent_pattern_matching(request_id, message, intent_scores)
 
         # Enhanced intent classification fixes from legacy service
-        if any(word in message_lower for word in ['thank you', 'thanks', 'thank', 'grateful', 'appreciate']):
-            self.intent_logger.log_intent_detection_result(request_id, 'gratitude', 0.95, "keyword_match")
-            return 'gratitude', 0.95
-
-        elif any(phrase in message_lower for phrase in ['what documents', 'documents do i need', 'what do i need', 'requirements', 'paperwork']):
-            self.intent_logger.log_intent_detection_result(request_id, 'document_request', 0.95, "phrase_match")
-            return 'document_request', 0.95
-
-        elif any(phrase in message_lower for phrase in ['injured at work', 'workplace injury', 'hurt at work', 'accident at work']):
-            self.intent_logger.log_intent_detection_result(request_id, 'injury_report', 0.95, "phrase_match")
-            return 'injury_report', 0.95
-
-        elif any(phrase in message_lower for phrase in ['i need help', 'help me', 'can you help']):
-            self.intent_logger.log_intent_detection_result(request_id, 'general_help', 0.85, "phrase_match")
-            return 'general_help', 0.85
-
-        elif any(phrase in message_lower for phrase in ['speak to agent', 'talk to agent', 'human agent', 'speak to someone']):
-            self.intent_logger.log_intent_detection_result(request_id, 'agent_request', 0.95, "phrase_match")
-            return 'agent_request', 0.95
-
-        elif any(phrase in message_lower for phrase in ['complaint', 'problem', 'issue', 'frustrated']):
-            self.intent_logger.log_intent_detection_result(request_id, 'complaint', 0.90, "phrase_match")
-            return 'complaint', 0.90
-
-        elif any(phrase in message_lower for phrase in ['understand wcfcb services', 'what can you help', 'what services']):
-            self.intent_logger.log_intent_detection_result(request_id, 'service_overview', 0.90, "phrase_match")
-            return 'service_overview', 0.90
+        override = intent_engine.streamlined_override(message)
+        if override:
+            override_intent, override_confidence = override
+            match_type = "keyword_match" if override_intent == 'gratitude' else "phrase_match"
+            self.intent_logger.log_intent_detection_result(request_id, override_intent, override_confidence, match_type)
+            return override_intent, override_confidence
 
         # Return highest scoring intent or unknown
         if intent_scores:
@@ -1098,12 +1014,11 @@ class StreamlinedReplyService:
         """
         Search knowledge base for relevant content.
 
-        Note: Knowledge Base Article doctype has been deprecated.
-        This method now returns an empty list as a placeholder.
+        Uses the shared BM25 ``knowledge_index``, which is empty (so this
+        returns []) on sites without the deprecated Knowledge Base Article
+        doctype.
         """
-        # Knowledge Base Article doctype has been removed
-        # Return empty list as knowledge base search is no longer available
-        return []
+        return knowledge_index.search(message, intent=intent, limit=3)
 
     def _extract_search_keywords(self, message: str) -> List[str]:
         """Extract relevant keywords from user message for search."""
@@ -1515,7 +1430,15 @@ class StreamlinedReplyService:
             }
 
             safe_log_error(f"Sending request to Gemini API", "Direct Gemini Request")
-            response = requests.post(url, json=payload, timeout=15)
+            from assistant_crm.services import llm_governor
+
+            prompt_text = payload["contents"][0]["parts"][0]["text"]
+            with llm_governor.acquire(
+                "gemini", "gemini-1.5-flash", llm_governor.INTERACTIVE, llm_governor.estimate_tokens(prompt_text, 512)
+            ) as permit:
+                response = requests.post(url, json=payload, timeout=15)
+                if response.status_code == 429:
+                    permit.rate_limited(response.headers.get("Retry-After"))
             response.raise_for_status()
 
             data = response.json()
@@ -1641,8 +1564,8 @@ class StreamlinedReplyService:
         try:
             # SURGICAL FIX: Enhanced Gemini service import with validation
             safe_log_error(f"Attempting to import Gemini service for live data response", "Gemini Import Debug")
-            from assistant_crm.services.gemini_service import GeminiService
-            gemini_service = GeminiService()
+            from assistant_crm.services import service_container
+            gemini_service = service_container.get("gemini")
 
             # Validate Gemini service is properly initialized
             if not gemini_service or not hasattr(gemini_service, 'process_message'):
@@ -1875,8 +1798,8 @@ class StreamlinedReplyService:
             safe_log_error(f"Formatting no data found response for identifier: {user_identifier}", "No Data Response Debug")
 
             # Import Gemini service for natural response with validation
-            from assistant_crm.services.gemini_service import GeminiService
-            gemini_service = GeminiService()
+            from assistant_crm.services import service_container
+            gemini_service = service_container.get("gemini")
 
             # Validate Gemini service
             if not gemini_service or not hasattr(gemini_service, 'process_message'):
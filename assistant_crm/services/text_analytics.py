@@ -0,0 +1,571 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Batch sentiment, emotion and language analysis for analytics jobs.
+
+``SentimentAnalysisService.analyze_sentiment``, ``detect_emotions_enhanced``
+and ``LanguageDetectionService.detect_language`` handle one string per call.
+Report jobs that score tens of thousands of rows should call
+``analyze_batch`` (or one of ``analyze_sentiment_batch``,
+``detect_emotions_batch``, ``detect_language_batch``) with a list or any
+iterator of texts. The result is a dict of NumPy arrays, one element per
+text, in input order.
+
+The lexicons live here and the services load them from here. They are
+compiled once per process:
+
+- one ``word -> flags`` dict covering positive, negative and negation words,
+  so sentiment scoring makes a single pass over the words
+- one ``KeywordMatcher`` (see ``intent_engine``) over the escalation
+  keywords, the emotion patterns and the greetings, so every substring check
+  is a single regex scan
+- ``word -> languages`` postings for the common-word vote, and precompiled
+  prefix patterns
+
+Results equal the per-item methods: same scores, the same float operation
+order and the same tie-breaking. ``tests/test_text_analytics.py`` checks
+this against the original loops, which are kept in
+``scripts/benchmark_text_analytics.py``.
+
+Batches of at least ``PARALLEL_THRESHOLD`` texts are split into chunks and
+spread over a process pool. Workers only run this module's pure functions and
+never touch the database. Pass ``workers=1`` to stay in-process.
+
+This module has no Frappe dependency.
+"""
+
+import itertools
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .intent_engine import KeywordMatcher
+
+CHUNK_SIZE = 5000
+PARALLEL_THRESHOLD = 20000
+MAX_WORKERS = 8
+
+# ---------------------------------------------------------------------------
+# Lexicons (SentimentAnalysisService / LanguageDetectionService load these)
+# ---------------------------------------------------------------------------
+
+POSITIVE_WORDS = frozenset({
+    # English positive words
+    "good", "great", "excellent", "amazing", "wonderful", "fantastic",
+    "awesome", "brilliant", "perfect", "outstanding", "superb",
+    "happy", "pleased", "satisfied", "delighted", "thrilled",
+    "love", "like", "enjoy", "appreciate", "thank", "thanks",
+    "helpful", "useful", "efficient", "quick", "fast", "easy",
+    "professional", "friendly", "polite", "courteous", "kind",
+
+    # Bemba positive words
+    "bwino", "ukusuma", "ukufwa", "ukusangalala", "ukutotela",
+    "ukutemwa", "ukupenda", "bwino sana",
+
+    # Nyanja positive words ("bwino" is listed with Bemba)
+    "kusangalala", "kukondwa", "kutamanda", "kuyamika",
+    "kukonda", "bwino kwambiri",
+
+    # Tonga positive words ("kusangalala", "kukondwa" are listed with Nyanja)
+    "botu", "kutenda", "kuyanda"
+})
+
+NEGATIVE_WORDS = frozenset({
+    # English negative words
+    "bad", "terrible", "awful", "horrible", "worst", "hate",
+    "angry", "mad", "furious", "upset", "frustrated", "annoyed",
+    "disappointed", "dissatisfied", "unhappy", "sad", "disgusted",
+    "useless", "worthless", "pathetic", "ridiculous", "stupid",
+    "slow", "difficult", "hard", "impossible", "broken",
+    "rude", "unprofessional", "incompetent", "lazy", "careless",
+    "complaint", "complain", "problem", "issue", "trouble",
+
+    # Bemba negative words
+    "icibi", "ukusulila", "ukukalipa", "ukufwaya", "ukusunga",
+    "icibi sana", "ukukalipila", "ukufwayafwaya",
+
+    # Nyanja negative words
+    "choipa", "kukwiya", "kupsya mtima", "kusauka", "kunyoza",
+    "choipa kwambiri", "kukwiyakwiya", "kupsyapsya",
+
+    # Tonga negative words
+    "bibi", "kukalipa", "kufwaya", "kusulila", "kunyema"
+})
+
+INTENSIFIERS = {
+    "very": 1.5,
+    "extremely": 2.0,
+    "really": 1.3,
+    "absolutely": 1.8,
+    "completely": 1.7,
+    "totally": 1.6,
+    "quite": 1.2,
+    "rather": 1.1,
+    "so": 1.4,
+    "too": 1.3,
+    "highly": 1.5,
+    "incredibly": 1.9,
+    "amazingly": 1.8,
+    "exceptionally": 2.0,
+
+    # Multi-language intensifiers
+    "sana": 1.5,  # Bemba/Nyanja/Tonga
+    "kwambiri": 1.6,  # Nyanja
+    "muno": 1.4  # Tonga
+}
+
+NEGATION_WORDS = frozenset({
+    "not", "no", "never", "nothing", "nobody", "nowhere",
+    "neither", "nor", "none", "without", "lack", "lacking",
+    "absent", "missing", "fail", "failed", "unable", "cannot",
+    "can't", "won't", "wouldn't", "shouldn't", "couldn't",
+    "don't", "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't",
+
+    # Multi-language negations
+    "tabu",  # Bemba - no
+    "awe",   # Bemba - no
+    "iyayi", # Nyanja - no
+    "ayi",   # Nyanja - no
+    "pe",    # Tonga - no
+    "kana"   # Tonga - no
+})
+
+ESCALATION_KEYWORDS = (
+    "complaint", "complain", "angry", "furious", "upset", "frustrated",
+    "terrible", "awful", "horrible", "worst", "hate", "disgusted",
+    "unacceptable", "outrageous", "ridiculous", "pathetic",
+    "manager", "supervisor", "escalate", "legal", "lawyer",
+    "sue", "court", "media", "newspaper", "report"
+)
+
+EMOTION_PATTERNS = {
+    'frustration': ['frustrated', 'annoyed', 'irritated', 'fed up', 'angry'],
+    'confusion': ['confused', 'lost', 'unclear', 'don\'t understand', 'what does this mean'],
+    'urgency': ['urgent', 'asap', 'immediately', 'right now', 'emergency'],
+    'satisfaction': ['satisfied', 'happy', 'pleased', 'great', 'perfect'],
+    'gratitude': ['thank', 'thanks', 'appreciate', 'grateful', 'helpful']
+}
+
+GREETING_PATTERNS = {
+    "en": [
+        "hello", "hi", "hey", "good morning", "good afternoon",
+        "good evening", "greetings", "howdy", "what's up"
+    ],
+    "bem": [
+        "muli bwanji", "mulishani", "mwabuka bwanji", "mwaswela bwanji",
+        "muli", "bwanji", "mulibwanji", "mwaiseni", "mwabombeni"
+    ],
+    "ny": [
+        "muli bwanji", "mulibwanji", "mwadzuka bwanji", "mwatulo bwanji",
+        "moni", "bwanji", "takulandirani", "mwabwera bwanji"
+    ],
+    "to": [
+        "muli bwanji", "mulibwanji", "mwabuka bwanji", "mwaswela bwanji",
+        "muli", "bwanji", "mwaiseni", "mwabombeni", "mwatondezya"
+    ]
+}
+
+COMMON_WORDS = {
+    "en": frozenset({
+        "the", "and", "or", "but", "in", "on", "at", "to", "for", "of",
+        "with", "by", "from", "about", "into", "through", "during",
+        "before", "after", "above", "below", "up", "down", "out", "off",
+        "over", "under", "again", "further", "then", "once", "here",
+        "there", "when", "where", "why", "how", "all", "any", "both",
+        "each", "few", "more", "most", "other", "some", "such", "no",
+        "nor", "not", "only", "own", "same", "so", "than", "too", "very",
+        "can", "will", "just", "should", "now", "business", "registration",
+        "pension", "employer", "claim", "help", "need", "want", "please",
+        "thank", "thanks", "sorry", "yes"
+    }),
+    "bem": frozenset({
+        "na", "ne", "pa", "ku", "mu", "nga", "ukuti", "ati", "kuti",
+        "uko", "umo", "apo", "pano", "nomba", "lelo", "mailo", "cindi",
+        "bantu", "umuntu", "abantu", "icibi", "icisuma", "ukufwaya",
+        "ukupenda", "ukutemwa", "ukusuma", "ukuya", "ukufika", "ukubwela",
+        "bwino", "sana", "pantu", "naimwe", "ine", "iwe", "uyu", "aba",
+        "business", "ukusungula", "pension", "employer", "claim",
+        "ndeelomba", "natotela", "asante", "eya", "awe", "tabu"
+    }),
+    "ny": frozenset({
+        "ndi", "pa", "ku", "mu", "kuti", "koma", "kapena", "ngati",
+        "pamene", "pano", "lero", "mawa", "dzulo", "anthu", "munthu",
+        "choipa", "chabwino", "kufuna", "kukonda", "kutamanda", "kupita",
+        "kubwera", "kufika", "bwino", "kwambiri", "chifukwa", "inu",
+        "ine", "iwe", "uyu", "awa", "business", "kulembetsa", "pension",
+        "employer", "claim", "chonde", "zikomo", "pepani", "inde", "ayi"
+    }),
+    "to": frozenset({
+        "a", "na", "ku", "mu", "pa", "kuti", "pele", "hape", "jwale",
+        "hosasa", "maabane", "batho", "motho", "mobe", "molemo", "ho batla",
+        "ho rata", "ho leboha", "ho ya", "ho tla", "ho fihla", "hantle",
+        "haholo", "hobane", "lona", "nna", "wena", "enwa", "bana",
+        "business", "ho ngodisa", "pension", "employer", "claim",
+        "ka kopo", "kea leboha", "tshwarelo", "ee", "che"
+    })
+}
+
+LANGUAGE_PATTERNS = {
+    "bem": [
+        r'\buku\w+',  # Bemba infinitive prefix
+        r'\baba\w+',  # Bemba plural prefix
+        r'\bici\w+',  # Bemba noun prefix
+        r'\bumu\w+',  # Bemba noun prefix
+        r'wa\b',      # Bemba possessive
+        r'nga\b'      # Bemba conditional
+    ],
+    "ny": [
+        r'\bku\w+',   # Nyanja infinitive prefix
+        r'\ba\w+',    # Nyanja plural prefix
+        r'\bchi\w+',  # Nyanja noun prefix
+        r'\bmu\w+',   # Nyanja noun prefix
+        r'wa\b',      # Nyanja possessive
+        r'ngati\b'    # Nyanja conditional
+    ],
+    "to": [
+        r'\bho\w+',   # Tonga infinitive prefix
+        r'\bba\w+',   # Tonga plural prefix
+        r'\bse\w+',   # Tonga noun prefix
+        r'\bmo\w+',   # Tonga noun prefix
+        r'wa\b',      # Tonga possessive
+        r'haeba\b'    # Tonga conditional
+    ]
+}
+
+# ---------------------------------------------------------------------------
+# Compiled lookups
+# ---------------------------------------------------------------------------
+
+_URL = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+_EMAIL = re.compile(r'\S+@\S+')
+_PHONE = re.compile(r'[\+]?[1-9]?[0-9]{7,15}')
+_SENTIMENT_PUNCTUATION = re.compile(r'[^\w\s]')
+_LANGUAGE_PUNCTUATION = re.compile(r'[^\w\s\.\!\?]')
+_WHITESPACE = re.compile(r'\s+')
+# The phone pattern needs seven ASCII digits in a row; skip it cheaply otherwise
+_PHONE_HINT = re.compile(r'[0-9]{7}')
+
+POSITIVE, NEGATIVE, NEGATION = 1, 2, 4
+_WORD_FLAGS: Dict[str, int] = {}
+for _words, _flag in ((POSITIVE_WORDS, POSITIVE), (NEGATIVE_WORDS, NEGATIVE), (NEGATION_WORDS, NEGATION)):
+    for _word in _words:
+        _WORD_FLAGS[_word] = _WORD_FLAGS.get(_word, 0) | _flag
+
+EMOTIONS = tuple(EMOTION_PATTERNS)
+LANGUAGES = tuple(GREETING_PATTERNS)
+COMMON_WORD_LANGUAGES = tuple(COMMON_WORDS)
+PATTERN_LANGUAGES = tuple(LANGUAGE_PATTERNS)
+
+# One scan finds escalation keywords, emotion patterns and greetings
+_MATCHER = KeywordMatcher(
+    list(ESCALATION_KEYWORDS)
+    + [p for patterns in EMOTION_PATTERNS.values() for p in patterns]
+    + [p for patterns in GREETING_PATTERNS.values() for p in patterns]
+)
+_ESCALATION = frozenset(ESCALATION_KEYWORDS)
+# pattern -> [(emotion index, ...)] with repeats, so duplicated patterns count twice
+_EMOTION_POSTINGS: Dict[str, List[int]] = {}
+for _i, _patterns in enumerate(EMOTION_PATTERNS.values()):
+    for _pattern in _patterns:
+        _EMOTION_POSTINGS.setdefault(_pattern, []).append(_i)
+_EMOTION_SIZES = tuple(len(patterns) for patterns in EMOTION_PATTERNS.values())
+_GREETING_POSTINGS: Dict[str, List[int]] = {}
+for _i, _patterns in enumerate(GREETING_PATTERNS.values()):
+    for _pattern in _patterns:
+        _GREETING_POSTINGS.setdefault(_pattern, []).append(_i)
+_COMMON_WORD_POSTINGS: Dict[str, Tuple[int, ...]] = {}
+for _i, _words in enumerate(COMMON_WORDS.values()):
+    for _word in _words:
+        _COMMON_WORD_POSTINGS[_word] = _COMMON_WORD_POSTINGS.get(_word, ()) + (_i,)
+_LANGUAGE_REGEXES = tuple(tuple(re.compile(p) for p in patterns) for patterns in LANGUAGE_PATTERNS.values())
+
+
+def _strip_contacts(text: str) -> str:
+    """Remove URLs, emails and phone numbers, skipping patterns that cannot match."""
+    if 'http' in text:
+        text = _URL.sub('', text)
+    if '@' in text:
+        text = _EMAIL.sub('', text)
+    if _PHONE_HINT.search(text):
+        text = _PHONE.sub('', text)
+    return text
+
+
+def preprocess_sentiment_text(text: str) -> str:
+    """``SentimentAnalysisService._preprocess_text``."""
+    text = _SENTIMENT_PUNCTUATION.sub(' ', _strip_contacts(text.lower()))
+    text = _WHITESPACE.sub(' ', text)
+    return text.strip()
+
+
+def clean_language_text(text: str) -> str:
+    """``LanguageDetectionService._clean_text``."""
+    text = _LANGUAGE_PUNCTUATION.sub(' ', _strip_contacts(text))
+    text = _WHITESPACE.sub(' ', text)
+    return text.strip()
+
+
+def _lexicon_scores(words: List[str]) -> Tuple[float, float]:
+    """Positive and negative scores in one pass (the two negation states run side by side)."""
+    flags = _WORD_FLAGS
+    intensifiers = INTENSIFIERS
+    positive = negative = 0
+    positive_negated = negative_negated = False
+    previous = None
+    previous_flags = 0
+    for i, word in enumerate(words):
+        word_flags = flags.get(word, 0)
+        if word_flags & NEGATION:
+            positive_negated = negative_negated = True
+        else:
+            if word_flags & (POSITIVE | NEGATIVE):
+                boost = intensifiers.get(previous) if i > 0 else None
+                if word_flags & POSITIVE:
+                    word_score = 1
+                    if boost is not None:
+                        word_score *= boost
+                    if positive_negated:
+                        word_score *= -0.5
+                        positive_negated = False
+                    positive += word_score
+                if word_flags & NEGATIVE:
+                    word_score = 1
+                    if boost is not None:
+                        word_score *= boost
+                    if negative_negated:
+                        word_score *= -0.5
+                        negative_negated = False
+                    negative += word_score
+            # Reset negation after 2 words
+            if i > 0 and not previous_flags & NEGATION:
+                positive_negated = negative_negated = False
+        previous = word
+        previous_flags = word_flags
+    return max(0, positive), max(0, negative)
+
+
+def _confidence(pos: float, neg: float, neu: float) -> str:
+    max_score = max(pos, neg, neu)
+    if max_score > 0.6:
+        return "high"
+    elif max_score > 0.4:
+        return "medium"
+    return "low"
+
+
+def sentiment_row(text: Any, found: Optional[frozenset] = None) -> Tuple[float, float, float, float, str, bool, str]:
+    """(positive, negative, neutral, compound, label, escalation_needed, confidence) for one text.
+
+    ``found`` is ``_MATCHER.find(text.lower())`` when the caller already has it.
+    """
+    if not text or not isinstance(text, str):
+        return 0.0, 0.0, 1.0, 0.0, "neutral", False, "low"
+    text_lower = text.lower()
+    # split() collapses whitespace itself, so the collapse/strip steps are skipped
+    words = _SENTIMENT_PUNCTUATION.sub(' ', _strip_contacts(text_lower)).split()
+    if not words:
+        return 0.0, 0.0, 1.0, 0.0, "neutral", False, "low"
+
+    positive_score, negative_score = _lexicon_scores(words)
+    total_words = len(words)
+    neutral_score = max(0, total_words - positive_score - negative_score)
+    pos = positive_score / total_words
+    neg = negative_score / total_words
+    neu = neutral_score / total_words
+
+    if pos == 0 and neg == 0:
+        compound = 0.0
+    else:
+        compound = pos - neg
+        compound = min(compound, 1.0) if compound > 0 else max(compound, -1.0)
+
+    if compound >= 0.05:
+        label = "positive"
+    elif compound <= -0.05:
+        label = "negative"
+    else:
+        label = "neutral"
+
+    if compound < -0.6:
+        escalation = True
+    else:
+        escalation = not _ESCALATION.isdisjoint(_MATCHER.find(text_lower) if found is None else found)
+    return (round(pos, 3), round(neg, 3), round(neu, 3), round(compound, 3),
+            label, escalation, _confidence(pos, neg, neu))
+
+
+def emotion_row(text: Any, found: Optional[frozenset] = None) -> Tuple[float, ...]:
+    """Score per emotion (``EMOTIONS`` order) as in ``detect_emotions_enhanced``."""
+    if not text or not isinstance(text, str):
+        return (0.0,) * len(EMOTIONS)
+    counts = [0] * len(EMOTIONS)
+    postings = _EMOTION_POSTINGS
+    for pattern in (_MATCHER.find(text.lower()) if found is None else found):
+        for i in postings.get(pattern, ()):
+            counts[i] += 1
+    return tuple(min(count / size, 1.0) for count, size in zip(counts, _EMOTION_SIZES))
+
+
+def language_row(text: Any) -> str:
+    """``LanguageDetectionService.detect_language`` for one text."""
+    if not text or not isinstance(text, str):
+        return "en"
+    cleaned = clean_language_text(text)
+    if not cleaned:
+        return "en"
+    text_lower = cleaned.lower()
+
+    # Greetings first (most reliable); the first language with the top score wins
+    scores = [0] * len(LANGUAGES)
+    for pattern in _MATCHER.find(text_lower):
+        for i in _GREETING_POSTINGS.get(pattern, ()):
+            scores[i] += 2
+    best = max(scores)
+    if best > 0:
+        return LANGUAGES[scores.index(best)]
+
+    # Common words, at least 2
+    scores = [0] * len(COMMON_WORD_LANGUAGES)
+    postings = _COMMON_WORD_POSTINGS
+    for word in text_lower.split():
+        for i in postings.get(word, ()):
+            scores[i] += 1
+    best = max(scores)
+    if best >= 2:
+        return COMMON_WORD_LANGUAGES[scores.index(best)]
+
+    # Character patterns, at least 3 matches
+    for language, regexes in zip(PATTERN_LANGUAGES, _LANGUAGE_REGEXES):
+        matches = 0
+        for regex in regexes:
+            matches += len(regex.findall(text_lower))
+            if matches >= 3:
+                return language
+
+    return "en"
+
+
+# ---------------------------------------------------------------------------
+# Batch API
+# ---------------------------------------------------------------------------
+
+def _analyze_chunk(texts: List[Any], sentiment: bool, emotions: bool, language: bool) -> Dict[str, list]:
+    out = {
+        "sentiment": [] if sentiment else None,
+        "emotions": [] if emotions else None,
+        "language": [] if language else None,
+    }
+    # Report rows repeat a lot ("good", "thanks"); each distinct text is analyzed once
+    memo: Dict[str, tuple] = {}
+    for text in texts:
+        row = memo.get(text) if isinstance(text, str) else None
+        if row is None:
+            # One keyword scan serves both the escalation check and the emotions
+            found = _MATCHER.find(text.lower()) if (sentiment or emotions) and text and isinstance(text, str) else None
+            row = (
+                sentiment_row(text, found) if sentiment else None,
+                emotion_row(text, found) if emotions else None,
+                language_row(text) if language else None,
+            )
+            if isinstance(text, str):
+                memo[text] = row
+        if sentiment:
+            out["sentiment"].append(row[0])
+        if emotions:
+            out["emotions"].append(row[1])
+        if language:
+            out["language"].append(row[2])
+    return out
+
+
+def _chunks(texts: Iterable[Any], size: int):
+    iterator = iter(texts)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def default_workers() -> int:
+    return max(1, min(MAX_WORKERS, (os.cpu_count() or 1)))
+
+
+def _run_chunks(texts: Iterable[Any], options: Tuple[bool, bool, bool],
+                workers: Optional[int], chunk_size: int) -> List[Dict[str, list]]:
+    chunks = _chunks(texts, chunk_size)
+    workers = default_workers() if workers is None else max(1, int(workers))
+
+    # Small batches stay in-process: pool start-up costs more than it saves
+    head = list(itertools.islice(chunks, -(-PARALLEL_THRESHOLD // chunk_size)))
+    if workers == 1 or sum(len(c) for c in head) < PARALLEL_THRESHOLD:
+        return [_analyze_chunk(c, *options) for c in itertools.chain(head, chunks)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_analyze_chunk, c, *options) for c in head]
+        for chunk in chunks:
+            futures.append(pool.submit(_analyze_chunk, chunk, *options))
+        return [future.result() for future in futures]
+
+
+def analyze_batch(texts: Iterable[Any], sentiment: bool = True, emotions: bool = True,
+                  language: bool = True, workers: Optional[int] = None,
+                  chunk_size: int = CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    """Analyze ``texts`` (list or iterator) and return one array per field, in input order.
+
+    Sentiment: ``positive``, ``negative``, ``neutral``, ``compound_score``
+    (float), ``sentiment`` (label), ``escalation_needed`` (bool) and
+    ``confidence`` (``low``/``medium``/``high``). Emotions:
+    ``emotion_scores`` (n x len(EMOTIONS), columns in ``EMOTIONS`` order) and
+    ``primary_emotion``, which is ``neutral`` when no pattern matched (the
+    per-item function reports the first emotion with a 0.0 score). Language:
+    ``language`` codes.
+    """
+    results = _run_chunks(texts, (sentiment, emotions, language), workers, max(1, int(chunk_size)))
+    out: Dict[str, np.ndarray] = {}
+
+    if sentiment:
+        rows = [row for r in results for row in r["sentiment"]]
+        columns = list(zip(*rows)) if rows else [()] * 7
+        out["positive"] = np.array(columns[0], dtype=np.float64)
+        out["negative"] = np.array(columns[1], dtype=np.float64)
+        out["neutral"] = np.array(columns[2], dtype=np.float64)
+        out["compound_score"] = np.array(columns[3], dtype=np.float64)
+        out["sentiment"] = np.array(columns[4], dtype="<U8")
+        out["escalation_needed"] = np.array(columns[5], dtype=bool)
+        out["confidence"] = np.array(columns[6], dtype="<U6")
+
+    if emotions:
+        rows = [row for r in results for row in r["emotions"]]
+        scores = np.array(rows, dtype=np.float64).reshape(len(rows), len(EMOTIONS))
+        out["emotion_scores"] = scores
+        # argmax keeps the first of equal scores, like max() over the dict
+        primary = np.array(EMOTIONS, dtype="<U12")[scores.argmax(axis=1)] if len(rows) \
+            else np.array([], dtype="<U12")
+        primary[~scores.any(axis=1)] = "neutral"
+        out["primary_emotion"] = primary
+
+    if language:
+        out["language"] = np.array([code for r in results for code in r["language"]], dtype="<U3")
+
+    return out
+
+
+def analyze_sentiment_batch(texts: Iterable[Any], workers: Optional[int] = None,
+                            chunk_size: int = CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    return analyze_batch(texts, emotions=False, language=False, workers=workers, chunk_size=chunk_size)
+
+
+def detect_emotions_batch(texts: Iterable[Any], workers: Optional[int] = None,
+                          chunk_size: int = CHUNK_SIZE) -> Dict[str, np.ndarray]:
+    return analyze_batch(texts, sentiment=False, language=False, workers=workers, chunk_size=chunk_size)
+
+
+def detect_language_batch(texts: Iterable[Any], workers: Optional[int] = None,
+                          chunk_size: int = CHUNK_SIZE) -> np.ndarray:
+    return analyze_batch(texts, sentiment=False, emotions=False, workers=workers,
+                         chunk_size=chunk_size)["language"]
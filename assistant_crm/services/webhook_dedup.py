@@ -0,0 +1,177 @@
+# Copyright (c) 2025, WCFCB and contributors
+# For license information, please see license.txt
+
+"""
+Fast duplicate rejection for inbound platform messages.
+
+Meta, Telegram and Tawk.to all redeliver webhooks (and the pollers re-read
+the same chats every cycle). Every delivery used to run a ``message_id``
+lookup, plus an ORDER BY creation DESC query for the user's latest
+conversation, before it could be dropped. This module adds:
+
+- ``claim(platform, message_id)``: one Redis ``SET NX`` per delivery. The
+  claim is provisional ("pending", short TTL) until the request commits; it
+  then holds the Unified Inbox Message name for ``webhook_dedup_ttl_seconds``
+  (default 48h). A rollback releases it so the platform's retry is ingested.
+  A claim made earlier in the same request is honoured, so handlers can
+  claim before conversation work and ``create_unified_inbox_message`` can
+  claim again. If Redis is unavailable the claim succeeds and the unique
+  ``(platform, platform_message_id)`` index is the backstop.
+- a latest-conversation pointer per ``(platform, customer_platform_id)`` in
+  the shared cache, set when a conversation is inserted and cleared when it
+  is deleted. A closed conversation needs no pointer update: readers check
+  its status and open a new conversation, which moves the pointer.
+
+Site config keys (all optional):
+- webhook_dedup_ttl_seconds: how long a committed delivery id is remembered
+  (default 172800)
+"""
+
+from typing import Optional
+
+import frappe
+
+PENDING = b"pending"
+PENDING_TTL_SECONDS = 60
+DEFAULT_TTL_SECONDS = 48 * 3600
+POINTER_TTL_SECONDS = 7 * 24 * 3600
+
+
+def _conf(key: str, default):
+    conf = getattr(frappe, "conf", {}) or {}
+    value = conf.get(key)
+    return default if value in (None, "") else value
+
+
+def _redis():
+    from frappe.utils.background_jobs import get_redis_conn
+
+    return get_redis_conn()
+
+
+def _key(*parts: str) -> str:
+    site = getattr(frappe.local, "site", None) or "default"
+    return ":".join([site, "assistant_crm", "dedup", *parts])
+
+
+def _claimed_in_request() -> set:
+    claimed = getattr(frappe.local, "assistant_crm_dedup_claims", None)
+    if claimed is None:
+        claimed = frappe.local.assistant_crm_dedup_claims = set()
+    return claimed
+
+
+def _on_commit(fn) -> None:
+    after_commit = getattr(getattr(frappe, "db", None), "after_commit", None)
+    if after_commit is not None:
+        after_commit.add(fn)
+    else:
+        fn()
+
+
+def _on_rollback(fn) -> None:
+    after_rollback = getattr(getattr(frappe, "db", None), "after_rollback", None)
+    if after_rollback is not None:
+        after_rollback.add(fn)
+
+
+def claim(platform: str, message_id: Optional[str]) -> bool:
+    """True if this delivery is new and the caller should ingest it."""
+    if not message_id:
+        return True
+    key = _key(platform, str(message_id))
+    claimed = _claimed_in_request()
+    if key in claimed:
+        return True
+
+    try:
+        if not _redis().set(key, PENDING, nx=True, ex=PENDING_TTL_SECONDS):
+            return False
+    except Exception:
+        return True  # fail open: the unique index still rejects the duplicate
+
+    claimed.add(key)
+    _on_rollback(lambda: release(platform, message_id))
+    return True
+
+
+def confirm(platform: str, message_id: Optional[str], message_name: str) -> None:
+    """Remember the delivery for the full TTL once the insert commits."""
+    if not message_id:
+        return
+    key = _key(platform, str(message_id))
+
+    def _store():
+        try:
+            _redis().set(key, message_name, ex=int(_conf("webhook_dedup_ttl_seconds", DEFAULT_TTL_SECONDS)))
+        except Exception:
+            pass
+
+    _on_commit(_store)
+
+
+def release(platform: str, message_id: Optional[str]) -> None:
+    """Drop a claim so a redelivery is processed (failed/rolled back ingest)."""
+    if not message_id:
+        return
+    key = _key(platform, str(message_id))
+    _claimed_in_request().discard(key)
+    try:
+        conn = _redis()
+        if conn.get(key) == PENDING:
+            conn.delete(key)
+    except Exception:
+        pass
+
+
+def get_claimed_message(platform: str, message_id: Optional[str]) -> Optional[str]:
+    """Unified Inbox Message name of a committed delivery, if remembered."""
+    if not message_id:
+        return None
+    try:
+        value = _redis().get(_key(platform, str(message_id)))
+    except Exception:
+        return None
+    if not value or value == PENDING:
+        return None
+    return value.decode() if isinstance(value, bytes) else value
+
+
+# ---------------------------------------------------------------------------
+# Latest conversation pointer
+# ---------------------------------------------------------------------------
+
+def _pointer_key(platform: str, customer_platform_id: str) -> str:
+    return f"assistant_crm:latest_conversation:{platform}:{customer_platform_id}"
+
+
+def get_latest_conversation(platform: str, customer_platform_id: Optional[str]) -> Optional[str]:
+    if not platform or not customer_platform_id:
+        return None
+    try:
+        return frappe.cache().get_value(_pointer_key(platform, customer_platform_id))
+    except Exception:
+        return None
+
+
+def set_latest_conversation(platform: str, customer_platform_id: Optional[str], conversation_name: str) -> None:
+    if not platform or not customer_platform_id:
+        return
+    try:
+        frappe.cache().set_value(
+            _pointer_key(platform, customer_platform_id),
+            conversation_name,
+            expires_in_sec=POINTER_TTL_SECONDS,
+        )
+    except Exception:
+        pass
+
+
+def clear_latest_conversation(platform: str, customer_platform_id: Optional[str], conversation_name: str) -> None:
+    """Remove the pointer if it still targets ``conversation_name``."""
+    if get_latest_conversation(platform, customer_platform_id) != conversation_name:
+        return
+    try:
+        frappe.cache().delete_value(_pointer_key(platform, customer_platform_id))
+    except Exception:
+        pass
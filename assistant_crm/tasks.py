@@ -21,6 +21,12 @@ def poll_youtube():
     poll_youtube_comments()
 
 
+def run_platform_pollers():
+    """Start the leader-elected Telegram / Tawk.to / Instagram pollers."""
+    from assistant_crm.services.platform_pollers import run_pollers
+    run_pollers()
+
+
 def sweep_escalations():
     """Sweep and escalate inactive conversations."""
     from assistant_crm.api.unified_inbox_api import sweep_escalate_inactive_conversations
@@ -178,3 +184,27 @@ def sweep_sla_reminders():
     from assistant_crm.api.unified_inbox_api import sweep_sla_reminders
     sweep_sla_reminders()
 
+
+
+def reconcile_inbox_counters():
+    """Repair drift in Unified Inbox Conversation message/unread counters."""
+    from assistant_crm.api.unified_inbox_api import reconcile_conversation_counters
+    reconcile_conversation_counters()
+
+
+def flush_issue_history():
+    """Flush buffered Issue conversation history (issue_history_mode = batched)."""
+    from assistant_crm.services.issue_history import flush_pending
+    flush_pending()
+
+
+def flush_ddos_violations():
+    """Write queued DDoS violations as aggregated Assistant CRM DDoS Log rows."""
+    from assistant_crm.ddos_violation_log import flush_violations
+    flush_violations()
+
+
+def release_outbound_retries():
+    """Re-enqueue outbound deliveries whose retry backoff has elapsed."""
+    from assistant_crm.services.outbound_dispatcher import release_due_retries
+    release_due_retries()
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Shared Redis Test Fixtures
+================================================
+
+A pool for a URL nothing listens on, registered without its health
+thread, so tests decide the circuit state themselves.
+"""
+
+import os
+
+from assistant_crm.services import redis_pool
+
+# Nothing listens on port 1: connections are refused at once
+DEAD_URL = "redis://127.0.0.1:1/0"
+
+
+def install_dead_pool(state=None):
+    """Register a pool for DEAD_URL with no health thread; returns it."""
+    pooled = redis_pool._PooledRedis(DEAD_URL)
+    pooled._thread_pid = os.getpid()
+    if state is not None:
+        pooled.state = state
+    redis_pool._pools[DEAD_URL] = pooled
+    return pooled
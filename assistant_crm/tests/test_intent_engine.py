@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Intent Engine Equivalence Tests
+=====================================================
+
+The shared precompiled intent engine must return exactly what the per-call
+keyword scans it replaced returned: same intent, same confidence, same
+per-intent scores. The original scans are kept as ``legacy_*`` functions in
+``scripts/benchmark_intent_engine.py``.
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.scripts.benchmark_intent_engine import (
+    DETECTORS,
+    SAMPLE_MESSAGES,
+    build_corpus,
+    engine_classifier,
+    legacy_classifier,
+)
+from assistant_crm.services import intent_engine
+from assistant_crm.services.intent_engine import KeywordMatcher
+
+# Hand-picked edge cases: overlapping and nested keywords, keywords inside
+# other words ("hi" in "this"), punctuation, case and whitespace
+EDGE_CASES = [
+    "",
+    "   ",
+    "HELLO!!!",
+    "this is a thing",
+    "claim status claim status",
+    "my claim status and my payment history",
+    "show me my payment history",
+    "when was my last payment",
+    "payment",
+    "paymentpaymentpay",
+    "WC-2024-000123",
+    "clm-1234 acc-999 emp-42",
+    "register as an employer",
+    "can't log in, cannot log in, cant access",
+    "that's all, thats all",
+    "Thank you so much!",
+    "i need help, help me, can you help",
+    "what documents do i need and what do i need",
+    "understand wcfcb services",
+    "I am very frustrated and angry, this is wrong",
+    "employee claims and company claims for staff claims",
+    "compliance premium safety training audit",
+    "case claim file review assign update",
+    "Hello there, I hurt at work and had an accident at work",
+    "héllo ünïcode paymént",
+    "good morning\tgood evening\ngood afternoon",
+]
+
+
+def corpus():
+    messages = list(SAMPLE_MESSAGES) + EDGE_CASES + build_corpus(3000, seed=11)
+    # Concatenations of raw keywords stress overlapping matches
+    rng = random.Random(5)
+    keywords = list(intent_engine.get_engine().matcher.keywords)
+    for _ in range(2000):
+        sep = rng.choice([" ", "", ", "])
+        messages.append(sep.join(rng.choice(keywords) for _ in range(rng.randint(1, 6))))
+    return messages
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    """Matcher finds exactly the keywords ``kw in text`` would."""
+
+    def test_matches_substring_semantics(self):
+        matcher = intent_engine.get_engine().matcher
+        for message in corpus():
+            text = message.lower()
+            expected = frozenset(k for k in matcher.keywords if k in text)
+            self.assertEqual(matcher.find(text), expected, message)
+
+    def test_nested_prefixes(self):
+        matcher = KeywordMatcher(["pay", "payment", "payment history", "history"])
+        self.assertEqual(
+            matcher.find("my payment history"),
+            frozenset(["pay", "payment", "payment history", "history"]),
+        )
+        self.assertEqual(matcher.find("repay"), frozenset(["pay"]))
+        self.assertEqual(matcher.find("nothing here"), frozenset())
+
+    def test_empty_matcher(self):
+        self.assertEqual(KeywordMatcher([]).find("anything"), frozenset())
+
+
+class TestIntentEngineEquivalence(unittest.TestCase):
+    """Every detector returns the same result as its original implementation."""
+
+    def test_detectors_match_legacy(self):
+        messages = corpus()
+        for name, (legacy, engine) in DETECTORS.items():
+            for message in messages:
+                self.assertEqual(engine(message), legacy(message), f"{name}: {message!r}")
+
+    def test_classifier_personas(self):
+        for persona in ("beneficiary", "employer", "staff", "unknown_persona"):
+            for message in corpus()[:500]:
+                self.assertEqual(
+                    engine_classifier(message, persona), legacy_classifier(message, persona),
+                    f"{persona}: {message!r}",
+                )
+
+    def test_known_intents(self):
+        self.assertEqual(intent_engine.classify_router("What is my claim status?")[0], "claim_status")
+        self.assertEqual(intent_engine.classify_router("Random gibberish xyz123"), ("unknown", 0.0))
+        self.assertEqual(intent_engine.classify_reply("I want to submit a claim")[0], "claim_submission")
+        self.assertEqual(intent_engine.ultra_fast_intent("thanks"), "gratitude")
+
+    def test_engine_is_shared(self):
+        self.assertIs(intent_engine.get_engine(), intent_engine.get_engine())
+
+
+if __name__ == '__main__':
+    unittest.main()
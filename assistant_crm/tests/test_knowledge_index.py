@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Knowledge Index Tests
+===========================================
+
+The inverted index must score exactly like a brute-force BM25 pass over
+every article, and an index updated incrementally must match one rebuilt
+from scratch.
+"""
+
+import math
+import os
+import random
+import sys
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.services import knowledge_index
+from assistant_crm.services.knowledge_index import KnowledgeIndex
+
+WORDS = ["claim", "payment", "pension", "employer", "registration", "injury", "medical",
+         "benefit", "compensation", "status", "form", "submit", "office", "contact", "audit"]
+
+
+def make_articles(count, seed=3):
+    rng = random.Random(seed)
+    articles = []
+    for i in range(count):
+        articles.append({
+            'name': f"KB-{i:04d}",
+            'title': " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))),
+            'content': "<p>" + " ".join(rng.choice(WORDS + ["the", "and"]) for _ in range(rng.randint(0, 30))) + "</p>",
+            'category': rng.choice(["Claims", "Payments", "General"]),
+            'language': rng.choice(["en", "en", "bem"]),
+            'keywords': [{'keyword': rng.choice(WORDS), 'weight': 1.0} for _ in range(rng.randint(0, 3))],
+            'modified': f"2025-01-01 00:00:{i % 60:02d}",
+        })
+    return articles
+
+
+def brute_force(articles, query, language=None):
+    prepared = [knowledge_index.prepare_article(a) for a in articles]
+    terms = [knowledge_index._article_terms(a) for a in prepared]
+    count = len(prepared)
+    avg_length = sum(sum(t.values()) for t in terms) / count
+    df = Counter(term for t in terms for term in t)
+    if language and language != 'en' and not any(a['language'] == language for a in prepared):
+        language = 'en'
+    scores = {}
+    for article, article_terms in zip(prepared, terms):
+        if language and article['language'] != language:
+            continue
+        length = sum(article_terms.values())
+        score = 0.0
+        for term, weight in query.items():
+            tf = article_terms.get(term, 0)
+            if not tf:
+                continue
+            idf = math.log(1 + (count - df[term] + 0.5) / (df[term] + 0.5))
+            norm = knowledge_index.K1 * (1 - knowledge_index.B + knowledge_index.B * length / avg_length)
+            score += weight * idf * tf * (knowledge_index.K1 + 1) / (tf + norm)
+        if score > 0:
+            scores[article['name']] = score
+    return scores
+
+
+def index_scores(index, query, language=None):
+    return {a['name']: s for a, s in index.search_tokens(query, language=language, limit=10 ** 6)}
+
+
+class TestKnowledgeIndex(unittest.TestCase):
+
+    def assertScoresEqual(self, actual, expected):
+        self.assertEqual(set(actual), set(expected))
+        for name, score in expected.items():
+            self.assertAlmostEqual(actual[name], score, places=9, msg=name)
+
+    def test_matches_brute_force_bm25(self):
+        articles = make_articles(200)
+        index = KnowledgeIndex()
+        index.sync(articles)
+        rng = random.Random(9)
+        for _ in range(100):
+            tokens = [rng.choice(WORDS + ["nothing"]) for _ in range(rng.randint(1, 5))]
+            for language in (None, "en", "bem", "ny"):
+                self.assertScoresEqual(
+                    index_scores(index, tokens, language),
+                    brute_force(articles, dict.fromkeys(tokens, 1.0), language),
+                )
+
+    def test_incremental_updates_match_rebuild(self):
+        articles = make_articles(120)
+        index = KnowledgeIndex()
+        index.sync(articles)
+
+        rng = random.Random(4)
+        current = {a['name']: a for a in articles}
+        for step in range(200):
+            action = rng.random()
+            if action < 0.3 and current:
+                del current[rng.choice(sorted(current))]
+            else:
+                article = make_articles(1, seed=step)[0]
+                article['name'] = rng.choice(sorted(current)) if action < 0.7 and current else f"NEW-{step}"
+                article['modified'] = f"2025-02-01 {step}"
+                current[article['name']] = article
+            index.sync(list(current.values()))
+
+        rebuilt = KnowledgeIndex()
+        rebuilt.sync(list(current.values()))
+        self.assertEqual(len(index), len(current))
+        for word in WORDS:
+            self.assertScoresEqual(index_scores(index, [word]), index_scores(rebuilt, [word]))
+
+    def test_sync_skips_unchanged_articles(self):
+        articles = make_articles(10)
+        index = KnowledgeIndex()
+        index.sync(articles)
+        before = {a['name']: a for a in index.articles()}
+        articles[0] = dict(articles[0], title="pension office", modified="2025-03-01")
+        index.sync(articles)
+        after = {a['name']: a for a in index.articles()}
+        self.assertIsNot(after["KB-0000"], before["KB-0000"])
+        self.assertIs(after["KB-0001"], before["KB-0001"])
+
+    def test_prepared_fields_and_intent_terms(self):
+        index = KnowledgeIndex()
+        index.sync([
+            {'name': "A", 'title': "How to submit a claim", 'content': "<b>Fill</b> the form",
+             'keywords': [{'keyword': " Claim Form ", 'weight': 2}]},
+            {'name': "B", 'title': "Pension dates", 'content': "Retirement pension schedule"},
+        ])
+        article = {a['name']: a for a in index.articles()}["A"]
+        self.assertEqual(article['_title_tokens'], ("submit", "claim"))
+        self.assertEqual(article['_clean_content'], "fill the form")
+        self.assertEqual(article['processed_keywords'], [{'keyword': "claim form", 'weight': 2}])
+        self.assertEqual(article['language'], "en")
+
+        self.assertEqual(index.search_tokens([]), [])
+        hits = index.search_tokens([], intent="pension_inquiry")
+        self.assertEqual([a['name'] for a, _ in hits], ["B"])
+        self.assertEqual([a['name'] for a, _ in index.search_tokens(["form"], limit=1)], ["A"])
+
+
+if __name__ == '__main__':
+    unittest.main()
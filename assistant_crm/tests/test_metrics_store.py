@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Metrics Store Tests
+=========================================
+
+Calls are counted in an in-process buffer without touching Redis.
+Percentiles come from fixed latency buckets, and increments that cannot
+be flushed are kept for the next flush.
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.services import metrics_store, redis_pool
+from redis_fixtures import DEAD_URL, install_dead_pool
+
+
+class TestMetricsStore(unittest.TestCase):
+
+    def setUp(self):
+        redis_pool.reset()
+        metrics_store._take()
+        metrics_store._flusher["pid"] = os.getpid()  # no background flush during tests
+
+    def tearDown(self):
+        metrics_store._take()
+        metrics_store._flusher["pid"] = None
+        redis_pool.reset()
+
+    def test_buckets_and_percentiles(self):
+        self.assertEqual(metrics_store.bucket_index(3), 0)
+        self.assertEqual(metrics_store.bucket_index(5), 0)
+        self.assertEqual(metrics_store.bucket_index(7), 1)
+        self.assertEqual(metrics_store.bucket_index(10 ** 6), len(metrics_store.LATENCY_BUCKETS_MS))
+
+        buckets = [0] * (len(metrics_store.LATENCY_BUCKETS_MS) + 1)
+        buckets[metrics_store.bucket_index(80)] = 90   # 50-100 ms
+        buckets[metrics_store.bucket_index(800)] = 10  # 500-1000 ms
+        self.assertTrue(50 <= metrics_store.percentile(buckets, 0.50) <= 100)
+        self.assertTrue(500 <= metrics_store.percentile(buckets, 0.95) <= 1000)
+        self.assertEqual(metrics_store.percentile([0] * len(buckets), 0.99), 0.0)
+
+    def test_concurrent_records_are_not_lost(self):
+        def work():
+            for i in range(1000):
+                metrics_store.record("gemini_api", 120, "success" if i % 10 else "timeout")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        buffered, _errors = metrics_store._take()
+        merged = {}
+        for fields in buffered.values():
+            metrics_store._merge(merged, fields)
+        summary = metrics_store._summarise(merged)
+        self.assertEqual(summary["count"], 4000)
+        self.assertEqual(summary["by_status"], {"success": 3600, "timeout": 400})
+        self.assertEqual(summary["error_rate"], 10.0)
+        self.assertEqual(summary["avg_ms"], 120.0)
+
+    def test_unflushed_increments_are_kept(self):
+        install_dead_pool(state=redis_pool.OPEN)
+
+        key = ("site", DEAD_URL, "gemini_api", 0)
+        metrics_store._buffer[key] = {"count": 2, "sum_ms": 40.0}
+        self.assertEqual(metrics_store.flush(), 0)
+        metrics_store._buffer[key]["count"] += 1  # a newer record for the same minute
+        self.assertEqual(metrics_store.flush(), 0)
+        self.assertEqual(metrics_store._buffer[key], {"count": 3, "sum_ms": 40.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
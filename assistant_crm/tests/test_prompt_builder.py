@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Prompt Builder Tests
+==========================================
+
+Context and history must fit the token budget with live data kept ahead
+of old turns, and the message, intent and auth context never dropped.
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.services import prompt_builder
+
+
+def make_context(claims=200):
+    return {
+        'user_message': "What is the status of my claim?",
+        'intent': "claim_status",
+        'confidence': 0.92,
+        'data_source': "live_data",
+        'has_live_data': True,
+        'auth_context': {'authenticated': True, 'collected_credentials': {'nrc': "123456/78/9"}},
+        'live_data': {
+            'claim_number': "CLM-0001",
+            'notes': "Medical report received and under review. " * 200,
+            'payments': [{'date': f"2025-01-{i % 28 + 1:02d}", 'amount': 1500 + i} for i in range(claims)],
+        },
+        'conversation_history': [{'role': "user", 'text': "hello"}],
+        'debug_trace': ["step"] * 50,
+    }
+
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_small_context_is_sent_whole(self):
+        context = {'intent': "greeting", 'confidence': 1.0}
+        text, tokens = prompt_builder.fit_context(context, 1000)
+        self.assertEqual(json.loads(text), context)
+        self.assertEqual(tokens, prompt_builder.count_tokens(text))
+
+    def test_context_trimmed_to_budget_by_priority(self):
+        context = make_context()
+        original = json.dumps(context)
+        text, tokens = prompt_builder.fit_context(context, 600, exclude=("conversation_history", "user_message"))
+        data = json.loads(text)
+
+        self.assertLessEqual(tokens, 600)
+        self.assertEqual(json.dumps(context), original)  # caller's context is untouched
+        self.assertTrue(data['context_truncated'])
+        self.assertNotIn('conversation_history', data)
+        self.assertNotIn('user_message', data)
+        self.assertNotIn('debug_trace', data)  # unlisted keys go first
+        self.assertEqual(data['auth_context'], context['auth_context'])
+        self.assertEqual(data['live_data']['claim_number'], "CLM-0001")
+        self.assertLess(len(data['live_data']['payments']), 200)
+
+    def test_required_keys_survive_tiny_budget(self):
+        text, _tokens = prompt_builder.fit_context(make_context(), 10)
+        data = json.loads(text)
+        self.assertEqual(set(data) - {'context_truncated'}, prompt_builder.REQUIRED_CONTEXT_KEYS)
+
+    def test_history_keeps_newest_turns(self):
+        history = [{'role': "user" if i % 2 else "assistant", 'text': f"turn {i} " + "word " * 20} for i in range(10)]
+        history.append({'direction': "Outbound", 'message_content': "=== internal log ==="})
+        history.append({'direction': "Outbound", 'message_content': "latest agent reply"})
+        turn_tokens = prompt_builder.count_tokens(history[0]['text'])
+
+        messages, used = prompt_builder.fit_history(history, turn_tokens * 3, max_turns=20)
+        self.assertLessEqual(used, turn_tokens * 3)
+        self.assertEqual(messages[-1], {'role': "assistant", 'content': "latest agent reply"})
+        self.assertEqual([m['content'].split()[1] for m in messages[:-1]], ["8", "9"])
+
+        self.assertEqual(prompt_builder.fit_history(history, 10 ** 6, max_turns=3)[0][0]['content'].split()[1], "8")
+        self.assertEqual(prompt_builder.fit_history([], 100), ([], 0))
+
+    def test_truncate(self):
+        text = "claim payment status " * 100
+        cut = prompt_builder.truncate(text, 50)
+        self.assertLessEqual(prompt_builder.count_tokens(cut), 50)
+        self.assertTrue(cut.endswith(prompt_builder.TRUNCATION_MARK))
+        self.assertEqual(prompt_builder.truncate("short", 50), "short")
+        self.assertEqual(prompt_builder.truncate(text, 0), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Service Container Tests
+=============================================
+
+Services are built once per site and process, shared across threads, and
+rebuilt only after the settings they read are invalidated.
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.services import service_container
+
+
+class SlowService:
+    instances = 0
+
+    def __init__(self):
+        time.sleep(0.01)
+        SlowService.instances += 1
+
+
+class TestServiceContainer(unittest.TestCase):
+
+    def setUp(self):
+        SlowService.instances = 0
+        service_container.clear()
+        self._services = dict(service_container.SERVICES)
+        service_container.SERVICES["slow"] = (f"{__name__}.SlowService", ())
+        service_container.SERVICES["slow_settings"] = (f"{__name__}.SlowService", ("Slow Settings",))
+
+    def tearDown(self):
+        service_container.SERVICES.clear()
+        service_container.SERVICES.update(self._services)
+        service_container.clear()
+
+    def test_built_once_across_threads(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service_container.get("slow"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(SlowService.instances, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        stats = service_container.get_metrics()["services"]["slow"]
+        self.assertEqual((stats["builds"], stats["hits"]), (1, 7))
+
+    def test_invalidate_rebuilds_only_matching_services(self):
+        plain = service_container.get("slow")
+        configured = service_container.get("slow_settings")
+
+        class Doc:
+            doctype = "Slow Settings"
+
+        service_container.invalidate(Doc())
+        self.assertIs(service_container.get("slow"), plain)
+        self.assertIsNot(service_container.get("slow_settings"), configured)
+        self.assertEqual(SlowService.instances, 3)
+
+    def test_unknown_service(self):
+        with self.assertRaises(KeyError):
+            service_container.get("missing")
+        self.assertEqual(service_container.warm_up(["slow"]).keys(), {"slow"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WCFCB Assistant CRM - Batch Text Analytics Tests
+================================================
+
+The batch API must return what the per-item sentiment, emotion and
+language loops return, in input order, in-process or on a pool. The
+original loops are kept as ``legacy_*`` functions in
+``scripts/benchmark_text_analytics.py``.
+"""
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from assistant_crm.scripts.benchmark_text_analytics import (
+    SAMPLE_MESSAGES,
+    build_corpus,
+    legacy_emotions,
+    legacy_language,
+    legacy_sentiment,
+)
+from assistant_crm.services import text_analytics
+
+EDGE_CASES = [
+    None, 42, "", "   ", "!!!", "not", "not not good", "no very good", "very not good",
+    "never extremely bad", "so so good", "good bad", "not good bad", "not bad good",
+    "don't understand", "I don't understand", "hi", "this", "muli", "bwino sana",
+    "ukufwaya ukufwaya", "kukwiya kukwiya kukwiya", "aba aba aba", "wa wa wa",
+    "reported to the court", "sue", "HAPPY HAPPY", "fed up, fed up",
+]
+
+
+def corpus():
+    rng = random.Random(3)
+    vocabulary = sorted(
+        text_analytics.POSITIVE_WORDS | text_analytics.NEGATIVE_WORDS | text_analytics.NEGATION_WORDS
+        | set(text_analytics.INTENSIFIERS)
+    )
+    random_texts = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 12))) for _ in range(2000)]
+    return list(SAMPLE_MESSAGES) + EDGE_CASES + build_corpus(2000, seed=5) + random_texts
+
+
+class TestTextAnalytics(unittest.TestCase):
+
+    def test_rows_match_legacy(self):
+        for text in corpus():
+            self.assertEqual(text_analytics.sentiment_row(text), legacy_sentiment(text), repr(text))
+            self.assertEqual(text_analytics.emotion_row(text), legacy_emotions(text), repr(text))
+            self.assertEqual(text_analytics.language_row(text), legacy_language(text), repr(text))
+
+    def test_batch_arrays(self):
+        texts = corpus()
+        result = text_analytics.analyze_batch(iter(texts), workers=1, chunk_size=333)
+        self.assertEqual(len(result["language"]), len(texts))
+        for i, text in enumerate(texts):
+            expected = legacy_sentiment(text)
+            self.assertEqual(result["compound_score"][i], expected[3])
+            self.assertEqual(result["sentiment"][i], expected[4])
+            self.assertEqual(bool(result["escalation_needed"][i]), expected[5])
+            self.assertEqual(tuple(result["emotion_scores"][i]), legacy_emotions(text))
+            self.assertEqual(result["language"][i], legacy_language(text))
+        self.assertEqual(result["primary_emotion"][texts.index("")], "neutral")
+        self.assertEqual(result["primary_emotion"][texts.index("fed up, fed up")], "frustration")
+
+    def test_pool_matches_in_process(self):
+        texts = build_corpus(text_analytics.PARALLEL_THRESHOLD + 1234, seed=8)
+        pooled = text_analytics.analyze_batch(texts, workers=2)
+        local = text_analytics.analyze_batch(texts, workers=1)
+        for field, values in local.items():
+            self.assertEqual(values.tolist(), pooled[field].tolist(), field)
+
+    def test_empty_batch(self):
+        result = text_analytics.analyze_batch([])
+        self.assertEqual(len(result["positive"]), 0)
+        self.assertEqual(result["emotion_scores"].shape, (0, len(text_analytics.EMOTIONS)))
+        self.assertEqual(len(text_analytics.detect_language_batch([])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -63,6 +63,7 @@ def get_real_time_metrics():
             "data": {
                 "system_health": monitoring_service.get_system_health(),
                 "performance_metrics": monitoring_service.get_performance_metrics(),
+                "recent_performance": monitoring_service.get_recent_performance(minutes=60),
                 "timestamp": frappe.utils.now()
             }
         }